@@ -1,21 +1,19 @@
+"""
+Client HTTP asynchrone de l'agent_memory (MCP) : historique, contexte,
+recherche d'échanges anciens et écritures. Un seul httpx.AsyncClient
+partagé (pool borné par MEMORY_HTTP_MAX_CONNECTIONS) ; URL de base :
+AGENT_MEMORY_URL (http://127.0.0.1:8003 par défaut).
+"""
+
 import os
 import uuid
 from typing import Any, Dict, List, Optional
 
-import requests
-
+import httpx
 
-"""
-Client HTTP pour communiquer avec l'agent_memory via MCP.
-
-Il expose deux méthodes principales :
-  - get_history(user_id, limit)
-  - save_interaction(user_id, role, text, metadata)
 
-L'URL de base de l'agent mémoire peut être configurée avec
-la variable d'environnement AGENT_MEMORY_URL.
-Par défaut, on utilise http://127.0.0.1:8003 (dev local).
-"""
+MEMORY_HTTP_MAX_CONNECTIONS = int(os.getenv("MEMORY_HTTP_MAX_CONNECTIONS", "20"))
+MEMORY_HTTP_TIMEOUT_S = float(os.getenv("MEMORY_HTTP_TIMEOUT_S", "5"))
 
 
 class MemoryClient:
@@ -24,8 +22,31 @@ class MemoryClient:
             "AGENT_MEMORY_URL",
             "http://127.0.0.1:8003",  # URL de dev local
         )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Client HTTP partagé, créé à la première utilisation.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=MEMORY_HTTP_TIMEOUT_S,
+                limits=httpx.Limits(
+                    max_connections=MEMORY_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=MEMORY_HTTP_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """
+        Ferme le pool de connexions (appelé à l'arrêt du service).
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
-    def _post_mcp(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def _post_mcp(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
         Envoie un message MCP à l'agent_memory et retourne la réponse JSON.
         """
@@ -39,11 +60,11 @@ class MemoryClient:
         }
 
         url = f"{self.base_url}/mcp"
-        response = requests.post(url, json=message, timeout=5)
+        response = await self._get_client().post(url, json=message)
         response.raise_for_status()
         return response.json()
 
-    def get_history(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    async def get_history(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Récupère l'historique des interactions pour un utilisateur donné.
         Retourne une liste de dictionnaires (id, user_id, role, text, metadata, created_at).
@@ -54,7 +75,7 @@ class MemoryClient:
             "limit": limit,
         }
 
-        data = self._post_mcp(payload)
+        data = await self._post_mcp(payload)
         resp_payload = data.get("payload", {}) or {}
 
         if resp_payload.get("status") != "ok":
@@ -64,7 +85,63 @@ class MemoryClient:
         history = resp_payload.get("history", []) or []
         return history
 
-    def save_interaction(
+    async def get_context(
+        self,
+        user_id: str,
+        recent_limit: int = 4,
+        baseline_limit: int = 10,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Récupère le contexte compact d'un utilisateur : résumé glissant
+        ("summary", None s'il n'existe pas encore) + derniers échanges
+        ("recent"), avec l'économie de tokens estimée par rapport aux
+        `baseline_limit` derniers messages bruts ("stats").
+        Retourne None si agent_memory renvoie une erreur.
+        """
+        payload = {
+            "task": "get_context",
+            "user_id": user_id,
+            "recent_limit": recent_limit,
+            "baseline_limit": baseline_limit,
+        }
+
+        data = await self._post_mcp(payload)
+        resp_payload = data.get("payload", {}) or {}
+
+        if resp_payload.get("status") != "ok":
+            return None
+
+        return resp_payload
+
+    async def retrieve_relevant(
+        self,
+        user_id: str,
+        query: str,
+        k: int = 3,
+        exclude_ids: Optional[List[int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Interactions de l'utilisateur les plus proches de `query` (quelle
+        que soit leur ancienneté), avec leur score de similarité.
+        Retourne une liste vide en cas d'erreur.
+        """
+        payload = {
+            "task": "retrieve_relevant",
+            "user_id": user_id,
+            "query": query,
+            "k": k,
+            "exclude_ids": exclude_ids or [],
+        }
+
+        data = await self._post_mcp(payload)
+        resp_payload = data.get("payload", {}) or {}
+
+        if resp_payload.get("status") != "ok":
+            return []
+
+        return resp_payload.get("results", []) or []
+
+    async def save_interaction(
         self,
         user_id: str,
         role: str,
@@ -83,10 +160,61 @@ class MemoryClient:
             "metadata": metadata or {},
         }
 
-        data = self._post_mcp(payload)
+        data = await self._post_mcp(payload)
         resp_payload = data.get("payload", {}) or {}
 
         if resp_payload.get("status") != "ok":
             return None
 
         return resp_payload.get("interaction_id")
+
+    async def save_interactions(
+        self,
+        interactions: List[Dict[str, Any]],
+    ) -> List[int]:
+        """
+        Enregistre un lot d'interactions (dicts user_id, role, text, metadata)
+        en un seul appel. Retourne les ids dans l'ordre du lot.
+
+        Lève RuntimeError si agent_memory refuse le lot.
+        """
+        payload = {
+            "task": "save_interactions",
+            "interactions": interactions,
+        }
+
+        data = await self._post_mcp(payload)
+        resp_payload = data.get("payload", {}) or {}
+
+        if resp_payload.get("status") != "ok":
+            raise RuntimeError(
+                f"save_interactions refusé par agent_memory : {resp_payload.get('message')!r}"
+            )
+
+        return resp_payload.get("interaction_ids", []) or []
+
+    async def record_exchanges(
+        self,
+        exchanges: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Enregistre un lot d'échanges (dicts exchange_id, user_id, user_text,
+        coach_text, metadata...) en un seul appel. Idempotent : un échange
+        déjà enregistré (retry, interface) n'est pas dupliqué.
+
+        Lève RuntimeError si agent_memory refuse le lot.
+        """
+        payload = {
+            "task": "record_exchanges",
+            "exchanges": exchanges,
+        }
+
+        data = await self._post_mcp(payload)
+        resp_payload = data.get("payload", {}) or {}
+
+        if resp_payload.get("status") != "ok":
+            raise RuntimeError(
+                f"record_exchanges refusé par agent_memory : {resp_payload.get('message')!r}"
+            )
+
+        return resp_payload.get("results", []) or []
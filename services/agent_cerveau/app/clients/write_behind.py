@@ -0,0 +1,151 @@
+"""
+File d'écriture différée des échanges vers l'agent_memory : envoi par
+lots (MEMORY_WRITE_BATCH_MAX ou MEMORY_WRITE_FLUSH_MS), file bornée par
+MEMORY_WRITE_QUEUE_MAX (submit() attend), lots retentés sans doublon
+grâce à l'idempotence de record_exchanges.
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+MEMORY_WRITE_QUEUE_MAX = int(os.getenv("MEMORY_WRITE_QUEUE_MAX", "1000"))
+MEMORY_WRITE_BATCH_MAX = int(os.getenv("MEMORY_WRITE_BATCH_MAX", "50"))
+MEMORY_WRITE_FLUSH_MS = float(os.getenv("MEMORY_WRITE_FLUSH_MS", "200"))
+MEMORY_WRITE_RETRIES = int(os.getenv("MEMORY_WRITE_RETRIES", "3"))
+
+# Marqueur déposé dans la file par stop().
+_STOP: Any = object()
+
+FlushFn = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        flush_fn: FlushFn,
+        max_size: int = MEMORY_WRITE_QUEUE_MAX,
+        batch_max: int = MEMORY_WRITE_BATCH_MAX,
+        flush_ms: float = MEMORY_WRITE_FLUSH_MS,
+        retries: int = MEMORY_WRITE_RETRIES,
+    ) -> None:
+        self._flush_fn = flush_fn
+        self.max_size = max(1, max_size)
+        self.batch_max = max(1, batch_max)
+        self.flush_s = flush_ms / 1000.0
+        self.retries = max(0, retries)
+
+        self._queue: Optional["asyncio.Queue[Any]"] = None
+        self._worker: Optional["asyncio.Task[None]"] = None
+
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    # ------------------------------------------------------------------ #
+    # Cycle de vie
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        if self._worker is not None and not self._worker.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Arrête le worker après avoir écrit tout ce qui reste dans la file.
+        """
+        if self._worker is None or self._queue is None:
+            return
+        await self._queue.put(_STOP)
+        await self._worker
+        self._worker = None
+
+    # ------------------------------------------------------------------ #
+    # Écritures
+    # ------------------------------------------------------------------ #
+    async def submit(self, item: Dict[str, Any]) -> None:
+        """
+        Dépose un élément à écrire. Ne bloque que si la file est pleine.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        if self._worker is None or self._worker.done():
+            # Pas de worker (ex : tests, script) : on démarre à la demande.
+            self.start()
+        self.submitted += 1
+        await self._queue.put(item)
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            batch: List[Dict[str, Any]] = [first]
+            deadline = loop.time() + self.flush_s
+
+            while len(batch) < self.batch_max:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._write(batch)
+
+        # Arrêt : on écrit ce qui a pu être déposé entre-temps.
+        while not self._queue.empty():
+            batch = []
+            while not self._queue.empty() and len(batch) < self.batch_max:
+                item = self._queue.get_nowait()
+                if item is not _STOP:
+                    batch.append(item)
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                await self._flush_fn(batch)
+                self.batches += 1
+                self.written += len(batch)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    self.failed += len(batch)
+                    print(
+                        "[AGENT_CERVEAU] écriture mémoire abandonnée "
+                        f"({len(batch)} éléments) :",
+                        repr(e),
+                        flush=True,
+                    )
+                    return
+                await asyncio.sleep(min(0.1 * 2**attempt, 2.0))
+
+    # ------------------------------------------------------------------ #
+    # Statistiques
+    # ------------------------------------------------------------------ #
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size,
+            "batch_max": self.batch_max,
+            "flush_ms": self.flush_s * 1000.0,
+            "submitted": self.submitted,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "avg_batch_size": (self.written / self.batches) if self.batches else 0.0,
+        }
@@ -0,0 +1,268 @@
+# services/agent_cerveau/app/llm/answer_cache.py
+
+"""
+Cache sémantique des réponses génériques du coach (désactivé par défaut,
+COACH_ANSWER_CACHE_ENABLED=1). Une réponse n'est resservie que pour le
+même mood et les mêmes connaissances expertes, une question proche
+(cosinus > COACH_ANSWER_CACHE_THRESHOLD) sans donnée personnelle, et si
+elle a été générée sans contexte de l'utilisateur.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+COACH_ANSWER_CACHE_ENABLED = os.getenv("COACH_ANSWER_CACHE_ENABLED", "0") == "1"
+COACH_ANSWER_CACHE_TTL_S = float(os.getenv("COACH_ANSWER_CACHE_TTL_S", "3600"))
+COACH_ANSWER_CACHE_MAX = int(os.getenv("COACH_ANSWER_CACHE_MAX", "500"))
+COACH_ANSWER_CACHE_THRESHOLD = float(os.getenv("COACH_ANSWER_CACHE_THRESHOLD", "0.85"))
+COACH_ANSWER_CACHE_DIM = int(os.getenv("COACH_ANSWER_CACHE_DIM", str(2**18)))
+
+SparseVector = Dict[int, float]
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Indices de données personnelles dans le message : la réponse dépend
+# alors de l'utilisateur et ne doit pas être partagée.
+_USER_SPECIFIC_RE = re.compile(
+    r"\d"
+    r"|\b(mon|ma|mes)\b"
+    r"|\bj'?ai\b"
+    r"|\bje (suis|pese|mesure|fais|mange|cours|dors|prends|sens)\b"
+    r"|\b(hier|aujourd'?hui|ce matin|ce soir|cette semaine)\b"
+)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Minuscules, sans accents, apostrophes typographiques unifiées.
+    """
+    text = unicodedata.normalize("NFD", (text or "").lower())
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    return text.replace("’", "'")
+
+
+def _feature_hash(feature: str, dim: int) -> Tuple[int, float]:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    sign = 1.0 if value & 1 else -1.0
+    return (value >> 1) % dim, sign
+
+
+def embed_text(text: str, dim: int = COACH_ANSWER_CACHE_DIM) -> SparseVector:
+    """
+    Vecteur creux normalisé (L2) du message : mots, paires de mots
+    consécutifs et trigrammes de caractères, hachés avec signe.
+    """
+    words = _WORD_RE.findall(normalize_text(text))
+    features: List[str] = [f"w:{w}" for w in words]
+    features += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"#{w}#"
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    vec: SparseVector = {}
+    for feature in features:
+        index, sign = _feature_hash(feature, dim)
+        vec[index] = vec.get(index, 0.0) + sign
+
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    if not norm:
+        return {}
+    return {i: v / norm for i, v in vec.items() if v}
+
+
+def cosine(a: SparseVector, b: SparseVector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(i, 0.0) for i, v in a.items())
+
+
+def knowledge_fingerprint(expert_knowledge: Any) -> str:
+    """
+    Empreinte stable des connaissances expertes jointes à la requête.
+    """
+    canonical = json.dumps(
+        expert_knowledge or [], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def is_user_specific(user_input: str, expert_knowledge: Any = None) -> bool:
+    """
+    True si la requête contient des données propres à l'utilisateur :
+    une analyse de photo, ou un message avec chiffres / possessifs /
+    faits personnels ("je pèse", "j'ai mal", "hier"...).
+    """
+    if isinstance(expert_knowledge, list):
+        for entry in expert_knowledge:
+            if isinstance(entry, dict) and entry.get("type") == "vision":
+                return True
+    return bool(_USER_SPECIFIC_RE.search(normalize_text(user_input)))
+
+
+@dataclass
+class _Entry:
+    question: str
+    vector: SparseVector
+    answer: str
+    created_at: float
+    hits: int = 0
+
+
+@dataclass
+class CacheHit:
+    answer: str
+    similarity: float
+    question: str
+    age_s: float
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        max_entries: int = COACH_ANSWER_CACHE_MAX,
+        ttl_s: float = COACH_ANSWER_CACHE_TTL_S,
+        threshold: float = COACH_ANSWER_CACHE_THRESHOLD,
+        enabled: bool = COACH_ANSWER_CACHE_ENABLED,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self.threshold = threshold
+        self.enabled = enabled
+
+        # (mood_label, empreinte connaissances, id) -> entrée, dans l'ordre LRU
+        self._entries: "OrderedDict[Tuple[str, str, int], _Entry]" = OrderedDict()
+        self._next_id = 0
+
+        self.lookups = 0
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _partition(mood_label: Optional[str], expert_knowledge: Any) -> Tuple[str, str]:
+        return (
+            normalize_text(mood_label or "").strip(),
+            knowledge_fingerprint(expert_knowledge),
+        )
+
+    def _expire(self, now: float) -> None:
+        expired = [
+            key for key, entry in self._entries.items()
+            if now - entry.created_at > self.ttl_s
+        ]
+        for key in expired:
+            del self._entries[key]
+        self.expirations += len(expired)
+
+    def lookup(
+        self,
+        user_input: str,
+        mood_label: Optional[str],
+        expert_knowledge: Any = None,
+    ) -> Optional[CacheHit]:
+        """
+        Renvoie la réponse en cache la plus proche, ou None (désactivé,
+        requête personnelle, aucune question assez similaire).
+        """
+        if not self.enabled:
+            return None
+        if is_user_specific(user_input, expert_knowledge):
+            self.skipped += 1
+            return None
+
+        self.lookups += 1
+        now = time.monotonic()
+        self._expire(now)
+
+        partition = self._partition(mood_label, expert_knowledge)
+        vector = embed_text(user_input)
+        best_key, best_score = None, 0.0
+        for key, entry in self._entries.items():
+            if key[:2] != partition:
+                continue
+            score = cosine(vector, entry.vector)
+            if score > best_score:
+                best_key, best_score = key, score
+
+        if best_key is None or best_score < self.threshold:
+            self.misses += 1
+            return None
+
+        entry = self._entries[best_key]
+        self._entries.move_to_end(best_key)
+        entry.hits += 1
+        self.hits += 1
+        return CacheHit(
+            answer=entry.answer,
+            similarity=round(best_score, 4),
+            question=entry.question,
+            age_s=round(now - entry.created_at, 1),
+        )
+
+    def store(
+        self,
+        user_input: str,
+        mood_label: Optional[str],
+        expert_knowledge: Any,
+        answer: str,
+        personal_context: bool = False,
+    ) -> bool:
+        """
+        Enregistre une réponse générée. Ignoré si le cache est désactivé,
+        si la requête est personnelle, si la réponse est vide ou si elle a
+        été générée avec le contexte de l'utilisateur (personal_context).
+        """
+        if not self.enabled or not answer:
+            return False
+        if personal_context or is_user_specific(user_input, expert_knowledge):
+            return False
+        vector = embed_text(user_input)
+        if not vector:
+            return False
+
+        partition = self._partition(mood_label, expert_knowledge)
+        self._entries[(*partition, self._next_id)] = _Entry(
+            question=user_input,
+            vector=vector,
+            answer=answer,
+            created_at=time.monotonic(),
+        )
+        self._next_id += 1
+        self.stores += 1
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped_user_specific": self.skipped,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": (self.hits / self.lookups) if self.lookups else 0.0,
+        }
@@ -0,0 +1,182 @@
+# services/agent_cerveau/app/llm/assembly.py
+
+"""
+Assemblage du prompt du coach : préfixe statique (COACH_SYSTEM_PROMPT,
+réutilisable par le cache de prompt du fournisseur) en message "system",
+puis blocs dynamiques en messages "user" ; size_report() donne la taille
+de chaque bloc.
+"""
+
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from app.llm.prompts import (
+    COACH_SYSTEM_PROMPT,
+    _format_history,
+    _format_mood,
+    _format_nutrition_suggestions,
+    _format_vision_info,
+)
+from app.llm.tokens import estimate_tokens
+
+PROMPT_BLOCK_CACHE_SIZE = int(os.getenv("PROMPT_BLOCK_CACHE_SIZE", "256"))
+
+_SYSTEM_PROMPT_TOKENS = estimate_tokens(COACH_SYSTEM_PROMPT)
+
+# Blocs souvent identiques d'une requête à l'autre (mood, sections
+# nutrition / vision vides) : leurs tokens ne sont comptés qu'une fois.
+_cached_token_count = lru_cache(maxsize=PROMPT_BLOCK_CACHE_SIZE)(estimate_tokens)
+
+
+@dataclass
+class PromptBlock:
+    name: str
+    role: str       # "system" | "user"
+    content: str
+    static: bool = False
+    tokens: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.tokens:
+            self.tokens = _cached_token_count(self.content)
+
+
+@dataclass
+class AssembledPrompt:
+    blocks: List[PromptBlock] = field(default_factory=list)
+
+    def to_messages(self) -> List[Dict[str, str]]:
+        """
+        Messages au format {"role", "content"}, préfixe statique en tête.
+        """
+        return [{"role": b.role, "content": b.content} for b in self.blocks]
+
+    def as_text(self) -> str:
+        """
+        Version "un seul texte" (compatibilité avec build_coach_prompt).
+        """
+        return "\n\n".join(b.content for b in self.blocks)
+
+    def size_report(self) -> Dict[str, Any]:
+        total_chars = sum(len(b.content) for b in self.blocks)
+        total_tokens = sum(b.tokens for b in self.blocks)
+        static_tokens = sum(b.tokens for b in self.blocks if b.static)
+        return {
+            "blocks": [
+                {
+                    "name": b.name,
+                    "role": b.role,
+                    "static": b.static,
+                    "chars": len(b.content),
+                    "tokens": b.tokens,
+                }
+                for b in self.blocks
+            ],
+            "total_chars": total_chars,
+            "total_tokens": total_tokens,
+            "static_tokens": static_tokens,
+            "static_share": (static_tokens / total_tokens) if total_tokens else 0.0,
+        }
+
+
+# -------------------------------------------------------------------------
+# Formateurs de blocs
+# -------------------------------------------------------------------------
+
+
+def format_history_block(history: Any, summary: Optional[str] = None) -> str:
+    recent = "Historique récent (extraits utiles) :\n" + _format_history(history)
+    if summary:
+        return summary + "\n\n" + recent
+    return recent
+
+
+def format_mood_block(mood: Any) -> str:
+    return "État émotionnel / physique estimé :\n" + _format_mood(mood)
+
+
+def format_nutrition_block(expert_knowledge: Any) -> str:
+    return (
+        "CONNAISSANCES EXPERTES – SECTION NUTRITION (base de données d'aliments) :\n"
+        + _format_nutrition_suggestions(expert_knowledge)
+    )
+
+
+def format_vision_block(expert_knowledge: Any) -> str:
+    return (
+        "CONNAISSANCES EXPERTES – SECTION VISION (analyse d'une éventuelle photo de repas) :\n"
+        + _format_vision_info(expert_knowledge)
+    )
+
+
+def format_user_input_block(user_input: str) -> str:
+    return (
+        "Message actuel de l'utilisateur :\n"
+        f'"""{user_input}"""\n\n'
+        "Maintenant, rédige ta réponse pour l'utilisateur."
+    )
+
+
+def token_cache_stats() -> Dict[str, int]:
+    """
+    Statistiques du cache de comptage de tokens (hits, misses, taille).
+    """
+    info = _cached_token_count.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+
+
+# -------------------------------------------------------------------------
+# Assemblage
+# -------------------------------------------------------------------------
+
+
+def assemble_coach_prompt(
+    user_input: str,
+    mood: Optional[Any] = None,
+    history: Any = None,
+    expert_knowledge: Any = None,
+    summary: Optional[str] = None,
+) -> AssembledPrompt:
+    """
+    Assemble le prompt du coach : préfixe statique puis blocs dynamiques.
+
+    Si un résumé glissant (agent_memory) est fourni, il précède les
+    derniers échanges dans le bloc "history".
+
+    Les blocs dynamiques sont ordonnés du plus "contextuel" au plus
+    spécifique ; le message actuel de l'utilisateur est toujours le dernier.
+    """
+    return AssembledPrompt(
+        blocks=[
+            PromptBlock(
+                name="system",
+                role="system",
+                content=COACH_SYSTEM_PROMPT,
+                static=True,
+                tokens=_SYSTEM_PROMPT_TOKENS,
+            ),
+            PromptBlock(
+                name="history",
+                role="user",
+                content=format_history_block(history, summary),
+            ),
+            PromptBlock(name="mood", role="user", content=format_mood_block(mood)),
+            PromptBlock(
+                name="nutrition",
+                role="user",
+                content=format_nutrition_block(expert_knowledge),
+            ),
+            PromptBlock(
+                name="vision",
+                role="user",
+                content=format_vision_block(expert_knowledge),
+            ),
+            PromptBlock(
+                name="user_input",
+                role="user",
+                content=format_user_input_block(user_input),
+            ),
+        ]
+    )
@@ -1,20 +1,41 @@
+"""
+Client LLM pour l'agent cerveau (version LangChain + Groq).
+
+Le prompt est soit un texte unique (message "user"), soit une liste de
+messages {"role": "system" | "user", "content": ...} (cf. app/llm/assembly.py).
+"""
+
 import os
+from typing import AsyncIterator, Dict, List, Sequence, Union
 
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
 
-"""
-Client LLM pour l'agent cerveau (version LangChain + Groq).
+Prompt = Union[str, Sequence[Dict[str, str]]]
 
-On garde la même interface LLMClient.generate(prompt: str) -> str,
-mais à l'intérieur on utilise LangChain pour appeler le modèle Groq.
-"""
+
+def _to_messages(prompt: Prompt) -> List[BaseMessage]:
+    if isinstance(prompt, str):
+        return [HumanMessage(content=prompt)]
+    return [
+        SystemMessage(content=m["content"])
+        if m.get("role") == "system"
+        else HumanMessage(content=m["content"])
+        for m in prompt
+    ]
 
 
 class LLMClient:
-    def __init__(self, model: str | None = None) -> None:
+    def __init__(
+        self,
+        model: str | None = None,
+        max_tokens: int = 800,
+        temperature: float = 0.4,
+        timeout_s: float | None = None,
+        max_retries: int = 2,
+    ) -> None:
         # Charger les variables d'environnement depuis .env
         load_dotenv()
 
@@ -29,26 +50,45 @@ class LLMClient:
         self.model_name = model or "llama-3.3-70b-versatile"
 
         # Initialisation du LLM LangChain pour Groq
+        # (timeout / max_retries : réglés par la politique de niveaux, cf. tiering.py)
         self.llm = ChatGroq(
             model=self.model_name,
             api_key=api_key,
-            temperature=0.4,
-            max_tokens=800,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout_s,
+            max_retries=max_retries,
         )
 
-    def generate(self, prompt: str) -> str:
+    def generate(self, prompt: Prompt) -> str:
         """
-        Génère une réponse textuelle à partir d'un prompt complet.
-
-        Pour l'instant, on envoie le prompt en un seul bloc comme un message "user".
-        Si tu veux séparer system / user plus tard, tu pourras adapter la logique.
+        Génère une réponse textuelle à partir d'un prompt complet
+        (texte unique ou liste de messages system / user).
         """
 
-        # On crée un message Human (utilisateur) avec le prompt complet
-        messages = [HumanMessage(content=prompt)]
+        messages = _to_messages(prompt)
 
         # Appel au modèle via LangChain
         response = self.llm.invoke(messages)
 
         # response.content contient le texte produit par le modèle
         return response.content
+
+    async def agenerate(self, prompt: Prompt) -> str:
+        """
+        Variante asynchrone de generate() : n'occupe pas la boucle
+        d'événements pendant la génération.
+        """
+        response = await self.llm.ainvoke(_to_messages(prompt))
+        return response.content
+
+    async def astream(self, prompt: Prompt) -> AsyncIterator[str]:
+        """
+        Variante streaming de generate() : renvoie les morceaux de texte
+        au fur et à mesure qu'ils sont produits par le modèle.
+        """
+        messages = _to_messages(prompt)
+
+        async for chunk in self.llm.astream(messages):
+            if chunk.content:
+                yield chunk.content
@@ -0,0 +1,288 @@
+# services/agent_cerveau/app/llm/context_packer.py
+
+"""
+Remplissage du contexte du coach sous COACH_PROMPT_TOKEN_BUDGET : les
+éléments (historique, nutrition, vision...) sont pris par score
+décroissant (priorité du bloc × pertinence, récence pour l'historique),
+tronqués ou écartés au-delà du budget. Le message et l'humeur restent.
+"""
+
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set
+
+from app.llm.assembly import (
+    format_history_block,
+    format_mood_block,
+    format_nutrition_block,
+    format_vision_block,
+    format_user_input_block,
+)
+from app.llm.prompts import (
+    _extract_nutrition_from_expert_knowledge,
+    _extract_vision_from_expert_knowledge,
+    _format_nutrition_item,
+    _format_vision_item,
+)
+from app.llm.tokens import estimate_tokens
+
+COACH_PROMPT_TOKEN_BUDGET = int(os.getenv("COACH_PROMPT_TOKEN_BUDGET", "1500"))
+COACH_PACKER_MIN_TRUNCATE = int(os.getenv("COACH_PACKER_MIN_TRUNCATE", "40"))
+
+_PRIORITIES = {
+    "summary": 1.0,
+    "vision": 0.9,
+    "history": 0.8,
+    "nutrition": 0.6,
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]{3,}")
+
+_STOPWORDS = {
+    "avec", "dans", "des", "est", "les", "mes", "mon", "pas", "pour", "que",
+    "qui", "quoi", "quel", "quelle", "sans", "sur", "une", "vous", "tu", "moi",
+    "suis", "fait", "faire", "veux", "peux", "comment", "plus", "mais", "ton",
+    "ses", "aux", "cette", "idee", "idees",
+}
+
+
+@lru_cache(maxsize=1)
+def _block_overheads() -> Dict[str, int]:
+    """
+    Coût (en tokens estimés) des en-têtes et consignes des blocs, mesuré
+    une fois sur les vrais formateurs d'assembly :
+      - "<bloc>_empty" : bloc présent mais sans donnée ;
+      - "<bloc>_open" : surcoût quand le bloc reçoit son premier élément.
+    """
+    sug = {"alim_nom_fr": "x", "energie_reglement_ue_1169_kcal_100g": 1}
+    vr = {"title": "x", "description_generale": "y"}
+    nutrition_one = estimate_tokens(
+        format_nutrition_block([{"type": "nutrition", "data": {"raw": {"suggestions": [sug]}}}])
+    ) - estimate_tokens(_format_nutrition_item(1, sug))
+    vision_one = estimate_tokens(
+        format_vision_block([{"type": "vision", "data": vr}])
+    ) - estimate_tokens(_format_vision_item(1, vr))
+
+    nutrition_empty = estimate_tokens(format_nutrition_block([]))
+    vision_empty = estimate_tokens(format_vision_block([]))
+    return {
+        "history_empty": estimate_tokens(format_history_block([])),
+        "user_input_empty": estimate_tokens(format_user_input_block("")),
+        "nutrition_empty": nutrition_empty,
+        "vision_empty": vision_empty,
+        "nutrition_open": max(0, nutrition_one - nutrition_empty),
+        "vision_open": max(0, vision_one - vision_empty),
+        # Séparateur entre le résumé et les derniers échanges.
+        "summary_open": 2,
+    }
+
+
+def _words(text: str) -> Set[str]:
+    text = unicodedata.normalize("NFD", (text or "").lower())
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    return {w for w in _WORD_RE.findall(text) if w not in _STOPWORDS}
+
+
+def _relevance(text: str, query_words: Set[str]) -> float:
+    if not query_words:
+        return 0.0
+    return len(_words(text) & query_words) / len(query_words)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Coupe le texte (sur une frontière de mot) pour tenir dans max_tokens.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(" ".join(words[:mid]) + " …") <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo]) + " …"
+
+
+@dataclass
+class _Candidate:
+    block: str
+    index: int
+    text: str
+    tokens: int
+    score: float
+    truncatable: bool
+    label: str
+
+
+@dataclass
+class PackedContext:
+    history: List[Any] = field(default_factory=list)
+    summary: Optional[str] = None
+    expert_knowledge: List[Dict[str, Any]] = field(default_factory=list)
+    budget: int = COACH_PROMPT_TOKEN_BUDGET
+    used_tokens: int = 0
+    dropped: List[Dict[str, Any]] = field(default_factory=list)
+    truncated: List[Dict[str, Any]] = field(default_factory=list)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "budget": self.budget,
+            "estimated_tokens": self.used_tokens,
+            "dropped": self.dropped,
+            "truncated": self.truncated,
+        }
+
+
+def pack_context(
+    user_input: str,
+    mood: Any = None,
+    history: Any = None,
+    expert_knowledge: Any = None,
+    summary: Optional[str] = None,
+    budget: int = COACH_PROMPT_TOKEN_BUDGET,
+) -> PackedContext:
+    """
+    Sélectionne (et tronque au besoin) les éléments de contexte pour que
+    les blocs dynamiques du prompt tiennent dans `budget` tokens estimés.
+    """
+    query = _words(user_input)
+    if isinstance(history, list):
+        history_items: List[Any] = list(history)
+    else:
+        history_items = [history] if history else []
+    nutrition_items = _extract_nutrition_from_expert_knowledge(expert_knowledge)[:12]
+    vision_items = _extract_vision_from_expert_knowledge(expert_knowledge)[:3]
+
+    overheads = _block_overheads()
+
+    # Toujours conservés : message utilisateur, humeur, blocs vides.
+    used = (
+        estimate_tokens(user_input)
+        + overheads["user_input_empty"]
+        + estimate_tokens(format_mood_block(mood))
+        + overheads["history_empty"]
+        + overheads["nutrition_empty"]
+        + overheads["vision_empty"]
+    )
+
+    candidates: List[_Candidate] = []
+
+    def add(
+        block: str,
+        index: int,
+        text: str,
+        label: str,
+        truncatable: bool,
+        weight: float = 1.0,
+        extra_tokens: int = 0,
+    ) -> None:
+        candidates.append(
+            _Candidate(
+                block=block,
+                index=index,
+                text=text,
+                tokens=estimate_tokens(text) + extra_tokens,
+                score=_PRIORITIES[block] * weight * (0.3 + _relevance(text, query)),
+                truncatable=truncatable,
+                label=label,
+            )
+        )
+
+    if summary:
+        add("summary", 0, summary, "résumé", truncatable=True)
+
+    n_hist = len(history_items)
+    for i, item in enumerate(history_items):
+        if isinstance(item, dict):
+            text = item.get("text", "") or item.get("content", "")
+            label = f"{item.get('role', 'inconnu')}: {text[:40]}"
+        else:
+            text, label = str(item), str(item)[:40]
+        # L'historique arrive du plus récent au plus ancien ; "- role: " ≈ 4 tokens.
+        recency = 1.0 - 0.5 * i / n_hist
+        add("history", i, text, label, truncatable=True, weight=recency, extra_tokens=4)
+
+    for i, sug in enumerate(nutrition_items):
+        line = _format_nutrition_item(i + 1, sug)
+        add("nutrition", i, line, str(sug.get("alim_nom_fr", "?")), truncatable=False)
+
+    for i, vr in enumerate(vision_items):
+        line = _format_vision_item(i + 1, vr)
+        add("vision", i, line, f"analyse d'image #{i + 1}", truncatable=True)
+
+    kept: Dict[str, Dict[int, str]] = {block: {} for block in _PRIORITIES}
+    packed = PackedContext(budget=budget)
+
+    for cand in sorted(candidates, key=lambda c: c.score, reverse=True):
+        # Le premier élément d'un bloc paie aussi ses consignes.
+        opening = 0 if kept[cand.block] else overheads.get(f"{cand.block}_open", 0)
+        remaining = budget - used - opening
+        if cand.tokens <= remaining:
+            kept[cand.block][cand.index] = cand.text
+            used += cand.tokens + opening
+        elif cand.truncatable and remaining >= COACH_PACKER_MIN_TRUNCATE:
+            cut = truncate_to_tokens(cand.text, remaining - 4)
+            kept[cand.block][cand.index] = cut
+            used += estimate_tokens(cut) + 4 + opening
+            packed.truncated.append(
+                {
+                    "block": cand.block,
+                    "item": cand.label,
+                    "tokens": cand.tokens,
+                    "kept_tokens": estimate_tokens(cut),
+                }
+            )
+        else:
+            packed.dropped.append(
+                {
+                    "block": cand.block,
+                    "item": cand.label,
+                    "tokens": cand.tokens,
+                    "score": round(cand.score, 3),
+                }
+            )
+
+    # Reconstruction des données dans leur ordre d'origine
+    packed.summary = kept["summary"].get(0)
+
+    for i, item in enumerate(history_items):
+        if i not in kept["history"]:
+            continue
+        if isinstance(item, dict):
+            packed.history.append({**item, "text": kept["history"][i]})
+        else:
+            packed.history.append(kept["history"][i])
+
+    suggestions = [sug for i, sug in enumerate(nutrition_items) if i in kept["nutrition"]]
+    if suggestions:
+        packed.expert_knowledge.append(
+            {"type": "nutrition", "data": {"raw": {"suggestions": suggestions}}}
+        )
+
+    for i, vr in enumerate(vision_items):
+        if i not in kept["vision"]:
+            continue
+        line = kept["vision"][i]
+        if line == _format_vision_item(i + 1, vr):
+            packed.expert_knowledge.append({"type": "vision", "data": vr})
+        else:
+            # Version tronquée : on garde le titre et le texte raccourci.
+            title, _, details = line.partition(" — ")
+            packed.expert_knowledge.append(
+                {
+                    "type": "vision",
+                    "data": {
+                        "title": title.split(". ", 1)[-1],
+                        "summary": details.replace("Résumé visuel : ", "", 1),
+                    },
+                }
+            )
+
+    packed.used_tokens = used
+    return packed
@@ -156,6 +156,41 @@ def _extract_nutrition_from_expert_knowledge(
         return suggestions
 
 
+def _format_nutrition_item(i: int, sug: Dict[str, Any]) -> str:
+    """
+    Une ligne du bloc nutrition pour la suggestion n°i.
+    """
+    nom = sug.get("alim_nom_fr", "Aliment inconnu")
+    kcal = sug.get("energie_reglement_ue_1169_kcal_100g")
+    prot = (
+        sug.get("proteines_n_x_6_25_g_100g")
+        or sug.get('"proteines_n_x_6_25_g_100g"')
+    )
+    gluc = sug.get("glucides_g_100g")
+    lip = sug.get("lipides_g_100g")
+    fibres = (
+        sug.get("fibres_alimentaires_g_100g")
+        or sug.get('"fibres_alimentaires_g_100g"')
+    )
+
+    desc_parts: List[str] = []
+    if kcal is not None:
+        desc_parts.append(f"~{kcal} kcal/100g (quand renseigné)")
+    if prot not in (None, "proteines_n_x_6_25_g_100g"):
+        desc_parts.append(f"protéines ≈ {prot} g/100g")
+    if gluc is not None:
+        desc_parts.append(f"glucides ≈ {gluc} g/100g")
+    if lip is not None:
+        desc_parts.append(f"lipides ≈ {lip} g/100g")
+    if fibres not in (None, "fibres_alimentaires_g_100g"):
+        desc_parts.append(f"fibres ≈ {fibres} g/100g")
+
+    if desc_parts:
+        desc = " ; ".join(desc_parts)
+        return f"{i}. {nom} — {desc}"
+    return f"{i}. {nom}"
+
+
 def _format_nutrition_suggestions(expert_knowledge: Any) -> str:
     """
     Transforme les suggestions nutritionnelles en texte clair pour le LLM.
@@ -183,36 +218,7 @@ def _format_nutrition_suggestions(expert_knowledge: Any) -> str:
     max_items = min(len(suggestions), 12)
 
     for i, sug in enumerate(suggestions[:max_items], start=1):
-        nom = sug.get("alim_nom_fr", "Aliment inconnu")
-        kcal = sug.get("energie_reglement_ue_1169_kcal_100g")
-        prot = (
-            sug.get("proteines_n_x_6_25_g_100g")
-            or sug.get('"proteines_n_x_6_25_g_100g"')
-        )
-        gluc = sug.get("glucides_g_100g")
-        lip = sug.get("lipides_g_100g")
-        fibres = (
-            sug.get("fibres_alimentaires_g_100g")
-            or sug.get('"fibres_alimentaires_g_100g"')
-        )
-
-        desc_parts: List[str] = []
-        if kcal is not None:
-            desc_parts.append(f"~{kcal} kcal/100g (quand renseigné)")
-        if prot not in (None, "proteines_n_x_6_25_g_100g"):
-            desc_parts.append(f"protéines ≈ {prot} g/100g")
-        if gluc is not None:
-            desc_parts.append(f"glucides ≈ {gluc} g/100g")
-        if lip is not None:
-            desc_parts.append(f"lipides ≈ {lip} g/100g")
-        if fibres not in (None, "fibres_alimentaires_g_100g"):
-            desc_parts.append(f"fibres ≈ {fibres} g/100g")
-
-        if desc_parts:
-            desc = " ; ".join(desc_parts)
-            lines.append(f"{i}. {nom} — {desc}")
-        else:
-            lines.append(f"{i}. {nom}")
+        lines.append(_format_nutrition_item(i, sug))
 
     lines.append("")
     lines.append(
@@ -272,6 +278,48 @@ def _extract_vision_from_expert_knowledge(
         return results
 
 
+def _format_vision_item(i: int, vr: Any) -> str:
+    """
+    Une ligne du bloc vision pour l'analyse d'image n°i.
+    """
+    if not isinstance(vr, dict):
+        return f"{i}. Analyse brute (non structurée) : {str(vr)}"
+
+    title = vr.get("title") or vr.get("label") or f"Analyse d'image #{i}"
+
+    summary = (
+        vr.get("summary")
+        or vr.get("description_generale")
+        or vr.get("description")
+        or vr.get("analysis")
+        or vr.get("advice")
+    )
+
+    calories_block = vr.get("calories_estimees") or vr.get("calories")
+    calories = None
+    if isinstance(calories_block, dict):
+        calories = calories_block.get("total_kcal_approx")
+    elif isinstance(calories_block, (int, float)):
+        calories = calories_block
+
+    details_parts: List[str] = []
+    if summary:
+        details_parts.append(f"Résumé visuel : {summary}")
+    if calories is not None:
+        details_parts.append(
+            f"Estimation calorique (approximative) : {calories} kcal"
+        )
+
+    for key in ["risks", "nutrition_comment", "quality_comment", "limitations"]:
+        if key in vr and vr[key]:
+            details_parts.append(f"{key} : {vr[key]}")
+
+    if details_parts:
+        details = " | ".join(details_parts)
+        return f"{i}. {title} — {details}"
+    return f"{i}. {title} — (détails non structurés : {vr})"
+
+
 def _format_vision_info(expert_knowledge: Any) -> str:
     """
     Formate les informations issues de l'agent_vision pour le LLM.
@@ -296,44 +344,7 @@ def _format_vision_info(expert_knowledge: Any) -> str:
 
     max_items = min(len(vision_results), 3)
     for i, vr in enumerate(vision_results[:max_items], start=1):
-        if not isinstance(vr, dict):
-            lines.append(f"{i}. Analyse brute (non structurée) : {str(vr)}")
-            continue
-
-        title = vr.get("title") or vr.get("label") or f"Analyse d'image #{i}"
-
-        summary = (
-            vr.get("summary")
-            or vr.get("description_generale")
-            or vr.get("description")
-            or vr.get("analysis")
-            or vr.get("advice")
-        )
-
-        calories_block = vr.get("calories_estimees") or vr.get("calories")
-        calories = None
-        if isinstance(calories_block, dict):
-            calories = calories_block.get("total_kcal_approx")
-        elif isinstance(calories_block, (int, float)):
-            calories = calories_block
-
-        details_parts: List[str] = []
-        if summary:
-            details_parts.append(f"Résumé visuel : {summary}")
-        if calories is not None:
-            details_parts.append(
-                f"Estimation calorique (approximative) : {calories} kcal"
-            )
-
-        for key in ["risks", "nutrition_comment", "quality_comment", "limitations"]:
-            if key in vr and vr[key]:
-                details_parts.append(f"{key} : {vr[key]}")
-
-        if details_parts:
-            details = " | ".join(details_parts)
-            lines.append(f"{i}. {title} — {details}")
-        else:
-            lines.append(f"{i}. {title} — (détails non structurés : {vr})")
+        lines.append(_format_vision_item(i, vr))
 
     lines.append("")
     lines.append(
@@ -347,33 +358,14 @@ def _format_vision_info(expert_knowledge: Any) -> str:
 
 
 # -------------------------------------------------------------------------
-# 3) CONSTRUCTION DU PROMPT COMPLET
+# 3) PRÉFIXE STATIQUE DU PROMPT (instructions + exemples)
 # -------------------------------------------------------------------------
 
-
-def build_coach_prompt(
-    user_input: str,
-    mood: Optional[Any] = None,
-    history: Any = None,
-    expert_knowledge: Any = None,
-) -> str:
-    """
-    Construit le prompt complet envoyé au LLM du coach.
-
-    Paramètres :
-      - user_input : message brut de l'utilisateur
-      - mood : soit une description textuelle simple, soit un dict mood_state
-      - history : historique récupéré depuis agent_memory (ou transmis par orchestrateur)
-      - expert_knowledge : données expertes (nutrition, vision, etc.) agrégées
-        par les autres agents (notamment agent_knowledge et agent_vision).
-    """
-
-    history_block = _format_history(history)
-    mood_block = _format_mood(mood)
-    nutrition_block = _format_nutrition_suggestions(expert_knowledge)
-    vision_block = _format_vision_info(expert_knowledge)
-
-    prompt = f"""
+# Ce texte ne dépend d'aucune donnée utilisateur : il est envoyé tel quel en
+# message "system", toujours en tête. Il forme ainsi un préfixe identique
+# d'une requête à l'autre, réutilisable par le cache de prompt du fournisseur.
+# Les données utilisateur sont assemblées dans app/llm/assembly.py.
+COACH_SYSTEM_PROMPT = """
 Tu es **SMARTCOACH**, un coach virtuel spécialisé en sport, santé, nutrition
 et hygiène de vie. Tu t'adresses à l'utilisateur en français, avec un ton
 bienveillant, motivant et concret, comme un coach humain qui parle à son élève.
@@ -383,8 +375,8 @@ CONTEXTE TECHNIQUE (pour toi, pas pour l'utilisateur) :
 - Tu reçois déjà une analyse d'humeur, un historique de conversations et, parfois,
   des connaissances expertes (analyse nutritionnelle, analyse d'image de repas,
   informations de profil : âge, poids, taille, objectif…).
-- Ces infos peuvent apparaître dans l'historique ci-dessous ou dans les blocs
-  "CONNAISSANCES EXPERTES".
+- Ces infos peuvent apparaître dans l'historique ou dans les blocs
+  "CONNAISSANCES EXPERTES" envoyés dans les messages suivants.
 
 IMPORTANT – CE QUE TU NE DOIS PAS FAIRE :
 - Ne mentionne JAMAIS ces détails techniques dans ta réponse
@@ -414,29 +406,14 @@ DOMAINE D'EXPERTISE :
 - Sommeil, récupération, gestion de la fatigue, motivation.
 
 ----------------------------------------------------------------------
-DONNÉES UTILISATEUR
+DONNÉES FOURNIES DANS LES MESSAGES SUIVANTS
 ----------------------------------------------------------------------
 
-Message actuel de l'utilisateur :
-\"\"\"{user_input}\"\"\"
-
-
-État émotionnel / physique estimé :
-{mood_block}
-
-
-Historique récent (extraits utiles) :
-{history_block}
-
-----------------------------------------------------------------------
-CONNAISSANCES EXPERTES FOURNIES PAR LES AUTRES AGENTS
-----------------------------------------------------------------------
-
-SECTION NUTRITION (base de données d'aliments) :
-{nutrition_block}
-
-SECTION VISION (analyse d'une éventuelle photo de repas) :
-{vision_block}
+Après ces instructions, tu reçois plusieurs messages séparés :
+- l'historique récent et l'état émotionnel / physique estimé,
+- les CONNAISSANCES EXPERTES FOURNIES PAR LES AUTRES AGENTS
+  (SECTION NUTRITION et SECTION VISION),
+- puis, en dernier, le message actuel de l'utilisateur.
 
 Ces connaissances sont considérées comme fiables lorsqu'elles existent.
 Tu dois t'y référer en priorité pour tout ce qui concerne la nutrition
@@ -474,7 +451,7 @@ STRUCTURE GÉNÉRALE (TU PEUX L'ADAPTER AU CONTEXTE) :
        - intensité (douce / modérée / soutenue),
        - type de travail (marche, footing, renfo bas du corps, mobilité…).
    - Si la demande touche à la nutrition : propose des pistes simples à appliquer,
-     en t'appuyant quand c'est pertinent sur les aliments de la base ci-dessus
+     en t'appuyant quand c'est pertinent sur les aliments de la base fournie
      ou sur l'analyse visuelle du repas.
    - Si l'utilisateur est très fatigué, blessé ou malade :
      - baisse fortement l'intensité,
@@ -537,8 +514,34 @@ FORMAT ATTENDU
 - Utilise au maximum les 3 blocs ci-dessus, avec des titres en gras comme indiqué.
 - Dans le bloc **Petit plan simple à mettre en place**, écris des puces courtes
   et très concrètes, adaptées au profil.
+""".strip()
 
-Maintenant, rédige ta réponse pour l'utilisateur.
-"""
-    # On strip pour éviter les grandes marges au début
-    return prompt.strip()
+
+def build_coach_prompt(
+    user_input: str,
+    mood: Optional[Any] = None,
+    history: Any = None,
+    expert_knowledge: Any = None,
+) -> str:
+    """
+    Construit le prompt complet envoyé au LLM du coach, en un seul texte.
+
+    Conservé pour compatibilité : l'agent cerveau envoie désormais le prompt
+    en plusieurs messages (voir assemble_coach_prompt), ce qui garde le
+    préfixe statique en tête.
+
+    Paramètres :
+      - user_input : message brut de l'utilisateur
+      - mood : soit une description textuelle simple, soit un dict mood_state
+      - history : historique récupéré depuis agent_memory (ou transmis par orchestrateur)
+      - expert_knowledge : données expertes (nutrition, vision, etc.) agrégées
+        par les autres agents (notamment agent_knowledge et agent_vision).
+    """
+    from app.llm.assembly import assemble_coach_prompt
+
+    return assemble_coach_prompt(
+        user_input=user_input,
+        mood=mood,
+        history=history,
+        expert_knowledge=expert_knowledge,
+    ).as_text()
@@ -0,0 +1,299 @@
+# services/agent_cerveau/app/llm/tiering.py
+
+"""
+Choix du modèle du coach par niveaux de latence : "primary" (70B) tant
+que sa latence médiane reste sous COACH_LATENCY_BUDGET_S, sinon "fast"
+(8B), de même après un 429 ou un échec du primaire. En mode dégradé,
+une requête sur COACH_PRIMARY_PROBE_EVERY sonde le primaire.
+"""
+
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+
+COACH_PRIMARY_MODEL = os.getenv("COACH_PRIMARY_MODEL", "llama-3.3-70b-versatile")
+COACH_PRIMARY_MAX_TOKENS = int(os.getenv("COACH_PRIMARY_MAX_TOKENS", "800"))
+COACH_PRIMARY_TIMEOUT_S = float(os.getenv("COACH_PRIMARY_TIMEOUT_S", "20"))
+COACH_FAST_MODEL = os.getenv("COACH_FAST_MODEL", "llama-3.1-8b-instant")
+COACH_FAST_MAX_TOKENS = int(os.getenv("COACH_FAST_MAX_TOKENS", "500"))
+COACH_FAST_TIMEOUT_S = float(os.getenv("COACH_FAST_TIMEOUT_S", "20"))
+
+COACH_LATENCY_BUDGET_S = float(os.getenv("COACH_LATENCY_BUDGET_S", "6"))
+COACH_LATENCY_WINDOW = int(os.getenv("COACH_LATENCY_WINDOW", "20"))
+COACH_LATENCY_MIN_SAMPLES = int(os.getenv("COACH_LATENCY_MIN_SAMPLES", "3"))
+COACH_RATE_LIMIT_COOLDOWN_S = float(os.getenv("COACH_RATE_LIMIT_COOLDOWN_S", "30"))
+COACH_PRIMARY_PROBE_EVERY = int(os.getenv("COACH_PRIMARY_PROBE_EVERY", "10"))
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    name: str
+    model: str
+    max_tokens: int
+    timeout_s: float
+
+
+PRIMARY_TIER = ModelTier(
+    "primary", COACH_PRIMARY_MODEL, COACH_PRIMARY_MAX_TOKENS, COACH_PRIMARY_TIMEOUT_S
+)
+FAST_TIER = ModelTier("fast", COACH_FAST_MODEL, COACH_FAST_MAX_TOKENS, COACH_FAST_TIMEOUT_S)
+
+
+@dataclass
+class TierReport:
+    tier: str
+    model: str
+    reason: Optional[str]
+    latency_s: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "tier": self.tier,
+            "model": self.model,
+            "reason": self.reason,
+            "latency_s": round(self.latency_s, 3),
+        }
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    Erreur de quota Groq (HTTP 429), quelle que soit la couche qui la lève.
+    """
+    if getattr(error, "status_code", None) == 429:
+        return True
+    if type(error).__name__ == "RateLimitError":
+        return True
+    text = str(error).lower()
+    return "rate limit" in text or "rate_limit" in text
+
+
+class LatencyTracker:
+    """
+    Latences glissantes (secondes) et erreurs par modèle.
+    """
+
+    def __init__(self, window: int = COACH_LATENCY_WINDOW) -> None:
+        self.window = max(1, window)
+        self._samples: Dict[str, Deque[float]] = {}
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.rate_limited: Dict[str, int] = {}
+
+    def record(self, model: str, latency_s: float) -> None:
+        self._samples.setdefault(model, deque(maxlen=self.window)).append(latency_s)
+        self.calls[model] = self.calls.get(model, 0) + 1
+
+    def record_error(self, model: str, rate_limited: bool = False) -> None:
+        self.errors[model] = self.errors.get(model, 0) + 1
+        if rate_limited:
+            self.rate_limited[model] = self.rate_limited.get(model, 0) + 1
+
+    def reset(self, model: str) -> None:
+        self._samples.pop(model, None)
+
+    def count(self, model: str) -> int:
+        return len(self._samples.get(model, ()))
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        samples = sorted(self._samples.get(model, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+        return samples[index]
+
+    def stats(self) -> Dict[str, Any]:
+        models = set(self._samples) | set(self.errors)
+        return {
+            model: {
+                "calls": self.calls.get(model, 0),
+                "errors": self.errors.get(model, 0),
+                "rate_limited": self.rate_limited.get(model, 0),
+                "p50_s": self.percentile(model, 0.5),
+                "p90_s": self.percentile(model, 0.9),
+            }
+            for model in sorted(models)
+        }
+
+
+class TieringPolicy:
+    def __init__(
+        self,
+        primary: ModelTier = PRIMARY_TIER,
+        fast: ModelTier = FAST_TIER,
+        latency_budget_s: float = COACH_LATENCY_BUDGET_S,
+        min_samples: int = COACH_LATENCY_MIN_SAMPLES,
+        cooldown_s: float = COACH_RATE_LIMIT_COOLDOWN_S,
+        probe_every: int = COACH_PRIMARY_PROBE_EVERY,
+        tracker: Optional[LatencyTracker] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.primary = primary
+        self.fast = fast
+        self.latency_budget_s = latency_budget_s
+        self.min_samples = max(1, min_samples)
+        self.cooldown_s = cooldown_s
+        self.probe_every = max(1, probe_every)
+        self.tracker = tracker or LatencyTracker()
+        self._clock = clock
+
+        self._primary_blocked_until = 0.0
+        self._degraded_requests = 0
+        self.served: Dict[str, int] = {primary.name: 0, fast.name: 0}
+
+    def choose(self) -> Tuple[ModelTier, Optional[str]]:
+        """
+        Niveau à utiliser pour la prochaine requête et la raison éventuelle
+        du choix ("rate_limit", "latency", "probe", None).
+        """
+        if self._clock() < self._primary_blocked_until:
+            return self.fast, "rate_limit"
+
+        p50 = self.tracker.percentile(self.primary.model, 0.5)
+        too_slow = (
+            p50 is not None
+            and self.tracker.count(self.primary.model) >= self.min_samples
+            and p50 > self.latency_budget_s
+        )
+        if not too_slow:
+            self._degraded_requests = 0
+            return self.primary, None
+
+        self._degraded_requests += 1
+        if self._degraded_requests % self.probe_every == 0:
+            # Sonde : le primaire est peut-être redevenu rapide.
+            return self.primary, "probe"
+        return self.fast, "latency"
+
+    def record_success(self, tier: ModelTier, latency_s: float) -> None:
+        if (
+            tier is self.primary
+            and self._degraded_requests
+            and latency_s <= self.latency_budget_s
+        ):
+            # Sonde réussie : on oublie les latences de la période lente.
+            self.tracker.reset(tier.model)
+            self._degraded_requests = 0
+        self.tracker.record(tier.model, latency_s)
+        self.served[tier.name] = self.served.get(tier.name, 0) + 1
+
+    def record_failure(self, tier: ModelTier, error: BaseException) -> None:
+        rate_limited = is_rate_limit_error(error)
+        self.tracker.record_error(tier.model, rate_limited=rate_limited)
+        if rate_limited and tier is self.primary:
+            self._primary_blocked_until = self._clock() + self.cooldown_s
+
+    def stats(self) -> Dict[str, Any]:
+        remaining = max(0.0, self._primary_blocked_until - self._clock())
+        return {
+            "latency_budget_s": self.latency_budget_s,
+            "primary": {"model": self.primary.model, "max_tokens": self.primary.max_tokens},
+            "fast": {"model": self.fast.model, "max_tokens": self.fast.max_tokens},
+            "primary_cooldown_remaining_s": round(remaining, 1),
+            "served": dict(self.served),
+            "models": self.tracker.stats(),
+        }
+
+
+def _default_client_factory(tier: ModelTier) -> Any:
+    # Import local : la politique reste utilisable (et testable) sans Groq.
+    from app.llm.client import LLMClient
+
+    # Pas de retry interne sur le primaire : en cas d'échec on bascule
+    # directement sur le niveau rapide plutôt que d'attendre.
+    return LLMClient(
+        model=tier.model,
+        max_tokens=tier.max_tokens,
+        timeout_s=tier.timeout_s,
+        max_retries=0 if tier.name == "primary" else 2,
+    )
+
+
+class TieredLLMClient:
+    """
+    Même rôle que LLMClient (agenerate / astream), mais le modèle est
+    choisi par TieringPolicy et l'appel est rejoué sur le niveau rapide
+    si le primaire échoue.
+    """
+
+    def __init__(
+        self,
+        policy: Optional[TieringPolicy] = None,
+        client_factory: Callable[[ModelTier], Any] = _default_client_factory,
+    ) -> None:
+        self.policy = policy or TieringPolicy()
+        self._client_factory = client_factory
+        self._clients: Dict[str, Any] = {}
+
+    def _client(self, tier: ModelTier) -> Any:
+        if tier.name not in self._clients:
+            self._clients[tier.name] = self._client_factory(tier)
+        return self._clients[tier.name]
+
+    def _fall_back(self, tier: ModelTier, error: BaseException) -> Tuple[ModelTier, str]:
+        """
+        Enregistre l'échec de `tier` et renvoie le niveau de repli et sa
+        raison. Relève l'erreur si `tier` est déjà le niveau rapide.
+        """
+        self.policy.record_failure(tier, error)
+        if tier is self.policy.fast:
+            raise error
+        print(
+            f"[AGENT_CERVEAU] modèle {tier.model} en échec, repli sur "
+            f"{self.policy.fast.model} :",
+            repr(error),
+            flush=True,
+        )
+        return self.policy.fast, "rate_limit" if is_rate_limit_error(error) else "error"
+
+    async def agenerate(self, prompt: Any) -> Tuple[str, TierReport]:
+        """
+        Génère la réponse complète (appel Groq via ainvoke) : la boucle
+        d'événements reste libre pendant la génération.
+        """
+        tier, reason = self.policy.choose()
+        start = time.perf_counter()
+        try:
+            answer = await self._client(tier).agenerate(prompt)
+        except Exception as e:
+            tier, reason = self._fall_back(tier, e)
+            start = time.perf_counter()
+            try:
+                answer = await self._client(tier).agenerate(prompt)
+            except Exception as e2:
+                self.policy.record_failure(tier, e2)
+                raise
+
+        latency = time.perf_counter() - start
+        self.policy.record_success(tier, latency)
+        return answer, TierReport(tier.name, tier.model, reason, latency)
+
+    async def astream(self, prompt: Any, report: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Variante streaming. Le repli n'est possible qu'avant le premier
+        token ; `report` est rempli (TierReport.as_dict()) en fin de flux.
+        """
+        tier, reason = self.policy.choose()
+        start = time.perf_counter()
+        emitted = False
+        try:
+            async for token in self._client(tier).astream(prompt):
+                emitted = True
+                yield token
+        except Exception as e:
+            if emitted:
+                self.policy.record_failure(tier, e)
+                raise
+            tier, reason = self._fall_back(tier, e)
+            start = time.perf_counter()
+            try:
+                async for token in self._client(tier).astream(prompt):
+                    yield token
+            except Exception as e2:
+                self.policy.record_failure(tier, e2)
+                raise
+
+        latency = time.perf_counter() - start
+        self.policy.record_success(tier, latency)
+        report.update(TierReport(tier.name, tier.model, reason, latency).as_dict())
@@ -0,0 +1,14 @@
+"""
+Estimation rapide du nombre de tokens d'un texte (mots et ponctuation,
+mots longs comptés plusieurs fois), sans le tokenizer du modèle.
+"""
+
+import re
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return sum(1 + len(piece) // 6 for piece in _TOKEN_RE.findall(text))
@@ -1,9 +1,38 @@
+import json
+
 from fastapi import FastAPI, Request
-from app.mcp.handler import process_mcp_message
+from fastapi.responses import StreamingResponse
+
+from app.mcp.handler import (
+    answer_cache,
+    coach_llm,
+    context_stats,
+    memory_client,
+    memory_writes,
+    process_mcp_message,
+    stream_coach_response,
+)
 
 app = FastAPI(title="Agent Cerveau")
 
 
+@app.on_event("startup")
+async def start_memory_writes() -> None:
+    """
+    Démarre le worker d'écriture différée vers agent_memory.
+    """
+    memory_writes.start()
+
+
+@app.on_event("shutdown")
+async def flush_memory_writes() -> None:
+    """
+    Vide la file d'écriture (aucune interaction perdue) puis ferme le pool HTTP.
+    """
+    await memory_writes.stop()
+    await memory_client.aclose()
+
+
 @app.post("/mcp")
 async def mcp_endpoint(request: Request):
     """
@@ -16,6 +45,56 @@ async def mcp_endpoint(request: Request):
     return response
 
 
+@app.post("/mcp/stream")
+async def mcp_stream_endpoint(request: Request):
+    """
+    Endpoint MCP en streaming : même message que /mcp, mais la réponse
+    du coach est renvoyée token par token (une ligne JSON par événement).
+    """
+    message = await request.json()
+
+    async def ndjson_events():
+        async for event in stream_coach_response(message):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson_events(), media_type="application/x-ndjson")
+
+
+@app.get("/memory/stats")
+async def memory_stats():
+    """
+    État de la file d'écriture différée vers agent_memory et économie
+    de tokens apportée par le résumé glissant.
+    """
+    requests = context_stats["requests"]
+    return {
+        "writes": memory_writes.stats(),
+        "context": {
+            **context_stats,
+            "tokens_saved_avg": (
+                context_stats["tokens_saved_total"] / requests if requests else 0.0
+            ),
+        },
+    }
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Taux de hit et taille du cache sémantique des réponses du coach.
+    """
+    return answer_cache.stats()
+
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """
+    Latences glissantes par modèle et répartition des réponses entre
+    le niveau principal (70B) et le niveau rapide.
+    """
+    return coach_llm.policy.stats()
+
+
 @app.get("/health")
 async def health_check():
     """
@@ -1,14 +1,128 @@
+import asyncio
+import os
 import uuid
-from typing import Any, Dict, Optional
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from app.mcp.schemas import MCPResponse
-from app.llm.client import LLMClient
-from app.llm.prompts import build_coach_prompt
+from app.llm.tiering import TieredLLMClient
+from app.llm.answer_cache import AnswerCache, CacheHit
+from app.llm.assembly import assemble_coach_prompt
+from app.llm.context_packer import pack_context
 from app.clients.memory_client import MemoryClient
+from app.clients.write_behind import WriteBehindQueue
 
-# Client mémoire global
+# Client mémoire global (pool de connexions partagé)
 memory_client = MemoryClient()
 
+# Écritures mémoire différées, envoyées par lots en arrière-plan : un
+# élément par échange (record_exchanges, idempotent par exchange_id)
+memory_writes = WriteBehindQueue(memory_client.record_exchanges)
+
+# LLM du coach : 70B par défaut, repli sur le modèle rapide si lent / quota atteint
+coach_llm = TieredLLMClient()
+
+# Cache sémantique des réponses génériques (opt-in, COACH_ANSWER_CACHE_ENABLED)
+answer_cache = AnswerCache()
+
+# Contexte conversationnel : résumé glissant (agent_memory) + derniers échanges,
+# au lieu des COACH_HISTORY_LIMIT derniers messages bruts.
+COACH_USE_SUMMARY = os.getenv("COACH_USE_SUMMARY", "1") == "1"
+COACH_RECENT_TURNS = int(os.getenv("COACH_RECENT_TURNS", "4"))
+COACH_HISTORY_LIMIT = int(os.getenv("COACH_HISTORY_LIMIT", "10"))
+# Échanges anciens proches de la question (retrieve_relevant), ajoutés
+# après les derniers échanges ; 0 pour désactiver.
+COACH_RELEVANT_MEMORIES = int(os.getenv("COACH_RELEVANT_MEMORIES", "3"))
+
+# Économie de tokens mesurée par requête (cf. /memory/stats)
+context_stats: Dict[str, Any] = {
+    "requests": 0,
+    "with_summary": 0,
+    "tokens_saved_total": 0,
+}
+
+
+async def _retrieve_relevant(user_id: str, user_input: str) -> List[Dict[str, Any]]:
+    """
+    Souvenirs pertinents pour la question ; liste vide si désactivé ou
+    si agent_memory ne répond pas (le coach s'en passe).
+    """
+    if COACH_RELEVANT_MEMORIES <= 0 or not user_input.strip():
+        return []
+    try:
+        # Marge : une partie des résultats peut déjà être dans les derniers échanges
+        return await memory_client.retrieve_relevant(
+            user_id=user_id,
+            query=user_input,
+            k=COACH_RELEVANT_MEMORIES + COACH_HISTORY_LIMIT,
+        )
+    except Exception as e:
+        print("[AGENT_CERVEAU] retrieve_relevant indisponible :", repr(e), flush=True)
+        return []
+
+
+def _merge_relevant(history: Any, relevant: List[Dict[str, Any]]) -> Any:
+    """
+    Ajoute après les derniers échanges les souvenirs qui n'y sont pas
+    déjà, datés pour que le coach sache qu'ils sont anciens.
+    """
+    if not relevant or not isinstance(history, list):
+        return history
+    seen = {item.get("id") for item in history if isinstance(item, dict)}
+    memories = []
+    for item in relevant:
+        if item.get("id") in seen:
+            continue
+        day = str(item.get("created_at") or "")[:10]
+        memories.append(
+            {**item, "role": f"{item.get('role', 'inconnu')} (souvenir du {day})"}
+        )
+        if len(memories) == COACH_RELEVANT_MEMORIES:
+            break
+    return history + memories
+
+
+async def _load_history(user_id: str, user_input: str = "") -> Dict[str, Any]:
+    """
+    Charge le contexte conversationnel depuis agent_memory.
+
+    Renvoie {"history", "summary", "tokens_saved", "relevant"} ; repasse
+    par get_history si le résumé est désactivé ou indisponible. Les
+    souvenirs pertinents sont demandés en parallèle.
+    """
+    relevant_task = asyncio.ensure_future(_retrieve_relevant(user_id, user_input))
+    try:
+        loaded = None
+        if COACH_USE_SUMMARY:
+            context = await memory_client.get_context(
+                user_id=user_id,
+                recent_limit=COACH_RECENT_TURNS,
+                baseline_limit=COACH_HISTORY_LIMIT,
+            )
+            if context is not None:
+                stats = context.get("stats") or {}
+                tokens_saved = int(stats.get("tokens_saved") or 0)
+                context_stats["requests"] += 1
+                context_stats["with_summary"] += int(bool(context.get("summary")))
+                context_stats["tokens_saved_total"] += tokens_saved
+                loaded = {
+                    "history": context.get("recent") or [],
+                    "summary": context.get("summary"),
+                    "tokens_saved": tokens_saved,
+                }
+
+        if loaded is None:
+            history = await memory_client.get_history(user_id=user_id, limit=COACH_HISTORY_LIMIT)
+            loaded = {"history": history, "summary": None, "tokens_saved": 0}
+    except BaseException:
+        relevant_task.cancel()
+        raise
+
+    recent = loaded["history"]
+    loaded["history"] = _merge_relevant(recent, await relevant_task)
+    loaded["relevant"] = len(loaded["history"]) - len(recent) if isinstance(recent, list) else 0
+    return loaded
+
 
 def _mood_from_payload(payload: Dict[str, Any]) -> Optional[Any]:
     """
@@ -21,7 +135,7 @@ def _mood_from_payload(payload: Dict[str, Any]) -> Optional[Any]:
     """
     mood_state = payload.get("mood_state")
     if isinstance(mood_state, dict) and mood_state:
-        return mood_state  # laissé tel quel pour que build_coach_prompt le détaille
+        return mood_state  # laissé tel quel pour que assemble_coach_prompt le détaille
 
     mood = payload.get("mood")
     if mood:
@@ -44,38 +158,104 @@ def _mood_label_for_memory(mood: Any) -> Optional[str]:
     return None
 
 
-async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
+def _cache_lookup(payload: Dict[str, Any]) -> Optional[CacheHit]:
     """
-    Handler principal de l’agent cerveau.
+    Cherche une réponse déjà générée pour une question générique équivalente.
+    Appelé avant tout accès à agent_memory : un hit évite aussi l'assemblage.
+    """
+    mood_label = _mood_label_for_memory(_mood_from_payload(payload))
+    expert_knowledge = payload.get("expert_knowledge") or payload.get("knowledge_results") or []
+    hit = answer_cache.lookup(payload.get("user_input", ""), mood_label, expert_knowledge)
+    if hit is not None:
+        print(
+            f"[AGENT_CERVEAU] réponse servie depuis le cache (similarité {hit.similarity})",
+            flush=True,
+        )
+    return hit
 
-    Flux :
-    1. Lire user_input + mood + expert knowledge (nutrition, vision, etc.)
-    2. Charger l’historique user depuis agent_memory
-    3. Construire le prompt complet (build_coach_prompt)
-    4. Appeler LLM (Groq)
-    5. Sauvegarder la conversation dans agent_memory
-    6. Retourner réponse à l’orchestrateur
+
+def _cache_store(payload: Dict[str, Any], req: "CoachRequest", answer: str) -> None:
+    """
+    Met la réponse en cache, sauf si le prompt contenait le contexte de
+    l'utilisateur (elle pourrait alors être servie à un autre).
     """
+    mood_label = _mood_label_for_memory(_mood_from_payload(payload))
+    expert_knowledge = payload.get("expert_knowledge") or payload.get("knowledge_results") or []
+    answer_cache.store(
+        payload.get("user_input", ""),
+        mood_label,
+        expert_knowledge,
+        answer,
+        personal_context=req.personalized,
+    )
 
-    payload: Dict[str, Any] = msg.get("payload", {}) or {}
-    context: Dict[str, Any] = msg.get("context", {}) or {}
-    task: Optional[str] = payload.get("task")
-    user_id: Optional[str] = context.get("user_id")
 
-    # -------------------------------------------------------------------------
-    # ❌ Tâche inconnue
-    # -------------------------------------------------------------------------
-    if task != "coach_response":
-        response_payload = {
-            "status": "error",
-            "message": f"Tâche inconnue ou non prise en charge: {task!r}",
-        }
-        return MCPResponse(
-            message_id=msg.get("message_id", str(uuid.uuid4())),
-            to_agent=msg.get("from_agent", "unknown"),
-            payload=response_payload,
-            context=context,
-        )
+def _cached_request(payload: Dict[str, Any], context: Dict[str, Any]) -> "CoachRequest":
+    """
+    CoachRequest minimale pour un hit de cache (pas de prompt assemblé) :
+    elle sert uniquement à enregistrer l'échange dans agent_memory.
+    """
+    return CoachRequest(
+        user_id=context.get("user_id"),
+        user_input=payload.get("user_input", ""),
+        mood_for_prompt=_mood_from_payload(payload),
+        history=[],
+        messages=[],
+        prompt_report={},
+        exchange_id=context.get("exchange_id"),
+    )
+
+
+def _cache_report(hit: Optional[CacheHit]) -> Dict[str, Any]:
+    if hit is None:
+        return {"hit": False}
+    return {
+        "hit": True,
+        "similarity": hit.similarity,
+        "question": hit.question,
+        "age_s": hit.age_s,
+    }
+
+
+@dataclass
+class CoachRequest:
+    """
+    Données préparées pour une réponse de coaching (mode classique ou streaming).
+    """
+
+    user_id: Optional[str]
+    user_input: str
+    mood_for_prompt: Any
+    history: Any
+    messages: List[Dict[str, str]]
+    prompt_report: Dict[str, Any]
+    # message_id de l'orchestrateur : clé de l'échange dans agent_memory
+    exchange_id: Optional[str] = None
+    # Prompt avec historique, résumé ou souvenirs de l'utilisateur
+    personalized: bool = False
+
+
+def _error_response(msg: Dict[str, Any], context: Dict[str, Any], message: str) -> MCPResponse:
+    return MCPResponse(
+        message_id=msg.get("message_id", str(uuid.uuid4())),
+        to_agent=msg.get("from_agent", "unknown"),
+        payload={"status": "error", "message": message},
+        context=context,
+    )
+
+
+async def _prepare_coach_request(
+    payload: Dict[str, Any],
+    context: Dict[str, Any],
+) -> CoachRequest:
+    """
+    Étapes communes aux deux modes :
+      1. Lire user_input + mood + expert knowledge (nutrition, vision, etc.)
+      2. Charger le contexte user depuis agent_memory (résumé + derniers
+       échanges + souvenirs pertinents)
+      3. Assembler le prompt (préfixe statique + blocs dynamiques)
+    """
+    user_id: Optional[str] = context.get("user_id")
 
     # -------------------------------------------------------------------------
     # ✔️ Extraction des données de l’orchestrateur
@@ -99,55 +279,142 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
     # ✔️ Charger l’historique depuis agent_memory
     # -------------------------------------------------------------------------
     history: Any = history_from_payload
+    summary: Optional[str] = None
+    tokens_saved = 0
+    relevant_memories = 0
     if user_id:
         try:
-            history = memory_client.get_history(user_id=user_id, limit=10)
+            loaded = await _load_history(user_id, user_input)
+            history, summary = loaded["history"], loaded["summary"]
+            tokens_saved = loaded["tokens_saved"]
+            relevant_memories = loaded["relevant"]
         except Exception:
             history = history_from_payload
 
     # -------------------------------------------------------------------------
-    # ✔️ Construire prompt final (inclut mood + connaissances expertes)
+    # ✔️ Assembler le prompt (inclut mood + connaissances expertes)
     # -------------------------------------------------------------------------
-    full_prompt = build_coach_prompt(
+    # Le contexte (historique, résumé, nutrition, vision) est d'abord ajusté
+    # au budget de tokens : éléments peu pertinents tronqués ou écartés.
+    packed = pack_context(
         user_input=user_input,
         mood=mood_for_prompt,
         history=history,
         expert_knowledge=expert_knowledge,
+        summary=summary,
+    )
+    assembled = assemble_coach_prompt(
+        user_input=user_input,
+        mood=mood_for_prompt,
+        history=packed.history,
+        expert_knowledge=packed.expert_knowledge,
+        summary=packed.summary,
+    )
+    prompt_report = assembled.size_report()
+    prompt_report["history_tokens_saved"] = tokens_saved
+    prompt_report["relevant_memories"] = relevant_memories
+    prompt_report["packing"] = packed.report()
+    if packed.dropped or packed.truncated:
+        print(
+            f"[AGENT_CERVEAU] contexte ajusté au budget ({packed.budget} tokens) :",
+            f"{len(packed.dropped)} écarté(s), {len(packed.truncated)} tronqué(s)",
+            flush=True,
+        )
+    print(
+        "[AGENT_CERVEAU] taille du prompt (tokens estimés) :",
+        {b["name"]: b["tokens"] for b in prompt_report["blocks"]},
+        flush=True,
+    )
+
+    return CoachRequest(
+        user_id=user_id,
+        user_input=user_input,
+        mood_for_prompt=mood_for_prompt,
+        history=history,
+        messages=assembled.to_messages(),
+        prompt_report=prompt_report,
+        exchange_id=context.get("exchange_id"),
+        personalized=bool(history) or bool(summary),
+    )
+
+
+async def _save_exchange(req: CoachRequest, answer: str) -> None:
+    """
+    Dépose l’échange (message utilisateur + réponse coach) dans la file
+    d’écriture différée : la réponse part sans attendre agent_memory.
+
+    L’échange est clé par le message_id de l’orchestrateur (exchange_id du
+    contexte) : l’interface enregistre le même échange avec le mood et le
+    repas, sans doublon. Sans exchange_id (appel direct), une clé est
+    générée : un retry du lot reste idempotent.
+    """
+    if not req.user_id:
+        return
+
+    mood_label = _mood_label_for_memory(req.mood_for_prompt)
+
+    await memory_writes.submit(
+        {
+            "exchange_id": req.exchange_id or str(uuid.uuid4()),
+            "user_id": req.user_id,
+            "user_text": req.user_input,
+            "user_metadata": {
+                "service": "coaching_sport",
+                "mood_raw": mood_label or str(req.mood_for_prompt),
+            },
+            "coach_text": answer,
+            "coach_metadata": {"service": "coaching_sport"},
+        }
     )
 
+
+async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
+    """
+    Handler principal de l’agent cerveau.
+
+    Flux :
+    1. Lire user_input + mood + expert knowledge (nutrition, vision, etc.)
+    2. Charger l’historique user depuis agent_memory
+    3. Assembler le prompt (préfixe statique + blocs dynamiques)
+    4. Appeler LLM (Groq)
+    5. Déposer la conversation dans la file d’écriture vers agent_memory
+    6. Retourner réponse à l’orchestrateur
+    """
+
+    payload: Dict[str, Any] = msg.get("payload", {}) or {}
+    context: Dict[str, Any] = msg.get("context", {}) or {}
+    task: Optional[str] = payload.get("task")
+
     # -------------------------------------------------------------------------
-    # ✔️ Appeler LLM
+    # ❌ Tâche inconnue
     # -------------------------------------------------------------------------
-    llm = LLMClient()
-    answer = llm.generate(full_prompt)
+    if task != "coach_response":
+        return _error_response(
+            msg, context, f"Tâche inconnue ou non prise en charge: {task!r}"
+        )
 
     # -------------------------------------------------------------------------
-    # ✔️ Enregistrer l’interaction dans agent_memory
+    # ✔️ Question générique déjà traitée ? (cache sémantique)
     # -------------------------------------------------------------------------
-    if user_id:
-        try:
-            mood_label = _mood_label_for_memory(mood_for_prompt)
+    hit = _cache_lookup(payload)
+    model_tier: Optional[Dict[str, Any]] = None
+    if hit is not None:
+        req = _cached_request(payload, context)
+        answer = hit.answer
+    else:
+        req = await _prepare_coach_request(payload, context)
 
-            # message utilisateur
-            memory_client.save_interaction(
-                user_id=user_id,
-                role="user",
-                text=user_input,
-                metadata={
-                    "service": "coaching_sport",
-                    "mood_raw": mood_label or str(mood_for_prompt),
-                },
-            )
-            # réponse coach
-            memory_client.save_interaction(
-                user_id=user_id,
-                role="coach",
-                text=answer,
-                metadata={"service": "coaching_sport"},
-            )
-        except Exception:
-            # Pas de crash si memory est down
-            pass
+        # ---------------------------------------------------------------------
+        # ✔️ Appeler LLM
+        # ---------------------------------------------------------------------
+        answer, tier_report = await coach_llm.agenerate(req.messages)
+        model_tier = tier_report.as_dict()
+        _cache_store(payload, req, answer)
+
+    # -------------------------------------------------------------------------
+    # ✔️ Enregistrer l’interaction dans agent_memory (écriture différée)
+    # -------------------------------------------------------------------------
+    await _save_exchange(req, answer)
 
     # -------------------------------------------------------------------------
     # ✔️ Construire réponse MCP
@@ -156,7 +423,10 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
         "status": "ok",
         "task": "coach_response",
         "answer": answer,
-        "used_history": history,
+        "used_history": req.history,
+        "prompt_report": req.prompt_report,
+        "answer_cache": _cache_report(hit),
+        "model_tier": model_tier,
     }
 
     return MCPResponse(
@@ -165,3 +435,76 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
         payload=response_payload,
         context=context,
     )
+
+
+async def stream_coach_response(msg: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Variante streaming de "coach_response".
+
+    Produit une suite d’événements (sérialisés en NDJSON par main.py) :
+      - {"type": "token", "content": "..."}   au fil de la génération
+      - {"type": "done", "payload": {...}}     payload identique au mode classique
+      - {"type": "error", "message": "..."}    si la tâche ou le LLM échoue
+
+    L’échange n’est déposé dans la file d’écriture mémoire qu’une fois le
+    flux terminé.
+    """
+    payload: Dict[str, Any] = msg.get("payload", {}) or {}
+    context: Dict[str, Any] = msg.get("context", {}) or {}
+    task: Optional[str] = payload.get("task")
+
+    if task != "coach_response":
+        yield {
+            "type": "error",
+            "message": f"Tâche inconnue ou non prise en charge: {task!r}",
+        }
+        return
+
+    hit = _cache_lookup(payload)
+    if hit is not None:
+        # Réponse déjà prête : envoyée en un seul événement "token".
+        req = _cached_request(payload, context)
+        yield {"type": "token", "content": hit.answer}
+        await _save_exchange(req, hit.answer)
+        yield {
+            "type": "done",
+            "payload": {
+                "status": "ok",
+                "task": "coach_response",
+                "answer": hit.answer,
+                "used_history": req.history,
+                "prompt_report": req.prompt_report,
+                "answer_cache": _cache_report(hit),
+                "model_tier": None,
+            },
+        }
+        return
+
+    req = await _prepare_coach_request(payload, context)
+
+    parts = []
+    model_tier: Dict[str, Any] = {}
+    try:
+        async for token in coach_llm.astream(req.messages, model_tier):
+            parts.append(token)
+            yield {"type": "token", "content": token}
+    except Exception as e:
+        yield {"type": "error", "message": f"Erreur LLM: {e!r}"}
+        return
+
+    answer = "".join(parts)
+    _cache_store(payload, req, answer)
+    await _save_exchange(req, answer)
+
+    yield {
+        "type": "done",
+        "payload": {
+            "status": "ok",
+            "task": "coach_response",
+            "answer": answer,
+            "used_history": req.history,
+            "prompt_report": req.prompt_report,
+            "answer_cache": _cache_report(None),
+            "model_tier": model_tier,
+        },
+    }
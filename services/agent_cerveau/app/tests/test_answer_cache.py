@@ -0,0 +1,99 @@
+import asyncio
+
+import app.mcp.handler as handler
+from app.llm.answer_cache import AnswerCache, embed_text, cosine, is_user_specific
+from app.llm.tiering import TierReport
+
+
+def test_similar_generic_question_is_served_from_cache():
+    cache = AnswerCache(enabled=True, threshold=0.8)
+    assert cache.store("C'est quoi une bonne séance pour débuter ?", "motivé", [], "Réponse A")
+
+    hit = cache.lookup("c'est quoi une bonne seance pour debuter", "motivé", [])
+    assert hit is not None and hit.answer == "Réponse A"
+
+    # Autre mood ou autres connaissances expertes : pas de partage
+    assert cache.lookup("c'est quoi une bonne seance pour debuter", "fatigué", []) is None
+    other = [{"type": "nutrition", "data": {"raw": {"suggestions": [{"alim_nom_fr": "Riz"}]}}}]
+    assert cache.lookup("c'est quoi une bonne seance pour debuter", "motivé", other) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+
+def test_user_specific_requests_bypass_the_cache():
+    assert is_user_specific("Je pèse 80 kg, que manger ?")
+    assert is_user_specific("J'ai mal à mon genou")
+    assert is_user_specific("Est-ce bien ?", [{"type": "vision", "data": {}}])
+    assert not is_user_specific("C'est quoi une bonne séance pour débuter ?")
+
+    cache = AnswerCache(enabled=True)
+    assert not cache.store("J'ai mal à mon genou", None, [], "Repos")
+    assert cache.lookup("J'ai mal à mon genou", None, []) is None
+    assert cache.stats()["skipped_user_specific"] == 1
+
+
+def test_ttl_and_size_bound():
+    cache = AnswerCache(enabled=True, max_entries=2, ttl_s=0.0)
+    cache.store("question une sur le sport", None, [], "a")
+    cache.store("question deux sur le sommeil", None, [], "b")
+    cache.store("question trois sur la nutrition", None, [], "c")
+    assert cache.stats()["evictions"] == 1
+
+    # TTL nul : tout a expiré à la lecture suivante
+    assert cache.lookup("question trois sur la nutrition", None, []) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_embedding_is_normalized():
+    a = embed_text("Séance de renforcement")
+    assert abs(cosine(a, a) - 1.0) < 1e-9
+    assert cosine(a, embed_text("recette de gâteau")) < 0.5
+
+
+def test_answer_generated_with_user_history_is_not_shared(monkeypatch):
+    class _Memory:
+        def __init__(self, recent):
+            self.recent = recent
+
+        async def get_context(self, user_id, recent_limit, baseline_limit):
+            return {"summary": None, "recent": self.recent.get(user_id, []), "stats": {}}
+
+        async def retrieve_relevant(self, user_id, query, k):
+            return []
+
+    class _LLM:
+        def __init__(self):
+            self.calls = 0
+
+        async def agenerate(self, messages):
+            self.calls += 1
+            return f"réponse {self.calls}", TierReport("primary", "fake", None, 0.0)
+
+    class _Writes:
+        async def submit(self, item):
+            pass
+
+    memory = _Memory({"user_a": [{"id": 1, "role": "user", "text": "Je prépare un marathon."}]})
+    llm = _LLM()
+    monkeypatch.setattr(handler, "memory_client", memory)
+    monkeypatch.setattr(handler, "coach_llm", llm)
+    monkeypatch.setattr(handler, "memory_writes", _Writes())
+    monkeypatch.setattr(handler, "answer_cache", AnswerCache(enabled=True))
+
+    def ask(user_id):
+        msg = {
+            "payload": {"task": "coach_response", "user_input": "C'est quoi une bonne séance pour débuter ?"},
+            "context": {"user_id": user_id},
+        }
+        return asyncio.run(handler.process_mcp_message(msg)).payload
+
+    # Réponse générée avec l'historique de A : pas servie à B
+    assert ask("user_a")["answer"] == "réponse 1"
+    second = ask("user_b")
+    assert second["answer"] == "réponse 2" and second["answer_cache"] == {"hit": False}
+
+    # Réponse de B, générée sans contexte personnel : partagée
+    third = ask("user_c")
+    assert third["answer"] == "réponse 2" and third["answer_cache"]["hit"]
+    assert llm.calls == 2
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import app.mcp.handler as handler
+from app.main import app
+
+
+class _Memory:
+    async def get_context(self, user_id, recent_limit, baseline_limit):
+        return {"summary": None, "recent": [], "stats": {}}
+
+    async def retrieve_relevant(self, user_id, query, k):
+        return []
+
+
+class _Writes:
+    def __init__(self):
+        self.items = []
+
+    async def submit(self, item):
+        self.items.append(item)
+
+
+class _LLM:
+    def __init__(self, tokens, fail=None):
+        self.tokens = tokens
+        self.fail = fail
+
+    async def astream(self, messages, report):
+        for token in self.tokens:
+            yield token
+        if self.fail is not None:
+            raise self.fail
+        report.update({"tier": "primary"})
+
+
+def _setup(monkeypatch, llm):
+    writes = _Writes()
+    monkeypatch.setattr(handler, "memory_client", _Memory())
+    monkeypatch.setattr(handler, "memory_writes", writes)
+    monkeypatch.setattr(handler, "coach_llm", llm)
+    return writes
+
+
+MSG = {
+    "message_id": "c-1",
+    "from_agent": "orchestrator",
+    "payload": {"task": "coach_response", "user_input": "Je suis crevé"},
+    "context": {"user_id": "u1", "exchange_id": "m-1"},
+}
+
+
+def test_stream_endpoint_sends_ndjson_and_saves_the_exchange_once(monkeypatch):
+    writes = _setup(monkeypatch, _LLM(["Repos ", "ce\nsoir."]))
+
+    resp = TestClient(app).post("/mcp/stream", json=MSG)
+    events = [json.loads(line) for line in resp.text.splitlines()]
+
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert [e["type"] for e in events] == ["token", "token", "done"]
+    assert events[-1]["payload"]["answer"] == "Repos ce\nsoir."
+    assert [(w["exchange_id"], w["coach_text"]) for w in writes.items] == [("m-1", "Repos ce\nsoir.")]
+
+
+def test_llm_failure_mid_stream_saves_nothing(monkeypatch):
+    writes = _setup(monkeypatch, _LLM(["Re"], fail=RuntimeError("timeout")))
+
+    async def run():
+        return [e async for e in handler.stream_coach_response(MSG)]
+
+    events = asyncio.run(run())
+
+    assert [e["type"] for e in events] == ["token", "error"]
+    assert writes.items == []
@@ -0,0 +1,54 @@
+from app.llm.assembly import assemble_coach_prompt
+from app.llm.context_packer import pack_context
+
+
+def _knowledge(n_suggestions=12, vision_words=0):
+    suggestions = [
+        {"alim_nom_fr": f"Aliment {i}", "energie_reglement_ue_1169_kcal_100g": 100 + i}
+        for i in range(n_suggestions)
+    ]
+    suggestions[5]["alim_nom_fr"] = "Lentilles corail"
+    return [
+        {"type": "nutrition", "data": {"raw": {"suggestions": suggestions}}},
+        {
+            "type": "vision",
+            "data": {
+                "title": "Assiette",
+                "description_generale": "pâtes carbonara " * vision_words or "pâtes",
+            },
+        },
+    ]
+
+
+def test_everything_fits_in_a_large_budget():
+    packed = pack_context(
+        "Des idées avec des lentilles ?",
+        history=[{"role": "user", "text": "Bonjour"}],
+        expert_knowledge=_knowledge(),
+        budget=5000,
+    )
+    assert not packed.dropped and not packed.truncated
+    assert len(packed.expert_knowledge[0]["data"]["raw"]["suggestions"]) == 12
+
+
+def test_small_budget_keeps_relevant_items_and_records_drops():
+    packed = pack_context(
+        "Des idées avec des lentilles ?",
+        history=[{"role": "coach", "text": "blabla " * 200}],
+        expert_knowledge=_knowledge(vision_words=400),
+        budget=520,
+    )
+    nutrition = next(e for e in packed.expert_knowledge if e["type"] == "nutrition")
+    kept = [s["alim_nom_fr"] for s in nutrition["data"]["raw"]["suggestions"]]
+
+    assert "Lentilles corail" in kept
+    assert packed.dropped or packed.truncated
+    assert packed.used_tokens <= 520
+
+    assembled = assemble_coach_prompt(
+        "Des idées avec des lentilles ?",
+        history=packed.history,
+        expert_knowledge=packed.expert_knowledge,
+    )
+    report = assembled.size_report()
+    assert report["total_tokens"] - report["static_tokens"] <= 520
@@ -0,0 +1,45 @@
+from app.llm.assembly import assemble_coach_prompt
+from app.llm.prompts import COACH_SYSTEM_PROMPT, build_coach_prompt
+
+
+def test_static_prefix_comes_first_and_user_input_last():
+    assembled = assemble_coach_prompt(
+        user_input="Je suis fatigué, quelle séance ce soir ?",
+        mood={"mood_label": "fatigué", "energy": "low"},
+        history=[{"role": "user", "text": "Bonjour"}],
+    )
+    messages = assembled.to_messages()
+
+    assert messages[0] == {"role": "system", "content": COACH_SYSTEM_PROMPT}
+    assert messages[-1]["role"] == "user"
+    assert "quelle séance ce soir" in messages[-1]["content"]
+
+    report = assembled.size_report()
+    assert [b["name"] for b in report["blocks"]] == [
+        "system", "history", "mood", "nutrition", "vision", "user_input",
+    ]
+    assert report["total_tokens"] == sum(b["tokens"] for b in report["blocks"])
+    assert 0 < report["static_share"] < 1
+
+
+def test_blocks_follow_each_request():
+    knowledge = [{"type": "nutrition", "data": {"raw": {"suggestions": [{"alim_nom_fr": "Lentilles"}]}}}]
+    first = assemble_coach_prompt(
+        user_input="Que manger ?",
+        history=[{"id": 1, "role": "user", "text": "Bonjour", "created_at": "2026-10-01T08:00:00"}],
+        expert_knowledge=knowledge,
+    ).to_messages()
+    second = assemble_coach_prompt(
+        user_input="Que manger ?",
+        history=[{"id": 2, "role": "user", "text": "Salut", "created_at": "2026-10-02T08:00:00"}],
+        expert_knowledge=knowledge,
+    ).to_messages()
+
+    assert "Bonjour" in first[1]["content"] and "Salut" in second[1]["content"]
+    assert first[3] == second[3] and "Lentilles" in first[3]["content"]
+
+
+def test_build_coach_prompt_keeps_text_compatibility():
+    text = build_coach_prompt(user_input="Salut coach")
+    assert text.startswith(COACH_SYSTEM_PROMPT)
+    assert '"""Salut coach"""' in text
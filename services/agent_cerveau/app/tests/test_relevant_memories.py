@@ -0,0 +1,55 @@
+import asyncio
+
+import app.mcp.handler as handler
+
+
+class _FakeMemory:
+    async def get_context(self, user_id, recent_limit, baseline_limit):
+        return {
+            "summary": "Objectif : 10 km.",
+            "recent": [
+                {"id": 40, "role": "coach", "text": "Bonne séance !"},
+                {"id": 39, "role": "user", "text": "J'ai couru 8 km."},
+            ],
+            "stats": {"tokens_saved": 12},
+        }
+
+    async def retrieve_relevant(self, user_id, query, k):
+        self.k = k
+        return [
+            {"id": 39, "role": "user", "text": "J'ai couru 8 km.", "score": 0.4},
+            {
+                "id": 3,
+                "role": "user",
+                "text": "J'ai une tendinite au genou.",
+                "created_at": "2026-09-20T08:00:00",
+                "score": 0.3,
+            },
+        ]
+
+
+def test_relevant_memories_are_appended_after_recent_turns(monkeypatch):
+    fake = _FakeMemory()
+    monkeypatch.setattr(handler, "memory_client", fake)
+    monkeypatch.setattr(handler, "COACH_RELEVANT_MEMORIES", 2)
+
+    loaded = asyncio.run(handler._load_history("u1", "Mon genou me fait mal"))
+
+    assert [item["id"] for item in loaded["history"]] == [40, 39, 3]
+    assert loaded["history"][-1]["role"] == "user (souvenir du 2026-09-20)"
+    assert loaded["relevant"] == 1
+    assert loaded["summary"] == "Objectif : 10 km."
+    assert fake.k == 2 + handler.COACH_HISTORY_LIMIT
+
+
+def test_memory_retrieval_failure_keeps_recent_history(monkeypatch):
+    class _Broken(_FakeMemory):
+        async def retrieve_relevant(self, user_id, query, k):
+            raise ConnectionError("agent_memory injoignable")
+
+    monkeypatch.setattr(handler, "memory_client", _Broken())
+
+    loaded = asyncio.run(handler._load_history("u1", "Mon genou me fait mal"))
+
+    assert [item["id"] for item in loaded["history"]] == [40, 39]
+    assert loaded["relevant"] == 0
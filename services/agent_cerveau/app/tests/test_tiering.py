@@ -0,0 +1,107 @@
+import asyncio
+
+from app.llm.tiering import ModelTier, TieredLLMClient, TieringPolicy
+
+PRIMARY = ModelTier("primary", "big", 800, 20)
+FAST = ModelTier("fast", "small", 500, 20)
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeClient:
+    def __init__(self, tier, fail=None):
+        self.tier = tier
+        self.fail = fail
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        if self.fail:
+            raise self.fail
+        return f"{self.tier.model}:{prompt}"
+
+    async def agenerate(self, prompt):
+        await asyncio.sleep(0)
+        return self.generate(prompt)
+
+    async def astream(self, prompt):
+        self.calls += 1
+        if self.fail:
+            raise self.fail
+        for part in ("a", "b"):
+            yield part
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _client(policy, primary_fail=None):
+    clients = {}
+
+    def factory(tier):
+        clients[tier.name] = FakeClient(tier, primary_fail if tier.name == "primary" else None)
+        return clients[tier.name]
+
+    return TieredLLMClient(policy, client_factory=factory), clients
+
+
+def test_rate_limit_falls_back_then_cools_down():
+    clock = FakeClock()
+    policy = TieringPolicy(PRIMARY, FAST, cooldown_s=30, clock=clock)
+    llm, clients = _client(policy, primary_fail=RateLimitError("429"))
+
+    answer, report = asyncio.run(llm.agenerate("q"))
+    assert answer == "small:q"
+    assert (report.tier, report.reason) == ("fast", "rate_limit")
+
+    # Pendant le cooldown, le primaire n'est même plus appelé
+    asyncio.run(llm.agenerate("q"))
+    assert clients["primary"].calls == 1
+
+    clock.now = 31
+    assert policy.choose() == (PRIMARY, None)
+
+
+def test_slow_primary_is_bypassed_and_probed():
+    policy = TieringPolicy(PRIMARY, FAST, latency_budget_s=5, min_samples=3, probe_every=3)
+    for _ in range(3):
+        policy.record_success(PRIMARY, 9.0)
+
+    assert policy.choose() == (FAST, "latency")
+    assert policy.choose() == (FAST, "latency")
+    assert policy.choose() == (PRIMARY, "probe")
+
+    # Sonde rapide : le primaire reprend la main
+    policy.record_success(PRIMARY, 1.0)
+    assert policy.choose() == (PRIMARY, None)
+
+
+def test_stream_falls_back_before_first_token():
+    policy = TieringPolicy(PRIMARY, FAST)
+    llm, _ = _client(policy, primary_fail=RuntimeError("timeout"))
+    report = {}
+
+    async def collect():
+        return [t async for t in llm.astream("q", report)]
+
+    assert asyncio.run(collect()) == ["a", "b"]
+    assert report["tier"] == "fast" and report["reason"] == "error"
+    assert policy.stats()["models"]["big"]["errors"] == 1
+
+
+def test_async_generate_falls_back_to_fast_tier():
+    policy = TieringPolicy(PRIMARY, FAST)
+    llm, clients = _client(policy, primary_fail=RateLimitError("429"))
+
+    answer, report = asyncio.run(llm.agenerate("q"))
+
+    assert answer == "small:q"
+    assert (report.tier, report.reason) == ("fast", "rate_limit")
+    assert clients["primary"].calls == 1
@@ -0,0 +1,75 @@
+import asyncio
+
+from app.clients.write_behind import WriteBehindQueue
+
+
+def test_writes_are_batched_and_flushed_on_stop():
+    batches = []
+
+    async def flush(batch):
+        batches.append([item["text"] for item in batch])
+
+    async def scenario():
+        queue = WriteBehindQueue(flush, batch_max=3, flush_ms=1000)
+        queue.start()
+        for i in range(7):
+            await queue.submit({"user_id": "u", "role": "user", "text": f"m{i}"})
+        await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert [t for batch in batches for t in batch] == [f"m{i}" for i in range(7)]
+    assert all(len(batch) <= 3 for batch in batches)
+    assert stats["written"] == 7
+    assert stats["pending"] == 0
+
+
+def test_failed_batch_is_retried_then_counted():
+    attempts = []
+
+    async def flush(batch):
+        attempts.append(len(batch))
+        if len(attempts) < 2:
+            raise RuntimeError("agent_memory indisponible")
+
+    async def scenario():
+        queue = WriteBehindQueue(flush, batch_max=10, flush_ms=5, retries=1)
+        await queue.submit({"user_id": "u", "role": "coach", "text": "ok"})
+        await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert attempts == [1, 1]
+    assert stats["written"] == 1
+    assert stats["failed"] == 0
+
+
+def test_exchange_is_submitted_once_with_the_orchestrator_id(monkeypatch):
+    import app.mcp.handler as handler
+
+    batches = []
+
+    async def flush(batch):
+        batches.append(batch)
+
+    monkeypatch.setattr(handler, "memory_writes", WriteBehindQueue(flush, flush_ms=5))
+
+    async def scenario():
+        req = handler._cached_request(
+            {"user_input": "Quel échauffement ?", "mood": "motivé"},
+            {"user_id": "u", "exchange_id": "orch-42"},
+        )
+        await handler._save_exchange(req, "10 minutes de footing léger.")
+        await handler.memory_writes.stop()
+
+    asyncio.run(scenario())
+
+    assert len(batches) == 1 and len(batches[0]) == 1
+    exchange = batches[0][0]
+    assert exchange["exchange_id"] == "orch-42"
+    assert (exchange["user_text"], exchange["coach_text"]) == (
+        "Quel échauffement ?",
+        "10 minutes de footing léger.",
+    )
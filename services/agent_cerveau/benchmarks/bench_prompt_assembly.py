@@ -0,0 +1,120 @@
+# services/agent_cerveau/benchmarks/bench_prompt_assembly.py
+
+"""
+Benchmark de l'assemblage du prompt du coach sur un trafic réaliste
+(plusieurs utilisateurs, historique qui avance à chaque requête) : temps
+par prompt, succès du cache de tokens et tokens par bloc.
+
+    python -m benchmarks.bench_prompt_assembly --iterations 2000
+"""
+
+import argparse
+import time
+from typing import Any, Dict, List
+
+from app.llm.assembly import _cached_token_count, assemble_coach_prompt, token_cache_stats
+
+MOODS = [
+    {"mood_label": "fatigué mais motivé", "valence": "positive", "energy": "low"},
+    {"mood_label": "stressé", "valence": "negative", "energy": "medium"},
+    {"mood_label": "neutre", "valence": "neutral", "energy": "medium"},
+]
+
+
+def _history(user: int, turn: int) -> List[Dict[str, Any]]:
+    """
+    Les 10 derniers messages d'un utilisateur après `turn` échanges.
+    """
+    return [
+        {
+            "id": user * 100000 + i,
+            "role": "user" if i % 2 == 0 else "coach",
+            "created_at": f"2026-10-{1 + i // 200 % 28:02d}T08:{i % 60:02d}:00",
+            "text": (
+                "Je voudrais reprendre la course à pied après deux ans d'arrêt, "
+                "mais j'ai souvent mal aux genoux le lendemain."
+                if i % 2 == 0
+                else "**Petit plan simple à mettre en place**\n"
+                "* 10 min de marche rapide\n* 3 × 1 min de trottinement\n"
+                "* 5 min d'étirements des mollets"
+            ),
+        }
+        for i in range(2 * turn, 2 * turn + 10)
+    ]
+
+
+def _sample_inputs(variant: int = 0) -> Dict[str, Any]:
+    suggestions = [
+        {
+            "alim_nom_fr": f"Aliment riche en protéines n°{variant}-{i}",
+            "energie_reglement_ue_1169_kcal_100g": 120 + i,
+            "proteines_n_x_6_25_g_100g": 20.5,
+            "glucides_g_100g": 3.1,
+            "lipides_g_100g": 4.2,
+            "fibres_alimentaires_g_100g": 1.0,
+        }
+        for i in range(15)
+    ]
+    vision = {
+        "description_generale": "Assiette de pâtes à la crème avec lardons et fromage râpé",
+        "calories_estimees": {"total_kcal_approx": 850, "niveau_calorique": "élevé"},
+        "risks": "Sauce riche en graisses saturées",
+        "nutrition_comment": "Peu de légumes, portion de féculents importante",
+    }
+    return {
+        "mood": MOODS[variant % len(MOODS)],
+        "history": _history(0, 0),
+        "expert_knowledge": [
+            {"type": "nutrition", "data": {"raw": {"suggestions": suggestions}}},
+            {"type": "vision", "data": vision},
+        ],
+    }
+
+
+def _timed(iterations: int, users: int) -> float:
+    variants = [_sample_inputs(v) for v in range(4)]
+    started = time.perf_counter()
+    for i in range(iterations):
+        inputs = dict(variants[i % len(variants)])
+        inputs["history"] = _history(i % users, i // users)
+        inputs["mood"] = MOODS[(i // 7) % len(MOODS)]
+        assemble_coach_prompt(user_input=f"Message n°{i} : que faire ce soir ?", **inputs)
+    return (time.perf_counter() - started) * 1e6 / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de l'assemblage du prompt.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    _cached_token_count.cache_clear()
+    per_prompt_us = _timed(args.iterations, args.users)
+    tokens_cache = token_cache_stats()
+
+    report = assemble_coach_prompt(user_input="Que faire ce soir ?", **_sample_inputs()).size_report()
+
+    rows: List[str] = [
+        f"{'bloc':<12}{'rôle':<8}{'statique':<10}{'caractères':>12}{'tokens':>10}"
+    ]
+    for b in report["blocks"]:
+        rows.append(
+            f"{b['name']:<12}{b['role']:<8}{str(b['static']):<10}"
+            f"{b['chars']:>12}{b['tokens']:>10}"
+        )
+    print("\n".join(rows))
+    print(
+        f"\ntotal : {report['total_tokens']} tokens estimés, "
+        f"préfixe statique : {report['static_tokens']} "
+        f"({report['static_share']:.0%})"
+    )
+    lookups = tokens_cache["hits"] + tokens_cache["misses"]
+    print(f"assemblage : {per_prompt_us:8.1f} µs / prompt ({args.users} utilisateurs)")
+    print(
+        f"cache du comptage de tokens : {tokens_cache['hits']} / {lookups} "
+        f"({tokens_cache['hits'] / lookups:.0%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
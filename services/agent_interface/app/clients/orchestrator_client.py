@@ -2,9 +2,10 @@
 
 from __future__ import annotations
 
+import json
 import os
 import uuid
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional
 
 import httpx
 
@@ -17,6 +18,11 @@ ORCHESTRATOR_URL = os.getenv(
     "http://orchestrator:8005/mcp",   # 👈 service Docker, pas 127.0.0.1
 )
 
+ORCHESTRATOR_STREAM_URL = os.getenv(
+    "ORCHESTRATOR_STREAM_URL",
+    ORCHESTRATOR_URL.rstrip("/") + "/stream",
+)
+
 AGENT_MEMORY_URL = os.getenv(
     "AGENT_MEMORY_URL",
     "http://agent_memory:8003/mcp",   # 👈 service Docker, pas 127.0.0.1
@@ -51,6 +57,7 @@ async def call_orchestrator(
           "status": "ok",
           "task": "process_user_input",
           "user_id": "...",
+          "exchange_id": "...",          (clé de l'échange pour agent_memory)
           "coach_answer": "...",
           "mood_state": {...} | null,
           "speech_transcription": {...} | null,
@@ -86,6 +93,44 @@ async def call_orchestrator(
         return resp.json()
 
 
+async def stream_orchestrator(
+    user_input: str,
+    *,
+    user_id: Optional[str] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Variante streaming de call_orchestrator() pour le chat texte.
+
+    Renvoie les événements NDJSON de l'orchestrateur au fil de l'eau :
+      - {"type": "meta", "payload": {...}}   (mood, nutrition, vision...)
+      - {"type": "token", "content": "..."}  (réponse du coach, morceau par morceau)
+      - {"type": "done", "payload": {...}}   (même payload que call_orchestrator)
+      - {"type": "error", "message": "..."}
+    """
+    msg: Dict[str, Any] = {
+        "message_id": str(uuid.uuid4()),
+        "type": "request",
+        "from_agent": "agent_interface",
+        "to_agent": "orchestrator",
+        "payload": {
+            "task": "process_user_input",
+            "user_input": user_input or "",
+        },
+        "context": {"user_id": user_id} if user_id else {},
+    }
+
+    async with httpx.AsyncClient() as client:
+        async with client.stream(
+            "POST", ORCHESTRATOR_STREAM_URL, json=msg, timeout=60.0
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                line = line.strip()
+                if not line:
+                    continue
+                yield json.loads(line)
+
+
 # ---------------------------------------------------------------------
 # Accès à l'agent_memory (historique utilisateur)
 # ---------------------------------------------------------------------
@@ -118,6 +163,52 @@ async def get_user_history(
         return resp.json()
 
 
+async def record_exchange(
+    user_id: str,
+    exchange_id: str,
+    *,
+    user_text: Optional[str] = None,
+    coach_text: Optional[str] = None,
+    mood: Optional[Dict[str, Any]] = None,
+    meal: Optional[Dict[str, Any]] = None,
+    user_metadata: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Enregistre un échange complet dans agent_memory (message, réponse,
+    mood, repas) en une transaction.
+
+    exchange_id est le message_id de l'orchestrateur (payload["exchange_id"]) :
+    l'agent_cerveau enregistre déjà le message et la réponse sous la même
+    clé, agent_memory n'ajoute donc que ce qui manque (mood, repas).
+    Rejouer l'appel ne crée pas de doublon.
+    """
+    payload: Dict[str, Any] = {
+        "task": "record_exchange",
+        "exchange_id": exchange_id,
+        "user_id": user_id,
+        "user_text": user_text,
+        "coach_text": coach_text,
+        "mood": mood,
+        "meal": meal,
+    }
+    if user_metadata:
+        payload["user_metadata"] = user_metadata
+
+    msg = {
+        "message_id": str(uuid.uuid4()),
+        "type": "request",
+        "from_agent": "agent_interface",
+        "to_agent": "agent_memory",
+        "payload": payload,
+        "context": {"user_id": user_id},
+    }
+
+    async with httpx.AsyncClient() as client:
+        resp = await client.post(AGENT_MEMORY_URL, json=msg, timeout=30)
+        resp.raise_for_status()
+        return resp.json()
+
+
 # ---------------------------------------------------------------------
 # WRAPPERS DE COMPATIBILITÉ (pour l'ancien coach.py)
 # ---------------------------------------------------------------------
@@ -174,34 +265,6 @@ async def query_orchestrator_with_image(
     )
 
 
-async def save_memory(
-    user_id: str,
-    memory_type: str,
-    content: str,
-) -> Dict[str, Any]:
-    """
-    Wrapper de compatibilité pour enregistrer un souvenir dans agent_memory.
-    Le coach.py l'utilise encore (ex : garder une trace d'un repas ou d'un message).
-    """
-    msg = {
-        "message_id": str(uuid.uuid4()),
-        "type": "request",
-        "from_agent": "agent_interface",
-        "to_agent": "agent_memory",
-        "payload": {
-            "task": "save_memory",
-            "user_id": user_id,
-            "memory_type": memory_type,
-            "content": content,
-        },
-        "context": {"user_id": user_id},
-    }
-
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(AGENT_MEMORY_URL, json=msg, timeout=30)
-        resp.raise_for_status()
-        return resp.json()
-
 # ---------------------------------------------------------------------
 # Récupération de l'historique utilisateur (compatibilité coach.py)
 # ---------------------------------------------------------------------
@@ -0,0 +1,191 @@
+# services/agent_interface/app/core/backup.py
+
+"""
+Sauvegardes à chaud de users.db, meals.db et moods.db avec l'API de
+sauvegarde en ligne, par pas de INTERFACE_BACKUP_PAGES pages séparés de
+INTERFACE_BACKUP_PAUSE_MS ; après INTERFACE_BACKUP_MAX_RESTARTS
+redémarrages, dernière copie sous verrou de lecture. Copie écrite dans
+<instantané>.part puis renommée ; INTERFACE_BACKUP_KEEP instantanés gardés
+par base. POST /admin/backup ou :
+
+    python -m app.core.backup
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core import meals_store, mood_store, store
+
+INTERFACE_BACKUP_DIR = os.getenv("INTERFACE_BACKUP_DIR", "data/backups")
+INTERFACE_BACKUP_KEEP = int(os.getenv("INTERFACE_BACKUP_KEEP", "7"))
+INTERFACE_BACKUP_INTERVAL_S = float(os.getenv("INTERFACE_BACKUP_INTERVAL_S", "0"))
+INTERFACE_BACKUP_PAGES = int(os.getenv("INTERFACE_BACKUP_PAGES", "64"))
+INTERFACE_BACKUP_PAUSE_MS = float(os.getenv("INTERFACE_BACKUP_PAUSE_MS", "5"))
+INTERFACE_BACKUP_MAX_RESTARTS = int(os.getenv("INTERFACE_BACKUP_MAX_RESTARTS", "3"))
+
+# Bases sauvegardées, par nom d'instantané
+SOURCES: Dict[str, Path] = {
+    "users": store.DB_PATH,
+    "meals": meals_store.DB_PATH,
+    "moods": mood_store.DB_PATH,
+}
+
+# Horodatage des instantanés : l'ordre des noms est l'ordre chronologique
+_STAMP_FORMAT = "%Y%m%dT%H%M%S%fZ"
+
+logger = logging.getLogger("agent_interface")
+
+# Une seule sauvegarde à la fois (endpoint + tâche périodique)
+_lock = threading.Lock()
+last_run: Optional[Dict[str, Any]] = None
+
+
+class _SourceChanged(Exception):
+    """La base source a changé pendant une copie sans verrou."""
+
+
+def backup_database(
+    source: Path,
+    target: Path,
+    pages: int = INTERFACE_BACKUP_PAGES,
+    pause_ms: float = INTERFACE_BACKUP_PAUSE_MS,
+    max_restarts: int = INTERFACE_BACKUP_MAX_RESTARTS,
+) -> Dict[str, Any]:
+    """
+    Copie cohérente de la base `source` vers le fichier `target`, base en
+    service. Synchrone (sqlite3) : à appeler via asyncio.to_thread().
+    """
+    started = time.perf_counter()
+    part = target.with_name(target.name + ".part")
+    part.unlink(missing_ok=True)
+
+    src = sqlite3.connect(source, isolation_level=None, timeout=5)
+    dst = sqlite3.connect(part)
+    counters = {"steps": 0, "restarts": 0}
+    try:
+        wal = src.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        locked = wal
+        while True:
+            if locked:
+                # Instantané de lecture gardé pendant toute la copie
+                src.execute("BEGIN")
+                src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            step = pages if (wal or not locked) else -1
+            remaining: List[int] = []
+
+            def progress(status: int, left: int, total: int) -> None:
+                counters["steps"] += 1
+                if not locked and remaining and left > remaining[-1]:
+                    raise _SourceChanged()
+                remaining.append(left)
+                if pause_ms > 0 and left > 0:
+                    time.sleep(pause_ms / 1000.0)
+
+            try:
+                src.backup(dst, pages=step, progress=progress)
+                break
+            except _SourceChanged:
+                counters["restarts"] += 1
+                locked = counters["restarts"] >= max_restarts
+            finally:
+                if src.in_transaction:
+                    src.execute("COMMIT")
+
+        # Instantané autonome : un seul fichier, sans -wal à côté
+        dst.execute("PRAGMA journal_mode=DELETE")
+    except Exception:
+        dst.close()
+        part.unlink(missing_ok=True)
+        raise
+    finally:
+        dst.close()
+        src.close()
+    os.replace(part, target)
+
+    return {
+        "path": str(target),
+        "bytes": target.stat().st_size,
+        "steps": counters["steps"],
+        "restarts": counters["restarts"],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def list_snapshots(directory: Path, label: str) -> List[Path]:
+    """
+    Instantanés complets d'une base, du plus ancien au plus récent.
+    """
+    if not directory.is_dir():
+        return []
+    pattern = re.compile(re.escape(label) + r"-\d{8}T\d{12}Z\.db")
+    return sorted(p for p in directory.iterdir() if pattern.fullmatch(p.name))
+
+
+def run_backups(
+    directory: str = INTERFACE_BACKUP_DIR,
+    keep: int = INTERFACE_BACKUP_KEEP,
+) -> Dict[str, Any]:
+    """
+    Un instantané de chaque base puis rétention. Renvoie un compte rendu.
+    """
+    global last_run
+    with _lock:
+        now = datetime.utcnow()
+        backup_dir = Path(directory).resolve()
+        backup_dir.mkdir(parents=True, exist_ok=True)
+        snapshots: Dict[str, Any] = {}
+        pruned: List[str] = []
+        for label, source in SOURCES.items():
+            if not source.exists():
+                continue
+            target = backup_dir / f"{label}-{now.strftime(_STAMP_FORMAT)}.db"
+            snapshots[label] = backup_database(source, target)
+            existing = list_snapshots(backup_dir, label)
+            for old in existing[: max(0, len(existing) - max(1, keep))]:
+                old.unlink()
+                pruned.append(str(old))
+        last_run = {"at": now.isoformat(), "snapshots": snapshots, "pruned": pruned}
+        return last_run
+
+
+def backup_stats(directory: str = INTERFACE_BACKUP_DIR) -> Dict[str, Any]:
+    backup_dir = Path(directory).resolve()
+    return {
+        "directory": str(backup_dir),
+        "keep": INTERFACE_BACKUP_KEEP,
+        "interval_s": INTERFACE_BACKUP_INTERVAL_S,
+        "last_run": last_run,
+        "snapshots": {
+            label: [p.name for p in list_snapshots(backup_dir, label)] for label in SOURCES
+        },
+    }
+
+
+async def backup_loop() -> None:
+    """
+    Sauvegarde périodique (lancée au démarrage si INTERFACE_BACKUP_INTERVAL_S > 0).
+    """
+    while True:
+        await asyncio.sleep(INTERFACE_BACKUP_INTERVAL_S)
+        try:
+            report = await asyncio.to_thread(run_backups)
+            logger.info(f"Sauvegarde des bases : {list(report['snapshots'])}")
+        except Exception as e:
+            logger.error(f"Échec de la sauvegarde des bases : {e!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dest", default=INTERFACE_BACKUP_DIR)
+    parser.add_argument("--keep", type=int, default=INTERFACE_BACKUP_KEEP)
+    args = parser.parse_args()
+    print(run_backups(args.dest, args.keep))
@@ -1,7 +1,10 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
-from app.routers import coach, auth, profile, dashboard, ui
+from app.routers import coach, auth, profile, dashboard, ui, backup
+from app.core.backup import INTERFACE_BACKUP_INTERVAL_S, backup_loop
 from app.core.logging import setup_logging, log_requests_middleware
 from app.routers.api import router as api_router
 
@@ -30,6 +33,14 @@ app.include_router(dashboard.router)
 app.include_router(coach.router)
 app.include_router(ui.router)
 app.include_router(api_router)
+app.include_router(backup.router)
+
+
+@app.on_event("startup")
+async def start_backups():
+    # Sauvegardes périodiques des bases SQLite (cf. app/core/backup.py)
+    if INTERFACE_BACKUP_INTERVAL_S > 0:
+        app.state.backup_task = asyncio.get_running_loop().create_task(backup_loop())
 
 
 @app.get("/health")
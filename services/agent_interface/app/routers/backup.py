@@ -0,0 +1,36 @@
+# services/agent_interface/app/routers/backup.py
+
+import os
+import secrets
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app.core.backup import backup_stats, run_backups
+
+router = APIRouter(prefix="/admin/backup", tags=["admin"])
+
+# Jeton d'administration : sans INTERFACE_BACKUP_TOKEN, les endpoints sont
+# désactivés (la sauvegarde reste possible via python -m app.core.backup).
+INTERFACE_BACKUP_TOKEN = os.getenv("INTERFACE_BACKUP_TOKEN", "")
+
+
+def _check_token(token: Optional[str]) -> None:
+    if not INTERFACE_BACKUP_TOKEN or not secrets.compare_digest(token or "", INTERFACE_BACKUP_TOKEN):
+        raise HTTPException(status_code=403, detail="Accès refusé")
+
+
+@router.post("/")
+def backup_now(x_backup_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """
+    Instantané à chaud de users.db, meals.db et moods.db (cf. app/core/backup.py).
+    Endpoint synchrone : exécuté dans le pool de threads de FastAPI.
+    """
+    _check_token(x_backup_token)
+    return run_backups()
+
+
+@router.get("/")
+def backup_status(x_backup_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    _check_token(x_backup_token)
+    return backup_stats()
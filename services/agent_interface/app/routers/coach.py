@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import json
 import os
 import uuid
 from datetime import datetime
@@ -14,15 +15,18 @@ from fastapi import (
     File,
     Header,
     HTTPException,
+    Query,
     UploadFile,
     status,
 )
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from app.clients.orchestrator_client import (
     call_orchestrator,
     get_history,
-    save_memory,
+    record_exchange,
+    stream_orchestrator,
 )
 from app.core.store import get_user_by_id, get_user_id_from_token
 from app.core.meals_store import save_meal, get_recent_meals  # ✅ historique des repas
@@ -218,6 +222,142 @@ def extract_transcription_text(transcription: Optional[Dict[str, Any]]) -> str:
     return ""
 
 
+async def _persist_exchange(
+    user_id: str,
+    exchange_id: Optional[str],
+    user_text: Optional[str],
+    answer: Optional[str],
+    mood: Optional[Dict[str, Any]],
+    meal: Optional[Dict[str, Any]],
+    user_metadata: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Persistance d'un échange, commune à tous les endpoints du coach :
+
+      - moods.db / meals.db : copies locales lues par le dashboard ;
+      - agent_memory : UN appel record_exchange (message, réponse, mood,
+        repas) clé par le message_id de l'orchestrateur. agent_cerveau a
+        déjà enregistré le message et la réponse sous cette clé : seuls le
+        mood et le repas sont ajoutés, sans doublon.
+
+    `answer` est la réponse du coach, None si l'orchestrateur n'en a pas
+    renvoyé : le message de repli affiché au front n'est jamais enregistré
+    (il occuperait la ligne "coach" de l'échange).
+
+    Aucune erreur ne remonte : la réponse au front passe avant la mémoire.
+    """
+    # Sauvegarde du mood si détecté
+    if mood:
+        try:
+            save_mood(user_id, mood)
+        except Exception:
+            pass
+
+    # ✅ Sauvegarde dans l’historique des repas
+    if meal is not None:
+        try:
+            save_meal(
+                user_id=user_id,
+                title=meal["title"],
+                description=meal["description"],
+                kcal=meal["kcal"],
+                image_url=meal["image_url"],
+            )
+        except Exception:
+            # On ne bloque pas la réponse si la persistance échoue
+            pass
+
+    # ✅ Sauvegarde dans l’agent de mémoire (historique de chat)
+    try:
+        await record_exchange(
+            user_id,
+            # Réponse sans exchange_id (ancien orchestrateur) : clé locale
+            exchange_id or str(uuid.uuid4()),
+            user_text=user_text,
+            coach_text=answer,
+            mood=mood,
+            meal=meal,
+            user_metadata=user_metadata,
+        )
+    except Exception:
+        # On ne casse jamais la réponse pour un problème de mémoire
+        pass
+
+
+async def _finalize_text_answer(
+    user_id: str,
+    user_text: str,
+    payload: Dict[str, Any],
+) -> CoachAnswer:
+    """
+    Post-traitement commun au chat texte (mode classique et streaming) :
+    prochaine séance, puis mood, repas et mémoire (_persist_exchange), et
+    construction de CoachAnswer.
+    """
+    coach_answer = payload.get("coach_answer") or None
+    answer = coach_answer or "Je n’ai pas pu générer de réponse pour le moment."
+    # 👈 Sauvegarde auto de la prochaine séance si détectée
+    try:
+        if answer and isinstance(answer, str):
+            if "minute" in answer.lower() or "séance" in answer.lower() or "marche" in answer.lower():
+                save_next_training(user_id, answer)
+    except Exception:
+        pass
+
+    meal = build_meal_from_payload(payload)
+    # 🔥 Récupération du mood envoyé par l’orchestrateur
+    mood = payload.get("mood_state") or payload.get("mood_result")
+
+    await _persist_exchange(
+        user_id, payload.get("exchange_id"), user_text, coach_answer, mood, meal
+    )
+
+    # Pas de transcription dans le cas texte
+    return CoachAnswer(answer=answer, meal=meal, mood=mood, transcription=None)
+
+
+async def _stream_text_answer(user_id: str, user_text: str):
+    """
+    Relaie les tokens de l'orchestrateur vers le front (NDJSON), puis
+    applique _finalize_text_answer() sur le payload final. Sans "done"
+    (erreur, flux coupé, front déconnecté), rien n'est persisté par
+    l'interface.
+    """
+    try:
+        async for event in stream_orchestrator(user_text, user_id=user_id):
+            event_type = event.get("type")
+
+            if event_type == "token":
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+
+            elif event_type == "done":
+                payload = event.get("payload", {}) or {}
+                result = await _finalize_text_answer(user_id, user_text, payload)
+                yield json.dumps(
+                    {"type": "done", **result.dict()}, ensure_ascii=False
+                ) + "\n"
+                return
+
+            elif event_type == "error":
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+                return
+
+        # Flux terminé sans "done" (orchestrateur coupé) : le front doit le savoir
+        yield json.dumps(
+            {"type": "error", "message": "Flux de l’orchestrateur interrompu"},
+            ensure_ascii=False,
+        ) + "\n"
+
+    except Exception as e:
+        yield json.dumps(
+            {
+                "type": "error",
+                "message": f"Erreur de communication avec l’orchestrateur: {e}",
+            },
+            ensure_ascii=False,
+        ) + "\n"
+
+
 # ---------------------------------------------------------------------------
 # 4) Endpoint : texte -> orchestrateur
 # ---------------------------------------------------------------------------
@@ -226,6 +366,7 @@ def extract_transcription_text(transcription: Optional[Dict[str, Any]]) -> str:
 @router.post("/", response_model=CoachAnswer)
 async def coach_text(
     req: CoachTextRequest,
+    stream: bool = Query(False, description="Réponse du coach token par token (NDJSON)"),
     user: Dict[str, Any] = Depends(get_current_user),
 ) -> CoachAnswer:
     """
@@ -235,9 +376,22 @@ async def coach_text(
       - answer : texte du coach (agent_cerveau)
       - meal   : éventuellement un résumé de repas si vision/nutrition ont été appelés
       - mood   : état d'humeur analysé par agent_mood
+
+    Avec ?stream=true, la réponse est un flux NDJSON :
+      - {"type": "token", "content": "..."} au fil de la génération
+      - {"type": "done", "answer": ..., "meal": ..., "mood": ...} à la fin,
+        une fois le post-traitement (mood, repas, mémoire) effectué
+      - {"type": "error", "message": "..."} en cas d'échec
     """
 
     user_id = user["user_id"]
+
+    if stream:
+        return StreamingResponse(
+            _stream_text_answer(user_id, req.text),
+            media_type="application/x-ndjson",
+        )
+
     # Contexte profil (pour plus tard si on veut le passer au LLM)
     user_profile = {
         "age": user.get("age"),
@@ -262,59 +416,7 @@ async def coach_text(
         )
 
     payload = orch_resp.get("payload", {}) or {}
-    answer = payload.get("coach_answer") or "Je n’ai pas pu générer de réponse pour le moment."
-    # 👈 Sauvegarde auto de la prochaine séance si détectée
-    try:
-        if answer and isinstance(answer, str):
-            if "minute" in answer.lower() or "séance" in answer.lower() or "marche" in answer.lower():
-                save_next_training(user_id, answer)
-    except Exception:
-        pass
-
-    meal = build_meal_from_payload(payload)
-    # 🔥 Récupération du mood envoyé par l’orchestrateur
-    mood = payload.get("mood_state") or payload.get("mood_result")
-
-    # Sauvegarde du mood si détecté
-    if mood:
-        try:
-            save_mood(user_id, mood)
-        except Exception:
-            pass
-
-    # ✅ Si le texte a déclenché une analyse de repas (ex: il décrit une photo déjà connue)
-    if meal is not None:
-        try:
-            save_meal(
-                user_id=user_id,
-                title=meal["title"],
-                description=meal["description"],
-                kcal=meal["kcal"],
-                image_url=meal["image_url"],
-            )
-        except Exception:
-            # On ne bloque pas la réponse si la persistance échoue
-            pass
-
-    # ✅ Sauvegarde dans l’agent de mémoire (historique de chat)
-    try:
-        await save_memory(
-            user_id=user_id,
-            memory={
-                "type": "text",
-                "user_message": req.text,
-                "coach_answer": answer,
-                "mood": mood,
-                "meal": meal,
-                "created_at": datetime.utcnow().isoformat(),
-            },
-        )
-    except Exception:
-        # On ne casse jamais la réponse pour un problème de mémoire
-        pass
-
-    # Pas de transcription dans le cas texte
-    return CoachAnswer(answer=answer, meal=meal, mood=mood, transcription=None)
+    return await _finalize_text_answer(user_id, req.text, payload)
 
 
 # ---------------------------------------------------------------------------
@@ -389,27 +491,7 @@ async def coach_voice(
     mood = payload.get("mood_state") or payload.get("mood_result")
     transcription = extract_transcription_obj(payload)
     transcription_text = extract_transcription_text(transcription)
-
-    # Sauvegarde du mood si détecté
-    if mood:
-        try:
-            save_mood(user_id, mood)
-        except Exception:
-            pass
-
-    # ✅ Si le vocal a entraîné l’analyse d’un repas, on le sauvegarde aussi
-    if meal is not None:
-        try:
-            save_meal(
-                user_id=user_id,
-                title=meal["title"],
-                description=meal["description"],
-                kcal=meal["kcal"],
-                image_url=meal["image_url"],
-            )
-        except Exception:
-            # On ne fait rien si ça plante, l’important est de répondre
-            pass
+    exchange_id = payload.get("exchange_id")
 
     # 2) Si pas de réponse mais on a une transcription,
     #    on refait un appel texte avec cette transcription.
@@ -421,7 +503,10 @@ async def coach_voice(
                 # user_profile=user_profile,
             )
             payload2 = orch_resp2.get("payload", {}) or {}
-            answer = payload2.get("coach_answer") or answer
+            if payload2.get("coach_answer"):
+                # L'échange enregistré par cerveau est celui du 2e appel
+                answer = payload2["coach_answer"]
+                exchange_id = payload2.get("exchange_id") or exchange_id
 
             # On peut aussi récupérer un mood/meal complémentaires
             mood2 = payload2.get("mood_state") or payload2.get("mood_result")
@@ -436,7 +521,8 @@ async def coach_voice(
             # On ne veut pas casser la réponse si le deuxième appel échoue
             pass
 
-    # 3) Fallback final si toujours rien
+    # 3) Fallback final si toujours rien (affiché, pas enregistré)
+    coach_answer = answer or None
     if not answer:
         if transcription_text:
             answer = (
@@ -446,23 +532,15 @@ async def coach_voice(
         else:
             answer = "Je n’ai pas pu générer de réponse pour ce vocal."
 
-    # ✅ Sauvegarde dans l’agent de mémoire
-    try:
-        await save_memory(
-            user_id=user_id,
-            memory={
-                "type": "voice",
-                "audio_file": str(tmp_path),
-                "transcription": transcription_text or None,
-                "user_message": transcription_text or None,
-                "coach_answer": answer,
-                "mood": mood,
-                "meal": meal,
-                "created_at": datetime.utcnow().isoformat(),
-            },
-        )
-    except Exception:
-        pass
+    await _persist_exchange(
+        user_id,
+        exchange_id,
+        transcription_text or None,
+        coach_answer,
+        mood,
+        meal,
+        user_metadata={"type": "voice", "audio_file": str(tmp_path)},
+    )
 
     return CoachAnswer(answer=answer, meal=meal, mood=mood, transcription=transcription)
 
@@ -516,7 +594,8 @@ async def coach_image(
 
     payload = orch_resp.get("payload", {}) or {}
     payload["image_url"] = image_url
-    answer = payload.get("coach_answer") or "Je n’ai pas pu analyser ce repas."
+    coach_answer = payload.get("coach_answer") or None
+    answer = coach_answer or "Je n’ai pas pu analyser ce repas."
     # 👈 Sauvegarde auto séance détectée (après analyse image)
     try:
         if answer and isinstance(answer, str):
@@ -529,42 +608,15 @@ async def coach_image(
     mood = payload.get("mood_state") or payload.get("mood_result")
     transcription = extract_transcription_obj(payload)
 
-    # Sauvegarde du mood si détecté
-    if mood:
-        try:
-            save_mood(user_id, mood)
-        except Exception:
-            pass
-
-    # ✅ Sauvegarde dans l’historique des repas
-    if meal is not None:
-        try:
-            save_meal(
-                user_id=user_id,
-                title=meal["title"],
-                description=meal["description"],
-                kcal=meal["kcal"],
-                image_url=meal["image_url"],
-            )
-        except Exception:
-            pass
-
-    # ✅ Sauvegarde aussi dans la mémoire globale
-    try:
-        await save_memory(
-            user_id=user_id,
-            memory={
-                "type": "image",
-                "image_url": image_url,
-                "user_message": "Analyse mon repas sur la photo",
-                "coach_answer": answer,
-                "mood": mood,
-                "meal": meal,
-                "created_at": datetime.utcnow().isoformat(),
-            },
-        )
-    except Exception:
-        pass
+    await _persist_exchange(
+        user_id,
+        payload.get("exchange_id"),
+        "Analyse mon repas sur la photo",
+        coach_answer,
+        mood,
+        meal,
+        user_metadata={"type": "image", "image_url": image_url},
+    )
 
     return CoachAnswer(answer=answer, meal=meal, mood=mood, transcription=transcription)
 
@@ -606,48 +658,22 @@ async def coach_photo_meal(
     image_url = f"/uploads/{tmp_name}"
     payload = orch_resp.get("payload", {}) or {}
     payload["image_url"] = image_url
-    answer = payload.get("coach_answer") or "Je n’ai pas pu analyser ce repas."
+    coach_answer = payload.get("coach_answer") or None
+    answer = coach_answer or "Je n’ai pas pu analyser ce repas."
 
     meal = build_meal_from_payload(payload)
     mood = payload.get("mood_state") or payload.get("mood_result")
     transcription = extract_transcription_obj(payload)
 
-    # Sauvegarde du mood si détecté
-    if mood:
-        try:
-            save_mood(user_id, mood)
-        except Exception:
-            pass
-
-    # ✅ Sauvegarde aussi via cet alias
-    if meal is not None:
-        try:
-            save_meal(
-                user_id=user_id,
-                title=meal["title"],
-                description=meal["description"],
-                kcal=meal["kcal"],
-                image_url=meal["image_url"],
-            )
-        except Exception:
-            pass
-
-    # ✅ Sauvegarde dans la mémoire
-    try:
-        await save_memory(
-            user_id=user_id,
-            memory={
-                "type": "image",
-                "image_url": image_url,
-                "user_message": "Analyse mon repas sur la photo",
-                "coach_answer": answer,
-                "mood": mood,
-                "meal": meal,
-                "created_at": datetime.utcnow().isoformat(),
-            },
-        )
-    except Exception:
-        pass
+    await _persist_exchange(
+        user_id,
+        payload.get("exchange_id"),
+        "Analyse mon repas sur la photo",
+        coach_answer,
+        mood,
+        meal,
+        user_metadata={"type": "image", "image_url": image_url},
+    )
 
     return CoachAnswer(answer=answer, meal=meal, transcription=transcription, mood=mood)
 
@@ -692,7 +718,16 @@ async def coach_save_memory(
     user: Dict[str, Any] = Depends(get_current_user),
 ):
     """
-    Sauvegarde manuellement une mémoire (si besoin) via agent_memory.
+    Sauvegarde manuellement une mémoire (si besoin) via agent_memory,
+    sous forme d'échange : user_message, coach_answer, mood, meal et
+    éventuellement exchange_id (pour compléter un échange existant).
     """
     user_id = user["user_id"]
-    return await save_memory(user_id=user_id, memory=data)
+    return await record_exchange(
+        user_id,
+        data.get("exchange_id") or str(uuid.uuid4()),
+        user_text=data.get("user_message"),
+        coach_text=data.get("coach_answer"),
+        mood=data.get("mood"),
+        meal=data.get("meal"),
+    )
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.routers.coach as coach
+
+MOOD = {"mood": "fatigue", "score": 0.7, "valence": "negative", "energy": "low"}
+
+
+def _orchestrator(monkeypatch, events, fail=None):
+    """
+    Remplace le flux de l'orchestrateur et enregistre les persistances.
+    """
+    persisted = {"record_exchange": [], "save_mood": []}
+
+    async def stream(user_input, *, user_id=None):
+        for event in events:
+            yield event
+        if fail is not None:
+            raise fail
+
+    async def record(user_id, exchange_id, **fields):
+        persisted["record_exchange"].append((user_id, exchange_id, fields))
+
+    monkeypatch.setattr(coach, "stream_orchestrator", stream)
+    monkeypatch.setattr(coach, "record_exchange", record)
+    monkeypatch.setattr(coach, "save_mood", lambda user_id, mood: persisted["save_mood"].append(mood))
+    monkeypatch.setattr(coach, "save_next_training", lambda user_id, answer: None)
+    return persisted
+
+
+def _lines(user_text="Je suis crevé"):
+    async def run():
+        return [json.loads(line) async for line in coach._stream_text_answer("u1", user_text)]
+
+    return asyncio.run(run())
+
+
+DONE = {
+    "type": "done",
+    "payload": {"exchange_id": "m-1", "coach_answer": "Repos ce soir.", "mood_state": MOOD},
+}
+
+
+def test_tokens_are_relayed_and_the_exchange_persisted_once(monkeypatch):
+    persisted = _orchestrator(
+        monkeypatch,
+        [
+            {"type": "meta", "payload": {}},
+            {"type": "token", "content": "Repos "},
+            {"type": "token", "content": "ce soir."},
+            DONE,
+            # Rien n'est relayé ni persisté après "done"
+            DONE,
+        ],
+    )
+
+    events = _lines()
+
+    assert [e["type"] for e in events] == ["token", "token", "done"]
+    assert events[-1]["answer"] == "Repos ce soir." and events[-1]["mood"] == MOOD
+    assert persisted["record_exchange"] == [
+        (
+            "u1",
+            "m-1",
+            {
+                "user_text": "Je suis crevé",
+                "coach_text": "Repos ce soir.",
+                "mood": MOOD,
+                "meal": None,
+                "user_metadata": None,
+            },
+        )
+    ]
+    assert persisted["save_mood"] == [MOOD]
+
+
+def test_fallback_answer_is_shown_but_not_recorded(monkeypatch):
+    done = {"type": "done", "payload": {"exchange_id": "m-2", "coach_answer": None, "mood_state": MOOD}}
+    persisted = _orchestrator(monkeypatch, [done])
+
+    events = _lines()
+
+    assert events[-1]["answer"] == "Je n’ai pas pu générer de réponse pour le moment."
+    [(_, exchange_id, fields)] = persisted["record_exchange"]
+    assert exchange_id == "m-2"
+    assert fields["coach_text"] is None
+    assert fields["user_text"] == "Je suis crevé" and fields["mood"] == MOOD
+
+
+def test_error_or_cut_stream_is_reported_without_persisting(monkeypatch):
+    scenarios = [
+        # Erreur relayée par l'orchestrateur
+        ([{"type": "token", "content": "Re"}, {"type": "error", "message": "boom"}], None),
+        # Orchestrateur coupé sans "done"
+        ([{"type": "token", "content": "Re"}], None),
+        # Connexion perdue en cours de flux
+        ([{"type": "token", "content": "Re"}], ConnectionError("reset")),
+    ]
+    for events, fail in scenarios:
+        persisted = _orchestrator(monkeypatch, events, fail=fail)
+        lines = _lines()
+        assert [e["type"] for e in lines] == ["token", "error"]
+        assert persisted["record_exchange"] == [] and persisted["save_mood"] == []
+    assert "reset" in lines[-1]["message"]
+
+
+def test_front_disconnect_before_done_persists_nothing(monkeypatch):
+    persisted = _orchestrator(monkeypatch, [{"type": "token", "content": "Re"}, DONE])
+
+    async def run():
+        stream = coach._stream_text_answer("u1", "Je suis crevé")
+        first = await stream.__anext__()
+        # StreamingResponse ferme le générateur quand le client se déconnecte
+        await stream.aclose()
+        return first
+
+    assert json.loads(asyncio.run(run()))["type"] == "token"
+    assert persisted["record_exchange"] == []
+
+
+def test_stream_query_parameter_returns_ndjson(monkeypatch):
+    _orchestrator(monkeypatch, [{"type": "token", "content": "Ça va\nmieux"}, DONE])
+    app = FastAPI()
+    app.include_router(coach.router)
+    app.dependency_overrides[coach.get_current_user] = lambda: {"user_id": "u1"}
+
+    resp = TestClient(app).post("/coach/?stream=true", json={"text": "Je suis crevé"})
+
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in resp.text.splitlines()]
+    assert [e["type"] for e in events] == ["token", "done"]
+    assert events[0]["content"] == "Ça va\nmieux"
@@ -1,15 +1,34 @@
 # services/agent_knowledge/app/main.py
 
+import asyncio
 from typing import Any, Dict
 
 from fastapi import FastAPI
 
-from app.mcp.handler import process_mcp_message
+from app.mcp.handler import knowledge_agent, process_mcp_message
 from app.mcp.schemas import MCPResponse
+from knowledge_agent import cache_stats
+from nutrition_engine import ciqual_engine
 
 app = FastAPI(title="SMARTCOACH - Agent Knowledge")
 
 
+@app.on_event("startup")
+def load_ciqual_columns():
+    # Colonnes CIQUAL en mmap (construites au premier démarrage)
+    try:
+        ciqual_engine.load()
+    except Exception as e:
+        print(f"[AGENT_KNOWLEDGE] moteur CIQUAL non chargé : {e!r}")
+
+
+@app.on_event("startup")
+async def warm_query_caches():
+    # En arrière-plan : les appels LLM du préchauffage ne retardent pas le démarrage
+    loop = asyncio.get_running_loop()
+    app.state.warm_up = loop.run_in_executor(None, knowledge_agent.warm_caches)
+
+
 @app.post("/mcp", response_model=MCPResponse)
 async def mcp_endpoint(msg: Dict[str, Any]):
     """
@@ -18,6 +37,11 @@ async def mcp_endpoint(msg: Dict[str, Any]):
     return await process_mcp_message(msg)
 
 
+@app.get("/cache/stats")
+def query_cache_stats():
+    return cache_stats()
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -0,0 +1,82 @@
+import math
+import sqlite3
+
+import pytest
+
+from nutrition_engine import CIQUAL_TRACE_FACTOR, CiqualEngine, goal_profile, parse_ciqual_value
+from nutrition_schema import NUTRITION_FIELDS
+
+# nom, kcal, protéines, glucides, lipides, fibres (texte comme dans CIQUAL)
+FOODS = [
+    ("Lentilles cuites", "116", "9,02", "12,7", "0,8", "7,9"),
+    ("Poulet rôti", "121", "26", "traces", "2,5", "1,2"),
+    ("Brocoli", "35", "2,8", "2,4", "0,6", "2,6"),
+    ("Aliment incomplet", "-", "12", "5", "1", "3"),
+    ("Pois chiches", "139", "8,86", "13,5", "2,07", "7,6"),
+    ("Flocons d'avoine", "367", "13", "58,7", "7", "10"),
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    db_path = tmp_path / "nutrition.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE foods ({', '.join(f'{f!r} TEXT' for f in NUTRITION_FIELDS)})")
+    conn.executemany(
+        f"INSERT INTO foods ({', '.join(NUTRITION_FIELDS[:6])}) VALUES (?, ?, ?, ?, ?, ?)",
+        FOODS,
+    )
+    conn.commit()
+    conn.close()
+    return CiqualEngine(db_path=str(db_path), arrays_dir=str(tmp_path / "arrays"))
+
+
+def test_parse_ciqual_value():
+    assert parse_ciqual_value("12,5") == 12.5
+    assert parse_ciqual_value(" 3.25 ") == 3.25
+    assert parse_ciqual_value("< 0,5") == pytest.approx(0.5 * CIQUAL_TRACE_FACTOR)
+    assert parse_ciqual_value("traces") == 0.0
+    assert parse_ciqual_value(7) == 7.0
+    for missing in ("-", "", None, "n.d."):
+        assert math.isnan(parse_ciqual_value(missing))
+
+
+def test_goal_profile():
+    assert goal_profile("Je veux perdre du poids") == "perte_de_poids"
+    assert goal_profile("Mincir avant l'été") == "perte_de_poids"
+    assert goal_profile("Prendre du muscle") == "prise_de_masse"
+    assert goal_profile("Des aliments riches en fer") is None
+
+
+def test_top_k_orders_by_score_and_skips_missing_or_out_of_bounds(engine):
+    # perte de poids : -kcal + 2 x protéines + 1,5 x fibres - 0,5 x lipides,
+    # kcal > 50 (Brocoli écarté) et kcal connue (Aliment incomplet écarté)
+    top = engine.top_k("perte_de_poids", 10)
+
+    assert [row["alim_nom_fr"] for row in top] == [
+        "Poulet rôti",
+        "Lentilles cuites",
+        "Pois chiches",
+        "Flocons d'avoine",
+    ]
+    assert top[0]["score"] == pytest.approx(-121 + 2 * 26 + 1.5 * 1.2 - 0.5 * 2.5, abs=1e-3)
+    assert top[0]["glucides_g_100g"] == 0.0
+    assert top[0]["calcium_mg_100g"] is None
+    assert [row["alim_nom_fr"] for row in engine.top_k("perte_de_poids", 2)] == [
+        "Poulet rôti",
+        "Lentilles cuites",
+    ]
+    assert engine.top_k("perte_de_poids", 0) == []
+
+
+def test_arrays_are_rebuilt_when_the_database_changes(engine):
+    engine.load()
+    assert engine.rows == len(FOODS)
+
+    conn = sqlite3.connect(engine.db_path)
+    conn.execute("INSERT INTO foods (alim_nom_fr) VALUES ('Nouvel aliment')")
+    conn.commit()
+    conn.close()
+
+    engine.load()
+    assert engine.rows == len(FOODS) + 1
@@ -0,0 +1,105 @@
+import sqlite3
+
+import pytest
+
+import knowledge_agent
+from query_cache import GoalSqlCache, RowsCache, normalize_goal
+
+
+def test_normalize_goal():
+    assert normalize_goal("Aliments riches en Fer !") == "aliments riches en fer"
+    assert normalize_goal("  des idées  de repas équilibrés ") == "des idees de repas equilibres"
+    assert normalize_goal("Collations saines ?") == normalize_goal("collations   SAINES")
+
+
+def test_rows_cache_is_invalidated_when_the_database_version_changes():
+    calls = []
+
+    def runner(sql):
+        calls.append(sql)
+        return [{"alim_nom_fr": f"résultat {len(calls)}"}]
+
+    cache = RowsCache(capacity=2)
+    first = cache.run("SELECT  *\nFROM foods", "v1", runner)
+    # Même requête (espaces près) : servie depuis le cache, copie modifiable
+    first[0]["alim_nom_fr"] = "modifié"
+    assert cache.run("SELECT * FROM foods", "v1", runner) == [{"alim_nom_fr": "résultat 1"}]
+
+    # Base rechargée : réexécutée
+    assert cache.run("SELECT * FROM foods", "v2", runner) == [{"alim_nom_fr": "résultat 2"}]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+
+    # LRU : capacité 2
+    cache.run("SELECT 1", "v2", runner)
+    cache.run("SELECT 2", "v2", runner)
+    assert cache.stats()["size"] == 2
+    cache.run("SELECT * FROM foods", "v2", runner)
+    assert len(calls) == 5
+
+
+def test_goal_sql_cache_persists_and_drops_old_versions(tmp_path):
+    path = str(tmp_path / "cache" / "cache.db")
+    cache = GoalSqlCache(path)
+    # Rien n'est créé avant le premier accès
+    assert not (tmp_path / "cache").exists()
+    cache.put("Aliments riches en fer", "v1", "SELECT 1")
+    assert cache.get("aliments riches en FER", "v1") == "SELECT 1"
+
+    # Redémarrage : relu depuis le fichier
+    restarted = GoalSqlCache(path)
+    assert restarted.sqls("v1") == ["SELECT 1"]
+    restarted.put("collations saines", "v2", "SELECT 2")
+    assert restarted.get("aliments riches en fer", "v1") is None
+    assert restarted.stats()["hit_ratio"] == 0.0
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    db_path = tmp_path / "nutrition.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE foods (alim_nom_fr TEXT, fer_mg_100g TEXT)")
+    conn.execute("INSERT INTO foods VALUES ('Boudin noir', '22,8')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(knowledge_agent, "database_version", lambda: "v1")
+    monkeypatch.setattr(knowledge_agent, "run_query", _run_on(db_path))
+    monkeypatch.setattr(knowledge_agent, "goal_sql_cache", GoalSqlCache(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(knowledge_agent, "rows_cache", RowsCache())
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    return knowledge_agent.KnowledgeAgent()
+
+
+def _run_on(db_path):
+    def run(sql, params=()):
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    return run
+
+
+def test_cached_sql_that_fails_is_discarded(agent, monkeypatch):
+    llm_calls = []
+
+    def build_sql(goal):
+        llm_calls.append(goal)
+        return "SELECT alim_nom_fr FROM foods"
+
+    monkeypatch.setattr(agent, "build_sql_with_llm", build_sql)
+    cache = knowledge_agent.goal_sql_cache
+    cache.put("Aliments riches en fer", "v1", "SELECT nom_inconnu FROM foods")
+
+    # SQL en cache en échec : oublié, l'erreur remonte
+    with pytest.raises(sqlite3.Error):
+        agent.query("Aliments riches en fer")
+    assert cache.get("aliments riches en fer", "v1") is None
+    assert llm_calls == []
+
+    # Appel suivant : nouveau SQL du LLM, mis en cache puis resservi
+    assert agent.query("Aliments riches en fer")["suggestions"] == [{"alim_nom_fr": "Boudin noir"}]
+    assert agent.query("aliments riches en fer !")["sql"] == "SELECT alim_nom_fr FROM foods"
+    assert len(llm_calls) == 1
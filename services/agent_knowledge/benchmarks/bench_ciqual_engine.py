@@ -0,0 +1,117 @@
+# services/agent_knowledge/benchmarks/bench_ciqual_engine.py
+
+"""
+Benchmark du score nutritionnel : requête SQL sur les colonnes texte,
+comme celles générées par le LLM, contre CiqualEngine.top_k, sur une
+table foods synthétique.
+
+    python -m benchmarks.bench_ciqual_engine --foods 3200 --k 50
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+import sql_utils
+from nutrition_engine import GOAL_PROFILES, NUMERIC_FIELDS, CiqualEngine
+from nutrition_schema import NUTRITION_FIELDS
+
+
+def _value(rng: random.Random, high: float) -> str:
+    draw = rng.random()
+    if draw < 0.12:
+        return "-"
+    if draw < 0.18:
+        return "< 0,5"
+    if draw < 0.20:
+        return "traces"
+    return f"{rng.uniform(0, high):.2f}".replace(".", ",")
+
+
+def _create_foods(path: str, foods: int) -> None:
+    rng = random.Random(7)
+    highs = {"energie_reglement_ue_1169_kcal_100g": 900, "sodium_mg_100g": 2000, "calcium_mg_100g": 1200}
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE foods ({', '.join(f'{chr(34)}{f}{chr(34)} TEXT' for f in NUTRITION_FIELDS)})")
+    conn.executemany(
+        f"INSERT INTO foods VALUES ({', '.join('?' * len(NUTRITION_FIELDS))})",
+        [
+            [f"Aliment {n}"] + [_value(rng, highs.get(f, 40)) for f in NUMERIC_FIELDS]
+            for n in range(foods)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _sql(profile: str, k: int) -> str:
+    spec = GOAL_PROFILES[profile]
+    used = sorted(set(spec["weights"]) | set(spec["bounds"]))
+
+    def num(field: str) -> str:
+        return f"CAST(REPLACE(\"{field}\", ',', '.') AS REAL)"
+
+    score = " + ".join(f"({w} * {num(f)})" for f, w in spec["weights"].items())
+    where = [f"\"{f}\" != '-' AND \"{f}\" NOT LIKE '<%' AND \"{f}\" != 'traces'" for f in used]
+    for field, (low, high) in spec["bounds"].items():
+        where.append(f"{num(field)} > {low}" if high is None else f"{num(field)} BETWEEN {low} AND {high}")
+    columns = ", ".join(f'"{f}"' for f in NUTRITION_FIELDS)
+    return (
+        f"SELECT * FROM (SELECT {columns}, {score} AS score FROM foods "
+        f"WHERE {' AND '.join(where)}) ORDER BY score DESC LIMIT {k}"
+    )
+
+
+def _time(fn: Callable[[], object], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1e6)
+    return sorted(timings)
+
+
+def _report(label: str, timings: List[float]) -> None:
+    print(
+        f"  {label:<14} p50 {statistics.median(timings):10.1f} µs   "
+        f"p99 {timings[int(0.99 * (len(timings) - 1))]:10.1f} µs"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--foods", type=int, default=3200)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nutrition.db")
+        _create_foods(db_path, args.foods)
+        sql_utils.DB_PATH = db_path
+
+        engine = CiqualEngine(db_path, arrays_dir=os.path.join(tmp, "arrays"))
+        t0 = time.perf_counter()
+        engine.load()
+        print(f"construction des colonnes : {(time.perf_counter() - t0) * 1000:.1f} ms")
+        t0 = time.perf_counter()
+        CiqualEngine(db_path, arrays_dir=os.path.join(tmp, "arrays")).load()
+        print(f"ouverture mmap (autre worker) : {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+        for profile in GOAL_PROFILES:
+            sql = _sql(profile, args.k)
+            expected = [r["alim_nom_fr"] for r in sql_utils.run_query(sql)]
+            got = [r["alim_nom_fr"] for r in engine.top_k(profile, args.k)]
+            print(f"{profile} (aliments en commun avec le SQL : {len(set(expected) & set(got))}/{len(expected)})")
+            _report("sql", _time(lambda: sql_utils.run_query(sql), args.repeat))
+            _report("moteur top_k", _time(lambda: engine.top_k(profile, args.k), args.repeat))
+            _report("moteur scores", _time(lambda: engine.scores(profile), args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# services/agent_knowledge/benchmarks/bench_query_cache.py
+
+"""
+Benchmark des caches objectif -> SQL et SQL -> lignes avec un LLM
+simulé : sans cache, avec les deux caches, puis après un redémarrage
+préchauffé par warm_caches.
+
+    python -m benchmarks.bench_query_cache --requests 500 --goals 40
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+
+class _FakeCompletions:
+    def __init__(self, llm_ms: float) -> None:
+        self.llm_s = llm_ms / 1000.0
+        self.calls = 0
+
+    def create(self, model, messages, temperature, max_tokens):
+        self.calls += 1
+        time.sleep(self.llm_s)
+        # Un SQL différent à chaque appel
+        n = self.calls
+        sql = (
+            f'SELECT "alim_nom_fr", "fer_mg_100g" FROM foods WHERE "fer_mg_100g" NOT LIKE \'<%\' '
+            f'AND "fer_mg_100g" != \'-\' ORDER BY CAST(REPLACE("fer_mg_100g", \',\', \'.\') AS REAL) DESC '
+            f"LIMIT {10 + n}"
+        )
+        message = type("Message", (), {"content": sql})
+        return type("Response", (), {"choices": [type("Choice", (), {"message": message})]})
+
+
+def _variant(rng: random.Random, goal: str) -> str:
+    choice = rng.random()
+    if choice < 0.3:
+        return goal.upper()
+    if choice < 0.5:
+        return goal + " !"
+    if choice < 0.6:
+        return goal.replace("e", "é", 1)
+    return goal
+
+
+def _report(label: str, latencies: List[float], extra: str = "") -> None:
+    latencies = sorted(latencies)
+    print(
+        f"{label:<12} moyenne {statistics.mean(latencies):8.2f} ms   "
+        f"p50 {statistics.median(latencies):8.2f} ms   "
+        f"p99 {latencies[int(0.99 * (len(latencies) - 1))]:8.2f} ms{extra}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--goals", type=int, default=40)
+    parser.add_argument("--llm-ms", type=float, default=400.0)
+    parser.add_argument("--foods", type=int, default=3200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    import knowledge_agent
+    import sql_utils
+    from benchmarks.bench_ciqual_engine import _create_foods
+    from query_cache import GoalSqlCache, RowsCache
+
+    rng = random.Random(3)
+    base_goals = [f"aliments riches en fer pour objectif {i}" for i in range(args.goals)]
+    weights = [1.0 / (i + 1) for i in range(args.goals)]
+    stream = [_variant(rng, g) for g in rng.choices(base_goals, weights, k=args.requests)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sql_utils.DB_PATH = os.path.join(tmp, "nutrition.db")
+        _create_foods(sql_utils.DB_PATH, args.foods)
+        agent = knowledge_agent.KnowledgeAgent()
+        fake = _FakeCompletions(args.llm_ms)
+        agent.client = type("Client", (), {"chat": type("Chat", (), {"completions": fake})})
+
+        def timed(fn) -> List[float]:
+            latencies = []
+            for goal in stream:
+                t0 = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fn(goal)
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+            return latencies
+
+        # 1) Sans cache
+        _report(
+            "sans cache",
+            timed(lambda goal: sql_utils.run_query(agent.build_sql_with_llm(goal))),
+            f"   {fake.calls} appels LLM",
+        )
+
+        # 2) Caches (cache objectif -> SQL persisté dans tmp)
+        cache_path = os.path.join(tmp, "knowledge_cache.db")
+        knowledge_agent.goal_sql_cache = GoalSqlCache(cache_path)
+        knowledge_agent.rows_cache = RowsCache()
+        fake.calls = 0
+        latencies = timed(lambda goal: agent.query(goal))
+        stats = knowledge_agent.cache_stats()
+        _report(
+            "caches",
+            latencies,
+            f"   {fake.calls} appels LLM   succès SQL {stats['goal_sql']['hit_ratio']:.0%}"
+            f"   lignes {stats['rows']['hit_ratio']:.1%} ({stats['rows']['size']} SQL)",
+        )
+
+        # 3) Redémarrage : cache de lignes vide, SQL persistés, préchauffage
+        knowledge_agent.goal_sql_cache = GoalSqlCache(cache_path)
+        knowledge_agent.rows_cache = RowsCache()
+        fake.calls = 0
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent.warm_caches(goals=[])
+        warm_ms = (time.perf_counter() - t0) * 1000.0
+        latencies = timed(lambda goal: agent.query(goal))
+        stats = knowledge_agent.cache_stats()
+        _report(
+            "redémarrage",
+            latencies,
+            f"   {fake.calls} appels LLM   succès SQL {stats['goal_sql']['hit_ratio']:.0%}"
+            f"   lignes {stats['rows']['hit_ratio']:.1%}   (préchauffage {warm_ms:.0f} ms)",
+        )
+
+
+if __name__ == "__main__":
+    main()
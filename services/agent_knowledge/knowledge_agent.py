@@ -1,10 +1,13 @@
 import os
 import json
+import sqlite3
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-from sql_utils import run_query
+from sql_utils import database_version, run_query
 from nutrition_schema import NUTRITION_FIELDS
+from nutrition_engine import ciqual_engine, goal_profile
+from query_cache import KNOWLEDGE_WARM_GOALS, goal_sql_cache, rows_cache
 
 from groq import Groq
 from dotenv import load_dotenv
@@ -29,6 +32,9 @@ else:
 PROMPT_CONTEXT = (BASE_DIR / "prompts" / "context.txt").read_text(encoding="utf-8")
 PROMPT_TEMPLATE = (BASE_DIR / "prompts" / "prompt.txt").read_text(encoding="utf-8")
 
+# Nombre d'aliments renvoyés par le moteur CIQUAL (même LIMIT que le prompt)
+KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", "50"))
+
 
 # -------------------------------------------------------------------
 # Agent Knowledge
@@ -124,19 +130,48 @@ class KnowledgeAgent:
         """
         Retourne un dict avec :
           - goal
-          - sql (utilisé)
+          - sql (utilisé, None si le moteur CIQUAL a répondu)
           - suggestions (liste de lignes SQLite)
+
+        Perte de poids / prise de masse : score et top-k calculés par le
+        moteur CIQUAL (nutrition_engine.py), sans LLM ni requête SQL.
         """
 
+        profile = goal_profile(user_goal)
+        if profile is not None:
+            try:
+                return {
+                    "goal": user_goal,
+                    "sql": None,
+                    "profile": profile,
+                    "suggestions": ciqual_engine.top_k(profile, KNOWLEDGE_TOP_K),
+                }
+            except Exception as e:
+                print(f"⚠️   Moteur CIQUAL indisponible ({e!r}), génération SQL utilisée.")
+
+        # Caches objectif -> SQL et SQL -> lignes (cf. query_cache.py),
+        # valables pour cette version de la base
+        version = database_version()
         sql = ""
+        from_llm = False
         if use_llm:
-            sql = self.build_sql_with_llm(user_goal)
+            sql = goal_sql_cache.get(user_goal, version) or ""
+            if not sql:
+                sql = self.build_sql_with_llm(user_goal)
+                from_llm = bool(sql)
 
         # Si le LLM renvoie SQL vide ou mauvais : fallback automatique
         if not sql.strip():
             sql = self.build_sql_from_goal(user_goal)
 
-        rows = run_query(sql)
+        try:
+            rows = rows_cache.run(sql, version, run_query)
+        except sqlite3.Error:
+            # SQL du LLM invalide : ne pas le resservir depuis le cache
+            goal_sql_cache.discard(user_goal, version)
+            raise
+        if from_llm:
+            goal_sql_cache.put(user_goal, version, sql)
 
         result: Dict[str, Any] = {
             "goal": user_goal,
@@ -145,6 +180,42 @@ class KnowledgeAgent:
         }
         return result
 
+    # ----------------------------------------------------------------
+    # Préchauffage des caches (démarrage)
+    # ----------------------------------------------------------------
+    def warm_caches(self, goals: List[str] = KNOWLEDGE_WARM_GOALS) -> Dict[str, Any]:
+        """
+        Réexécute les SQL déjà connus (sans LLM), puis prépare les
+        objectifs courants absents du cache.
+        """
+        try:
+            version = database_version()
+        except OSError as e:
+            print(f"⚠️   Préchauffage des caches impossible : {e!r}")
+            return {"goals": len(goals), "failed": len(goals), **cache_stats()}
+        for sql in goal_sql_cache.sqls(version):
+            try:
+                rows_cache.run(sql, version, run_query)
+            except sqlite3.Error:
+                pass
+        failed = 0
+        for goal in goals:
+            if goal_profile(goal) is not None:
+                continue  # servi par le moteur CIQUAL
+            try:
+                self.query(goal, use_llm=True)
+            except Exception as e:
+                failed += 1
+                print(f"⚠️   Préchauffage impossible pour {goal!r} : {e!r}")
+        return {"goals": len(goals), "failed": failed, **cache_stats()}
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {
+        "goal_sql": goal_sql_cache.stats(),
+        "rows": rows_cache.stats(),
+    }
+
 
 # -------------------------------------------------------------------
 # Exécution directe (debug)
@@ -0,0 +1,210 @@
+"""
+Moteur CIQUAL en mémoire : les colonnes texte de foods ("12,5", "-",
+"< 0,5", "traces") sont converties une fois en tableaux float32 .npy
+(KNOWLEDGE_ARRAYS_DIR) ouverts en mmap, reconstruits quand nutrition.db
+change. Scores par objectif vectorisés, top-k par argpartition.
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import sql_utils
+from sql_utils import database_version
+from nutrition_schema import NUTRITION_FIELDS
+
+KNOWLEDGE_ARRAYS_DIR = os.getenv("KNOWLEDGE_ARRAYS_DIR", "db/ciqual_arrays")
+CIQUAL_TRACE_FACTOR = float(os.getenv("CIQUAL_TRACE_FACTOR", "0.5"))
+
+NAME_FIELD = NUTRITION_FIELDS[0]
+NUMERIC_FIELDS = NUTRITION_FIELDS[1:]
+
+KCAL = "energie_reglement_ue_1169_kcal_100g"
+PROTEINES = "proteines_n_x_6_25_g_100g"
+GLUCIDES = "glucides_g_100g"
+LIPIDES = "lipides_g_100g"
+FIBRES = "fibres_alimentaires_g_100g"
+
+# Objectif -> poids du score et bornes (min exclusif, max inclusif)
+GOAL_PROFILES: Dict[str, Dict[str, Any]] = {
+    "perte_de_poids": {
+        "weights": {KCAL: -1.0, PROTEINES: 2.0, FIBRES: 1.5, LIPIDES: -0.5},
+        "bounds": {KCAL: (50, None), PROTEINES: (2, None), FIBRES: (1, None), LIPIDES: (0.5, 10)},
+    },
+    "prise_de_masse": {
+        "weights": {KCAL: 1.0, PROTEINES: 2.0, GLUCIDES: 1.0, LIPIDES: -0.5},
+        "bounds": {KCAL: (100, None), PROTEINES: (5, None), GLUCIDES: (10, None), LIPIDES: (3, 20)},
+    },
+}
+
+_NUMBER = re.compile(r"-?\d+(?:[.,]\d+)?")
+
+
+def parse_ciqual_value(raw: Any) -> float:
+    """
+    Valeur CIQUAL (texte ou nombre) -> float, NaN si manquante.
+    """
+    if raw is None:
+        return math.nan
+    if isinstance(raw, (int, float)):
+        return float(raw)
+    text = str(raw).strip().lower()
+    if not text or text == "-":
+        return math.nan
+    if text.startswith("trace"):
+        return 0.0
+    match = _NUMBER.search(text)
+    if match is None:
+        return math.nan
+    value = float(match.group().replace(",", "."))
+    if text.startswith("<"):
+        return value * CIQUAL_TRACE_FACTOR
+    return value
+
+
+def goal_profile(user_goal: str) -> Optional[str]:
+    """
+    Objectif de score reconnu dans la demande, ou None.
+    """
+    goal = user_goal.lower()
+    if "perdre" in goal or "maigrir" in goal or "perte de poids" in goal or "mincir" in goal:
+        return "perte_de_poids"
+    if "muscle" in goal or "prise de masse" in goal:
+        return "prise_de_masse"
+    return None
+
+
+def build_arrays(db_path: Path, out_dir: Path) -> Dict[str, Any]:
+    """
+    Lit la table foods et écrit un .npy par colonne de NUTRITION_FIELDS,
+    puis meta.json (écrit en dernier : sa présence signale des fichiers
+    complets). Chaque fichier est écrit à côté puis renommé : plusieurs
+    workers peuvent reconstruire en même temps.
+    """
+    columns = ", ".join(f'"{f}"' for f in NUTRITION_FIELDS)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(f"SELECT {columns} FROM foods").fetchall()
+    finally:
+        conn.close()
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    arrays: Dict[str, np.ndarray] = {
+        NAME_FIELD: np.array([row[0] or "" for row in rows], dtype=np.str_),
+    }
+    for i, field in enumerate(NUMERIC_FIELDS, start=1):
+        arrays[field] = np.array([parse_ciqual_value(row[i]) for row in rows], dtype=np.float32)
+
+    suffix = f".{os.getpid()}.tmp"
+    for field, array in arrays.items():
+        tmp = out_dir / f"{field}.npy{suffix}"
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, out_dir / f"{field}.npy")
+
+    meta = {
+        "source": str(db_path),
+        "version": database_version(str(db_path)),
+        "rows": len(rows),
+        "fields": NUTRITION_FIELDS,
+    }
+    tmp = out_dir / f"meta.json{suffix}"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, out_dir / "meta.json")
+    return meta
+
+
+class CiqualEngine:
+    def __init__(self, db_path: Optional[str] = None, arrays_dir: str = KNOWLEDGE_ARRAYS_DIR):
+        # Par défaut : la base de sql_utils (lue au chargement)
+        self.db_path = db_path
+        self.arrays_dir = Path(arrays_dir)
+        self.columns: Dict[str, np.ndarray] = {}
+        self.rows = 0
+
+    def _up_to_date(self, db_path: Path) -> bool:
+        meta_path = self.arrays_dir / "meta.json"
+        if not meta_path.exists():
+            return False
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        return (
+            meta.get("fields") == NUTRITION_FIELDS
+            and meta.get("version") == database_version(str(db_path))
+        )
+
+    def load(self) -> None:
+        """
+        Ouvre les colonnes en mmap (reconstruites si nutrition.db a changé).
+        """
+        db_path = Path(self.db_path or sql_utils.DB_PATH).resolve()
+        if not self._up_to_date(db_path):
+            meta = build_arrays(db_path, self.arrays_dir)
+            print(f"[AGENT_KNOWLEDGE] colonnes CIQUAL reconstruites ({meta['rows']} aliments)")
+        # np.asarray : vue ndarray simple sur le mmap (moins de surcoût
+        # par opération que np.memmap, mêmes pages partagées)
+        self.columns = {
+            field: np.asarray(np.load(self.arrays_dir / f"{field}.npy", mmap_mode="r"))
+            for field in NUTRITION_FIELDS
+        }
+        self.rows = len(self.columns[NAME_FIELD])
+
+    def scores(self, profile: str) -> np.ndarray:
+        """
+        Score de chaque aliment pour l'objectif ; NaN si une valeur
+        utilisée manque ou sort des bornes.
+        """
+        if not self.columns:
+            self.load()
+        spec = GOAL_PROFILES[profile]
+        score = np.zeros(self.rows, dtype=np.float32)
+        for field, weight in spec["weights"].items():
+            score += np.float32(weight) * self.columns[field]
+        keep = np.ones(self.rows, dtype=bool)
+        for field, (low, high) in spec["bounds"].items():
+            column = self.columns[field]
+            if low is not None:
+                keep &= column > low
+            if high is not None:
+                keep &= column <= high
+        score[~keep] = np.nan
+        return score
+
+    def top_k(self, profile: str, k: int) -> List[Dict[str, Any]]:
+        """
+        Les k meilleurs aliments pour l'objectif, score décroissant, au
+        format des lignes SQL (colonnes de NUTRITION_FIELDS) + "score".
+        """
+        if k <= 0:
+            return []
+        score = self.scores(profile)
+        candidates = np.flatnonzero(~np.isnan(score))
+        if k < len(candidates):
+            candidates = candidates[np.argpartition(-score[candidates], k - 1)[:k]]
+        order = candidates[np.argsort(-score[candidates], kind="stable")]
+
+        # Une extraction par colonne (indexation groupée), pas par case
+        names = self.columns[NAME_FIELD][order].tolist()
+        values = {
+            field: np.round(self.columns[field][order].astype(np.float64), 3).tolist()
+            for field in NUMERIC_FIELDS
+        }
+        scores = np.round(score[order].astype(np.float64), 3).tolist()
+
+        results: List[Dict[str, Any]] = []
+        for j, name in enumerate(names):
+            row: Dict[str, Any] = {NAME_FIELD: name}
+            for field in NUMERIC_FIELDS:
+                value = values[field][j]
+                row[field] = None if math.isnan(value) else value
+            row["score"] = scores[j]
+            results.append(row)
+        return results
+
+
+ciqual_engine = CiqualEngine()
@@ -0,0 +1,187 @@
+"""
+Caches de l'agent_knowledge : GoalSqlCache (objectif normalisé -> SQL du
+LLM, persisté dans KNOWLEDGE_CACHE_DB) et RowsCache (SQL -> lignes, LRU
+de KNOWLEDGE_ROWS_CACHE_SIZE). Les deux sont indexés par la version de
+nutrition.db ; statistiques sur GET /cache/stats.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+KNOWLEDGE_CACHE_DB = os.getenv("KNOWLEDGE_CACHE_DB", "db/knowledge_cache.db")
+KNOWLEDGE_ROWS_CACHE_SIZE = int(os.getenv("KNOWLEDGE_ROWS_CACHE_SIZE", "256"))
+KNOWLEDGE_WARM_GOALS = [
+    goal.strip()
+    for goal in os.getenv(
+        "KNOWLEDGE_WARM_GOALS",
+        "des idées de repas équilibrés|aliments riches en protéines|aliments riches en fer"
+        "|aliments riches en fibres|aliments riches en calcium|aliments pauvres en sel"
+        "|collations saines",
+    ).split("|")
+    if goal.strip()
+]
+
+
+def normalize_goal(goal: str) -> str:
+    """
+    Clé de cache d'un objectif : "Aliments riches en Fer !" et
+    "aliments riches en fer" donnent la même.
+    """
+    text = unicodedata.normalize("NFKD", goal.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+def _ratio(hits: int, misses: int) -> Optional[float]:
+    total = hits + misses
+    return round(hits / total, 3) if total else None
+
+
+class GoalSqlCache:
+    def __init__(self, path: str = KNOWLEDGE_CACHE_DB):
+        self.path = Path(path)
+        # Connexion ouverte au premier accès (pas de fichier créé à l'import),
+        # puis gardée pour toute la durée du service, protégée par le verrou
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Appelé sous self._lock
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS goal_sql (
+                    goal TEXT NOT NULL,
+                    db_version TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (goal, db_version)
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, goal: str, version: str) -> Optional[str]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT sql FROM goal_sql WHERE goal = ? AND db_version = ?",
+                (normalize_goal(goal), version),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, goal: str, version: str, sql: str) -> None:
+        with self._lock:
+            # Entrées d'anciennes versions de la base : plus jamais lues
+            db = self._db()
+            db.execute("DELETE FROM goal_sql WHERE db_version != ?", (version,))
+            db.execute(
+                "INSERT OR REPLACE INTO goal_sql (goal, db_version, sql, created_at) VALUES (?, ?, ?, ?)",
+                (normalize_goal(goal), version, sql, datetime.utcnow().isoformat()),
+            )
+            db.commit()
+            self.writes += 1
+
+    def discard(self, goal: str, version: str) -> None:
+        """
+        Oublie le SQL d'un objectif (requête en échec à l'exécution).
+        """
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "DELETE FROM goal_sql WHERE goal = ? AND db_version = ?",
+                (normalize_goal(goal), version),
+            )
+            db.commit()
+
+    def sqls(self, version: str) -> List[str]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT DISTINCT sql FROM goal_sql WHERE db_version = ?", (version,)
+            ).fetchall()
+            return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": _ratio(self.hits, self.misses),
+            "writes": self.writes,
+        }
+
+
+class RowsCache:
+    def __init__(self, capacity: int = KNOWLEDGE_ROWS_CACHE_SIZE):
+        self.capacity = max(1, capacity)
+        self._rows: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def run(
+        self,
+        sql: str,
+        version: str,
+        runner: Callable[[str], List[Dict[str, Any]]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Lignes de `sql` pour la version de la base, exécutée par `runner`
+        si absente (copie des dicts : l'appelant peut les modifier).
+        """
+        key = " ".join(sql.split())
+        with self._lock:
+            if version != self._version:
+                if self._rows:
+                    self.invalidations += 1
+                self._rows.clear()
+                self._version = version
+            rows = self._rows.get(key)
+            if rows is not None:
+                self._rows.move_to_end(key)
+                self.hits += 1
+                return [dict(row) for row in rows]
+            self.misses += 1
+
+        # Exécution hors verrou ; une erreur n'est pas mise en cache
+        rows = runner(sql)
+        with self._lock:
+            if version == self._version:
+                self._rows[key] = rows
+                self._rows.move_to_end(key)
+                while len(self._rows) > self.capacity:
+                    self._rows.popitem(last=False)
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._rows),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": _ratio(self.hits, self.misses),
+            "invalidations": self.invalidations,
+        }
+
+
+goal_sql_cache = GoalSqlCache()
+rows_cache = RowsCache()
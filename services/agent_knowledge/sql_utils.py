@@ -1,5 +1,6 @@
+import os
 import sqlite3
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
 DB_PATH = "db/nutrition.db"
@@ -15,3 +16,12 @@ def run_query(sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
         return [dict(row) for row in rows]
     finally:
         conn.close()
+
+
+def database_version(db_path: Optional[str] = None) -> str:
+    """
+    Version de la base CIQUAL (taille + date de modification) : change
+    quand la base est rechargée, invalide les caches qui en dépendent.
+    """
+    stat = os.stat(db_path or DB_PATH)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
@@ -1,33 +1,12 @@
 # services/agent_manager/app/llm/prompts.py
 
 from textwrap import dedent
+from typing import List
 
 
-def build_router_prompt(user_text: str) -> str:
+# Description des services, partagée par le prompt unitaire et le prompt par lots.
+SERVICES_SECTION = dedent(
     """
-    Construit le prompt envoyé au LLM routeur pour décider quels services
-    appeler en fonction de la demande utilisateur.
-
-    Services disponibles :
-      - mood/analyze_mood
-      - coaching/coach_response
-      - nutrition/analyze_meal        (pour plus tard)
-      - history/get_history           (pour plus tard)
-      - speech/transcribe_audio       (principalement utilisé quand audio_path
-                                       est fourni par l'interface)
-    """
-    instructions = dedent(
-        f"""
-        Tu es un routeur de services dans un système de coach sportif multi-agents.
-
-        Ton rôle :
-          1. Lire attentivement la demande de l'utilisateur.
-          2. Décider quels services doivent être utilisés.
-          3. Pour chaque service, générer un objet JSON avec :
-             - "service": nom du service
-             - "command": commande à exécuter
-             - "text": texte à transmettre à ce service (quand pertinent)
-
         Les services disponibles :
 
           1) Service "mood" (analyse d'humeur)
@@ -65,6 +44,36 @@ def build_router_prompt(user_text: str) -> str:
                un chemin audio (audio_path). Le routeur peut cependant le suggérer
                si la demande parle explicitement d'un fichier audio à transcrire.
              - "text" doit alors contenir le chemin ou l'identifiant du fichier audio.
+    """
+).strip()
+
+
+def build_router_prompt(user_text: str) -> str:
+    """
+    Construit le prompt envoyé au LLM routeur pour décider quels services
+    appeler en fonction de la demande utilisateur.
+
+    Services disponibles :
+      - mood/analyze_mood
+      - coaching/coach_response
+      - nutrition/analyze_meal        (pour plus tard)
+      - history/get_history           (pour plus tard)
+      - speech/transcribe_audio       (principalement utilisé quand audio_path
+                                       est fourni par l'interface)
+    """
+    instructions = dedent(
+        """
+        Tu es un routeur de services dans un système de coach sportif multi-agents.
+
+        Ton rôle :
+          1. Lire attentivement la demande de l'utilisateur.
+          2. Décider quels services doivent être utilisés.
+          3. Pour chaque service, générer un objet JSON avec :
+             - "service": nom du service
+             - "command": commande à exécuter
+             - "text": texte à transmettre à ce service (quand pertinent)
+
+        {services_section}
 
         Format de la réponse (IMPORTANT) :
 
@@ -95,4 +104,74 @@ def build_router_prompt(user_text: str) -> str:
         """
     ).strip()
 
-    return instructions
+    return instructions.format(
+        services_section=SERVICES_SECTION,
+        user_text=user_text,
+    )
+
+
+def build_batch_router_prompt(user_texts: List[str]) -> str:
+    """
+    Variante "par lots" du prompt routeur (micro-batching) : plusieurs
+    demandes utilisateur indépendantes sont routées en un seul appel.
+
+    Le LLM doit renvoyer un tableau JSON avec un plan par demande,
+    dans le même ordre, identifié par "index".
+    """
+    numbered = "\n".join(
+        f'  [{i}] "{text}"' for i, text in enumerate(user_texts)
+    )
+
+    instructions = dedent(
+        """
+        Tu es un routeur de services dans un système de coach sportif multi-agents.
+
+        Tu reçois PLUSIEURS demandes utilisateur indépendantes, numérotées.
+        Pour CHACUNE, décide quels services doivent être utilisés, exactement
+        comme si elle était seule (ne mélange jamais les demandes entre elles).
+
+        {services_section}
+
+        Format de la réponse (IMPORTANT) :
+
+          - Tu dois répondre STRICTEMENT avec un tableau JSON valide, sans aucun texte autour.
+          - Un élément par demande, dans le même ordre, avec son "index".
+          - Le format attendu est :
+
+            [
+              {{
+                "index": 0,
+                "services": [
+                  {{
+                    "service": "mood",
+                    "command": "analyze_mood",
+                    "text": "Je suis très fatigué et stressé par le travail."
+                  }}
+                ]
+              }},
+              {{
+                "index": 1,
+                "services": [
+                  {{
+                    "service": "coaching",
+                    "command": "coach_response",
+                    "text": "Je voudrais un programme pour reprendre le sport en douceur."
+                  }}
+                ]
+              }}
+            ]
+
+          - Ne mets pas de ```json ou de balises de code.
+          - Ne rajoute pas de champs supplémentaires.
+
+        Demandes utilisateur ({count}) :
+
+        {numbered}
+        """
+    ).strip()
+
+    return instructions.format(
+        services_section=SERVICES_SECTION,
+        count=len(user_texts),
+        numbered=numbered,
+    )
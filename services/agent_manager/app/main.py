@@ -1,6 +1,8 @@
+from typing import Any, Dict
+
 from fastapi import FastAPI
 
-from app.mcp.handler import process_mcp_message
+from app.mcp.handler import process_mcp_message, router_batcher, routing_cache
 from app.mcp.schemas import MCPMessage, MCPResponse
 
 app = FastAPI(title="Agent Manager")
@@ -12,3 +14,12 @@ async def mcp_endpoint(msg: MCPMessage) -> MCPResponse:
     Endpoint MCP de l'agent Manager.
     """
     return await process_mcp_message(msg.dict())
+
+
+@app.get("/routing/stats")
+async def routing_stats() -> Dict[str, Any]:
+    """
+    Statistiques du routage : cache (taille, hit ratio, évictions...)
+    et micro-batching (nombre de lots, taille moyenne).
+    """
+    return {"cache": routing_cache.stats(), "batching": router_batcher.stats()}
@@ -1,9 +1,19 @@
+import asyncio
+import time
 import uuid
 from typing import Any, Dict, List, Optional
 
 from app.llm.client import LLMClient
-from app.llm.prompts import build_router_prompt
+from app.llm.prompts import build_batch_router_prompt, build_router_prompt
 from app.mcp.schemas import MCPMessage, MCPResponse
+from app.routing.batcher import ROUTER_BATCH_ENABLED, RouterBatcher
+from app.routing.cache import ROUTER_CACHE_ENABLED, RoutingCache
+from app.routing.classifier import ROUTER_LOCAL_THRESHOLD, get_runtime_model
+from app.routing.decision_log import log_decision
+from app.routing.utils import pairs_to_services, services_to_pairs
+
+# Cache global des décisions de routage (quasi-doublons, LRU + TTL).
+routing_cache = RoutingCache()
 
 
 def _fallback_decide_services(user_text: str) -> List[Dict[str, Any]]:
@@ -116,6 +126,74 @@ def _fallback_decide_services(user_text: str) -> List[Dict[str, Any]]:
     return services
 
 
+def _parse_llm_services(raw_services: Any, user_text: str) -> List[Dict[str, Any]]:
+    """
+    Nettoie une liste de services proposée par le LLM routeur
+    (on ignore les éléments sans "service" ou "command").
+    """
+    services: List[Dict[str, Any]] = []
+    if isinstance(raw_services, list):
+        for item in raw_services:
+            if not isinstance(item, dict):
+                continue
+            svc = item.get("service")
+            cmd = item.get("command")
+            txt = item.get("text", user_text)
+            if not svc or not cmd:
+                continue
+            services.append(
+                {
+                    "service": svc,
+                    "command": cmd,
+                    "text": txt,
+                }
+            )
+    return services
+
+
+def _route_with_llm(user_text: str) -> List[Dict[str, Any]]:
+    """
+    Demande au LLM routeur quels services appeler pour ce texte.
+    Lève une exception si le LLM est indisponible ou renvoie un JSON invalide.
+    """
+    router_prompt = build_router_prompt(user_text)
+    llm_client = LLMClient()
+    llm_output = llm_client.generate_json(router_prompt)
+
+    return _parse_llm_services(llm_output.get("services", []), user_text)
+
+
+def _route_batch_with_llm(user_texts: List[str]) -> List[Optional[List[Dict[str, Any]]]]:
+    """
+    Route plusieurs messages en un seul appel LLM (micro-batching).
+
+    Renvoie un plan par message, dans l'ordre ; None pour un message
+    que le LLM a oublié (l'appelant concerné repassera par les mots-clés).
+    """
+    llm_client = LLMClient()
+    llm_output = llm_client.generate_json(build_batch_router_prompt(user_texts))
+
+    # On tolère aussi {"plans": [...]} au lieu d'un tableau nu.
+    if isinstance(llm_output, dict):
+        llm_output = llm_output.get("plans", [])
+
+    plans: List[Optional[List[Dict[str, Any]]]] = [None] * len(user_texts)
+    if isinstance(llm_output, list):
+        for position, item in enumerate(llm_output):
+            if not isinstance(item, dict):
+                continue
+            index = item.get("index", position)
+            if isinstance(index, int) and 0 <= index < len(user_texts):
+                plans[index] = _parse_llm_services(
+                    item.get("services", []), user_texts[index]
+                )
+    return plans
+
+
+# Regroupe les appels au LLM routeur arrivant dans une courte fenêtre.
+router_batcher = RouterBatcher(_route_with_llm, _route_batch_with_llm)
+
+
 async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
     """
     Gestionnaire MCP pour l'agent_manager.
@@ -134,6 +212,8 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
       - status: "ok" ou "error"
       - task: "route_services"
       - services: liste de dicts {service, command, text, ...}
+      - routing: {source: "cache" | "local" | "llm" | "keywords" | "none",
+                  confidence, latency_ms}
       - llm_error: message d'erreur éventuel du routeur LLM
     """
 
@@ -187,34 +267,50 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
         )
 
     # ------------------------------------------------------------------ #
-    # 2) Utiliser le LLM routeur pour les autres services (mood, coaching,
-    #    nutrition, history), à partir du texte utilisateur.
+    # 2) Décider des autres services (mood, coaching, nutrition, history)
+    #    à partir du texte utilisateur :
+    #      a) cache des messages déjà routés (ou quasi-identiques) ;
+    #      b) classifieur local entraîné, s'il est assez confiant ;
+    #      c) sinon, LLM routeur (Groq), éventuellement regroupé avec
+    #         d'autres messages concurrents (micro-batching).
     # ------------------------------------------------------------------ #
+    route_source = "none"
+    route_confidence: Optional[float] = None
+    router_latency_ms: Optional[float] = None
+
     if user_text.strip():
-        try:
-            router_prompt = build_router_prompt(user_text)
-            llm_client = LLMClient()
-            llm_output = llm_client.generate_json(router_prompt)
-
-            raw_services = llm_output.get("services", [])  # type: ignore[assignment]
-            if isinstance(raw_services, list):
-                for item in raw_services:
-                    if not isinstance(item, dict):
-                        continue
-                    svc = item.get("service")
-                    cmd = item.get("command")
-                    txt = item.get("text", user_text)
-                    if not svc or not cmd:
-                        continue
-                    services.append(
-                        {
-                            "service": svc,
-                            "command": cmd,
-                            "text": txt,
-                        }
-                    )
-        except Exception as e:
-            error_info = f"Erreur LLM router: {e!r}"
+        started = time.perf_counter()
+
+        cached = routing_cache.get(user_text) if ROUTER_CACHE_ENABLED else None
+        if cached is not None:
+            services.extend(pairs_to_services(cached, user_text))
+            route_source = "cache"
+
+        local_model = get_runtime_model() if route_source == "none" else None
+        if local_model is not None:
+            prediction = local_model.predict(user_text)
+            route_confidence = prediction.confidence
+            if prediction.confidence >= ROUTER_LOCAL_THRESHOLD:
+                services.extend(pairs_to_services(prediction.services, user_text))
+                route_source = "local"
+
+        if route_source == "none":
+            try:
+                if ROUTER_BATCH_ENABLED:
+                    llm_services = await router_batcher.route(user_text)
+                else:
+                    # Appel bloquant (LangChain) déporté dans un thread
+                    # pour ne pas figer la boucle d'événements.
+                    llm_services = await asyncio.to_thread(_route_with_llm, user_text)
+                services.extend(llm_services)
+                route_source = "llm"
+                if ROUTER_CACHE_ENABLED:
+                    routing_cache.put(user_text, services_to_pairs(llm_services))
+            except Exception as e:
+                error_info = f"Erreur LLM router: {e!r}"
+                route_source = "keywords"
+
+        router_latency_ms = (time.perf_counter() - started) * 1000.0
 
     # ------------------------------------------------------------------ #
     # 3) Calculer les services de fallback (mots-clés) ET les fusionner
@@ -275,10 +371,29 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
     # (Optionnel) log debug pour voir ce qui est renvoyé
     # print("[AGENT_MANAGER] services finaux :", services, flush=True)
 
+    # ------------------------------------------------------------------ #
+    # 5) Journaliser la décision (texte, services finaux) : sert
+    #    d'entraînement et d'évaluation au classifieur local. Écriture
+    #    disque dans un thread, comme l'appel au LLM routeur.
+    # ------------------------------------------------------------------ #
+    if user_text.strip():
+        await asyncio.to_thread(
+            log_decision,
+            text=user_text,
+            services=services_to_pairs(services),
+            source=route_source,
+            router_latency_ms=router_latency_ms,
+        )
+
     response_payload: Dict[str, Any] = {
         "status": "ok",
         "task": "route_services",
         "services": services,
+        "routing": {
+            "source": route_source,
+            "confidence": route_confidence,
+            "latency_ms": router_latency_ms,
+        },
     }
     if error_info:
         response_payload["llm_error"] = error_info
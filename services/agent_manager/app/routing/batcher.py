@@ -0,0 +1,107 @@
+# services/agent_manager/app/routing/batcher.py
+
+"""
+Micro-batching du LLM routeur : les messages arrivés dans la même
+fenêtre (ROUTER_BATCH_WINDOW_MS, au plus ROUTER_BATCH_MAX) partagent un
+seul appel, dont le plan est redistribué aux appelants en attente.
+"""
+
+import asyncio
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROUTER_BATCH_ENABLED = os.getenv("ROUTER_BATCH_ENABLED", "0") == "1"
+ROUTER_BATCH_WINDOW_MS = float(os.getenv("ROUTER_BATCH_WINDOW_MS", "20"))
+ROUTER_BATCH_MAX = int(os.getenv("ROUTER_BATCH_MAX", "8"))
+
+ServicePlan = List[Dict[str, Any]]
+
+
+class RouterBatcher:
+    def __init__(
+        self,
+        route_one: Callable[[str], ServicePlan],
+        route_many: Callable[[List[str]], List[Optional[ServicePlan]]],
+        window_ms: float = ROUTER_BATCH_WINDOW_MS,
+        max_batch: int = ROUTER_BATCH_MAX,
+    ) -> None:
+        self._route_one = route_one
+        self._route_many = route_many
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+
+        self._pending: List[Tuple[str, "asyncio.Future[ServicePlan]"]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.batches = 0
+        self.messages = 0
+
+    async def route(self, text: str) -> ServicePlan:
+        """
+        Met le message en attente et renvoie son plan de services une fois
+        le lot traité. Lève l'exception du LLM si le lot a échoué.
+        """
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[ServicePlan]" = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+        if self._pending:
+            # Il reste des messages (rafale > max_batch) : nouvelle fenêtre.
+            self._timer = asyncio.get_running_loop().call_later(self.window_s, self._flush)
+        if batch:
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(
+        self,
+        batch: List[Tuple[str, "asyncio.Future[ServicePlan]"]],
+    ) -> None:
+        texts = [text for text, _ in batch]
+        self.batches += 1
+        self.messages += len(batch)
+
+        try:
+            if len(texts) == 1:
+                plans: List[Optional[ServicePlan]] = [
+                    await asyncio.to_thread(self._route_one, texts[0])
+                ]
+            else:
+                plans = await asyncio.to_thread(self._route_many, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            plan = plans[i] if i < len(plans) else None
+            if plan is None:
+                future.set_exception(
+                    ValueError(f"Plan manquant pour le message #{i} du lot.")
+                )
+            else:
+                future.set_result(plan)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": ROUTER_BATCH_ENABLED,
+            "window_ms": self.window_s * 1000.0,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "messages": self.messages,
+            "avg_batch_size": (self.messages / self.batches) if self.batches else 0.0,
+        }
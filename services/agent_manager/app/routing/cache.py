@@ -0,0 +1,199 @@
+# services/agent_manager/app/routing/cache.py
+
+"""
+Cache de routage des messages quasi identiques : clé exacte sur le
+texte normalisé, sinon voisins MinHash + LSH. Borné par
+ROUTER_CACHE_MAX_ENTRIES (LRU), entrées expirées après ROUTER_CACHE_TTL_S.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.routing.utils import normalize_text, stable_hash
+
+ROUTER_CACHE_ENABLED = os.getenv("ROUTER_CACHE_ENABLED", "1") == "1"
+ROUTER_CACHE_MAX_ENTRIES = int(os.getenv("ROUTER_CACHE_MAX_ENTRIES", "5000"))
+ROUTER_CACHE_TTL_S = float(os.getenv("ROUTER_CACHE_TTL_S", "3600"))
+ROUTER_CACHE_SIMILARITY = float(os.getenv("ROUTER_CACHE_SIMILARITY", "0.75"))
+
+# Nombre premier de Mersenne 2^31 - 1 : (a * h + b) tient dans un uint64.
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+
+def _shingles(norm_text: str) -> Set[str]:
+    """
+    Shingles d'un texte normalisé : mots + bigrammes de mots.
+    """
+    words = norm_text.split()
+    shingles = set(words)
+    shingles.update(" ".join(words[i : i + 2]) for i in range(len(words) - 1))
+    return shingles
+
+
+@dataclass
+class _CacheEntry:
+    signature: np.ndarray
+    services: List[Tuple[str, str]]
+    created_at: float
+
+
+class RoutingCache:
+    def __init__(
+        self,
+        max_entries: int = ROUTER_CACHE_MAX_ENTRIES,
+        ttl_s: float = ROUTER_CACHE_TTL_S,
+        similarity_threshold: float = ROUTER_CACHE_SIMILARITY,
+        num_perm: int = 64,
+        bands: int = 16,
+        seed: int = 7,
+    ) -> None:
+        if num_perm % bands != 0:
+            raise ValueError("num_perm doit être un multiple de bands.")
+
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.similarity_threshold = similarity_threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+
+        rng = np.random.RandomState(seed)
+        self._perm_a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm).astype(np.uint64)
+        self._perm_b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm).astype(np.uint64)
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+
+        self.lookups = 0
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # ------------------------------------------------------------------ #
+    # MinHash / LSH
+    # ------------------------------------------------------------------ #
+    def signature(self, norm_text: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (stable_hash(s) for s in _shingles(norm_text)), dtype=np.uint64
+        )
+        if hashes.size == 0:
+            return np.full(self._perm_a.shape, _MERSENNE_PRIME, dtype=np.uint64)
+        hashes %= _MERSENNE_PRIME
+        # (num_perm x n_shingles) -> minimum par permutation
+        permuted = (self._perm_a[:, None] * hashes[None, :] + self._perm_b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        r = self.rows_per_band
+        return [(b, signature[b * r : (b + 1) * r].tobytes()) for b in range(self.bands)]
+
+    # ------------------------------------------------------------------ #
+    # Gestion des entrées
+    # ------------------------------------------------------------------ #
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(entry.signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def _is_expired(self, entry: _CacheEntry, now: float) -> bool:
+        return now - entry.created_at > self.ttl_s
+
+    def get(self, text: str) -> Optional[List[Tuple[str, str]]]:
+        """
+        Renvoie les services en cache pour ce texte (ou un quasi-doublon),
+        sinon None.
+        """
+        self.lookups += 1
+        key = normalize_text(text)
+        if not key:
+            return None
+
+        now = time.monotonic()
+
+        # 1) Clé exacte
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._is_expired(entry, now):
+                self._remove(key)
+                self.expirations += 1
+            else:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return list(entry.services)
+
+        # 2) Quasi-doublons via LSH
+        signature = self.signature(key)
+        candidates: Set[str] = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+
+        best_key: Optional[str] = None
+        best_similarity = 0.0
+        for cand in candidates:
+            cand_entry = self._entries.get(cand)
+            if cand_entry is None:
+                continue
+            if self._is_expired(cand_entry, now):
+                self._remove(cand)
+                self.expirations += 1
+                continue
+            similarity = float(np.mean(cand_entry.signature == signature))
+            if similarity > best_similarity:
+                best_key, best_similarity = cand, similarity
+
+        if best_key is not None and best_similarity >= self.similarity_threshold:
+            self._entries.move_to_end(best_key)
+            self.near_hits += 1
+            return list(self._entries[best_key].services)
+
+        return None
+
+    def put(self, text: str, services: List[Tuple[str, str]]) -> None:
+        key = normalize_text(text)
+        if not key:
+            return
+
+        self._remove(key)
+        entry = _CacheEntry(
+            signature=self.signature(key),
+            services=list(services),
+            created_at=time.monotonic(),
+        )
+        self._entries[key] = entry
+        for band_key in self._band_keys(entry.signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    # ------------------------------------------------------------------ #
+    # Statistiques
+    # ------------------------------------------------------------------ #
+    def stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.near_hits
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "similarity_threshold": self.similarity_threshold,
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.lookups - hits,
+            "hit_ratio": (hits / self.lookups) if self.lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,188 @@
+# services/agent_manager/app/routing/classifier.py
+
+"""
+Classifieur d'intention local (n-grammes hashés + régression logistique
+one-vs-rest). Sous le seuil ROUTER_LOCAL_THRESHOLD, le handler repasse
+par le LLM routeur.
+"""
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.routing.utils import ROUTABLE_SERVICES, hashed_ngram_features
+
+ROUTER_MODEL_PATH = os.getenv("ROUTER_MODEL_PATH", "data/router_model.npz")
+ROUTER_LOCAL_THRESHOLD = float(os.getenv("ROUTER_LOCAL_THRESHOLD", "0.85"))
+
+
+@dataclass
+class LocalPrediction:
+    """
+    Résultat d'une prédiction locale :
+      - services   : couples (service, command) retenus
+      - confidence : confiance globale (la plus faible des décisions par service)
+      - probas     : probabilité par label, dans l'ordre de IntentClassifier.labels
+    """
+
+    services: List[Tuple[str, str]]
+    confidence: float
+    probas: List[float]
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30.0, 30.0)))
+
+
+class IntentClassifier:
+    def __init__(
+        self,
+        labels: Sequence[Tuple[str, str]] = ROUTABLE_SERVICES,
+        n_features: int = 2**14,
+    ) -> None:
+        self.labels: List[Tuple[str, str]] = [tuple(l) for l in labels]  # type: ignore[misc]
+        self.n_features = n_features
+        self.weights = np.zeros((n_features, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+
+    # ------------------------------------------------------------------ #
+    # Entraînement
+    # ------------------------------------------------------------------ #
+    def fit(
+        self,
+        texts: Sequence[str],
+        label_sets: Sequence[Sequence[Tuple[str, str]]],
+        epochs: int = 300,
+        learning_rate: float = 2.0,
+        l2: float = 1e-4,
+    ) -> "IntentClassifier":
+        """
+        Entraîne le modèle en "full batch" sur des features creuses.
+
+        La matrice (n_textes x n_features) n'est jamais densifiée : on garde
+        des triplets (ligne, colonne, valeur) et on utilise np.add.at /
+        np.bincount pour les produits.
+        """
+        n = len(texts)
+        if n == 0:
+            raise ValueError("Aucun exemple d'entraînement.")
+
+        rows: List[np.ndarray] = []
+        cols: List[np.ndarray] = []
+        vals: List[np.ndarray] = []
+        for i, text in enumerate(texts):
+            idx, val = hashed_ngram_features(text, self.n_features)
+            rows.append(np.full(idx.shape[0], i, dtype=np.int64))
+            cols.append(idx)
+            vals.append(val)
+
+        row_idx = np.concatenate(rows)
+        col_idx = np.concatenate(cols)
+        values = np.concatenate(vals).astype(np.float32)
+
+        label_index = {label: j for j, label in enumerate(self.labels)}
+        y = np.zeros((n, len(self.labels)), dtype=np.float32)
+        for i, pairs in enumerate(label_sets):
+            for pair in pairs:
+                j = label_index.get(tuple(pair))  # type: ignore[arg-type]
+                if j is not None:
+                    y[i, j] = 1.0
+
+        for _ in range(epochs):
+            logits = np.zeros((n, len(self.labels)), dtype=np.float32)
+            np.add.at(logits, row_idx, self.weights[col_idx] * values[:, None])
+            logits += self.bias
+
+            err = (_sigmoid(logits) - y) / n  # gradient de la log-loss moyenne
+
+            for j in range(len(self.labels)):
+                grad_w = np.bincount(
+                    col_idx,
+                    weights=values * err[row_idx, j],
+                    minlength=self.n_features,
+                ).astype(np.float32)
+                self.weights[:, j] -= learning_rate * (grad_w + l2 * self.weights[:, j])
+            self.bias -= learning_rate * err.sum(axis=0)
+
+        return self
+
+    # ------------------------------------------------------------------ #
+    # Prédiction
+    # ------------------------------------------------------------------ #
+    def predict_proba(self, text: str) -> np.ndarray:
+        idx, val = hashed_ngram_features(text, self.n_features)
+        logits = val @ self.weights[idx] + self.bias
+        return _sigmoid(logits)
+
+    def predict(self, text: str) -> LocalPrediction:
+        probas = self.predict_proba(text)
+        chosen = [self.labels[j] for j, p in enumerate(probas) if p >= 0.5]
+        # Confiance de chaque décision binaire = max(p, 1 - p) ;
+        # la confiance globale est celle de la décision la moins sûre.
+        confidence = float(np.min(np.maximum(probas, 1.0 - probas)))
+        return LocalPrediction(
+            services=chosen,
+            confidence=confidence,
+            probas=[float(p) for p in probas],
+        )
+
+    # ------------------------------------------------------------------ #
+    # Persistance
+    # ------------------------------------------------------------------ #
+    def save(self, path: str) -> None:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with target.open("wb") as f:
+            np.savez_compressed(
+                f,
+                weights=self.weights,
+                bias=self.bias,
+                labels=np.array(["/".join(l) for l in self.labels]),
+                n_features=np.array(self.n_features),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with np.load(path) as data:
+            labels = [tuple(str(l).split("/", 1)) for l in data["labels"]]
+            model = cls(labels=labels, n_features=int(data["n_features"]))  # type: ignore[arg-type]
+            model.weights = data["weights"].astype(np.float32)
+            model.bias = data["bias"].astype(np.float32)
+        return model
+
+
+# ---------------------------------------------------------------------- #
+# Modèle chargé à l'exécution (rechargé si le fichier change sur disque)
+# ---------------------------------------------------------------------- #
+_loaded_model: Optional[IntentClassifier] = None
+_loaded_mtime: Optional[float] = None
+
+
+def get_runtime_model(path: Optional[str] = None) -> Optional[IntentClassifier]:
+    """
+    Renvoie le modèle entraîné s'il existe, sinon None.
+
+    Le fichier est relu automatiquement après un nouvel entraînement
+    hors ligne (comparaison du mtime), sans redémarrer le service.
+    """
+    global _loaded_model, _loaded_mtime
+
+    model_path = Path(path or ROUTER_MODEL_PATH)
+    try:
+        mtime = model_path.stat().st_mtime
+    except OSError:
+        _loaded_model, _loaded_mtime = None, None
+        return None
+
+    if _loaded_model is None or mtime != _loaded_mtime:
+        try:
+            _loaded_model = IntentClassifier.load(str(model_path))
+            _loaded_mtime = mtime
+        except Exception as e:
+            print("[AGENT_MANAGER] modèle de routage illisible :", repr(e), flush=True)
+            _loaded_model, _loaded_mtime = None, None
+
+    return _loaded_model
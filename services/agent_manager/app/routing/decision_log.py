@@ -0,0 +1,80 @@
+# services/agent_manager/app/routing/decision_log.py
+
+"""
+Journal JSONL des décisions de routage (texte, services, source,
+latence du routeur), relu par app.routing.train et app.routing.evaluate.
+ROUTER_DECISION_LOG vide => journalisation désactivée.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DECISION_LOG_PATH = os.getenv("ROUTER_DECISION_LOG", "data/routing_decisions.jsonl")
+
+
+def log_decision(
+    text: str,
+    services: List[Tuple[str, str]],
+    source: str,
+    router_latency_ms: Optional[float] = None,
+    path: Optional[str] = None,
+) -> None:
+    """
+    Ajoute une décision de routage au journal.
+
+    Ne lève jamais d'exception : le routage ne doit pas échouer
+    parce que le disque est plein ou en lecture seule.
+    """
+    target = path if path is not None else DECISION_LOG_PATH
+    if not target or not text.strip():
+        return
+
+    record: Dict[str, Any] = {
+        "ts": datetime.utcnow().isoformat(),
+        "text": text,
+        "services": [list(p) for p in services],
+        "source": source,
+        "router_latency_ms": router_latency_ms,
+    }
+
+    try:
+        log_path = Path(target)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        with log_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print("[AGENT_MANAGER] journal de routage indisponible :", repr(e), flush=True)
+
+
+def iter_decisions(path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Parcourt le journal ligne par ligne (les lignes corrompues sont ignorées).
+    """
+    log_path = Path(path or DECISION_LOG_PATH)
+    if not log_path.exists():
+        return
+
+    with log_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get("text"):
+                yield record
+
+
+def load_llm_decisions(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Renvoie uniquement les décisions prises par le LLM routeur.
+
+    On n'apprend (et n'évalue) que sur ces décisions-là : réentraîner le
+    modèle sur ses propres prédictions ("local") figerait ses erreurs.
+    """
+    return [r for r in iter_decisions(path) if r.get("source") == "llm"]
@@ -0,0 +1,110 @@
+# services/agent_manager/app/routing/evaluate.py
+
+"""
+Évaluation du classifieur local sur les décisions "llm" du journal :
+accord avec le LLM routeur et latence économisée.
+
+    python -m app.routing.evaluate --log data/routing_decisions.jsonl
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.routing.classifier import (
+    ROUTER_LOCAL_THRESHOLD,
+    ROUTER_MODEL_PATH,
+    IntentClassifier,
+)
+from app.routing.decision_log import load_llm_decisions
+
+
+def evaluate(
+    model: IntentClassifier,
+    records: Sequence[Dict[str, Any]],
+    threshold: float = ROUTER_LOCAL_THRESHOLD,
+) -> Dict[str, Any]:
+    """
+    Calcule les métriques d'évaluation sur une liste de décisions LLM.
+
+    Renvoie :
+      - n                    : nombre de décisions évaluées
+      - exact_match          : part des messages dont l'ensemble de services
+                               prédit est identique à celui du LLM
+      - label_accuracy       : exactitude par (service, command)
+      - coverage             : part des messages traités localement (confiance >= seuil)
+      - exact_match_covered  : exactitude sur les seuls messages traités localement
+      - local_latency_ms_avg : latence moyenne d'une prédiction locale
+      - llm_latency_ms_avg   : latence moyenne journalisée du LLM routeur
+      - latency_saved_ms_total / latency_saved_ms_avg
+    """
+    n = len(records)
+    if n == 0:
+        return {"n": 0}
+
+    exact = 0
+    covered = 0
+    covered_exact = 0
+    label_hits = {"/".join(l): 0 for l in model.labels}
+    local_latencies: List[float] = []
+    llm_latencies: List[float] = []
+    saved_ms = 0.0
+
+    for record in records:
+        expected = {tuple(p) for p in record.get("services", [])}
+
+        started = time.perf_counter()
+        prediction = model.predict(record["text"])
+        local_ms = (time.perf_counter() - started) * 1000.0
+        local_latencies.append(local_ms)
+
+        predicted = set(prediction.services)
+        is_exact = predicted == expected
+        exact += int(is_exact)
+
+        for label in model.labels:
+            if (label in predicted) == (label in expected):
+                label_hits["/".join(label)] += 1
+
+        llm_ms: Optional[float] = record.get("router_latency_ms")
+        if isinstance(llm_ms, (int, float)):
+            llm_latencies.append(float(llm_ms))
+
+        if prediction.confidence >= threshold:
+            covered += 1
+            covered_exact += int(is_exact)
+            if isinstance(llm_ms, (int, float)):
+                saved_ms += max(0.0, float(llm_ms) - local_ms)
+
+    return {
+        "n": n,
+        "threshold": threshold,
+        "exact_match": exact / n,
+        "label_accuracy": {k: v / n for k, v in label_hits.items()},
+        "coverage": covered / n,
+        "exact_match_covered": (covered_exact / covered) if covered else None,
+        "local_latency_ms_avg": sum(local_latencies) / n,
+        "llm_latency_ms_avg": (
+            sum(llm_latencies) / len(llm_latencies) if llm_latencies else None
+        ),
+        "latency_saved_ms_total": saved_ms,
+        "latency_saved_ms_avg": saved_ms / n,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Évalue le routeur local vs LLM.")
+    parser.add_argument("--log", default=None, help="Journal JSONL des décisions.")
+    parser.add_argument("--model", default=ROUTER_MODEL_PATH, help="Modèle .npz entraîné.")
+    parser.add_argument("--threshold", type=float, default=ROUTER_LOCAL_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    model = IntentClassifier.load(args.model)
+    records = load_llm_decisions(args.log)
+    report = evaluate(model, records, threshold=args.threshold)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# services/agent_manager/app/routing/train.py
+
+"""
+Entraînement hors ligne du classifieur de routage ; le modèle écrit est
+rechargé par l'agent_manager sans redémarrage (get_runtime_model).
+
+    python -m app.routing.train --log data/routing_decisions.jsonl --out data/router_model.npz
+"""
+
+import argparse
+import json
+import random
+from typing import Optional, Sequence
+
+from app.routing.classifier import ROUTER_MODEL_PATH, IntentClassifier
+from app.routing.decision_log import load_llm_decisions
+from app.routing.evaluate import evaluate
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Entraîne le routeur local.")
+    parser.add_argument("--log", default=None, help="Journal JSONL des décisions.")
+    parser.add_argument("--out", default=ROUTER_MODEL_PATH, help="Fichier .npz de sortie.")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--learning-rate", type=float, default=2.0)
+    parser.add_argument(
+        "--holdout",
+        type=float,
+        default=0.2,
+        help="Part des décisions gardée pour l'évaluation (0 = tout pour l'entraînement).",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    records = load_llm_decisions(args.log)
+    if not records:
+        raise SystemExit("Aucune décision 'llm' dans le journal : rien à apprendre.")
+
+    random.Random(args.seed).shuffle(records)
+    n_holdout = int(len(records) * args.holdout)
+    holdout, train = records[:n_holdout], records[n_holdout:]
+
+    model = IntentClassifier()
+    model.fit(
+        [r["text"] for r in train],
+        [[tuple(p) for p in r.get("services", [])] for r in train],
+        epochs=args.epochs,
+        learning_rate=args.learning_rate,
+    )
+    model.save(args.out)
+
+    print(f"[train] {len(train)} exemples, modèle écrit dans {args.out}")
+    if holdout:
+        print(json.dumps(evaluate(model, holdout), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
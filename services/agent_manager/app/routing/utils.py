@@ -0,0 +1,121 @@
+# services/agent_manager/app/routing/utils.py
+
+import re
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+# Services "texte" que le routeur peut choisir à partir du message.
+# speech / vision dépendent uniquement de audio_path / image_path et ne
+# passent donc jamais par le routage appris.
+ROUTABLE_SERVICES: Tuple[Tuple[str, str], ...] = (
+    ("mood", "analyze_mood"),
+    ("coaching", "coach_response"),
+    ("nutrition", "analyze_meal"),
+    ("history", "get_history"),
+)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise le texte utilisateur pour le routage :
+    - mise en minuscules
+    - suppression des accents ("fatigué" -> "fatigue")
+    - suppression de la ponctuation / emojis
+    - réduction des espaces multiples
+    """
+    if not text:
+        return ""
+
+    text = text.lower()
+
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+
+    text = re.sub(r"[^a-z0-9\s]", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+
+    return text
+
+
+def stable_hash(token: str) -> int:
+    """
+    Hash stable entre processus (contrairement à hash() de Python,
+    qui est salé à chaque démarrage).
+    """
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def hashed_ngram_features(
+    text: str,
+    n_features: int = 2**14,
+    word_ngrams: Sequence[int] = (1, 2),
+    char_ngrams: Sequence[int] = (3, 4),
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Transforme un texte en vecteur creux (indices, valeurs) par hashing
+    de n-grammes de mots et de caractères.
+
+    - Les valeurs sont des log(1 + tf), normalisées L2.
+    - Aucun vocabulaire à stocker : la dimension est fixe (n_features).
+    """
+    norm = normalize_text(text)
+    if not norm:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    words = norm.split()
+    tokens: List[str] = []
+
+    for n in word_ngrams:
+        for i in range(len(words) - n + 1):
+            tokens.append("w" + str(n) + ":" + " ".join(words[i : i + n]))
+
+    padded = f" {norm} "
+    for n in char_ngrams:
+        for i in range(len(padded) - n + 1):
+            tokens.append("c" + str(n) + ":" + padded[i : i + n])
+
+    counts: Dict[int, int] = {}
+    for tok in tokens:
+        idx = stable_hash(tok) % n_features
+        counts[idx] = counts.get(idx, 0) + 1
+
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    norm_l2 = float(np.linalg.norm(values))
+    if norm_l2 > 0:
+        values /= norm_l2
+
+    return indices, values
+
+
+def services_to_pairs(services: Iterable[Dict[str, object]]) -> List[Tuple[str, str]]:
+    """
+    Extrait les couples (service, command) routables d'une liste de services.
+    """
+    routable = set(ROUTABLE_SERVICES)
+    pairs: List[Tuple[str, str]] = []
+    for s in services:
+        if not isinstance(s, dict):
+            continue
+        key = (str(s.get("service")), str(s.get("command")))
+        if key in routable and key not in pairs:
+            pairs.append(key)
+    return pairs
+
+
+def pairs_to_services(
+    pairs: Iterable[Tuple[str, str]],
+    user_text: str,
+) -> List[Dict[str, object]]:
+    """
+    Reconstruit des dicts de service (format agent_manager) à partir de
+    couples (service, command), en transmettant le texte utilisateur courant.
+    """
+    return [
+        {"service": service, "command": command, "text": user_text}
+        for service, command in pairs
+    ]
@@ -0,0 +1,35 @@
+import asyncio
+import json
+import threading
+
+import app.mcp.handler as handler
+from app.routing import decision_log
+
+
+def test_routing_decision_is_logged_off_the_event_loop(tmp_path, monkeypatch):
+    log_path = tmp_path / "decisions.jsonl"
+    threads = []
+
+    def log(**kwargs):
+        threads.append(threading.current_thread())
+        decision_log.log_decision(path=str(log_path), **kwargs)
+
+    def llm_down(text):
+        raise ConnectionError("Groq injoignable")
+
+    monkeypatch.setattr(handler, "log_decision", log)
+    monkeypatch.setattr(handler, "_route_with_llm", llm_down)
+    monkeypatch.setattr(handler, "get_runtime_model", lambda: None)
+    monkeypatch.setattr(handler, "ROUTER_CACHE_ENABLED", False)
+    monkeypatch.setattr(handler, "ROUTER_BATCH_ENABLED", False)
+
+    response = asyncio.run(
+        handler.process_mcp_message(
+            {"message_id": "m", "payload": {"task": "route_services", "text": "Je suis crevé"}}
+        )
+    )
+
+    assert response.payload["routing"]["source"] == "keywords"
+    assert threads and threads[0] is not threading.main_thread()
+    record = json.loads(log_path.read_text(encoding="utf-8"))
+    assert record["text"] == "Je suis crevé" and record["source"] == "keywords"
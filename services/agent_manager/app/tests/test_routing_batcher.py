@@ -0,0 +1,33 @@
+import asyncio
+
+from app.routing.batcher import RouterBatcher
+
+
+def test_concurrent_messages_are_batched_and_fanned_out():
+    calls = []
+
+    def route_one(text):
+        calls.append([text])
+        return [{"service": "coaching", "command": "coach_response", "text": text}]
+
+    def route_many(texts):
+        calls.append(list(texts))
+        # Le LLM "oublie" le dernier message du lot.
+        return [
+            [{"service": "mood", "command": "analyze_mood", "text": t}]
+            for t in texts[:-1]
+        ]
+
+    async def scenario():
+        batcher = RouterBatcher(route_one, route_many, window_ms=10, max_batch=3)
+        return await asyncio.gather(
+            *(batcher.route(f"message {i}") for i in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+
+    assert calls == [["message 0", "message 1", "message 2"]]
+    assert results[0][0]["text"] == "message 0"
+    assert results[1][0]["text"] == "message 1"
+    assert isinstance(results[2], ValueError)
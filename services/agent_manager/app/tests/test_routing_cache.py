@@ -0,0 +1,29 @@
+from app.routing.cache import RoutingCache
+
+COACHING = [("coaching", "coach_response"), ("nutrition", "analyze_meal")]
+
+
+def test_near_duplicate_hit_and_accent_folding():
+    cache = RoutingCache()
+    cache.put("Je veux perdre du poids", COACHING)
+
+    assert cache.get("je veux perdre du poids !") == COACHING
+    assert cache.get("je veux perdre du poids vite") == COACHING
+    assert cache.get("Quel temps fait-il à Paris demain ?") is None
+
+    stats = cache.stats()
+    assert stats["exact_hits"] == 1
+    assert stats["near_hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_lru_eviction_and_ttl():
+    cache = RoutingCache(max_entries=2, ttl_s=-1.0)
+    cache.put("premier message", COACHING)
+    cache.put("deuxième message", COACHING)
+    cache.put("troisième message", COACHING)
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+
+    # ttl négatif : toutes les entrées sont déjà expirées
+    assert cache.get("troisième message") is None
@@ -0,0 +1,52 @@
+from app.routing.classifier import IntentClassifier
+from app.routing.evaluate import evaluate
+
+MOOD = ("mood", "analyze_mood")
+COACHING = ("coaching", "coach_response")
+NUTRITION = ("nutrition", "analyze_meal")
+
+TRAIN = [
+    ("je suis fatigué et stressé", [MOOD, COACHING]),
+    ("je suis épuisé ce soir", [MOOD, COACHING]),
+    ("qu'est-ce que je peux manger ce midi", [MOOD, COACHING, NUTRITION]),
+    ("idée de repas léger pour le dîner", [MOOD, COACHING, NUTRITION]),
+    ("un programme de course pour débuter", [MOOD, COACHING]),
+    ("combien de calories dans une pizza", [MOOD, COACHING, NUTRITION]),
+]
+
+
+def _trained_model() -> IntentClassifier:
+    model = IntentClassifier(n_features=2**12)
+    model.fit([t for t, _ in TRAIN], [l for _, l in TRAIN], epochs=400)
+    return model
+
+
+def test_predicts_training_labels():
+    model = _trained_model()
+    pred = model.predict("idée de repas pour ce midi")
+    assert NUTRITION in pred.services
+    assert COACHING in pred.services
+    assert 0.5 <= pred.confidence <= 1.0
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    model = _trained_model()
+    path = tmp_path / "router_model.npz"
+    model.save(str(path))
+
+    loaded = IntentClassifier.load(str(path))
+    assert loaded.labels == model.labels
+    assert loaded.predict("je suis fatigué").services == model.predict("je suis fatigué").services
+
+
+def test_evaluate_reports_accuracy_and_latency_saved():
+    model = _trained_model()
+    records = [
+        {"text": t, "services": [list(p) for p in l], "source": "llm", "router_latency_ms": 300.0}
+        for t, l in TRAIN
+    ]
+    report = evaluate(model, records, threshold=0.0)
+    assert report["n"] == len(TRAIN)
+    assert report["exact_match"] == 1.0
+    assert report["coverage"] == 1.0
+    assert report["latency_saved_ms_total"] > 0
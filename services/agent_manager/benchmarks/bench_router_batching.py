@@ -0,0 +1,107 @@
+# services/agent_manager/benchmarks/bench_router_batching.py
+
+"""
+Benchmark du micro-batching du routeur, avec un LLM simulé (coût fixe
+par appel + coût par message, appels simultanés limités).
+
+    python -m benchmarks.bench_router_batching --messages 256
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.routing.batcher import RouterBatcher
+
+
+class FakeRouterLLM:
+    def __init__(self, overhead_ms: float, per_message_ms: float, max_parallel: int) -> None:
+        self.overhead_s = overhead_ms / 1000.0
+        self.per_message_s = per_message_ms / 1000.0
+        self._slots = threading.Semaphore(max_parallel)
+        self.calls = 0
+
+    def _call(self, n_messages: int) -> None:
+        with self._slots:
+            self.calls += 1
+            time.sleep(self.overhead_s + self.per_message_s * n_messages)
+
+    def route_one(self, text: str) -> List[Dict[str, Any]]:
+        self._call(1)
+        return [{"service": "coaching", "command": "coach_response", "text": text}]
+
+    def route_many(self, texts: List[str]) -> List[Optional[List[Dict[str, Any]]]]:
+        self._call(len(texts))
+        return [
+            [{"service": "coaching", "command": "coach_response", "text": t}]
+            for t in texts
+        ]
+
+
+async def _run(concurrency: int, n_messages: int, batched: bool, args: argparse.Namespace) -> Dict[str, float]:
+    llm = FakeRouterLLM(args.overhead_ms, args.per_message_ms, args.max_parallel)
+    batcher = RouterBatcher(
+        llm.route_one,
+        llm.route_many,
+        window_ms=args.window_ms,
+        max_batch=args.max_batch,
+    )
+    queue: "asyncio.Queue[int]" = asyncio.Queue()
+    for i in range(n_messages):
+        queue.put_nowait(i)
+
+    async def worker() -> None:
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            text = f"message {i}"
+            if batched:
+                await batcher.route(text)
+            else:
+                await asyncio.to_thread(llm.route_one, text)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "throughput": n_messages / elapsed,
+        "llm_calls": float(llm.calls),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    print(
+        f"LLM simulé : {args.overhead_ms} ms/appel + {args.per_message_ms} ms/message, "
+        f"{args.max_parallel} appels simultanés max ; fenêtre {args.window_ms} ms, "
+        f"lots de {args.max_batch} max."
+    )
+    print(f"{'concurrence':>11} | {'unitaire msg/s':>14} | {'par lots msg/s':>14} | {'appels LLM':>10} | {'gain':>6}")
+    for concurrency in args.concurrency:
+        single = await _run(concurrency, args.messages, False, args)
+        batched = await _run(concurrency, args.messages, True, args)
+        print(
+            f"{concurrency:>11} | {single['throughput']:>14.1f} | {batched['throughput']:>14.1f} | "
+            f"{int(single['llm_calls']):>4} -> {int(batched['llm_calls']):<4} | "
+            f"x{batched['throughput'] / single['throughput']:.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du micro-batching du routeur.")
+    parser.add_argument("--messages", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--overhead-ms", type=float, default=80.0)
+    parser.add_argument("--per-message-ms", type=float, default=4.0)
+    parser.add_argument("--max-parallel", type=int, default=4)
+    parser.add_argument("--window-ms", type=float, default=20.0)
+    parser.add_argument("--max-batch", type=int, default=8)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
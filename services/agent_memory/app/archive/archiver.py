@@ -0,0 +1,195 @@
+# services/agent_memory/app/archive/archiver.py
+
+"""
+Archivage des interactions plus anciennes que MEMORY_ARCHIVE_HOT_MONTHS
+mois : copie dans une partition froide par mois (cold_store.py), ajout
+au catalogue, puis suppression de la table chaude par lots. Cet ordre
+rend le job rejouable ; un archiveur par shard.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Set
+
+from app.archive.cold_store import ColdStore, PartitionWriter, cold_store
+from app.cache.hot_history import hot_history
+from app.changes.feed import change_feed
+from app.db.shards import shard_router
+from app.repositories.partitions import (
+    delete_archived_rows,
+    max_interaction_id,
+    rows_to_archive,
+    upsert_partition,
+)
+from app.retrieval.vector_index import VectorIndex, vector_index
+
+MEMORY_ARCHIVE_HOT_MONTHS = int(os.getenv("MEMORY_ARCHIVE_HOT_MONTHS", "6"))
+# Période du job en secondes (0 = pas de job périodique, POST /archive/run seulement)
+MEMORY_ARCHIVE_INTERVAL_S = float(os.getenv("MEMORY_ARCHIVE_INTERVAL_S", "86400"))
+MEMORY_ARCHIVE_BATCH = int(os.getenv("MEMORY_ARCHIVE_BATCH", "5000"))
+
+
+def archive_cutoff(now: datetime, hot_months: int) -> datetime:
+    """
+    Premier jour du plus ancien mois gardé chaud : le mois courant et les
+    hot_months - 1 précédents restent dans la table.
+    """
+    index = now.year * 12 + now.month - 1 - max(1, hot_months) + 1
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+class Archiver:
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        store: ColdStore = cold_store,
+        index: VectorIndex = vector_index,
+        hot_months: int = MEMORY_ARCHIVE_HOT_MONTHS,
+        interval_s: float = MEMORY_ARCHIVE_INTERVAL_S,
+        batch: int = MEMORY_ARCHIVE_BATCH,
+        shard: int = 0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.shard = shard
+        self.store = store
+        self.index = index
+        self.hot_months = max(1, hot_months)
+        self.interval_s = interval_s
+        self.batch = max(1, batch)
+        self._lock = asyncio.Lock()
+        self._task: Optional["asyncio.Task[None]"] = None
+
+        self.runs = 0
+        self.rows_archived = 0
+        self.errors = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Archive tout ce qui est antérieur au seuil (un seul passage sur la
+        table, par id croissant). Renvoie un compte rendu.
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            cutoff = archive_cutoff(now or datetime.utcnow(), self.hot_months)
+            writers: Dict[str, PartitionWriter] = {}
+            users: Set[str] = set()
+            copied = deleted = 0
+            try:
+                async with self.session_factory() as db:
+                    guard = await db.run_sync(max_interaction_id)
+
+                    # 1) Copie vers les fichiers froids
+                    after_id = 0
+                    while True:
+                        rows, last_id = await db.run_sync(
+                            rows_to_archive,
+                            cutoff=cutoff,
+                            after_id=after_id,
+                            below_id=guard,
+                            limit=self.batch,
+                        )
+                        if last_id is None:
+                            break
+                        by_month: Dict[str, list] = {}
+                        for row in rows:
+                            by_month.setdefault(row["created_at"].strftime("%Y-%m"), []).append(row)
+                        for month, month_rows in by_month.items():
+                            if month not in writers:
+                                writers[month] = await asyncio.to_thread(
+                                    self.store.writer, month, self.shard
+                                )
+                            await asyncio.to_thread(writers[month].add, month_rows)
+                        users.update(row["user_id"] for row in rows)
+                        copied += len(rows)
+                        after_id = last_id
+
+                    # 2) Fichiers compressés puis catalogue
+                    for month in sorted(writers):
+                        info = await asyncio.to_thread(writers.pop(month).finish)
+                        await db.run_sync(upsert_partition, month, **info)
+
+                    # 3) Index vectoriel à jour avant que les lignes ne disparaissent
+                    for user_id in sorted(users):
+                        await self.index.sync_user(db, user_id)
+
+                    # 4) Purge de la table chaude (seulement ce qui a été copié)
+                    if copied:
+                        after_id = 0
+                        while True:
+                            count, last_id = await db.run_sync(
+                                delete_archived_rows,
+                                cutoff=cutoff,
+                                after_id=after_id,
+                                up_to_id=guard - 1,
+                                limit=self.batch,
+                            )
+                            if last_id is None:
+                                break
+                            deleted += count
+                            after_id = last_id
+            except Exception:
+                self.errors += 1
+                for writer in writers.values():
+                    await asyncio.to_thread(writer.abort)
+                raise
+
+            if deleted:
+                # Les historiques "complets" en cache ne le sont plus
+                hot_history.clear()
+                for user_id in sorted(users):
+                    change_feed.publish(
+                        "archived", user_id, shard=self.shard, cutoff=cutoff.isoformat()
+                    )
+            self.runs += 1
+            self.rows_archived += deleted
+            self.last_run = {
+                "cutoff": cutoff.isoformat(),
+                "rows_copied": copied,
+                "rows_deleted": deleted,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+            return self.last_run
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                report = await self.run_once()
+                if report["rows_deleted"]:
+                    print(f"[AGENT_MEMORY] archivage (shard {self.shard}) :", report, flush=True)
+            except Exception as e:
+                print(f"[AGENT_MEMORY] échec de l'archivage (shard {self.shard}) :", repr(e), flush=True)
+
+    def start(self) -> None:
+        if self.interval_s > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "shard": self.shard,
+            "hot_months": self.hot_months,
+            "interval_s": self.interval_s,
+            "runs": self.runs,
+            "rows_archived": self.rows_archived,
+            "errors": self.errors,
+            "last_run": self.last_run,
+            "cold_store": self.store.stats(),
+        }
+
+
+archivers = [
+    Archiver(lambda shard=shard: shard_router.session_for(shard), shard=shard)
+    for shard in range(shard_router.count)
+]
@@ -0,0 +1,337 @@
+# services/agent_memory/app/archive/cold_store.py
+
+"""
+Partitions froides : une base SQLite gzip par mois (et par shard), avec
+le même index d'historique que la table chaude, décompressée à la
+demande dans MEMORY_ARCHIVE_DIR/.cache (LRU, MEMORY_ARCHIVE_CACHE_FILES).
+Méthodes synchrones : à appeler via asyncio.to_thread().
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from app.repositories.interactions import HISTORY_FIELDS, decode_cursor, encode_cursor
+
+MEMORY_ARCHIVE_DIR = os.getenv("MEMORY_ARCHIVE_DIR", "./archive")
+MEMORY_ARCHIVE_CACHE_FILES = int(os.getenv("MEMORY_ARCHIVE_CACHE_FILES", "4"))
+MEMORY_ARCHIVE_COMPRESSLEVEL = int(os.getenv("MEMORY_ARCHIVE_COMPRESSLEVEL", "6"))
+
+# Même format de date que SQLAlchemy pour les DateTime SQLite : l'ordre
+# des chaînes est l'ordre chronologique.
+_DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS interactions (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        text TEXT NOT NULL,
+        metadata TEXT,
+        created_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_interactions_user_created_id
+    ON interactions (user_id, created_at DESC, id DESC)
+    """,
+]
+
+
+def _format_date(value: datetime) -> str:
+    return value.strftime(_DATE_FORMAT)
+
+
+class PartitionWriter:
+    """
+    Construit (ou complète) le fichier froid d'un mois. Les lignes déjà
+    présentes (même id) sont ignorées : relancer un archivage interrompu
+    ne crée pas de doublons.
+    """
+
+    def __init__(self, store: "ColdStore", month: str, shard: int = 0) -> None:
+        self.store = store
+        self.month = month
+        self.path = store.partition_path(month, shard)
+        self._tmp = self.path + ".build"
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+        if os.path.exists(self.path):
+            # Partition existante (archivage complémentaire) : on repart d'elle
+            with gzip.open(self.path, "rb") as src, open(self._tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        # Utilisée depuis les threads de asyncio.to_thread(), un appel à la fois
+        self._conn = sqlite3.connect(self._tmp, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> None:
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO interactions (id, user_id, role, text, metadata, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    row["id"],
+                    row["user_id"],
+                    row["role"],
+                    row["text"],
+                    json.dumps(row["metadata"], ensure_ascii=False)
+                    if row.get("metadata") is not None
+                    else None,
+                    _format_date(row["created_at"]),
+                )
+                for row in rows
+            ],
+        )
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Compresse le fichier et le met en place (remplacement atomique).
+        Renvoie les informations du catalogue.
+        """
+        self._conn.commit()
+        info = self._conn.execute(
+            "SELECT count(*), min(id), max(id), min(created_at), max(created_at) FROM interactions"
+        ).fetchone()
+        self._conn.execute("VACUUM")
+        self._conn.close()
+
+        bytes_raw = os.path.getsize(self._tmp)
+        compressed_tmp = self.path + ".tmp"
+        with open(self._tmp, "rb") as src, gzip.open(
+            compressed_tmp, "wb", compresslevel=MEMORY_ARCHIVE_COMPRESSLEVEL
+        ) as dst:
+            shutil.copyfileobj(src, dst, length=1024 * 1024)
+        with open(compressed_tmp, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(compressed_tmp, self.path)
+        os.remove(self._tmp)
+        self.store.forget(self.path)
+
+        return {
+            "path": self.path,
+            "rows": info[0],
+            "min_id": info[1],
+            "max_id": info[2],
+            "min_created_at": datetime.fromisoformat(info[3]),
+            "max_created_at": datetime.fromisoformat(info[4]),
+            "bytes_raw": bytes_raw,
+            "bytes_compressed": os.path.getsize(self.path),
+        }
+
+    def abort(self) -> None:
+        try:
+            self._conn.close()
+        finally:
+            for path in (self._tmp, self.path + ".tmp"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class ColdStore:
+    def __init__(
+        self,
+        directory: str = MEMORY_ARCHIVE_DIR,
+        cache_files: int = MEMORY_ARCHIVE_CACHE_FILES,
+    ) -> None:
+        self.directory = directory
+        self.cache_dir = os.path.join(directory, ".cache")
+        self.cache_files = max(1, cache_files)
+        # partition (chemin .gz) -> chemin du fichier décompressé
+        self._open: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.decompressions = 0
+        self.cache_hits = 0
+        self.queries = 0
+
+    def partition_path(self, month: str, shard: int = 0) -> str:
+        directory = self.directory if shard == 0 else os.path.join(self.directory, f"shard{shard}")
+        return os.path.join(directory, f"interactions_{month.replace('-', '_')}.sqlite.gz")
+
+    def writer(self, month: str, shard: int = 0) -> PartitionWriter:
+        return PartitionWriter(self, month, shard)
+
+    # ------------------------------------------------------------------ #
+    # Décompression à la demande
+    # ------------------------------------------------------------------ #
+    def _connect(self, path: str) -> sqlite3.Connection:
+        with self._lock:
+            plain = self._open.get(path)
+            if plain is not None and os.path.exists(plain):
+                self._open.move_to_end(path)
+                self.cache_hits += 1
+            else:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # shard<n>/interactions_... -> shard<n>_interactions_... (même mois, shards différents)
+                name = os.path.relpath(path, self.directory).replace(os.sep, "_")
+                plain = os.path.join(self.cache_dir, name[: -len(".gz")])
+                tmp = plain + ".tmp"
+                with gzip.open(path, "rb") as src, open(tmp, "wb") as dst:
+                    shutil.copyfileobj(src, dst, length=1024 * 1024)
+                os.replace(tmp, plain)
+                self._open[path] = plain
+                self.decompressions += 1
+                while len(self._open) > self.cache_files:
+                    _, evicted = self._open.popitem(last=False)
+                    if os.path.exists(evicted):
+                        os.remove(evicted)
+            self.queries += 1
+        conn = sqlite3.connect(f"file:{plain}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def forget(self, path: str) -> None:
+        """
+        Oublie la copie décompressée d'une partition (réécrite).
+        """
+        with self._lock:
+            plain = self._open.pop(path, None)
+            if plain and os.path.exists(plain):
+                os.remove(plain)
+
+    # ------------------------------------------------------------------ #
+    # Lectures
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "user_id": row["user_id"],
+            "role": row["role"],
+            "text": row["text"],
+            "metadata": json.loads(row["metadata"]) if row["metadata"] else None,
+            "created_at": datetime.fromisoformat(row["created_at"]).isoformat(),
+        }
+
+    def history_page(
+        self,
+        partitions: Sequence[Any],
+        user_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        roles: Optional[Sequence[str]] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Suite de l'historique dans les partitions archivées (objets
+        ArchivePartition, du plus récent au plus ancien), même format que
+        get_history_page. Seules les partitions antérieures au curseur
+        sont ouvertes.
+
+        Lève ValueError si un champ ou le curseur est invalide.
+        """
+        wanted = list(fields) if fields else list(HISTORY_FIELDS)
+        unknown = [f for f in wanted if f not in HISTORY_FIELDS]
+        if unknown:
+            raise ValueError(f"Champs inconnus : {unknown} (autorisés : {sorted(HISTORY_FIELDS)})")
+
+        cursor = decode_cursor(before) if before else None
+        found: List[Dict[str, Any]] = []
+        for partition in partitions:
+            if len(found) > limit:
+                break
+            if cursor is not None and partition.min_created_at > cursor[0]:
+                continue
+            sql = "SELECT * FROM interactions WHERE user_id = ?"
+            params: List[Any] = [user_id]
+            if roles:
+                sql += f" AND role IN ({', '.join('?' for _ in roles)})"
+                params.extend(roles)
+            if cursor is not None:
+                c_at = _format_date(cursor[0])
+                sql += " AND created_at <= ? AND (created_at < ? OR (created_at = ? AND id < ?))"
+                params.extend([c_at, c_at, c_at, cursor[1]])
+            sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+            params.append(limit + 1 - len(found))
+
+            conn = self._connect(partition.path)
+            try:
+                found.extend(self._to_dict(row) for row in conn.execute(sql, params))
+            finally:
+                conn.close()
+
+        has_more = len(found) > limit
+        page = found[:limit]
+        next_cursor = prev_cursor = None
+        if page:
+            first, last = page[0], page[-1]
+            if has_more:
+                next_cursor = encode_cursor(datetime.fromisoformat(last["created_at"]), last["id"])
+            prev_cursor = encode_cursor(datetime.fromisoformat(first["created_at"]), first["id"])
+        return {
+            "items": [{f: item[f] for f in wanted} for item in page],
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }
+
+    def get_by_ids(self, partitions: Sequence[Any], ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Interactions archivées par id (seules les partitions dont la plage
+        d'ids contient un des ids demandés sont ouvertes).
+        """
+        found: Dict[int, Dict[str, Any]] = {}
+        for partition in partitions:
+            wanted = [i for i in ids if partition.min_id <= i <= partition.max_id and i not in found]
+            if not wanted:
+                continue
+            conn = self._connect(partition.path)
+            try:
+                rows = conn.execute(
+                    f"SELECT * FROM interactions WHERE id IN ({', '.join('?' for _ in wanted)})",
+                    wanted,
+                )
+                found.update((row["id"], self._to_dict(row)) for row in rows)
+            finally:
+                conn.close()
+        return found
+
+    def read_chunk(
+        self,
+        partition: Any,
+        after_id: int,
+        limit: int,
+        user_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Tranche d'une partition par id croissant (export NDJSON).
+        """
+        sql = "SELECT * FROM interactions WHERE id > ?"
+        params: List[Any] = [after_id]
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params.append(user_id)
+        if since is not None:
+            sql += " AND created_at >= ?"
+            params.append(_format_date(since))
+        sql += " ORDER BY id LIMIT ?"
+        params.append(limit)
+        conn = self._connect(partition.path)
+        try:
+            return [self._to_dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "decompressed_files": len(self._open),
+            "max_decompressed_files": self.cache_files,
+            "decompressions": self.decompressions,
+            "cache_hits": self.cache_hits,
+            "queries": self.queries,
+        }
+
+
+cold_store = ColdStore()
@@ -0,0 +1,317 @@
+# services/agent_memory/app/backup/snapshots.py
+
+"""
+Sauvegardes à chaud des bases SQLite de l'agent_memory avec l'API de
+sauvegarde en ligne, par pas de MEMORY_BACKUP_PAGES pages séparés de
+MEMORY_BACKUP_PAUSE_MS ; en WAL, une transaction de lecture fige
+l'instantané sans bloquer les écrivains. Copie écrite dans
+<instantané>.part puis renommée ; les partitions froides de son
+catalogue sont liées (ou copiées) dans <instantané>.archive/.
+MEMORY_BACKUP_KEEP instantanés gardés par base.
+
+    python -m app.backup.snapshots
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.db.session import MEMORY_DB_BUSY_TIMEOUT_MS
+from app.db.shards import ShardRouter, shard_router
+
+MEMORY_BACKUP_DIR = os.getenv("MEMORY_BACKUP_DIR", "./backups")
+MEMORY_BACKUP_KEEP = int(os.getenv("MEMORY_BACKUP_KEEP", "7"))
+MEMORY_BACKUP_INTERVAL_S = float(os.getenv("MEMORY_BACKUP_INTERVAL_S", "0"))
+MEMORY_BACKUP_PAGES = int(os.getenv("MEMORY_BACKUP_PAGES", "256"))
+MEMORY_BACKUP_PAUSE_MS = float(os.getenv("MEMORY_BACKUP_PAUSE_MS", "5"))
+MEMORY_BACKUP_MAX_RESTARTS = int(os.getenv("MEMORY_BACKUP_MAX_RESTARTS", "3"))
+
+# Horodatage des instantanés : l'ordre des noms est l'ordre chronologique
+_STAMP_FORMAT = "%Y%m%dT%H%M%S%fZ"
+
+
+class _SourceChanged(Exception):
+    """La base source a changé pendant une copie sans verrou."""
+
+
+def backup_database(
+    source: str,
+    target: str,
+    pages: int = MEMORY_BACKUP_PAGES,
+    pause_ms: float = MEMORY_BACKUP_PAUSE_MS,
+    max_restarts: int = MEMORY_BACKUP_MAX_RESTARTS,
+) -> Dict[str, Any]:
+    """
+    Copie cohérente de la base `source` vers le fichier `target`, base en
+    service. Synchrone (sqlite3) : à appeler via asyncio.to_thread().
+    """
+    started = time.perf_counter()
+    part = f"{target}.part"
+    if os.path.exists(part):
+        os.remove(part)
+
+    src = sqlite3.connect(source, isolation_level=None, timeout=MEMORY_DB_BUSY_TIMEOUT_MS / 1000)
+    dst = sqlite3.connect(part)
+    counters = {"steps": 0, "restarts": 0}
+    try:
+        wal = src.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        locked = wal
+        while True:
+            if locked:
+                # Instantané de lecture gardé pendant toute la copie
+                src.execute("BEGIN")
+                src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            step = pages if (wal or not locked) else -1
+            remaining: List[int] = []
+
+            def progress(status: int, left: int, total: int) -> None:
+                counters["steps"] += 1
+                if not locked and remaining and left > remaining[-1]:
+                    raise _SourceChanged()
+                remaining.append(left)
+                if pause_ms > 0 and left > 0:
+                    time.sleep(pause_ms / 1000.0)
+
+            try:
+                src.backup(dst, pages=step, progress=progress)
+                break
+            except _SourceChanged:
+                counters["restarts"] += 1
+                locked = counters["restarts"] >= max_restarts
+            finally:
+                if src.in_transaction:
+                    src.execute("COMMIT")
+
+        page_count = dst.execute("PRAGMA page_count").fetchone()[0]
+        # Instantané autonome : un seul fichier, sans -wal à côté
+        dst.execute("PRAGMA journal_mode=DELETE")
+    except Exception:
+        dst.close()
+        os.remove(part)
+        raise
+    finally:
+        dst.close()
+        src.close()
+    os.replace(part, target)
+
+    return {
+        "source": source,
+        "path": target,
+        "bytes": os.path.getsize(target),
+        "pages": page_count,
+        "steps": counters["steps"],
+        "restarts": counters["restarts"],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def snapshot_path(directory: str, label: str, now: datetime) -> str:
+    return os.path.join(directory, f"{label}-{now.strftime(_STAMP_FORMAT)}.db")
+
+
+def archive_dir(snapshot: str) -> str:
+    return os.path.splitext(snapshot)[0] + ".archive"
+
+
+def snapshot_archives(snapshot: str) -> Dict[str, Any]:
+    """
+    Partitions froides du catalogue de l'instantané (leurs lignes ne sont
+    plus dans la table chaude), liées dans archive_dir(snapshot) : un
+    fichier froid n'est jamais modifié en place (os.replace), le lien garde
+    donc la version cataloguée. Copie si le lien est impossible.
+    """
+    conn = sqlite3.connect(f"file:{snapshot}?mode=ro", uri=True)
+    try:
+        paths = [row[0] for row in conn.execute("SELECT path FROM archive_partitions")]
+    except sqlite3.OperationalError:
+        paths = []
+    finally:
+        conn.close()
+
+    target_dir = archive_dir(snapshot)
+    linked: List[str] = []
+    missing: List[str] = []
+    for path in paths:
+        if not os.path.exists(path):
+            missing.append(path)
+            continue
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, os.path.basename(path))
+        try:
+            os.link(path, target)
+        except OSError:
+            shutil.copy2(path, target)
+        linked.append(target)
+    return {"archive_dir": target_dir if linked else None, "archives": linked, "missing": missing}
+
+
+def list_snapshots(directory: str, label: str) -> List[str]:
+    """
+    Instantanés complets d'une base, du plus ancien au plus récent.
+    """
+    if not os.path.isdir(directory):
+        return []
+    pattern = re.compile(re.escape(label) + r"-\d{8}T\d{12}Z\.db")
+    names = [name for name in os.listdir(directory) if pattern.fullmatch(name)]
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+
+def prune_snapshots(directory: str, label: str, keep: int) -> List[str]:
+    """
+    Supprime les instantanés les plus anciens au-delà de `keep`, avec
+    leurs partitions froides.
+    """
+    snapshots = list_snapshots(directory, label)
+    removed = snapshots[: max(0, len(snapshots) - max(1, keep))]
+    for path in removed:
+        os.remove(path)
+        shutil.rmtree(archive_dir(path), ignore_errors=True)
+    return removed
+
+
+def database_files(router: ShardRouter) -> Dict[str, str]:
+    """
+    Fichiers SQLite des shards, par nom d'instantané (nom du fichier).
+    """
+    files: Dict[str, str] = {}
+    for engine in router.engines:
+        database = engine.url.database
+        if database and database != ":memory:":
+            files[Path(database).stem] = str(Path(database).resolve())
+    return files
+
+
+class BackupManager:
+    def __init__(
+        self,
+        sources: Dict[str, str],
+        directory: str = MEMORY_BACKUP_DIR,
+        keep: int = MEMORY_BACKUP_KEEP,
+        interval_s: float = MEMORY_BACKUP_INTERVAL_S,
+        pages: int = MEMORY_BACKUP_PAGES,
+        pause_ms: float = MEMORY_BACKUP_PAUSE_MS,
+    ) -> None:
+        self.sources = dict(sources)
+        self.directory = directory
+        self.keep = max(1, keep)
+        self.interval_s = interval_s
+        self.pages = pages
+        self.pause_ms = pause_ms
+        self._lock = asyncio.Lock()
+        self._task: Optional["asyncio.Task[None]"] = None
+
+        self.runs = 0
+        self.errors = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Un instantané de chaque base, puis application de la rétention.
+        Renvoie un compte rendu.
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            now = now or datetime.utcnow()
+            await asyncio.to_thread(os.makedirs, self.directory, exist_ok=True)
+            snapshots: Dict[str, Any] = {}
+            pruned: List[str] = []
+            try:
+                for label, source in sorted(self.sources.items()):
+                    snapshots[label] = await asyncio.to_thread(
+                        backup_database,
+                        source,
+                        snapshot_path(self.directory, label, now),
+                        pages=self.pages,
+                        pause_ms=self.pause_ms,
+                    )
+                    snapshots[label].update(
+                        await asyncio.to_thread(snapshot_archives, snapshots[label]["path"])
+                    )
+                    pruned += await asyncio.to_thread(
+                        prune_snapshots, self.directory, label, self.keep
+                    )
+            except Exception:
+                self.errors += 1
+                raise
+
+            self.runs += 1
+            self.last_run = {
+                "at": now.isoformat(),
+                "snapshots": snapshots,
+                "pruned": pruned,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+            return self.last_run
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                report = await self.run_once()
+                print(
+                    "[AGENT_MEMORY] sauvegarde :",
+                    {label: s["path"] for label, s in report["snapshots"].items()},
+                    flush=True,
+                )
+            except Exception as e:
+                print("[AGENT_MEMORY] échec de la sauvegarde :", repr(e), flush=True)
+
+    def start(self) -> None:
+        if self.interval_s > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "keep": self.keep,
+            "interval_s": self.interval_s,
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_run": self.last_run,
+            "snapshots": {
+                label: [os.path.basename(p) for p in list_snapshots(self.directory, label)]
+                for label in sorted(self.sources)
+            },
+        }
+
+
+backups = BackupManager(database_files(shard_router))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dest", default=MEMORY_BACKUP_DIR)
+    parser.add_argument("--keep", type=int, default=MEMORY_BACKUP_KEEP)
+    parser.add_argument("--pages", type=int, default=MEMORY_BACKUP_PAGES)
+    parser.add_argument("--pause-ms", type=float, default=MEMORY_BACKUP_PAUSE_MS)
+    args = parser.parse_args()
+
+    manager = BackupManager(
+        database_files(shard_router),
+        directory=args.dest,
+        keep=args.keep,
+        pages=args.pages,
+        pause_ms=args.pause_ms,
+    )
+    report = asyncio.run(manager.run_once())
+    print("[AGENT_MEMORY] sauvegarde :", report, flush=True)
+
+
+if __name__ == "__main__":
+    main()
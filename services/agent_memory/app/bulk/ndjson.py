@@ -0,0 +1,255 @@
+# services/agent_memory/app/bulk/ndjson.py
+
+"""
+Export / import en masse des interactions en NDJSON, en mémoire
+constante : export par tranches keyset de MEMORY_EXPORT_CHUNK lignes,
+import au fil de l'eau par lots de MEMORY_IMPORT_BATCH. Avec plusieurs
+shards, chaque ligne est rangée dans le shard de son utilisateur.
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from app.archive.cold_store import ColdStore, cold_store
+from app.cache.hot_history import hot_history
+from app.changes.feed import change_feed
+from app.db.shards import ShardRouter
+from app.repositories.interactions import get_interactions_chunk, insert_interactions_bulk
+from app.repositories.partitions import list_partitions
+from app.retrieval.vector_index import vector_index
+
+MEMORY_EXPORT_CHUNK = int(os.getenv("MEMORY_EXPORT_CHUNK", "2000"))
+MEMORY_IMPORT_BATCH = int(os.getenv("MEMORY_IMPORT_BATCH", "2000"))
+MEMORY_IMPORT_MAX_LINE_BYTES = int(os.getenv("MEMORY_IMPORT_MAX_LINE_BYTES", str(1024 * 1024)))
+
+# Nombre maximal de lignes rejetées détaillées dans la réponse d'import
+_MAX_REPORTED_ERRORS = 20
+
+
+def _encode(rows: List[Dict[str, Any]]) -> bytes:
+    lines = []
+    for row in rows:
+        created_at = row["created_at"]
+        if isinstance(created_at, datetime):
+            row = {**row, "created_at": created_at.isoformat()}
+        lines.append(json.dumps(row, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def export_interactions(
+    shards: ShardRouter,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    include_archived: bool = False,
+    chunk: int = MEMORY_EXPORT_CHUNK,
+    store: ColdStore = cold_store,
+) -> AsyncIterator[bytes]:
+    """
+    Flux NDJSON des interactions (toute la base, ou un utilisateur), shard
+    par shard.
+    """
+    chunk = max(1, chunk)
+    targets = [shards.shard_of(user_id)] if user_id is not None else range(shards.count)
+    for shard in targets:
+        async for data in _export_shard(
+            partial(shards.session_for, shard), user_id, since, include_archived, chunk, store
+        ):
+            yield data
+
+
+async def _export_shard(
+    session_factory: Callable[[], Any],
+    user_id: Optional[str],
+    since: Optional[datetime],
+    include_archived: bool,
+    chunk: int,
+    store: ColdStore,
+) -> AsyncIterator[bytes]:
+    """
+    Interactions d'un shard : partitions archivées d'abord si
+    include_archived (du mois le plus ancien au plus récent), puis table
+    chaude.
+    """
+    if include_archived:
+        async with session_factory() as db:
+            partitions = await db.run_sync(list_partitions)
+        for partition in reversed(partitions):
+            if since is not None and partition.max_created_at < since:
+                continue
+            after_id = 0
+            while True:
+                rows = await asyncio.to_thread(
+                    store.read_chunk, partition, after_id, chunk, user_id, since
+                )
+                if rows:
+                    yield _encode(rows)
+                    after_id = rows[-1]["id"]
+                if len(rows) < chunk:
+                    break
+
+    after_id, after = 0, None
+    while True:
+        async with session_factory() as db:
+            rows = await db.run_sync(
+                get_interactions_chunk,
+                limit=chunk,
+                after=after,
+                after_id=after_id,
+                user_id=user_id,
+                since=since,
+            )
+        if rows:
+            after_id = rows[-1]["id"]
+            after = (rows[-1]["created_at"], rows[-1]["id"])
+            yield _encode(rows)
+        if len(rows) < chunk:
+            return
+
+
+async def _iter_lines(body: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[Optional[bytes]]:
+    """
+    Lignes d'un flux d'octets. None pour une ligne de plus de max_bytes,
+    abandonnée au fil de l'eau au lieu d'être gardée en mémoire.
+    """
+    buffer = b""
+    oversized = False
+    async for data in body:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            if oversized:
+                # Fin de la ligne démesurée
+                oversized = False
+                yield None
+            else:
+                yield raw
+        if len(buffer) > max_bytes:
+            oversized = True
+            buffer = b""
+    if oversized:
+        yield None
+    elif buffer:
+        yield buffer
+
+
+def parse_line(raw: bytes, keep_ids: bool) -> Dict[str, Any]:
+    """
+    Ligne NDJSON -> ligne à insérer. Lève ValueError si elle est invalide.
+    """
+    try:
+        item = json.loads(raw)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"JSON invalide : {e}") from e
+    if not isinstance(item, dict):
+        raise ValueError("chaque ligne doit être un objet JSON")
+    if not item.get("user_id") or not item.get("text"):
+        raise ValueError("user_id et text sont obligatoires")
+    metadata = item.get("metadata")
+    if metadata is not None and not isinstance(metadata, dict):
+        raise ValueError("metadata doit être un objet")
+    try:
+        created_at = (
+            datetime.fromisoformat(item["created_at"]) if item.get("created_at") else datetime.utcnow()
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"created_at invalide : {item.get('created_at')!r}") from e
+    if created_at.tzinfo is not None:
+        # La base stocke des dates UTC naïves
+        created_at = created_at.replace(tzinfo=None) - created_at.utcoffset()
+
+    row = {
+        "user_id": str(item["user_id"]),
+        "role": str(item.get("role") or "user"),
+        "text": str(item["text"]),
+        "metadata": metadata or {},
+        "created_at": created_at,
+    }
+    if keep_ids:
+        if not isinstance(item.get("id"), int) or item["id"] <= 0:
+            raise ValueError("keep_ids : id entier positif obligatoire")
+        row["id"] = item["id"]
+    return row
+
+
+async def import_interactions(
+    shards: ShardRouter,
+    body: AsyncIterator[bytes],
+    keep_ids: bool = False,
+    batch: int = MEMORY_IMPORT_BATCH,
+) -> Dict[str, Any]:
+    """
+    Importe un flux NDJSON. Les lignes invalides sont comptées et
+    ignorées (les 20 premières sont détaillées), les autres insérées par
+    lots. keep_ids=True conserve les ids du fichier et ignore ceux qui
+    existent déjà : réimporter le même export ne crée pas de doublons.
+    Chaque lot est réparti entre les shards (insertions en parallèle).
+    """
+    batch = max(1, batch)
+    pending: List[Dict[str, Any]] = []
+    users: Set[str] = set()
+    errors: List[Dict[str, Any]] = []
+    counts = {"lines": 0, "imported": 0, "skipped": 0, "rejected": 0}
+
+    def reject(line_no: int, message: str) -> None:
+        counts["rejected"] += 1
+        if len(errors) < _MAX_REPORTED_ERRORS:
+            errors.append({"line": line_no, "error": message})
+
+    async def insert(shard: int, rows: List[Dict[str, Any]]) -> None:
+        async with shards.session_for(shard) as db:
+            inserted = await db.run_sync(insert_interactions_bulk, rows=rows, keep_ids=keep_ids)
+        counts["imported"] += inserted
+        counts["skipped"] += len(rows) - inserted
+
+    async def flush(rows: List[Dict[str, Any]]) -> None:
+        by_shard = shards.split(rows, lambda row: row["user_id"])
+        await asyncio.gather(
+            *(insert(shard, [rows[i] for i in positions]) for shard, positions in by_shard.items())
+        )
+
+    # Un lot s'insère (thread SQLite) pendant qu'on lit et valide le suivant
+    in_flight: Optional["asyncio.Task[None]"] = None
+    try:
+        async for raw in _iter_lines(body, MEMORY_IMPORT_MAX_LINE_BYTES):
+            counts["lines"] += 1
+            if raw is None:
+                reject(counts["lines"], "ligne trop longue")
+                continue
+            if not raw.strip():
+                continue
+            try:
+                row = parse_line(raw, keep_ids)
+            except ValueError as e:
+                reject(counts["lines"], str(e))
+                continue
+            pending.append(row)
+            users.add(row["user_id"])
+            if len(pending) >= batch:
+                if in_flight is not None:
+                    await in_flight
+                in_flight = asyncio.create_task(flush(pending))
+                pending = []
+        if in_flight is not None:
+            await in_flight
+            in_flight = None
+        if pending:
+            await flush(pending)
+    finally:
+        if in_flight is not None:
+            in_flight.cancel()
+
+    if counts["imported"]:
+        # Historiques en cache périmés. Les lignes importées peuvent être
+        # plus anciennes que la fenêtre de rattrapage de l'index vectoriel :
+        # il est reconstruit à la prochaine recherche.
+        for user_id in users:
+            hot_history.invalidate(user_id)
+        for user_id in sorted(users):
+            change_feed.publish("imported", user_id)
+            await asyncio.to_thread(vector_index.forget_user, user_id)
+
+    return {"status": "ok", **counts, "errors": errors}
@@ -0,0 +1,275 @@
+# services/agent_memory/app/cache/hot_history.py
+
+"""
+Cache en mémoire des MEMORY_HOT_HISTORY_DEPTH dernières interactions de
+chaque utilisateur actif : sert les premières pages d'historique, tenu à
+jour après chaque commit (write-through), évincé par LRU au-delà de
+MEMORY_HOT_HISTORY_MAX_BYTES. Propre au processus (un seul worker).
+"""
+
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.repositories.interactions import HISTORY_FIELDS, encode_cursor
+
+MEMORY_HOT_HISTORY_ENABLED = os.getenv("MEMORY_HOT_HISTORY_ENABLED", "1") == "1"
+MEMORY_HOT_HISTORY_DEPTH = int(os.getenv("MEMORY_HOT_HISTORY_DEPTH", "20"))
+MEMORY_HOT_HISTORY_MAX_BYTES = int(
+    os.getenv("MEMORY_HOT_HISTORY_MAX_BYTES", str(16 * 1024 * 1024))
+)
+
+# (id, role, text, metadata, created_at)
+Entry = Tuple[int, str, str, Optional[Dict[str, Any]], datetime]
+
+# Surcoût approximatif d'un tuple et de ses objets Python (octets).
+_ENTRY_OVERHEAD = 200
+
+
+def _entry_size(entry: Entry) -> int:
+    metadata = entry[3]
+    return (
+        _ENTRY_OVERHEAD
+        + len(entry[2])
+        + (len(json.dumps(metadata, ensure_ascii=False)) if metadata else 0)
+    )
+
+
+def _order_key(entry: Entry) -> Tuple[float, int]:
+    # Même ordre que l'index : created_at décroissant, puis id décroissant
+    return (-entry[4].timestamp(), -entry[0])
+
+
+class _UserHistory:
+    __slots__ = ("entries", "complete", "size")
+
+    def __init__(self, entries: List[Entry], complete: bool) -> None:
+        self.entries = entries
+        # True si l'utilisateur n'a aucune interaction plus ancienne que
+        # celles du cache (historique entièrement en mémoire).
+        self.complete = complete
+        self.size = sum(_entry_size(e) for e in entries)
+
+
+class HotHistoryCache:
+    def __init__(
+        self,
+        depth: int = MEMORY_HOT_HISTORY_DEPTH,
+        max_bytes: int = MEMORY_HOT_HISTORY_MAX_BYTES,
+        enabled: bool = MEMORY_HOT_HISTORY_ENABLED,
+    ) -> None:
+        self.depth = max(1, depth)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self._users: "OrderedDict[str, _UserHistory]" = OrderedDict()
+        self._bytes = 0
+        # Numéro de la dernière écriture (write-through ou invalidation) et,
+        # pour les utilisateurs en cours de chargement depuis la base, le
+        # numéro de leur dernière écriture : un chargement commencé avant
+        # est périmé et n'est pas mis en cache.
+        self._seq = 0
+        self._loading: Dict[str, int] = {}
+        self._written_at: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------ #
+    # Lecture
+    # ------------------------------------------------------------------ #
+    def get_page(
+        self,
+        user_id: str,
+        limit: int,
+        roles: Optional[Sequence[str]] = None,
+        fields: Optional[Sequence[str]] = None,
+        record: bool = True,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Première page d'historique (même format que get_history_page),
+        ou None si le cache ne peut pas y répondre.
+
+        record=False : relecture juste après un remplissage, non comptée
+        dans les statistiques (le miss l'a déjà été).
+        """
+        if not self.enabled:
+            return None
+        wanted = list(fields) if fields else list(HISTORY_FIELDS)
+        unknown = [f for f in wanted if f not in HISTORY_FIELDS]
+        if unknown:
+            raise ValueError(
+                f"Champs inconnus : {unknown} (autorisés : {sorted(HISTORY_FIELDS)})"
+            )
+        if limit > self.depth:
+            self.bypassed += record
+            return None
+
+        cached = self._users.get(user_id)
+        if cached is None:
+            self.misses += record
+            return None
+
+        entries = cached.entries
+        if roles:
+            entries = [e for e in entries if e[1] in roles]
+        if len(entries) < limit and not cached.complete:
+            # Pas assez d'éléments en mémoire pour ce filtre
+            self.misses += record
+            return None
+
+        self.hits += record
+        self._users.move_to_end(user_id)
+
+        page = entries[:limit]
+        has_more = len(entries) > limit or not cached.complete
+        items = [self._to_dict(user_id, e, wanted) for e in page]
+        return {
+            "items": items,
+            "next_cursor": (
+                encode_cursor(page[-1][4], page[-1][0]) if page and has_more else None
+            ),
+            "prev_cursor": encode_cursor(page[0][4], page[0][0]) if page else None,
+        }
+
+    @staticmethod
+    def _to_dict(user_id: str, entry: Entry, fields: Iterable[str]) -> Dict[str, Any]:
+        full = {
+            "id": entry[0],
+            "user_id": user_id,
+            "role": entry[1],
+            "text": entry[2],
+            "metadata": entry[3],
+            "created_at": entry[4].isoformat(),
+        }
+        return {f: full[f] for f in fields}
+
+    # ------------------------------------------------------------------ #
+    # Remplissage après lecture en base
+    # ------------------------------------------------------------------ #
+    def is_cached(self, user_id: str) -> bool:
+        return user_id in self._users
+
+    def begin_load(self, user_id: str) -> int:
+        """
+        À appeler AVANT de lire la base pour remplir le cache. Le jeton
+        renvoyé est à passer à fill() : une écriture concurrente pour cet
+        utilisateur rendra le chargement périmé.
+        """
+        self._loading[user_id] = self._loading.get(user_id, 0) + 1
+        return self._seq
+
+    def fill(self, user_id: str, rows: Sequence[Any], requested: int, token: int) -> None:
+        """
+        Remplit le cache avec les `requested` dernières interactions lues
+        en base (objets Interaction ou dicts sérialisés).
+        """
+        stale = self._written_at.get(user_id, -1) > token
+        self.abort_load(user_id)
+        if not self.enabled or stale or user_id in self._users:
+            return
+        entries = [self._entry(row) for row in rows[: self.depth]]
+        self._store(user_id, _UserHistory(entries, complete=len(rows) < requested))
+
+    def abort_load(self, user_id: str) -> None:
+        """
+        Termine un chargement (sans remplir le cache si appelé seul).
+        """
+        remaining = self._loading.get(user_id, 1) - 1
+        if remaining > 0:
+            self._loading[user_id] = remaining
+        else:
+            self._loading.pop(user_id, None)
+            self._written_at.pop(user_id, None)
+
+    @staticmethod
+    def _entry(row: Any) -> Entry:
+        if isinstance(row, dict):
+            created_at = row["created_at"]
+            if isinstance(created_at, str):
+                created_at = datetime.fromisoformat(created_at)
+            return (row["id"], row["role"], row["text"], row.get("metadata"), created_at)
+        return (row.id, row.role, row.text, row.metadata_json, row.created_at)
+
+    # ------------------------------------------------------------------ #
+    # Write-through
+    # ------------------------------------------------------------------ #
+    def record_writes(self, items: Sequence[Dict[str, Any]], ids: Sequence[int]) -> None:
+        """
+        Ajoute des interactions fraîchement validées (dicts user_id, role,
+        text, metadata, created_at) aux utilisateurs présents en cache.
+        """
+        if not self.enabled:
+            return
+        for item, interaction_id in zip(items, ids):
+            user_id = item["user_id"]
+            self._mark_written(user_id)
+            cached = self._users.get(user_id)
+            if cached is None or any(e[0] == interaction_id for e in cached.entries):
+                continue
+            entry: Entry = (
+                interaction_id,
+                item.get("role") or "user",
+                item["text"],
+                item.get("metadata") or {},
+                item["created_at"],
+            )
+            entries = sorted([entry, *cached.entries], key=_order_key)
+            if len(entries) > self.depth:
+                entries = entries[: self.depth]
+                complete = False
+            else:
+                complete = cached.complete
+            self._bytes -= cached.size
+            del self._users[user_id]
+            self._store(user_id, _UserHistory(entries, complete))
+
+    def invalidate(self, user_id: str) -> None:
+        cached = self._users.pop(user_id, None)
+        if cached is not None:
+            self._bytes -= cached.size
+        self._mark_written(user_id)
+
+    def clear(self) -> None:
+        self._users.clear()
+        self._bytes = 0
+        for user_id in list(self._loading):
+            self._mark_written(user_id)
+
+    def _mark_written(self, user_id: str) -> None:
+        self._seq += 1
+        if user_id in self._loading:
+            self._written_at[user_id] = self._seq
+
+    def _store(self, user_id: str, history: _UserHistory) -> None:
+        self._users[user_id] = history
+        self._bytes += history.size
+        while self._bytes > self.max_bytes and len(self._users) > 1:
+            _, evicted = self._users.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    # ------------------------------------------------------------------ #
+    # Statistiques
+    # ------------------------------------------------------------------ #
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "depth": self.depth,
+            "users": len(self._users),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+hot_history = HotHistoryCache()
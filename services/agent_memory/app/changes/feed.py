@@ -0,0 +1,210 @@
+# services/agent_memory/app/changes/feed.py
+
+"""
+Flux de changements de l'agent_memory pour invalider les caches
+clients : événements numérotés ("interactions", "summary", "archived",
+"imported") gardés dans un tampon de MEMORY_CHANGES_BUFFER, lus depuis
+un curseur en long-poll (GET /changes) ou en SSE (GET /changes/stream).
+Un curseur sorti du tampon reçoit reset=true.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence, Set
+
+MEMORY_CHANGES_BUFFER = int(os.getenv("MEMORY_CHANGES_BUFFER", "10000"))
+MEMORY_CHANGES_MAX_WAIT_S = float(os.getenv("MEMORY_CHANGES_MAX_WAIT_S", "30"))
+# Commentaire SSE envoyé sans événement : garde la connexion ouverte
+# (proxys) et détecte les clients partis.
+MEMORY_CHANGES_HEARTBEAT_S = float(os.getenv("MEMORY_CHANGES_HEARTBEAT_S", "15"))
+
+
+def _matches(event: Dict[str, Any], user_id: Optional[str], service: Optional[str]) -> bool:
+    if user_id is not None and event["user_id"] != user_id:
+        return False
+    if service is not None and service not in event.get("services", ()):
+        return False
+    return True
+
+
+class ChangeFeed:
+    def __init__(self, capacity: int = MEMORY_CHANGES_BUFFER, start: Optional[int] = None) -> None:
+        self.capacity = max(1, capacity)
+        # Dernière séquence attribuée (0 événement : le tampon commence après)
+        self.seq = start if start is not None else time.time_ns() // 1000
+        self._first_seq = self.seq + 1
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=self.capacity)
+        # Lecteurs en attente, par utilisateur filtré (None : tous)
+        self._waiters: Dict[Optional[str], Set["asyncio.Future[None]"]] = {}
+
+        self.published = 0
+        self.reads = 0
+        self.resets = 0
+
+    # ------------------------------------------------------------------ #
+    # Publication
+    # ------------------------------------------------------------------ #
+    def publish(
+        self,
+        kind: str,
+        user_id: str,
+        services: Sequence[str] = (),
+        **fields: Any,
+    ) -> Dict[str, Any]:
+        self.seq += 1
+        event = {
+            "seq": self.seq,
+            "kind": kind,
+            "user_id": user_id,
+            "services": sorted(set(services)),
+            "at": datetime.utcnow().isoformat(),
+            **fields,
+        }
+        if len(self._events) == self.capacity:
+            self._first_seq = self._events[0]["seq"] + 1
+        self._events.append(event)
+        self.published += 1
+        self._wake(user_id)
+        return event
+
+    def publish_writes(self, items: Sequence[Dict[str, Any]], ids: Sequence[int]) -> None:
+        """
+        Un événement "interactions" par utilisateur pour un lot validé
+        (dicts user_id, metadata...) et ses ids.
+        """
+        by_user: Dict[str, Dict[str, Any]] = {}
+        for item, interaction_id in zip(items, ids):
+            entry = by_user.setdefault(item["user_id"], {"ids": [], "services": set()})
+            entry["ids"].append(interaction_id)
+            service = (item.get("metadata") or {}).get("service")
+            if service:
+                entry["services"].add(service)
+        for user_id, entry in by_user.items():
+            self.publish(
+                "interactions", user_id, entry["services"], interaction_ids=entry["ids"]
+            )
+
+    def _wake(self, user_id: str) -> None:
+        for key in (user_id, None):
+            for future in self._waiters.pop(key, ()):
+                if not future.done():
+                    future.set_result(None)
+
+    # ------------------------------------------------------------------ #
+    # Lecture
+    # ------------------------------------------------------------------ #
+    def read(
+        self,
+        since: Optional[int] = None,
+        user_id: Optional[str] = None,
+        service: Optional[str] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """
+        Événements de séquence > since (au plus `limit`). Sans `since`, le
+        lecteur s'abonne à partir de maintenant (aucun événement). `next`
+        est le curseur à renvoyer au prochain appel.
+        """
+        self.reads += 1
+        if since is None:
+            return {"events": [], "next": self.seq, "reset": False}
+
+        reset = since < self._first_seq - 1 or since > self.seq
+        if reset:
+            self.resets += 1
+            return {"events": [], "next": self.seq, "reset": True}
+
+        events: List[Dict[str, Any]] = []
+        position = since
+        # Les séquences du tampon sont contiguës : accès direct au premier
+        start = since - self._first_seq + 1
+        for i in range(max(0, start), len(self._events)):
+            event = self._events[i]
+            position = event["seq"]
+            if _matches(event, user_id, service):
+                events.append(event)
+                if len(events) >= limit:
+                    break
+        else:
+            position = self.seq
+        return {"events": events, "next": position, "reset": False}
+
+    async def wait(
+        self,
+        since: Optional[int] = None,
+        user_id: Optional[str] = None,
+        service: Optional[str] = None,
+        timeout: float = MEMORY_CHANGES_MAX_WAIT_S,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """
+        Comme read(), mais attend (au plus `timeout` secondes) qu'un
+        événement correspondant arrive s'il n'y en a aucun.
+        """
+        page = self.read(since, user_id, service, limit)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(0.0, min(timeout, MEMORY_CHANGES_MAX_WAIT_S))
+        while not page["events"] and not page["reset"]:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            future: "asyncio.Future[None]" = loop.create_future()
+            self._waiters.setdefault(user_id, set()).add(future)
+            try:
+                await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                waiters = self._waiters.get(user_id)
+                if waiters is not None:
+                    waiters.discard(future)
+                    if not waiters:
+                        del self._waiters[user_id]
+            page = self.read(page["next"], user_id, service, limit)
+        return page
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "first_seq": self._first_seq,
+            "buffered": len(self._events),
+            "capacity": self.capacity,
+            "waiting": sum(len(w) for w in self._waiters.values()),
+            "published": self.published,
+            "reads": self.reads,
+            "resets": self.resets,
+        }
+
+
+async def sse_events(
+    feed: ChangeFeed,
+    since: Optional[int] = None,
+    user_id: Optional[str] = None,
+    service: Optional[str] = None,
+    heartbeat_s: float = MEMORY_CHANGES_HEARTBEAT_S,
+) -> AsyncIterator[str]:
+    """
+    Flux SSE (text/event-stream) : un message par événement, avec id =
+    séquence (le navigateur la renvoie dans Last-Event-ID en cas de
+    reconnexion) et event = kind ; "reset" si le curseur est périmé.
+    """
+    cursor = since
+    while True:
+        page = await feed.wait(cursor, user_id, service, timeout=heartbeat_s)
+        if page["reset"]:
+            yield f"id: {page['next']}\nevent: reset\ndata: {json.dumps({'next': page['next']})}\n\n"
+        for event in page["events"]:
+            yield (
+                f"id: {event['seq']}\nevent: {event['kind']}\n"
+                f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            )
+        if not page["events"] and not page["reset"]:
+            yield ": ping\n\n"
+        cursor = page["next"]
+
+
+change_feed = ChangeFeed()
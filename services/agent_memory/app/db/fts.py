@@ -0,0 +1,78 @@
+# services/agent_memory/app/db/fts.py
+
+"""
+Index plein texte FTS5 à contenu externe sur interactions.text, avec
+une colonne "owner" pour filtrer l'utilisateur dans l'index, sans
+accents (unicode61 remove_diacritics 2) et tenu à jour par triggers.
+"""
+
+from typing import Union
+
+from sqlalchemy.engine import Connection, Engine
+
+FTS_TABLE = "interactions_fts"
+
+_OWNER_EXPR = "'u' || hex({row}.user_id)"
+
+_STATEMENTS = [
+    f"""
+    CREATE VIEW IF NOT EXISTS interactions_fts_source AS
+    SELECT id, text, {_OWNER_EXPR.format(row='interactions')} AS owner
+    FROM interactions
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text,
+        owner,
+        content='interactions_fts_source',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS interactions_fts_ai AFTER INSERT ON interactions BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text, owner)
+        VALUES (new.id, new.text, {_OWNER_EXPR.format(row='new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS interactions_fts_ad AFTER DELETE ON interactions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text, owner)
+        VALUES ('delete', old.id, old.text, {_OWNER_EXPR.format(row='old')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS interactions_fts_au AFTER UPDATE OF text, user_id ON interactions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text, owner)
+        VALUES ('delete', old.id, old.text, {_OWNER_EXPR.format(row='old')});
+        INSERT INTO {FTS_TABLE}(rowid, text, owner)
+        VALUES (new.id, new.text, {_OWNER_EXPR.format(row='new')});
+    END
+    """,
+]
+
+
+def owner_token(user_id: str) -> str:
+    """
+    Jeton FTS d'un utilisateur (même valeur que 'u' || hex(user_id) en SQL).
+    """
+    return "u" + user_id.encode("utf-8").hex().upper()
+
+
+def _ensure_fts(conn: Connection) -> None:
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).first()
+    for statement in _STATEMENTS:
+        conn.exec_driver_sql(statement)
+    if not exists:
+        # Base existante : on indexe l'historique déjà présent
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def ensure_fts(bind: Union[Engine, Connection]) -> None:
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            _ensure_fts(conn)
+    else:
+        _ensure_fts(bind)
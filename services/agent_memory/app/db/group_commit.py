@@ -0,0 +1,128 @@
+# services/agent_memory/app/db/group_commit.py
+
+"""
+Group commit des écritures d'interactions : les écritures arrivées dans
+la même fenêtre (MEMORY_GROUP_COMMIT_MS, au plus
+MEMORY_GROUP_COMMIT_MAX_ROWS lignes) partagent une transaction ; chaque
+appelant reçoit ses ids, ou l'exception, après le commit.
+"""
+
+import asyncio
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.interactions import write_interactions
+
+MEMORY_GROUP_COMMIT_ENABLED = os.getenv("MEMORY_GROUP_COMMIT_ENABLED", "1") == "1"
+MEMORY_GROUP_COMMIT_MS = float(os.getenv("MEMORY_GROUP_COMMIT_MS", "3"))
+MEMORY_GROUP_COMMIT_MAX_ROWS = int(os.getenv("MEMORY_GROUP_COMMIT_MAX_ROWS", "500"))
+
+Pending = Tuple[List[Dict[str, Any]], "asyncio.Future[List[Optional[int]]]"]
+
+
+class GroupCommitWriter:
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        window_ms: float = MEMORY_GROUP_COMMIT_MS,
+        max_rows: int = MEMORY_GROUP_COMMIT_MAX_ROWS,
+    ) -> None:
+        self._session_factory = session_factory
+        self.window_s = window_ms / 1000.0
+        self.max_rows = max(1, max_rows)
+
+        self._pending: List[Pending] = []
+        self._pending_rows = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+        self.commits = 0
+        self.rows = 0
+        self.writes = 0
+        self.failed_commits = 0
+
+    async def write(self, items: List[Dict[str, Any]]) -> List[Optional[int]]:
+        """
+        Dépose des interactions (dicts user_id, role, text, metadata,
+        éventuellement exchange_id) et renvoie leurs ids, dans l'ordre, une
+        fois la transaction validée (None pour une ligne d'échange déjà
+        enregistrée, cf. write_interactions).
+        """
+        if not items:
+            return []
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[List[Optional[int]]]" = loop.create_future()
+        self._pending.append((list(items), future))
+        self._pending_rows += len(items)
+        self.writes += 1
+
+        if self._pending_rows >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        asyncio.ensure_future(self._commit_pending())
+
+    def _take_batch(self) -> List[Pending]:
+        batch: List[Pending] = []
+        rows = 0
+        while self._pending and (not batch or rows + len(self._pending[0][0]) <= self.max_rows):
+            entry = self._pending.pop(0)
+            batch.append(entry)
+            rows += len(entry[0])
+        self._pending_rows -= rows
+        return batch
+
+    async def _commit_pending(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            # Le lot est pris APRÈS l'obtention du verrou : tout ce qui est
+            # arrivé pendant le commit précédent part dans celui-ci.
+            batch = self._take_batch()
+            if not batch:
+                return
+            items = [item for entry_items, _ in batch for item in entry_items]
+            try:
+                async with self._session_factory() as db:
+                    ids = await db.run_sync(write_interactions, items=items)
+            except Exception as e:
+                self.failed_commits += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                self.commits += 1
+                self.rows += len(items)
+                offset = 0
+                for entry_items, future in batch:
+                    n = len(entry_items)
+                    if not future.done():
+                        future.set_result(ids[offset : offset + n])
+                    offset += n
+
+        if self._pending and self._timer is None:
+            # Rafale plus grande que max_rows : on enchaîne sans attendre.
+            self._flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": MEMORY_GROUP_COMMIT_ENABLED,
+            "window_ms": self.window_s * 1000.0,
+            "max_rows": self.max_rows,
+            "pending_rows": self._pending_rows,
+            "writes": self.writes,
+            "commits": self.commits,
+            "rows": self.rows,
+            "failed_commits": self.failed_commits,
+            "avg_rows_per_commit": (self.rows / self.commits) if self.commits else 0.0,
+        }
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String, Text, JSON
+from sqlalchemy import Column, Computed, DateTime, Index, Integer, String, Text, JSON
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -10,7 +10,8 @@ class Interaction(Base):
     __tablename__ = "interactions"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String, index=True, nullable=False)
+    # Pas d'index simple sur user_id : l'index composite ci-dessous le couvre.
+    user_id = Column(String, nullable=False)
     role = Column(String, nullable=False)      # "user" ou "coach"
     text = Column(Text, nullable=False)
 
@@ -20,3 +21,94 @@ class Interaction(Base):
     metadata_json = Column("metadata", JSON, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Échange (message_id de l'orchestrateur) auquel appartient la ligne,
+    # écrit par record_exchange : une seule ligne par (échange, rôle).
+    exchange_id = Column(String, nullable=True)
+
+    # Champs de metadata exposés en colonnes générées VIRTUAL (calculées à
+    # la lecture, rien de plus n'est stocké dans la table) : ils peuvent
+    # être indexés et filtrés en SQL sans relire ni parser le JSON.
+    meta_service = Column(String, Computed("json_extract(metadata, '$.service')", persisted=False))
+    physical_state = Column(
+        String, Computed("json_extract(metadata, '$.physical_state')", persisted=False)
+    )
+    mental_state = Column(
+        String, Computed("json_extract(metadata, '$.mental_state')", persisted=False)
+    )
+
+    __table_args__ = (
+        # Historique d'un utilisateur du plus récent au plus ancien, sans tri
+        # en mémoire : sert get_user_history et la pagination par curseur.
+        Index(
+            "ix_interactions_user_created_id",
+            "user_id",
+            created_at.desc(),
+            id.desc(),
+        ),
+        # Interactions d'un service sur une période (tous utilisateurs).
+        Index("ix_interactions_service_created", "meta_service", "created_at"),
+        # Frise des moods : index partiel, seulement les lignes du mood tracker.
+        Index(
+            "ix_interactions_mood_timeline",
+            "user_id",
+            "created_at",
+            sqlite_where=meta_service == "mood_tracker",
+        ),
+        # Idempotence de record_exchange : rejouer un échange (retry,
+        # plusieurs écrivains) n'ajoute pas de ligne. Index partiel : les
+        # interactions hors échange n'y figurent pas.
+        Index(
+            "ux_interactions_exchange_role",
+            "exchange_id",
+            "role",
+            unique=True,
+            sqlite_where=exchange_id.isnot(None),
+        ),
+    )
+
+
+class UserSummary(Base):
+    """
+    Résumé glissant de l'historique d'un utilisateur.
+
+    - state_json            : état structuré du résumé (profil, objectifs, sujets...)
+    - summary               : rendu texte injecté dans le prompt du coach
+    - last_interaction_id   : dernière interaction intégrée au résumé
+    - interactions_covered  : nombre total d'interactions résumées
+    """
+
+    __tablename__ = "user_summaries"
+
+    user_id = Column(String, primary_key=True)
+    summary = Column(Text, nullable=False, default="")
+    state_json = Column(JSON, nullable=True)
+    last_interaction_id = Column(Integer, nullable=False, default=0)
+    interactions_covered = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ArchivePartition(Base):
+    """
+    Partition mensuelle d'interactions archivée dans un fichier froid
+    (SQLite compressé, cf. app/archive/cold_store.py).
+
+    - month          : "YYYY-MM" (created_at des interactions)
+    - path           : fichier .sqlite.gz
+    - rows           : nombre d'interactions dans le fichier
+    - min_id, max_id : plage des ids (recherche par id)
+    - min_created_at, max_created_at : plage des dates
+    """
+
+    __tablename__ = "archive_partitions"
+
+    month = Column(String, primary_key=True)
+    path = Column(String, nullable=False)
+    rows = Column(Integer, nullable=False, default=0)
+    min_id = Column(Integer, nullable=False)
+    max_id = Column(Integer, nullable=False)
+    min_created_at = Column(DateTime, nullable=False)
+    max_created_at = Column(DateTime, nullable=False)
+    bytes_raw = Column(Integer, nullable=False, default=0)
+    bytes_compressed = Column(Integer, nullable=False, default=0)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,210 @@
+# services/agent_memory/app/db/rebalance.py
+
+"""
+Déplacement des utilisateurs après un changement de MEMORY_SHARDS
+(service arrêté). La source n'est vidée qu'après la copie : relancer
+l'outil reprend un déplacement interrompu. Les partitions froides ne sont
+pas déplacées : un shard qui en a bloque l'outil, sauf --force.
+
+    python -m app.db.rebalance --from 1 --to 4
+"""
+
+import argparse
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import create_engine, delete, event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.db.models import ArchivePartition, Interaction, UserSummary
+from app.db.session import apply_sqlite_pragmas, init_db
+from app.db.shards import MEMORY_SHARDS, shard_of, shard_url
+from app.repositories.interactions import create_interactions
+from app.retrieval.vector_index import VectorIndex, vector_index
+
+REBALANCE_BATCH = 2000
+
+
+def _sync_url(url: str) -> str:
+    # Outil hors ligne : driver sqlite synchrone
+    return url.replace("+aiosqlite", "")
+
+
+def _engine(url: str) -> Engine:
+    engine = create_engine(_sync_url(url))
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    return engine
+
+
+def _users(db: Session) -> List[str]:
+    found = {u for (u,) in db.execute(select(Interaction.user_id).distinct())}
+    found.update(u for (u,) in db.execute(select(UserSummary.user_id)))
+    return sorted(found)
+
+
+def _delete_user(db: Session, user_id: str) -> int:
+    deleted = db.execute(delete(Interaction).where(Interaction.user_id == user_id)).rowcount
+    db.execute(delete(UserSummary).where(UserSummary.user_id == user_id))
+    db.commit()
+    return deleted
+
+
+def move_user(source: Session, target: Session, user_id: str, batch: int = REBALANCE_BATCH) -> int:
+    """
+    Déplace un utilisateur d'un shard à l'autre. Renvoie le nombre
+    d'interactions déplacées.
+    """
+    _delete_user(target, user_id)
+
+    summary = source.get(UserSummary, user_id)
+    summarized_up_to = summary.last_interaction_id if summary else 0
+    new_summarized_up_to = 0
+    moved, after_id = 0, 0
+    while True:
+        rows = (
+            source.execute(
+                select(Interaction)
+                .where(Interaction.user_id == user_id, Interaction.id > after_id)
+                .order_by(Interaction.id)
+                .limit(batch)
+            )
+            .scalars()
+            .all()
+        )
+        if not rows:
+            break
+        created = create_interactions(
+            target,
+            [
+                {
+                    "user_id": it.user_id,
+                    "role": it.role,
+                    "text": it.text,
+                    "metadata": it.metadata_json,
+                    "exchange_id": it.exchange_id,
+                    "created_at": it.created_at,
+                }
+                for it in rows
+            ],
+        )
+        # Même ordre d'ids : les interactions résumées restent un préfixe
+        for old, new in zip(rows, created):
+            if old.id <= summarized_up_to:
+                new_summarized_up_to = new.id
+        moved += len(rows)
+        after_id = rows[-1].id
+        source.expunge_all()
+
+    if summary is not None:
+        target.add(
+            UserSummary(
+                user_id=user_id,
+                summary=summary.summary,
+                state_json=summary.state_json,
+                last_interaction_id=new_summarized_up_to,
+                interactions_covered=summary.interactions_covered,
+                updated_at=summary.updated_at,
+            )
+        )
+        target.commit()
+
+    _delete_user(source, user_id)
+    return moved
+
+
+def rebalance(
+    urls: Sequence[str],
+    old_count: int,
+    new_count: int,
+    batch: int = REBALANCE_BATCH,
+    index: Optional[VectorIndex] = vector_index,
+    dry_run: bool = False,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Déplace les utilisateurs des old_count premiers shards vers leur shard
+    parmi new_count. `urls` : URL de chaque shard (au moins
+    max(old_count, new_count)).
+
+    Les partitions archivées restent dans le catalogue de leur shard : les
+    mois archivés d'un utilisateur déplacé ne seraient plus lisibles ni
+    exportables. Lève ValueError si un shard source en a, sauf force=True
+    (ou dry_run, qui les signale dans archived_shards).
+    """
+    count = max(old_count, new_count)
+    if len(urls) < count:
+        raise ValueError(f"{count} URL de shards nécessaires, {len(urls)} fournies.")
+
+    engines = [_engine(url) for url in urls[:count]]
+    for engine in engines[:new_count]:
+        init_db(engine)
+
+    report: Dict[str, Any] = {"users_moved": 0, "interactions_moved": 0, "archived_shards": []}
+    try:
+        for source_shard in range(old_count):
+            with Session(engines[source_shard]) as source:
+                if source.execute(select(ArchivePartition.month).limit(1)).first():
+                    report["archived_shards"].append(source_shard)
+        if report["archived_shards"] and not (force or dry_run):
+            raise ValueError(
+                f"Shards avec partitions archivées : {report['archived_shards']} "
+                "(non déplacées, leurs mois archivés deviendraient illisibles "
+                "pour les utilisateurs déplacés). Relancer avec --force pour passer outre."
+            )
+
+        for source_shard in range(old_count):
+            with Session(engines[source_shard]) as source:
+                for user_id in _users(source):
+                    target_shard = shard_of(user_id, new_count)
+                    if target_shard == source_shard:
+                        continue
+                    report["users_moved"] += 1
+                    if dry_run:
+                        continue
+                    with Session(engines[target_shard]) as target:
+                        report["interactions_moved"] += move_user(source, target, user_id, batch)
+                    if index is not None:
+                        index.forget_user(user_id)
+    finally:
+        for engine in engines:
+            engine.dispose()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--from", dest="old_count", type=int, default=MEMORY_SHARDS)
+    parser.add_argument("--to", dest="new_count", type=int, required=True)
+    parser.add_argument("--batch", type=int, default=REBALANCE_BATCH)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Déplacer même si des shards ont des partitions archivées (non déplacées).",
+    )
+    args = parser.parse_args()
+
+    urls = [shard_url(i) for i in range(max(args.old_count, args.new_count))]
+    try:
+        report = rebalance(
+            urls,
+            args.old_count,
+            args.new_count,
+            batch=args.batch,
+            dry_run=args.dry_run,
+            force=args.force,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print("[AGENT_MEMORY] rééquilibrage :", report, flush=True)
+    if report["archived_shards"]:
+        print(
+            "[AGENT_MEMORY] attention : les partitions archivées des shards",
+            report["archived_shards"],
+            "n'ont pas été déplacées (lecture des archives limitée au shard d'origine).",
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
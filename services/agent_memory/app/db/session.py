@@ -1,14 +1,141 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+"""
+Accès base de données de l'agent_memory : sessions asynchrones
+(aiosqlite), une par requête MCP, sur un SQLite réglé pour la
+concurrence (WAL, synchronous=NORMAL, busy_timeout, pool borné). Les
+repositories restent synchrones, appelés via AsyncSession.run_sync().
+"""
+
+import os
+from typing import Any, List, Tuple, Union
+
+from sqlalchemy import Index, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql import operators
+
+from app.db.fts import ensure_fts
+from app.db.models import Base
 
 # Pour la V1, on utilise une base SQLite locale.
 # Le fichier sera créé dans le dossier de l'agent_memory.
-DATABASE_URL = "sqlite:///./agent_memory.db"
+DATABASE_URL = os.getenv("MEMORY_DATABASE_URL", "sqlite+aiosqlite:///./agent_memory.db")
+
+MEMORY_DB_POOL_SIZE = int(os.getenv("MEMORY_DB_POOL_SIZE", "5"))
+MEMORY_DB_MAX_OVERFLOW = int(os.getenv("MEMORY_DB_MAX_OVERFLOW", "10"))
+MEMORY_DB_POOL_TIMEOUT_S = float(os.getenv("MEMORY_DB_POOL_TIMEOUT_S", "10"))
+MEMORY_DB_BUSY_TIMEOUT_MS = int(os.getenv("MEMORY_DB_BUSY_TIMEOUT_MS", "5000"))
+MEMORY_DB_SYNCHRONOUS = os.getenv("MEMORY_DB_SYNCHRONOUS", "NORMAL")
+
+
+def apply_sqlite_pragmas(dbapi_connection: Any, connection_record: Any = None) -> None:
+    """
+    Réglages appliqués à chaque nouvelle connexion SQLite du pool.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={MEMORY_DB_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={MEMORY_DB_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def create_memory_engine(url: str = DATABASE_URL) -> AsyncEngine:
+    async_engine = create_async_engine(
+        url,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=MEMORY_DB_POOL_SIZE,
+        max_overflow=MEMORY_DB_MAX_OVERFLOW,
+        pool_timeout=MEMORY_DB_POOL_TIMEOUT_S,
+    )
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    return async_engine
+
+
+engine = create_memory_engine()
+
+# Une session par requête MCP (async with AsyncSessionLocal() as db: ...)
+AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+
+def add_missing_columns(conn: Connection) -> None:
+    """
+    Ajoute aux tables existantes les colonnes déclarées dans les modèles
+    depuis leur création : colonnes nullables simples, et colonnes
+    générées (Computed). SQLite n'accepte que des colonnes VIRTUAL en
+    ALTER TABLE : aucune réécriture de la table.
+    """
+    for table in Base.metadata.sorted_tables:
+        existing = {
+            row[1] for row in conn.exec_driver_sql(f"PRAGMA table_xinfo({table.name})")
+        }
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            if column.computed is not None:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type} "
+                    f"GENERATED ALWAYS AS ({column.computed.sqltext}) VIRTUAL"
+                )
+            elif column.nullable:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                )
+
+
+def _index_keys(index: Index) -> List[Tuple[str, int]]:
+    keys = []
+    for expression in index.expressions:
+        column = getattr(expression, "element", expression)
+        descending = getattr(expression, "modifier", None) is operators.desc_op
+        keys.append((column.name, int(descending)))
+    return keys
+
+
+def drop_outdated_indexes(conn: Connection) -> None:
+    """
+    Supprime les index existants dont les colonnes ou le sens de tri ne
+    correspondent plus aux modèles : init_db les recrée ensuite.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            rows = conn.exec_driver_sql(f"PRAGMA index_xinfo({index.name})").all()
+            existing = [(row[2], row[3]) for row in rows if row[5]]
+            if existing and existing != _index_keys(index):
+                conn.exec_driver_sql(f"DROP INDEX {index.name}")
+
+
+def _migrate(conn: Connection) -> None:
+    add_missing_columns(conn)
+    drop_outdated_indexes(conn)
+
+
+def init_db(bind: Union[Engine, Connection]) -> None:
+    """
+    Crée les tables manquantes, puis les colonnes et les index
+    manquants sur les tables existantes (create_all ne les ajoute pas à une
+    table déjà créée) ou dont la définition a changé, et l'index plein
+    texte de l'historique.
+    """
+    Base.metadata.create_all(bind=bind)
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            _migrate(conn)
+    else:
+        _migrate(bind)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    ensure_fts(bind)
 
-# check_same_thread=False est nécessaire pour SQLite avec FastAPI / Uvicorn
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async def init_db_async(async_engine: AsyncEngine = engine) -> None:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(init_db)
 
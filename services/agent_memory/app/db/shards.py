@@ -0,0 +1,114 @@
+# services/agent_memory/app/db/shards.py
+
+"""
+Répartition des utilisateurs sur plusieurs bases SQLite
+(blake2b(user_id) % MEMORY_SHARDS), chacune avec son moteur et son
+verrou d'écriture. Shard 0 : MEMORY_DATABASE_URL, shard i :
+MEMORY_SHARD_URL_TEMPLATE. Les ids ne sont uniques que par shard ;
+changer MEMORY_SHARDS passe par app/db/rebalance.py.
+"""
+
+import asyncio
+import hashlib
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.db.session import (
+    DATABASE_URL,
+    AsyncSessionLocal,
+    create_memory_engine,
+    engine,
+    init_db_async,
+)
+
+MEMORY_SHARDS = max(1, int(os.getenv("MEMORY_SHARDS", "1")))
+MEMORY_SHARD_URL_TEMPLATE = os.getenv(
+    "MEMORY_SHARD_URL_TEMPLATE", "sqlite+aiosqlite:///./agent_memory_shard{shard}.db"
+)
+
+T = TypeVar("T")
+
+
+def shard_of(user_id: Optional[str], count: int) -> int:
+    """
+    Shard d'un utilisateur : stable d'un processus à l'autre (pas de
+    hash() Python, qui change à chaque démarrage).
+    """
+    if count <= 1 or not user_id:
+        return 0
+    digest = hashlib.blake2b(str(user_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % count
+
+
+def shard_url(shard: int) -> str:
+    return DATABASE_URL if shard == 0 else MEMORY_SHARD_URL_TEMPLATE.format(shard=shard)
+
+
+class ShardRouter:
+    def __init__(
+        self,
+        sessionmakers: Sequence[Callable[[], AsyncSession]],
+        engines: Sequence[AsyncEngine] = (),
+    ) -> None:
+        if not sessionmakers:
+            raise ValueError("Au moins un shard est nécessaire.")
+        self.sessionmakers = list(sessionmakers)
+        self.engines = list(engines)
+        self.count = len(self.sessionmakers)
+
+    @classmethod
+    def from_urls(cls, urls: Sequence[str]) -> "ShardRouter":
+        engines = [create_memory_engine(url) for url in urls]
+        return cls(
+            [async_sessionmaker(e, expire_on_commit=False) for e in engines],
+            engines,
+        )
+
+    def shard_of(self, user_id: Optional[str]) -> int:
+        return shard_of(user_id, self.count)
+
+    def session(self, user_id: Optional[str] = None) -> AsyncSession:
+        """
+        Session sur le shard de l'utilisateur (shard 0 sans utilisateur).
+        """
+        return self.sessionmakers[self.shard_of(user_id)]()
+
+    def session_for(self, shard: int) -> AsyncSession:
+        return self.sessionmakers[shard]()
+
+    def split(self, items: Sequence[T], user_id: Callable[[T], str]) -> Dict[int, List[int]]:
+        """
+        Positions des éléments par shard (l'ordre d'entrée est conservé
+        dans chaque shard).
+        """
+        positions: Dict[int, List[int]] = {}
+        for i, item in enumerate(items):
+            positions.setdefault(self.shard_of(user_id(item)), []).append(i)
+        return positions
+
+    async def init_all(self) -> None:
+        await asyncio.gather(*(init_db_async(e) for e in self.engines))
+
+    async def dispose_all(self) -> None:
+        await asyncio.gather(*(e.dispose() for e in self.engines))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "shards": self.count,
+            "urls": [str(e.url) for e in self.engines],
+        }
+
+
+def _default_router() -> ShardRouter:
+    # Le shard 0 réutilise le moteur de app.db.session (base historique)
+    engines = [engine] + [create_memory_engine(shard_url(i)) for i in range(1, MEMORY_SHARDS)]
+    return ShardRouter(
+        [AsyncSessionLocal]
+        + [async_sessionmaker(e, expire_on_commit=False) for e in engines[1:]],
+        engines,
+    )
+
+
+shard_router = _default_router()
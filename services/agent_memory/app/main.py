@@ -1,12 +1,38 @@
-from fastapi import FastAPI, Request
-from app.mcp.handler import process_mcp_message
-from app.db.models import Base
-from app.db.session import engine
+from datetime import datetime
+from typing import Optional
+
+from fastapi import FastAPI, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from app.archive.archiver import archivers
+from app.backup.snapshots import backups
+from app.bulk.ndjson import export_interactions, import_interactions
+from app.cache.hot_history import hot_history
+from app.changes.feed import MEMORY_CHANGES_MAX_WAIT_S, change_feed, sse_events
+from app.mcp.handler import group_commits, process_mcp_message
+from app.db.shards import shard_router
+from app.retrieval.vector_index import vector_index
+from app.summary.refresher import summary_refresher
 
 app = FastAPI(title="Agent Memory")
 
-# Création des tables au démarrage (pour SQLite)
-Base.metadata.create_all(bind=engine)
+
+@app.on_event("startup")
+async def create_tables() -> None:
+    # Création des tables et index au démarrage (pour SQLite), dans chaque shard
+    await shard_router.init_all()
+    # Job d'archivage des mois anciens (cf. app/archive/archiver.py), un par shard
+    for archiver in archivers:
+        archiver.start()
+    # Instantanés périodiques des bases (cf. app/backup/snapshots.py)
+    backups.start()
+
+
+@app.on_event("shutdown")
+async def close_engine() -> None:
+    await backups.stop()
+    for archiver in archivers:
+        await archiver.stop()
+    await shard_router.dispose_all()
 
 
 @app.post("/mcp")
@@ -16,6 +42,104 @@ async def mcp_endpoint(request: Request):
     return response
 
 
+@app.get("/summaries/stats")
+async def summaries_stats():
+    return summary_refresher.stats()
+
+
+@app.get("/writes/stats")
+async def writes_stats():
+    return {str(shard): writer.stats() for shard, writer in sorted(group_commits.items())}
+
+
+@app.get("/history/cache/stats")
+async def history_cache_stats():
+    return hot_history.stats()
+
+
+@app.get("/retrieval/stats")
+async def retrieval_stats():
+    return vector_index.stats()
+
+
+@app.get("/archive/stats")
+async def archive_stats():
+    return [archiver.stats() for archiver in archivers]
+
+
+@app.post("/archive/run")
+async def archive_run():
+    return [await archiver.run_once() for archiver in archivers]
+
+
+@app.get("/backup/stats")
+async def backup_stats():
+    return backups.stats()
+
+
+@app.post("/backup/run")
+async def backup_run():
+    # Sauvegarde à chaud, par pas de pages : les écritures continuent
+    return await backups.run_once()
+
+
+@app.get("/shards/stats")
+async def shards_stats():
+    return shard_router.stats()
+
+
+@app.get("/export/interactions")
+async def export_interactions_ndjson(
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    include_archived: bool = False,
+):
+    # NDJSON en flux : une interaction par ligne, lue par tranches
+    return StreamingResponse(
+        export_interactions(
+            shard_router, user_id=user_id, since=since, include_archived=include_archived
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.post("/import/interactions")
+async def import_interactions_ndjson(request: Request, keep_ids: bool = False):
+    return await import_interactions(shard_router, request.stream(), keep_ids=keep_ids)
+
+
+@app.get("/changes")
+async def changes(
+    since: Optional[int] = None,
+    user_id: Optional[str] = None,
+    service: Optional[str] = None,
+    timeout: float = Query(MEMORY_CHANGES_MAX_WAIT_S, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    # Long-poll : répond dès qu'un changement correspondant arrive (ou à timeout)
+    return await change_feed.wait(since, user_id, service, timeout=timeout, limit=limit)
+
+
+@app.get("/changes/stream")
+async def changes_stream(
+    since: Optional[int] = None,
+    user_id: Optional[str] = None,
+    service: Optional[str] = None,
+    last_event_id: Optional[int] = Header(None),
+):
+    # SSE : à la reconnexion, le navigateur renvoie Last-Event-ID
+    return StreamingResponse(
+        sse_events(change_feed, since if since is not None else last_event_id, user_id, service),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@app.get("/changes/stats")
+async def changes_stats():
+    return change_feed.stats()
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "service": "agent_memory"}
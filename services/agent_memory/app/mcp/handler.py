@@ -1,19 +1,222 @@
+import asyncio
 import uuid
-from typing import Any, Dict, Optional
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.mcp.schemas import MCPResponse
-from app.db.session import SessionLocal
-from app.repositories.interactions import create_interaction, get_user_history
+from app.archive.cold_store import cold_store
+from app.cache.hot_history import hot_history
+from app.changes.feed import change_feed
+from app.db.group_commit import MEMORY_GROUP_COMMIT_ENABLED, GroupCommitWriter
+from app.db.shards import shard_router
+from app.repositories.exchanges import exchange_rows, invalid_exchange, mood_row
+from app.repositories.interactions import (
+    encode_cursor,
+    get_history_page,
+    get_interactions_by_ids,
+    get_user_history,
+    write_interactions,
+)
+from app.repositories.moods import get_mood_timeline
+from app.repositories.partitions import list_partitions
+from app.repositories.search import search_history
+from app.repositories.summaries import get_summary
+from app.retrieval.vector_index import MEMORY_RETRIEVE_MIN_SCORE, vector_index
+from app.summary.refresher import summary_refresher
+from app.summary.summarizer import estimate_tokens, format_history_lines
 
 
-def get_db() -> Session:
+def _serialize_interaction(it: Any) -> Dict[str, Any]:
+    return {
+        "id": it.id,
+        "user_id": it.user_id,
+        "role": it.role,
+        "text": it.text,
+        "metadata": it.metadata_json,
+        "created_at": it.created_at.isoformat(),
+    }
+
+
+def get_db(user_id: Optional[str] = None) -> AsyncSession:
     """
-    Fournit une session DB.
-    On gère l'ouverture/fermeture manuellement dans process_mcp_message.
+    Fournit une session DB asynchrone, propre à la requête MCP, sur le
+    shard de l'utilisateur (cf. app/db/shards.py).
+    Elle est fermée par le `async with` de process_mcp_message.
     """
-    return SessionLocal()
+    return shard_router.session(user_id)
+
+
+# Écritures concurrentes regroupées en une transaction (cf. group_commit.py),
+# un tampon par shard : chaque shard a son propre verrou d'écriture.
+group_commits: Dict[int, GroupCommitWriter] = {}
+
+
+def _group_commit(shard: int) -> GroupCommitWriter:
+    writer = group_commits.get(shard)
+    if writer is None:
+        writer = group_commits[shard] = GroupCommitWriter(
+            lambda: shard_router.session_for(shard)
+        )
+    return writer
+
+
+async def _write_shard(shard: int, rows: List[Dict[str, Any]]) -> List[Optional[int]]:
+    if MEMORY_GROUP_COMMIT_ENABLED:
+        return await _group_commit(shard).write(rows)
+    async with shard_router.session_for(shard) as db:
+        return await db.run_sync(write_interactions, items=rows)
+
+
+async def _write_interactions(items: List[Dict[str, Any]]) -> List[Optional[int]]:
+    """
+    Insère des interactions et renvoie leurs ids une fois le commit fait :
+    via le tampon de group commit du shard, ou dans une transaction dédiée
+    s'il est désactivé. Un lot réparti sur plusieurs shards est écrit en
+    parallèle (une transaction par shard). Le cache d'historique est mis
+    à jour ensuite (write-through), l'index vectoriel est prévenu et le
+    flux de changements publié.
+
+    Les lignes d'un échange déjà enregistrées (même exchange_id et même
+    rôle) sont ignorées : leur id vaut None.
+    """
+    # created_at fixé ici pour que le cache connaisse la valeur écrite
+    now = datetime.utcnow()
+    rows = [{**item, "created_at": now} for item in items]
+    by_shard = shard_router.split(rows, lambda row: row["user_id"])
+    if len(by_shard) == 1:
+        ((shard, _),) = by_shard.items()
+        ids = await _write_shard(shard, rows)
+    else:
+        shards = sorted(by_shard)
+        written = await asyncio.gather(
+            *(_write_shard(shard, [rows[i] for i in by_shard[shard]]) for shard in shards)
+        )
+        ids: List[Optional[int]] = [None] * len(rows)
+        for shard, shard_ids in zip(shards, written):
+            for position, interaction_id in zip(by_shard[shard], shard_ids):
+                ids[position] = interaction_id
+    inserted = [i for i, interaction_id in enumerate(ids) if interaction_id is not None]
+    if len(inserted) < len(ids):
+        rows = [rows[i] for i in inserted]
+    written_ids = [ids[i] for i in inserted]
+    hot_history.record_writes(rows, written_ids)
+    vector_index.note_writes(rows, written_ids)
+    change_feed.publish_writes(rows, written_ids)
+    return ids
+
+
+async def _record_exchanges(exchanges: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Enregistre des échanges (cf. app/repositories/exchanges.py) : toutes
+    leurs lignes partent dans la même écriture, donc dans une transaction
+    par shard. Renvoie pour chaque échange les ids des rôles insérés et
+    les rôles déjà présents (ignorés).
+    """
+    rows: List[Dict[str, Any]] = []
+    spans = []
+    for exchange in exchanges:
+        exchange_items = exchange_rows(exchange)
+        spans.append((len(rows), exchange_items))
+        rows.extend(exchange_items)
+
+    ids = await _write_interactions(rows)
+
+    results = []
+    for exchange, (start, exchange_items) in zip(exchanges, spans):
+        written = {
+            row["role"]: ids[start + i]
+            for i, row in enumerate(exchange_items)
+            if ids[start + i] is not None
+        }
+        results.append(
+            {
+                "exchange_id": str(exchange["exchange_id"]),
+                "interaction_ids": written,
+                "skipped": [row["role"] for row in exchange_items if row["role"] not in written],
+            }
+        )
+    await summary_refresher.maybe_schedule(
+        [row["user_id"] for row, interaction_id in zip(rows, ids) if interaction_id is not None]
+    )
+    return results
+
+
+async def _hot_history_page(
+    db: AsyncSession,
+    user_id: str,
+    limit: int,
+    roles: Optional[List[str]] = None,
+    fields: Optional[List[str]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Première page d'historique servie par le cache en mémoire. En cas de
+    miss, le cache de l'utilisateur est chargé depuis la base puis relu.
+    None si la demande ne tient pas dans le cache.
+    """
+    page = hot_history.get_page(user_id, limit, roles=roles, fields=fields)
+    if page is not None or not hot_history.enabled or limit > hot_history.depth:
+        return page
+    if hot_history.is_cached(user_id):
+        # En cache, mais pas assez d'éléments pour ce filtre de rôles
+        return None
+
+    token = hot_history.begin_load(user_id)
+    try:
+        rows = await db.run_sync(get_user_history, user_id=user_id, limit=hot_history.depth)
+    except Exception:
+        hot_history.abort_load(user_id)
+        raise
+    hot_history.fill(user_id, rows, hot_history.depth, token)
+    return hot_history.get_page(user_id, limit, roles=roles, fields=fields, record=False)
+
+
+async def _continue_in_archives(
+    db: AsyncSession,
+    page: Dict[str, Any],
+    user_id: str,
+    limit: int,
+    before: Optional[str],
+    roles: Optional[List[str]],
+    fields: Optional[List[str]],
+) -> Dict[str, Any]:
+    """
+    Complète une page d'historique arrivée au bout de la table chaude avec
+    les partitions archivées (lues à la demande). `page` doit contenir id
+    et created_at ; les champs non demandés sont retirés ici.
+    """
+    items = page["items"]
+    next_cursor, prev_cursor = page["next_cursor"], page["prev_cursor"]
+    if next_cursor is None:
+        partitions = await db.run_sync(list_partitions)
+        if partitions:
+            if items:
+                last = items[-1]
+                position = encode_cursor(datetime.fromisoformat(last["created_at"]), last["id"])
+            else:
+                position = before
+            remaining = limit - len(items)
+            cold = await asyncio.to_thread(
+                cold_store.history_page,
+                partitions,
+                user_id,
+                max(1, remaining),
+                before=position,
+                roles=roles,
+                fields=list(dict.fromkeys(["id", "created_at", *fields])) if fields else None,
+            )
+            if remaining > 0:
+                items = items + cold["items"]
+                next_cursor = cold["next_cursor"]
+                prev_cursor = prev_cursor or cold["prev_cursor"]
+            elif cold["items"]:
+                # Page pleine : on indique seulement qu'il reste des archives
+                next_cursor = position
+
+    if fields:
+        items = [{f: item[f] for f in fields} for item in items]
+    return {"items": items, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
 
 
 async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
@@ -22,16 +225,24 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
 
     Tâches gérées :
       - "save_interaction" : sauvegarder une interaction générique
-      - "get_history"      : récupérer l'historique d'un user
+      - "save_interactions": sauvegarder un lot d'interactions (une transaction par shard)
+      - "get_history"      : récupérer l'historique d'un user (pagination par curseur,
+                             archives comprises si include_archived)
+      - "get_context"      : résumé glissant + derniers échanges (prompt du coach)
+      - "search_history"   : recherche plein texte dans l'historique (FTS5, BM25)
+      - "retrieve_relevant": interactions les plus proches d'une question (index vectoriel)
+      - "record_exchange"  : enregistrer un échange complet (message, réponse, mood,
+                             repas) en une transaction, idempotent par exchange_id
+      - "record_exchanges" : même chose pour un lot d'échanges
       - "save_mood"        : sauvegarder un état physique/mental (mood tracker)
+      - "get_mood_timeline": agrégats quotidiens des moods sur une période
     """
 
     payload: Dict[str, Any] = msg.get("payload", {}) or {}
     task: Optional[str] = payload.get("task")
 
-    db = get_db()
-
-    try:
+    # Toutes les tâches portent sur un utilisateur : une session sur son shard
+    async with get_db(payload.get("user_id")) as db:
         # --- 1) Sauvegarder une interaction générique ---
         if task == "save_interaction":
             user_id = payload.get("user_id")
@@ -46,18 +257,46 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
                     "message": "user_id et text sont obligatoires pour save_interaction.",
                 }
             else:
-                interaction = create_interaction(
-                    db=db,
-                    user_id=user_id,
-                    role=role,
-                    text=text,
-                    metadata=metadata,
+                ids = await _write_interactions(
+                    [{"user_id": user_id, "role": role, "text": text, "metadata": metadata}],
                 )
                 response_payload = {
                     "status": "ok",
                     "task": "save_interaction",
-                    "interaction_id": interaction.id,
+                    "interaction_id": ids[0],
+                }
+                await summary_refresher.maybe_schedule([user_id])
+
+        # --- 1bis) Sauvegarder un lot d'interactions ---
+        elif task == "save_interactions":
+            items = payload.get("interactions") or []
+            if not isinstance(items, list):
+                items = [items]
+
+            invalid = [
+                i
+                for i, item in enumerate(items)
+                if not isinstance(item, dict)
+                or not item.get("user_id")
+                or not item.get("text")
+            ]
+            if invalid:
+                response_payload = {
+                    "status": "error",
+                    "task": "save_interactions",
+                    "message": (
+                        "interactions doit être une liste d'objets avec user_id et text "
+                        f"(éléments invalides : {invalid})."
+                    ),
+                }
+            else:
+                ids = await _write_interactions(items)
+                response_payload = {
+                    "status": "ok",
+                    "task": "save_interactions",
+                    "interaction_ids": ids,
                 }
+                await summary_refresher.maybe_schedule([item["user_id"] for item in items])
 
         # --- 2) Récupérer l'historique ---
         elif task == "get_history":
@@ -71,23 +310,215 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
                     "message": "user_id est obligatoire pour get_history.",
                 }
             else:
-                interactions = get_user_history(db=db, user_id=user_id, limit=limit)
-                history = [
-                    {
-                        "id": it.id,
-                        "user_id": it.user_id,
-                        "role": it.role,
-                        "text": it.text,
-                        "metadata": it.metadata_json,
-                        "created_at": it.created_at.isoformat(),
+                roles = payload.get("roles")
+                if isinstance(roles, str):
+                    roles = [roles]
+                before, after = payload.get("before"), payload.get("after")
+                fields = payload.get("fields")
+                # Les archives ne sont lues que sur demande, vers le passé
+                with_archives = bool(payload.get("include_archived")) and not after
+                read_fields = (
+                    list(dict.fromkeys(["id", "created_at", *fields]))
+                    if with_archives and fields
+                    else fields
+                )
+                try:
+                    page = None
+                    if not before and not after:
+                        page = await _hot_history_page(
+                            db, user_id, limit, roles=roles, fields=read_fields
+                        )
+                    if page is None:
+                        page = await db.run_sync(
+                            get_history_page,
+                            user_id=user_id,
+                            limit=limit,
+                            before=before,
+                            after=after,
+                            roles=roles,
+                            fields=read_fields,
+                        )
+                    if with_archives:
+                        page = await _continue_in_archives(
+                            db, page, user_id, limit, before, roles, fields
+                        )
+                except ValueError as e:
+                    response_payload = {
+                        "status": "error",
+                        "task": "get_history",
+                        "message": str(e),
+                    }
+                else:
+                    response_payload = {
+                        "status": "ok",
+                        "task": "get_history",
+                        "history": page["items"],
+                        "next_cursor": page["next_cursor"],
+                        "prev_cursor": page["prev_cursor"],
                     }
-                    for it in interactions
-                ]
+
+        # --- 2bis) Contexte compact pour le coach : résumé + derniers échanges ---
+        elif task == "get_context":
+            user_id = payload.get("user_id")
+            recent_limit = int(payload.get("recent_limit", 4))
+            baseline_limit = int(payload.get("baseline_limit", 10))
+
+            if not user_id:
+                response_payload = {
+                    "status": "error",
+                    "task": "get_context",
+                    "message": "user_id est obligatoire pour get_context.",
+                }
+            else:
+                needed = max(recent_limit, baseline_limit)
+                page = await _hot_history_page(db, user_id, needed)
+                if page is not None:
+                    items = page["items"]
+                else:
+                    items = [
+                        _serialize_interaction(it)
+                        for it in await db.run_sync(
+                            get_user_history, user_id=user_id, limit=needed
+                        )
+                    ]
+                summary_row = await db.run_sync(get_summary, user_id)
+                summary = summary_row.summary if summary_row else None
+
+                # Sans résumé (nouvel utilisateur), on garde l'historique habituel.
+                recent = items[:recent_limit] if summary else items[:baseline_limit]
+
+                baseline_tokens = estimate_tokens(
+                    format_history_lines(items[:baseline_limit])
+                )
+                context_tokens = estimate_tokens(summary or "") + estimate_tokens(
+                    format_history_lines(recent)
+                )
                 response_payload = {
                     "status": "ok",
-                    "task": "get_history",
-                    "history": history,
+                    "task": "get_context",
+                    "summary": summary,
+                    "summary_covered": (
+                        summary_row.interactions_covered if summary_row else 0
+                    ),
+                    "recent": recent,
+                    "stats": {
+                        "baseline_tokens": baseline_tokens,
+                        "context_tokens": context_tokens,
+                        "tokens_saved": baseline_tokens - context_tokens,
+                    },
+                }
+
+        # --- 2ter) Recherche plein texte dans l'historique ---
+        elif task == "search_history":
+            user_id = payload.get("user_id")
+            query = payload.get("query") or ""
+            limit = max(1, min(int(payload.get("limit", 10)), 100))
+            offset = max(0, int(payload.get("offset", 0)))
+            roles = payload.get("roles")
+            if isinstance(roles, str):
+                roles = [roles]
+
+            if not user_id or not query.strip():
+                response_payload = {
+                    "status": "error",
+                    "task": "search_history",
+                    "message": "user_id et query sont obligatoires pour search_history.",
+                }
+            else:
+                found = await db.run_sync(
+                    search_history,
+                    user_id=user_id,
+                    query=query,
+                    limit=limit,
+                    offset=offset,
+                    roles=roles,
+                    match_all=payload.get("match", "all") != "any",
+                )
+                response_payload = {
+                    "status": "ok",
+                    "task": "search_history",
+                    "results": found["results"],
+                    "has_more": found["has_more"],
+                    "next_offset": offset + limit if found["has_more"] else None,
+                }
+
+        # --- 2quater) Souvenirs pertinents (recherche vectorielle) ---
+        elif task == "retrieve_relevant":
+            user_id = payload.get("user_id")
+            query = payload.get("query") or ""
+            k = max(1, min(int(payload.get("k", 5)), 50))
+            exclude_ids = [int(i) for i in payload.get("exclude_ids") or []]
+            min_score = float(payload.get("min_score", MEMORY_RETRIEVE_MIN_SCORE))
+
+            if not user_id or not query.strip():
+                response_payload = {
+                    "status": "error",
+                    "task": "retrieve_relevant",
+                    "message": "user_id et query sont obligatoires pour retrieve_relevant.",
+                }
+            elif not vector_index.enabled:
+                response_payload = {
+                    "status": "error",
+                    "task": "retrieve_relevant",
+                    "message": "Index vectoriel désactivé (MEMORY_VECTOR_ENABLED=0).",
+                }
+            else:
+                hits = await vector_index.search(
+                    db, user_id, query, k=k, exclude_ids=exclude_ids, min_score=min_score
+                )
+                rows = {
+                    i: _serialize_interaction(it)
+                    for i, it in (
+                        await db.run_sync(get_interactions_by_ids, ids=[i for i, _ in hits])
+                    ).items()
+                }
+                archived = [i for i, _ in hits if i not in rows]
+                if archived:
+                    # Souvenirs plus anciens que la table chaude : partitions froides
+                    partitions = await db.run_sync(list_partitions)
+                    rows.update(
+                        await asyncio.to_thread(cold_store.get_by_ids, partitions, archived)
+                    )
+                response_payload = {
+                    "status": "ok",
+                    "task": "retrieve_relevant",
+                    "results": [
+                        {**rows[i], "score": round(score, 4)}
+                        for i, score in hits
+                        if i in rows
+                    ],
+                }
+
+        # --- 2quinquies) Enregistrer un échange complet (idempotent) ---
+        elif task in ("record_exchange", "record_exchanges"):
+            if task == "record_exchange":
+                exchanges = [payload]
+            else:
+                exchanges = payload.get("exchanges") or []
+                if not isinstance(exchanges, list):
+                    exchanges = [exchanges]
+
+            invalid = {
+                i: reason
+                for i, reason in ((i, invalid_exchange(e)) for i, e in enumerate(exchanges))
+                if reason
+            }
+            if invalid:
+                response_payload = {
+                    "status": "error",
+                    "task": task,
+                    "message": (
+                        f"{invalid[0]} pour record_exchange."
+                        if task == "record_exchange"
+                        else f"échanges invalides : {invalid}."
+                    ),
                 }
+            else:
+                results = await _record_exchanges(exchanges)
+                if task == "record_exchange":
+                    response_payload = {"status": "ok", "task": task, **results[0]}
+                else:
+                    response_payload = {"status": "ok", "task": task, "results": results}
 
         # --- 3) Sauvegarder un mood (agent Mood Tracker) ---
         elif task == "save_mood":
@@ -103,29 +534,48 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
                 }
             else:
                 # On stocke le mood dans metadata, comme l'a décrit le prof
-                metadata = {
-                    "service": "mood_tracker",
-                    "physical_state": physical_state,
-                    "mental_state": mental_state,
-                }
+                ids = await _write_interactions([mood_row(user_id, physical_state, mental_state)])
 
-                # Texte optionnel pour debug / lecture humaine
-                text = (
-                    f"Mood du jour - physique: {physical_state}, mental: {mental_state}"
-                )
+                response_payload = {
+                    "status": "ok",
+                    "task": "save_mood",
+                    "interaction_id": ids[0],
+                }
+                await summary_refresher.maybe_schedule([user_id])
 
-                interaction = create_interaction(
-                    db=db,
-                    user_id=user_id,
-                    role="mood",
-                    text=text,
-                    metadata=metadata,
+        # --- 3bis) Frise des moods (agrégats quotidiens) ---
+        elif task == "get_mood_timeline":
+            user_id = payload.get("user_id")
+            try:
+                end = date.fromisoformat(payload["end"]) if payload.get("end") else datetime.utcnow().date()
+                start = (
+                    date.fromisoformat(payload["start"])
+                    if payload.get("start")
+                    else end - timedelta(days=int(payload.get("days", 30)) - 1)
                 )
+            except (TypeError, ValueError):
+                start = end = None
 
+            if not user_id:
+                response_payload = {
+                    "status": "error",
+                    "task": "get_mood_timeline",
+                    "message": "user_id est obligatoire pour get_mood_timeline.",
+                }
+            elif start is None or start > end:
+                response_payload = {
+                    "status": "error",
+                    "task": "get_mood_timeline",
+                    "message": "start et end doivent être des dates YYYY-MM-DD avec start <= end.",
+                }
+            else:
+                timeline = await db.run_sync(get_mood_timeline, user_id=user_id, start=start, end=end)
                 response_payload = {
                     "status": "ok",
-                    "task": "save_mood",
-                    "interaction_id": interaction.id,
+                    "task": "get_mood_timeline",
+                    "start": start.isoformat(),
+                    "end": end.isoformat(),
+                    "days": timeline,
                 }
 
         # --- 4) Tâche inconnue ---
@@ -135,9 +585,6 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
                 "message": f"Tâche inconnue ou absente dans le payload: {task!r}",
             }
 
-    finally:
-        db.close()
-
     return MCPResponse(
         message_id=msg.get("message_id", str(uuid.uuid4())),
         to_agent=msg.get("from_agent", "unknown"),
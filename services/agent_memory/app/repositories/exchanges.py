@@ -0,0 +1,125 @@
+"""
+Un échange de chat (record_exchange) mis à plat en interactions : une
+ligne par rôle ("user", "coach", "mood", "meal") portant l'exchange_id.
+L'index unique (exchange_id, role) rend l'écriture idempotente.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.repositories.moods import MOOD_LEVELS, MOOD_SERVICE
+
+MEAL_SERVICE = "meal_tracker"
+COACHING_SERVICE = "coaching_sport"
+
+# Valence d'agent_mood -> niveau de l'état mental
+_VALENCE_LEVELS = {"negative": "low", "neutral": "medium", "positive": "high"}
+
+
+def mood_row(
+    user_id: str,
+    physical_state: Optional[str],
+    mental_state: Optional[str],
+    details: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    metadata: Dict[str, Any] = {
+        "service": MOOD_SERVICE,
+        "physical_state": physical_state,
+        "mental_state": mental_state,
+    }
+    if details:
+        # Mood complet de l'orchestrateur (label, score, valence...)
+        metadata["details"] = details
+    return {
+        "user_id": user_id,
+        "role": "mood",
+        # Texte optionnel pour debug / lecture humaine
+        "text": f"Mood du jour - physique: {physical_state}, mental: {mental_state}",
+        "metadata": metadata,
+    }
+
+
+def mood_states(mood: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    États (physique, mental) d'un mood d'échange : ceux de save_mood
+    s'ils sont fournis, sinon déduits du résultat d'agent_mood (energy ->
+    physique, valence -> mental, en niveaux de MOOD_LEVELS).
+    """
+    physical = mood.get("physical_state")
+    if physical is None and mood.get("energy") in MOOD_LEVELS:
+        physical = mood["energy"]
+    mental = mood.get("mental_state")
+    if mental is None:
+        mental = _VALENCE_LEVELS.get(mood.get("valence"))
+    return physical, mental
+
+
+def _meal_text(meal: Dict[str, Any]) -> str:
+    text = meal.get("description") or meal.get("title") or "Repas analysé"
+    if meal.get("kcal") is not None and "kcal" not in text:
+        text = f"{text} (~{meal['kcal']} kcal)"
+    return text
+
+
+def exchange_rows(exchange: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Lignes d'interactions d'un échange (dict exchange_id, user_id et au
+    moins un des champs user_text, coach_text, mood, meal), dans l'ordre
+    user, coach, mood, meal. Les metadata fournies (user_metadata,
+    coach_metadata) complètent celles par défaut.
+    """
+    user_id = exchange["user_id"]
+    rows: List[Dict[str, Any]] = []
+
+    if exchange.get("user_text"):
+        rows.append(
+            {
+                "user_id": user_id,
+                "role": "user",
+                "text": exchange["user_text"],
+                "metadata": {"service": COACHING_SERVICE, **(exchange.get("user_metadata") or {})},
+            }
+        )
+    if exchange.get("coach_text"):
+        rows.append(
+            {
+                "user_id": user_id,
+                "role": "coach",
+                "text": exchange["coach_text"],
+                "metadata": {"service": COACHING_SERVICE, **(exchange.get("coach_metadata") or {})},
+            }
+        )
+
+    mood = exchange.get("mood")
+    if isinstance(mood, dict) and mood:
+        physical_state, mental_state = mood_states(mood)
+        # Aucun état exploitable : la ligne fausserait get_mood_timeline
+        if physical_state or mental_state:
+            rows.append(mood_row(user_id, physical_state, mental_state, details=mood))
+
+    meal = exchange.get("meal")
+    if isinstance(meal, dict) and meal:
+        rows.append(
+            {
+                "user_id": user_id,
+                "role": "meal",
+                "text": _meal_text(meal),
+                "metadata": {**meal, "service": MEAL_SERVICE},
+            }
+        )
+
+    for row in rows:
+        row["exchange_id"] = str(exchange["exchange_id"])
+    return rows
+
+
+def invalid_exchange(exchange: Any) -> Optional[str]:
+    """
+    Raison du refus d'un échange, ou None s'il est valide.
+    """
+    if not isinstance(exchange, dict):
+        return "un échange doit être un objet"
+    if not exchange.get("exchange_id") or not exchange.get("user_id"):
+        return "exchange_id et user_id sont obligatoires"
+    if not exchange_rows(exchange):
+        return "au moins un de user_text, coach_text, mood ou meal est nécessaire"
+    return None
@@ -1,9 +1,23 @@
-from typing import Any, Dict, List
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 from app.db.models import Interaction
 
+# Colonnes qu'un appelant de get_history peut demander (projection).
+HISTORY_FIELDS = {
+    "id": Interaction.id,
+    "user_id": Interaction.user_id,
+    "role": Interaction.role,
+    "text": Interaction.text,
+    "metadata": Interaction.metadata_json,
+    "created_at": Interaction.created_at,
+}
+
 
 def create_interaction(
     db: Session,
@@ -29,6 +43,87 @@ def create_interaction(
     return db_interaction
 
 
+def create_interactions(
+    db: Session,
+    items: List[Dict[str, Any]],
+) -> List[Interaction]:
+    """
+    Crée plusieurs interactions dans UNE seule transaction.
+
+    Chaque élément contient user_id, role, text et éventuellement metadata
+    et created_at.
+    Les objets sont renvoyés dans l'ordre d'entrée (avec leur id).
+    """
+    db_interactions = [
+        Interaction(
+            user_id=item["user_id"],
+            role=item.get("role") or "user",
+            text=item["text"],
+            metadata_json=item.get("metadata") or {},
+            exchange_id=item.get("exchange_id"),
+            # created_at peut être fixé par l'appelant (cache write-through)
+            **({"created_at": item["created_at"]} if item.get("created_at") else {}),
+        )
+        for item in items
+    ]
+    db.add_all(db_interactions)
+    # Les ids sont attribués au flush (INSERT ... RETURNING) : pas de SELECT
+    # de rafraîchissement ligne par ligne (les sessions async n'expirent pas
+    # les objets au commit).
+    db.commit()
+    return db_interactions
+
+
+def write_interactions(
+    db: Session,
+    items: List[Dict[str, Any]],
+) -> List[Optional[int]]:
+    """
+    Comme create_interactions (une seule transaction), mais renvoie
+    seulement les ids. Les éléments qui portent un exchange_id sont
+    insérés avec ON CONFLICT DO NOTHING : si ce rôle de l'échange est
+    déjà enregistré (retry, autre écrivain, doublon dans le lot), la
+    ligne est ignorée et son id vaut None.
+    """
+    ids: List[Optional[int]] = [None] * len(items)
+    plain = [i for i, item in enumerate(items) if not item.get("exchange_id")]
+    if plain:
+        db_interactions = [
+            Interaction(
+                user_id=items[i]["user_id"],
+                role=items[i].get("role") or "user",
+                text=items[i]["text"],
+                metadata_json=items[i].get("metadata") or {},
+                **({"created_at": items[i]["created_at"]} if items[i].get("created_at") else {}),
+            )
+            for i in plain
+        ]
+        db.add_all(db_interactions)
+        db.flush()
+        for i, it in zip(plain, db_interactions):
+            ids[i] = it.id
+
+    for i, item in enumerate(items):
+        if not item.get("exchange_id"):
+            continue
+        values = {
+            "user_id": item["user_id"],
+            "role": item.get("role") or "user",
+            "text": item["text"],
+            "metadata_json": item.get("metadata") or {},
+            "exchange_id": item["exchange_id"],
+            "created_at": item.get("created_at") or datetime.utcnow(),
+        }
+        ids[i] = db.execute(
+            sqlite_insert(Interaction)
+            .values(**values)
+            .on_conflict_do_nothing()
+            .returning(Interaction.id)
+        ).scalar()
+    db.commit()
+    return ids
+
+
 def get_user_history(
     db: Session,
     user_id: str,
@@ -41,7 +136,222 @@ def get_user_history(
     q = (
         db.query(Interaction)
         .filter(Interaction.user_id == user_id)
-        .order_by(Interaction.created_at.desc())
+        .order_by(Interaction.created_at.desc(), Interaction.id.desc())
         .limit(limit)
     )
     return q.all()
+
+
+# ---------------------------------------------------------------------------
+# Pagination par curseur (keyset)
+# ---------------------------------------------------------------------------
+# L'ordre de lecture est celui de l'index ix_interactions_user_created_id :
+# created_at décroissant puis id décroissant. Un curseur désigne une position
+# (created_at, id) dans cet ordre ; la page suivante se lit directement dans
+# l'index à partir de cette position, sans OFFSET ni tri.
+
+
+def encode_cursor(created_at: datetime, interaction_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{interaction_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Lève ValueError si le curseur est invalide.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, interaction_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(interaction_id)
+    except Exception as e:
+        raise ValueError(f"Curseur invalide : {cursor!r}") from e
+
+
+def get_history_page(
+    db: Session,
+    user_id: str,
+    limit: int = 10,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    roles: Optional[Sequence[str]] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Page d'historique d'un utilisateur, du plus récent au plus ancien.
+
+    - before : curseur -> interactions plus anciennes que cette position
+    - after  : curseur -> interactions plus récentes (nouveaux messages)
+    - roles  : filtre sur le rôle ("user", "coach", "mood"...)
+    - fields : colonnes renvoyées (ex : ["role", "text"]) ; id et
+               created_at sont toujours lus pour construire les curseurs.
+
+    Renvoie {"items": [dict...], "next_cursor", "prev_cursor"} :
+    next_cursor (None en fin d'historique) se passe en `before` pour la
+    page plus ancienne, prev_cursor en `after` pour les plus récentes.
+
+    Lève ValueError si un champ ou un curseur est invalide.
+    """
+    if before and after:
+        raise ValueError("before et after ne peuvent pas être combinés.")
+
+    wanted = list(fields) if fields else list(HISTORY_FIELDS)
+    unknown = [f for f in wanted if f not in HISTORY_FIELDS]
+    if unknown:
+        raise ValueError(f"Champs inconnus : {unknown} (autorisés : {sorted(HISTORY_FIELDS)})")
+    selected = list(dict.fromkeys(["id", "created_at", *wanted]))
+
+    stmt = select(*(HISTORY_FIELDS[f] for f in selected)).where(
+        Interaction.user_id == user_id
+    )
+    if roles:
+        stmt = stmt.where(Interaction.role.in_(list(roles)))
+
+    if before:
+        c_at, c_id = decode_cursor(before)
+        # Après (c_at, c_id) dans l'ordre created_at DESC, id DESC
+        stmt = stmt.where(
+            Interaction.created_at <= c_at,
+            or_(
+                Interaction.created_at < c_at,
+                and_(Interaction.created_at == c_at, Interaction.id < c_id),
+            ),
+        ).order_by(Interaction.created_at.desc(), Interaction.id.desc())
+    elif after:
+        c_at, c_id = decode_cursor(after)
+        # Avant (c_at, c_id) : on lit l'index à l'envers puis on réordonne
+        stmt = stmt.where(
+            Interaction.created_at >= c_at,
+            or_(
+                Interaction.created_at > c_at,
+                and_(Interaction.created_at == c_at, Interaction.id > c_id),
+            ),
+        ).order_by(Interaction.created_at, Interaction.id)
+    else:
+        stmt = stmt.order_by(Interaction.created_at.desc(), Interaction.id.desc())
+
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after:
+        rows.reverse()
+
+    items = [dict(zip(selected, row)) for row in rows]
+
+    next_cursor = prev_cursor = None
+    if items:
+        last, first = items[-1], items[0]
+        # Pour `after`, il reste forcément des éléments plus anciens (le curseur).
+        if has_more or after:
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        prev_cursor = encode_cursor(first["created_at"], first["id"])
+
+    for item in items:
+        item["created_at"] = item["created_at"].isoformat()
+        for f in ("id", "created_at"):
+            if f not in wanted:
+                del item[f]
+
+    return {"items": items, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+
+# ---------------------------------------------------------------------------
+# Lectures pour l'index vectoriel (retrieve_relevant)
+# ---------------------------------------------------------------------------
+
+
+def get_interactions_after(
+    db: Session,
+    user_id: str,
+    after_id: int,
+    since: Optional[datetime] = None,
+    limit: int = 5_000,
+) -> List[Tuple[int, str, datetime]]:
+    """
+    (id, text, created_at) des interactions de l'utilisateur d'id > after_id,
+    par id croissant. `since` borne created_at par le bas pour que la
+    lecture reste une plage de l'index (user_id, created_at, id).
+    """
+    stmt = select(Interaction.id, Interaction.text, Interaction.created_at).where(
+        Interaction.user_id == user_id, Interaction.id > after_id
+    )
+    if since is not None:
+        stmt = stmt.where(Interaction.created_at >= since)
+    stmt = stmt.order_by(Interaction.id).limit(limit)
+    return [tuple(row) for row in db.execute(stmt).all()]
+
+
+def get_interactions_by_ids(db: Session, ids: Sequence[int]) -> Dict[int, Interaction]:
+    if not ids:
+        return {}
+    rows = db.query(Interaction).filter(Interaction.id.in_(list(ids))).all()
+    return {row.id: row for row in rows}
+
+
+# ---------------------------------------------------------------------------
+# Export / import en masse (NDJSON, cf. app/bulk/ndjson.py)
+# ---------------------------------------------------------------------------
+
+
+def get_interactions_chunk(
+    db: Session,
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    after_id: int = 0,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Tranche suivante d'un export, du plus ancien au plus récent.
+
+    - toute la table : par id croissant à partir de after_id (exclu) ;
+    - un utilisateur : par (created_at, id) croissants à partir de `after`
+      (exclu), ce qui suit l'index (user_id, created_at DESC, id DESC) à
+      l'envers au lieu de parcourir toute la table.
+    """
+    stmt = select(*HISTORY_FIELDS.values())
+    if user_id is None:
+        stmt = stmt.where(Interaction.id > after_id)
+        if since is not None:
+            stmt = stmt.where(Interaction.created_at >= since)
+        stmt = stmt.order_by(Interaction.id)
+    else:
+        stmt = stmt.where(Interaction.user_id == user_id)
+        if since is not None:
+            stmt = stmt.where(Interaction.created_at >= since)
+        if after is not None:
+            c_at, c_id = after
+            stmt = stmt.where(
+                Interaction.created_at >= c_at,
+                or_(
+                    Interaction.created_at > c_at,
+                    and_(Interaction.created_at == c_at, Interaction.id > c_id),
+                ),
+            )
+        stmt = stmt.order_by(Interaction.created_at, Interaction.id)
+    rows = db.execute(stmt.limit(limit)).all()
+    return [dict(zip(HISTORY_FIELDS, row)) for row in rows]
+
+
+def insert_interactions_bulk(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    keep_ids: bool = False,
+) -> int:
+    """
+    Insère un lot importé en une transaction (INSERT multi-lignes, sans
+    objets ORM). keep_ids : les ids fournis sont conservés et les lignes
+    dont l'id existe déjà sont ignorées (import rejouable).
+
+    Renvoie le nombre de lignes insérées.
+    """
+    table = Interaction.__table__
+    stmt = insert(table)
+    if keep_ids:
+        stmt = stmt.prefix_with("OR IGNORE")
+    else:
+        rows = [{k: v for k, v in row.items() if k != "id"} for row in rows]
+    inserted = db.execute(stmt, rows).rowcount
+    db.commit()
+    return inserted
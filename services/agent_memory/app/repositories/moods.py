@@ -0,0 +1,97 @@
+"""
+Lectures du mood tracker : états physique / mental lus dans les colonnes
+générées de interactions, via l'index partiel
+ix_interactions_mood_timeline, agrégats calculés par SQLite.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import bindparam, case, func, literal_column, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Interaction
+
+MOOD_SERVICE = "mood_tracker"
+MOOD_LEVELS = ("low", "medium", "high")
+
+# Niveau -> score entre 0 et 1 (moyenne journalière)
+_LEVEL_SCORES = {"low": 0.0, "medium": 0.5, "high": 1.0}
+
+
+def _level_counts(column: Any, prefix: str) -> List[Any]:
+    return [
+        func.sum(case((column == level, 1), else_=0)).label(f"{prefix}_{level}")
+        for level in MOOD_LEVELS
+    ]
+
+
+def _timeline_statement() -> Any:
+    day = func.date(Interaction.created_at).label("day")
+    return (
+        select(
+            day,
+            func.count().label("entries"),
+            *_level_counts(Interaction.physical_state, "physical"),
+            *_level_counts(Interaction.mental_state, "mental"),
+            func.avg(case(_LEVEL_SCORES, value=Interaction.physical_state)).label("physical_score"),
+            func.avg(case(_LEVEL_SCORES, value=Interaction.mental_state)).label("mental_score"),
+        )
+        .where(
+            Interaction.user_id == bindparam("user_id"),
+            # Littéral (pas de paramètre) : le planificateur doit voir que la
+            # condition de l'index partiel est remplie.
+            Interaction.meta_service == literal_column(f"'{MOOD_SERVICE}'"),
+            Interaction.created_at >= bindparam("start"),
+            Interaction.created_at < bindparam("end"),
+        )
+        .group_by(day)
+        .order_by(day)
+    )
+
+
+# Construite une fois : la requête ne change pas, seuls les paramètres varient
+_TIMELINE = _timeline_statement()
+
+
+def get_mood_timeline(
+    db: Session,
+    user_id: str,
+    start: date,
+    end: date,
+) -> List[Dict[str, Any]]:
+    """
+    Agrégats quotidiens (jours UTC) des moods d'un utilisateur entre
+    start et end inclus, du plus ancien au plus récent. Les jours sans
+    mood sont absents.
+
+    Pour chaque jour : nombre de moods, répartition des états physique et
+    mental ("low" / "medium" / "high") et score moyen entre 0 et 1 (les
+    états inconnus ne comptent pas dans la moyenne).
+    """
+    rows = db.execute(
+        _TIMELINE,
+        {
+            "user_id": user_id,
+            "start": datetime.combine(start, time.min),
+            "end": datetime.combine(end + timedelta(days=1), time.min),
+        },
+    ).mappings()
+
+    timeline = []
+    for row in rows:
+        timeline.append(
+            {
+                "date": row["day"],
+                "entries": row["entries"],
+                "physical": {level: row[f"physical_{level}"] for level in MOOD_LEVELS},
+                "mental": {level: row[f"mental_{level}"] for level in MOOD_LEVELS},
+                "physical_score": (
+                    round(row["physical_score"], 3) if row["physical_score"] is not None else None
+                ),
+                "mental_score": (
+                    round(row["mental_score"], 3) if row["mental_score"] is not None else None
+                ),
+            }
+        )
+    return timeline
@@ -0,0 +1,126 @@
+"""
+Catalogue des partitions archivées et lectures / purges de la table
+chaude pour l'archivage (cf. app/archive/archiver.py).
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.db.models import ArchivePartition, Interaction
+
+
+def list_partitions(db: Session) -> List[ArchivePartition]:
+    """
+    Partitions archivées, de la plus récente à la plus ancienne.
+    """
+    return db.query(ArchivePartition).order_by(ArchivePartition.month.desc()).all()
+
+
+def upsert_partition(db: Session, month: str, **fields: Any) -> ArchivePartition:
+    row = db.get(ArchivePartition, month)
+    if row is None:
+        row = ArchivePartition(month=month)
+        db.add(row)
+    for name, value in fields.items():
+        setattr(row, name, value)
+    row.archived_at = datetime.utcnow()
+    db.commit()
+    return row
+
+
+def max_interaction_id(db: Session) -> int:
+    return db.query(func.max(Interaction.id)).scalar() or 0
+
+
+def rows_to_archive(
+    db: Session,
+    cutoff: datetime,
+    after_id: int,
+    below_id: int,
+    limit: int,
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Parcourt la table par id croissant à partir de after_id (exclu), sous
+    below_id (exclu : la dernière interaction de la table n'est jamais
+    archivée, pour que SQLite ne réattribue pas d'ids déjà archivés).
+
+    Renvoie (interactions antérieures à `cutoff` parmi les `limit` lignes
+    parcourues, sous forme de dicts ; dernier id parcouru ou None).
+    """
+    window = (
+        select(Interaction.id)
+        .where(Interaction.id > after_id, Interaction.id < below_id)
+        .order_by(Interaction.id)
+        .limit(limit)
+        .subquery()
+    )
+    last_id = db.execute(select(func.max(window.c.id))).scalar()
+    if last_id is None:
+        return [], None
+
+    rows = db.execute(
+        select(
+            Interaction.id,
+            Interaction.user_id,
+            Interaction.role,
+            Interaction.text,
+            Interaction.metadata_json,
+            Interaction.created_at,
+        )
+        .where(
+            Interaction.id > after_id,
+            Interaction.id <= last_id,
+            Interaction.created_at < cutoff,
+        )
+        .order_by(Interaction.id)
+    ).all()
+    old = [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "role": row.role,
+            "text": row.text,
+            "metadata": row.metadata_json,
+            "created_at": row.created_at,
+        }
+        for row in rows
+    ]
+    return old, last_id
+
+
+def delete_archived_rows(
+    db: Session,
+    cutoff: datetime,
+    after_id: int,
+    up_to_id: int,
+    limit: int,
+) -> Tuple[int, Optional[int]]:
+    """
+    Supprime de la table chaude (par lots, pour ne pas garder le verrou
+    d'écriture longtemps) les interactions antérieures à `cutoff` d'id
+    dans ]after_id, up_to_id]. Renvoie (supprimées, dernier id parcouru).
+    """
+    ids = [
+        row[0]
+        for row in db.execute(
+            select(Interaction.id)
+            .where(
+                Interaction.id > after_id,
+                Interaction.id <= up_to_id,
+                Interaction.created_at < cutoff,
+            )
+            .order_by(Interaction.id)
+            .limit(limit)
+        ).all()
+    ]
+    if not ids:
+        return 0, None
+    db.execute(
+        text("DELETE FROM interactions WHERE id >= :lo AND id <= :hi AND created_at < :cutoff"),
+        {"lo": ids[0], "hi": ids[-1], "cutoff": cutoff},
+    )
+    db.commit()
+    return len(ids), ids[-1]
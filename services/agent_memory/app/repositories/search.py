@@ -0,0 +1,101 @@
+"""
+Recherche plein texte dans l'historique d'un utilisateur (FTS5, BM25).
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db.fts import FTS_TABLE, owner_token
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Mots vides ignorés dans la requête (sauf si la requête n'a que ça)
+_STOPWORDS = {
+    "a", "ai", "au", "aux", "c", "d", "est", "j", "l", "m", "n", "qu", "s", "t", "y", "avec", "ce", "ces", "dans", "de", "des", "du", "en",
+    "et", "il", "je", "la", "le", "les", "ma", "mes", "mon", "ne", "on",
+    "ou", "par", "pas", "pour", "que", "qui", "quoi", "sa", "se", "ses",
+    "son", "sur", "ta", "te", "tes", "ton", "tu", "un", "une", "vous",
+    "coach", "dit", "quel", "quelle",
+}
+
+
+def _normalize(word: str) -> str:
+    word = unicodedata.normalize("NFD", word.lower())
+    return "".join(c for c in word if unicodedata.category(c) != "Mn")
+
+
+def build_match_query(query: str, match_all: bool = True) -> Optional[str]:
+    """
+    Transforme le texte libre de l'utilisateur en requête FTS5 sûre :
+    chaque mot est mis entre guillemets (pas d'injection de syntaxe FTS),
+    le dernier mot est cherché en préfixe ("genou" trouve "genoux").
+    """
+    words = [w for w in _WORD_RE.findall(query or "")]
+    kept = [w for w in words if _normalize(w) not in _STOPWORDS] or words
+    if not kept:
+        return None
+    terms = [f'"{w}"' for w in kept[:-1]] + [f'"{kept[-1]}"*']
+    return f" {'AND' if match_all else 'OR'} ".join(terms)
+
+
+def search_history(
+    db: Session,
+    user_id: str,
+    query: str,
+    limit: int = 10,
+    offset: int = 0,
+    roles: Optional[Sequence[str]] = None,
+    match_all: bool = True,
+) -> Dict[str, Any]:
+    """
+    Interactions de l'utilisateur correspondant à `query`, les plus
+    pertinentes d'abord (BM25). Renvoie {"results": [...], "has_more"}.
+    """
+    match = build_match_query(query, match_all=match_all)
+    if match is None:
+        return {"results": [], "has_more": False}
+
+    params: Dict[str, Any] = {
+        "match": f'owner : "{owner_token(user_id)}" AND text : ({match})',
+        "limit": limit + 1,
+        "offset": offset,
+    }
+    role_filter = ""
+    if roles:
+        placeholders = ", ".join(f":role{i}" for i in range(len(roles)))
+        role_filter = f"AND i.role IN ({placeholders})"
+        params.update({f"role{i}": role for i, role in enumerate(roles)})
+
+    rows = db.execute(
+        text(
+            f"""
+            SELECT i.id, i.role, i.text, i.created_at,
+                   bm25({FTS_TABLE}, 1.0, 0.0) AS score,
+                   snippet({FTS_TABLE}, 0, '[', ']', '…', 16) AS snippet
+            FROM {FTS_TABLE}
+            JOIN interactions AS i ON i.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :match {role_filter}
+            ORDER BY score
+            LIMIT :limit OFFSET :offset
+            """
+        ),
+        params,
+    ).all()
+
+    results: List[Dict[str, Any]] = [
+        {
+            "id": row.id,
+            "role": row.role,
+            "text": row.text,
+            "snippet": row.snippet,
+            # bm25() est négatif : plus petit = plus pertinent
+            "score": round(-row.score, 4),
+            "created_at": str(row.created_at),
+        }
+        for row in rows[:limit]
+    ]
+    return {"results": results, "has_more": len(rows) > limit}
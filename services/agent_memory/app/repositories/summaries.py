@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db.models import Interaction, UserSummary
+
+
+def get_summary(db: Session, user_id: str) -> Optional[UserSummary]:
+    return db.get(UserSummary, user_id)
+
+
+def count_unsummarized(db: Session, user_id: str) -> int:
+    """
+    Nombre d'interactions de l'utilisateur pas encore intégrées au résumé.
+    """
+    summary = get_summary(db, user_id)
+    last_id = summary.last_interaction_id if summary else 0
+    return (
+        db.query(func.count(Interaction.id))
+        .filter(Interaction.user_id == user_id, Interaction.id > last_id)
+        .scalar()
+        or 0
+    )
+
+
+def get_unsummarized(db: Session, user_id: str, last_id: int) -> List[Interaction]:
+    """
+    Interactions postérieures à last_id, dans l'ordre chronologique.
+    """
+    return (
+        db.query(Interaction)
+        .filter(Interaction.user_id == user_id, Interaction.id > last_id)
+        .order_by(Interaction.id.asc())
+        .all()
+    )
+
+
+def upsert_summary(
+    db: Session,
+    user_id: str,
+    summary: str,
+    state: Dict[str, Any],
+    last_interaction_id: int,
+    interactions_covered: int,
+) -> UserSummary:
+    row = get_summary(db, user_id)
+    if row is None:
+        row = UserSummary(user_id=user_id)
+        db.add(row)
+
+    row.summary = summary
+    row.state_json = state
+    row.last_interaction_id = last_interaction_id
+    row.interactions_covered = interactions_covered
+    row.updated_at = datetime.utcnow()
+
+    db.commit()
+    db.refresh(row)
+    return row
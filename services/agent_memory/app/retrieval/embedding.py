@@ -0,0 +1,102 @@
+# services/agent_memory/app/retrieval/embedding.py
+
+"""
+Vecteurs de texte calculés localement : mots normalisés, bigrammes et
+trigrammes de caractères hachés (blake2b) dans MEMORY_VECTOR_DIM
+dimensions, poids TF sous-linéaire, normalisation L2. Seuls les
+coefficients non nuls sont gardés ; l'IDF s'applique à la recherche.
+"""
+
+import hashlib
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+MEMORY_VECTOR_DIM = int(os.getenv("MEMORY_VECTOR_DIM", str(2**16)))
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_STOPWORDS = {
+    "a", "ai", "au", "aux", "avec", "bien", "c", "ca", "ce", "ces", "cette",
+    "comment", "d", "dans", "de", "des", "dois", "du", "elle", "en", "encore",
+    "est", "et", "etre", "fait", "faire", "faut", "il", "j", "je", "l", "la",
+    "le", "les", "leur", "lui", "m", "ma", "mais", "me", "mes", "moi", "mon",
+    "n", "ne", "nous", "on", "ou", "par", "pas", "peut", "peux", "plus",
+    "pour", "qu", "quand", "que", "quel", "quelle", "qui", "quoi", "s", "sa",
+    "se", "ses", "si", "son", "sur", "t", "ta", "te", "tes", "toi", "ton",
+    "tres", "tu", "un", "une", "vos", "votre", "vous", "y",
+}
+
+# Poids relatifs des familles de traits
+_WEIGHTS = {"w": 1.0, "b": 0.6, "c": 0.25}
+
+
+def normalize_words(text: str) -> List[str]:
+    text = unicodedata.normalize("NFD", (text or "").lower())
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    return [w for w in _WORD_RE.findall(text) if w not in _STOPWORDS]
+
+
+def _features(text: str) -> Counter:
+    """
+    Nombre d'occurrences de chaque trait ("w:" mot, "b:" bigramme,
+    "c:" trigramme de caractères).
+    """
+    words = normalize_words(text)
+    feats: Counter = Counter()
+    for w in words:
+        feats["w:" + w] += 1
+        if len(w) >= 4:
+            padded = f"#{w}#"
+            for i in range(len(padded) - 2):
+                feats["c:" + padded[i : i + 3]] += 1
+    for a, b in zip(words, words[1:]):
+        feats[f"b:{a} {b}"] += 1
+    return feats
+
+
+@lru_cache(maxsize=200_000)
+def _slot(feature: str, dim: int) -> Tuple[int, float]:
+    h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return h % dim, (1.0 if (h >> 63) & 1 else -1.0)
+
+
+def embed_text(text: str, dim: int = MEMORY_VECTOR_DIM) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vecteur creux normalisé (norme 1) : (indices int32 triés, valeurs
+    float32). Vide si le texte n'a aucun trait.
+    """
+    acc: Dict[int, float] = {}
+    for feature, count in _features(text).items():
+        index, sign = _slot(feature, dim)
+        # TF sous-linéaire : un mot répété compte moins que deux mots distincts
+        acc[index] = acc.get(index, 0.0) + sign * _WEIGHTS[feature[0]] * (1.0 + math.log(count))
+    indices = np.array(sorted(i for i, v in acc.items() if v != 0.0), dtype=np.int32)
+    values = np.array([acc[i] for i in indices], dtype=np.float32)
+    norm = float(np.linalg.norm(values))
+    if norm > 0.0:
+        values /= norm
+    return indices, values
+
+
+def embed_texts(
+    texts: Sequence[str], dim: int = MEMORY_VECTOR_DIM
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Plusieurs textes à la suite : (indices, valeurs, nombre de valeurs par texte).
+    """
+    pairs = [embed_text(text, dim) for text in texts]
+    lengths = np.array([len(indices) for indices, _ in pairs], dtype=np.int32)
+    if not pairs:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32), lengths
+    return (
+        np.concatenate([indices for indices, _ in pairs]),
+        np.concatenate([values for _, values in pairs]),
+        lengths,
+    )
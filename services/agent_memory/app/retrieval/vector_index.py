@@ -0,0 +1,474 @@
+# services/agent_memory/app/retrieval/vector_index.py
+
+"""
+Index vectoriel par utilisateur pour retrieve_relevant (cosinus TF-IDF
+sur tout l'historique) : en mémoire (LRU, MEMORY_VECTOR_MAX_BYTES) et
+sur disque dans MEMORY_VECTOR_DIR, rattrapé à la recherche depuis le
+dernier id indexé. La base reste la source de vérité.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.interactions import get_interactions_after
+from app.retrieval.embedding import MEMORY_VECTOR_DIM, embed_text, embed_texts
+
+MEMORY_VECTOR_ENABLED = os.getenv("MEMORY_VECTOR_ENABLED", "1") == "1"
+MEMORY_VECTOR_DIR = os.getenv("MEMORY_VECTOR_DIR", "./vector_index")
+MEMORY_VECTOR_MAX_BYTES = int(os.getenv("MEMORY_VECTOR_MAX_BYTES", str(256 * 1024 * 1024)))
+MEMORY_VECTOR_CATCHUP_BATCH = int(os.getenv("MEMORY_VECTOR_CATCHUP_BATCH", "5000"))
+# created_at est fixé juste avant le commit : une écriture concurrente peut
+# être validée avec un created_at un peu antérieur au dernier indexé.
+MEMORY_VECTOR_CATCHUP_MARGIN_S = float(os.getenv("MEMORY_VECTOR_CATCHUP_MARGIN_S", "300"))
+MEMORY_RETRIEVE_MIN_SCORE = float(os.getenv("MEMORY_RETRIEVE_MIN_SCORE", "0.1"))
+
+_FORMAT_VERSION = 1
+
+# Fichiers d'un utilisateur : (nom, type, taille = "count" ou "nnz" de meta.json)
+_FILES = (
+    ("ids", np.int64, "count"),
+    ("lengths", np.int32, "count"),
+    ("indices", np.int32, "nnz"),
+    ("values", np.float32, "nnz"),
+)
+
+
+def _grow(array: np.ndarray, needed: int, used: int) -> np.ndarray:
+    if needed <= len(array):
+        return array
+    grown = np.empty(max(needed, 2 * len(array), 64), dtype=array.dtype)
+    grown[:used] = array[:used]
+    return grown
+
+
+class _UserVectors:
+    """
+    Vecteurs creux d'un utilisateur :
+
+      - à la suite, dans l'ordre d'ajout (format "COO" : pour chaque
+        coefficient non nul, sa ligne, sa dimension et sa valeur) ; les
+        tableaux doublent de capacité quand ils sont pleins ;
+      - regroupés par dimension (listes inversées, format "CSC") pour
+        les `_posting_count` premiers vecteurs : une question ne lit que
+        les listes de ses dimensions. Les vecteurs ajoutés depuis sont
+        parcourus directement, et les listes reconstruites quand ils
+        dépassent 10 % du total ;
+      - fréquences documentaires par dimension (IDF).
+    """
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+        self.count = 0  # vecteurs
+        self.nnz = 0    # coefficients non nuls
+        self.ids = np.empty(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)  # début de chaque ligne
+        self.rows = np.empty(0, dtype=np.int32)
+        self.indices = np.empty(0, dtype=np.int32)
+        self.values = np.empty(0, dtype=np.float32)
+        self.df = np.zeros(dim, dtype=np.int32)
+        self.last_id = 0
+        self.last_created_at: Optional[datetime] = None
+        # True une fois rattrapé sur la base dans ce processus
+        self.synced = False
+        # Normes TF-IDF des documents, recalculées quand l'IDF a pu dériver
+        self._norms = np.empty(0, dtype=np.float64)
+        self._norms_count = 0
+        # Listes inversées des premiers vecteurs
+        self._posting_count = 0
+        self._posting_nnz = 0
+        self._posting_ptr = np.zeros(dim + 1, dtype=np.int64)
+        self._posting_rows = np.empty(0, dtype=np.int32)
+        self._posting_values = np.empty(0, dtype=np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            a.nbytes
+            for a in (
+                self.ids, self.offsets, self.rows, self.indices, self.values, self.df,
+                self._norms, self._posting_ptr, self._posting_rows, self._posting_values,
+            )
+        )
+
+    def append(
+        self, ids: np.ndarray, indices: np.ndarray, values: np.ndarray, lengths: np.ndarray
+    ) -> None:
+        n, nnz = len(ids), len(indices)
+        if not n:
+            return
+        count, total = self.count + n, self.nnz + nnz
+        self.ids = _grow(self.ids, count, self.count)
+        self.offsets = _grow(self.offsets, count + 1, self.count + 1)
+        for name in ("rows", "indices", "values"):
+            setattr(self, name, _grow(getattr(self, name), total, self.nnz))
+
+        self.ids[self.count : count] = ids
+        self.offsets[self.count + 1 : count + 1] = self.nnz + np.cumsum(lengths)
+        self.rows[self.nnz : total] = np.repeat(
+            np.arange(self.count, count, dtype=np.int32), lengths
+        )
+        self.indices[self.nnz : total] = indices
+        self.values[self.nnz : total] = values
+        # Chaque dimension apparaît au plus une fois par vecteur
+        self.df += np.bincount(indices, minlength=self.dim).astype(np.int32)
+        self.count, self.nnz = count, total
+
+    def _refresh_postings(self) -> None:
+        tail = self.count - self._posting_count
+        if tail <= max(256, self.count // 10):
+            return
+        nnz = self.nnz
+        order = np.argsort(self.indices[:nnz], kind="stable")
+        self._posting_rows = self.rows[order]
+        self._posting_values = self.values[order]
+        self._posting_ptr[1:] = np.cumsum(np.bincount(self.indices[:nnz], minlength=self.dim))
+        self._posting_count, self._posting_nnz = self.count, nnz
+
+    def _doc_norms(self, idf2: np.ndarray) -> np.ndarray:
+        n = self.count
+        if n > 1.1 * self._norms_count or not len(self._norms):
+            # L'IDF a bougé (plus de 10 % de documents en plus) : tout recalculer
+            start = 0
+            self._norms_count = n
+        else:
+            start = len(self._norms)
+        if start < n:
+            lo, hi = int(self.offsets[start]), self.nnz
+            weights = np.square(self.values[lo:hi], dtype=np.float64) * idf2[self.indices[lo:hi]]
+            fresh = np.sqrt(
+                np.bincount(self.rows[lo:hi] - start, weights=weights, minlength=n - start)
+            )
+            self._norms = fresh if start == 0 else np.concatenate([self._norms[:start], fresh])
+        return self._norms[:n]
+
+    def search(
+        self,
+        query_indices: np.ndarray,
+        query_values: np.ndarray,
+        k: int,
+        exclude_ids: Sequence[int] = (),
+        min_score: float = 0.0,
+    ) -> List[Tuple[int, float]]:
+        n = self.count
+        if not n or k <= 0 or not len(query_indices):
+            return []
+        idf = np.log((1.0 + n) / (1.0 + self.df)) + 1.0
+        idf2 = idf * idf
+        q_norm = float(np.linalg.norm(query_values * idf[query_indices]))
+        if q_norm == 0.0:
+            return []
+
+        query_weights = (query_values * idf2[query_indices]).astype(np.float32)
+
+        # Vecteurs indexés : listes inversées des dimensions de la requête
+        self._refresh_postings()
+        starts = self._posting_ptr[query_indices]
+        sizes = self._posting_ptr[query_indices + 1] - starts
+        positions = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        rows = [self._posting_rows[positions]]
+        products = [self._posting_values[positions] * np.repeat(query_weights, sizes)]
+
+        # Vecteurs ajoutés depuis : parcours direct
+        if self.nnz > self._posting_nnz:
+            weights = np.zeros(self.dim, dtype=np.float32)
+            weights[query_indices] = query_weights
+            lo, hi = self._posting_nnz, self.nnz
+            contributions = weights[self.indices[lo:hi]]
+            hit = np.flatnonzero(contributions) + lo
+            rows.append(self.rows[hit])
+            products.append(contributions[hit - lo] * self.values[hit])
+
+        rows, products = np.concatenate(rows), np.concatenate(products)
+        if not len(rows):
+            # Aucun trait commun avec l'historique indexé
+            return []
+        scores = np.bincount(rows, weights=products, minlength=n).astype(np.float64)
+        scores /= np.maximum(self._doc_norms(idf2), 1e-12) * q_norm
+        if exclude_ids:
+            scores[np.isin(self.ids[:n], np.asarray(exclude_ids, dtype=np.int64))] = -1.0
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (int(self.ids[i]), float(scores[i])) for i in top if scores[i] >= min_score
+        ]
+
+
+class VectorIndex:
+    def __init__(
+        self,
+        directory: str = MEMORY_VECTOR_DIR,
+        dim: int = MEMORY_VECTOR_DIM,
+        max_bytes: int = MEMORY_VECTOR_MAX_BYTES,
+        enabled: bool = MEMORY_VECTOR_ENABLED,
+        catchup_batch: int = MEMORY_VECTOR_CATCHUP_BATCH,
+    ) -> None:
+        self.directory = directory
+        self.dim = dim
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.catchup_batch = max(1, catchup_batch)
+
+        self._users: "OrderedDict[str, _UserVectors]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Dernier id écrit par utilisateur (signalé par _write_interactions)
+        self._latest_written: Dict[str, int] = {}
+
+        self.searches = 0
+        self.disk_loads = 0
+        self.rebuilds = 0
+        self.catchup_queries = 0
+        self.catchups_skipped = 0
+        self.indexed = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------ #
+    # Écritures
+    # ------------------------------------------------------------------ #
+    def note_writes(self, items: Sequence[Dict[str, Any]], ids: Sequence[int]) -> None:
+        """
+        Mémorise le dernier id écrit par utilisateur : la prochaine
+        recherche saura qu'elle doit rattraper l'index.
+        """
+        for item, interaction_id in zip(items, ids):
+            user_id = item["user_id"]
+            if interaction_id > self._latest_written.get(user_id, 0):
+                self._latest_written[user_id] = interaction_id
+
+    # ------------------------------------------------------------------ #
+    # Recherche
+    # ------------------------------------------------------------------ #
+    async def search(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        query: str,
+        k: int = 5,
+        exclude_ids: Sequence[int] = (),
+        min_score: float = MEMORY_RETRIEVE_MIN_SCORE,
+    ) -> List[Tuple[int, float]]:
+        """
+        [(interaction_id, score)] des k interactions les plus proches de
+        `query`, score décroissant (cosinus, entre 0 et 1 en pratique).
+        """
+        self.searches += 1
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            vectors = await self._ensure(db, user_id)
+        query_indices, query_values = embed_text(query, self.dim)
+        return vectors.search(query_indices, query_values, k, exclude_ids, min_score)
+
+    async def sync_user(self, db: AsyncSession, user_id: str) -> None:
+        """
+        Rattrape l'index d'un utilisateur sans chercher (avant que ses
+        interactions anciennes ne quittent la table chaude, cf. archiver.py).
+        """
+        if not self.enabled:
+            return
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            await self._ensure(db, user_id)
+
+    async def _ensure(self, db: AsyncSession, user_id: str) -> _UserVectors:
+        vectors = self._users.get(user_id)
+        if vectors is None:
+            vectors = await asyncio.to_thread(self._load, user_id)
+            self._users[user_id] = vectors
+        else:
+            self._users.move_to_end(user_id)
+
+        if vectors.synced and self._latest_written.get(user_id, 0) <= vectors.last_id:
+            self.catchups_skipped += 1
+            return vectors
+
+        await self._catch_up(db, user_id, vectors)
+        vectors.synced = True
+        self._evict()
+        return vectors
+
+    async def _catch_up(self, db: AsyncSession, user_id: str, vectors: _UserVectors) -> None:
+        while True:
+            since = (
+                vectors.last_created_at - timedelta(seconds=MEMORY_VECTOR_CATCHUP_MARGIN_S)
+                if vectors.last_created_at
+                else None
+            )
+            rows = await db.run_sync(
+                get_interactions_after,
+                user_id=user_id,
+                after_id=vectors.last_id,
+                since=since,
+                limit=self.catchup_batch,
+            )
+            self.catchup_queries += 1
+            if rows:
+                await asyncio.to_thread(self._index_rows, user_id, vectors, rows)
+            if len(rows) < self.catchup_batch:
+                return
+
+    def _index_rows(
+        self, user_id: str, vectors: _UserVectors, rows: Sequence[Tuple[int, str, datetime]]
+    ) -> None:
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        indices, values, lengths = embed_texts([row[1] for row in rows], self.dim)
+        latest = max(row[2] for row in rows)
+        if vectors.last_created_at is not None:
+            latest = max(latest, vectors.last_created_at)
+
+        self._persist(
+            user_id, vectors, ids, indices, values, lengths, int(ids[-1]), latest
+        )
+        vectors.append(ids, indices, values, lengths)
+        vectors.last_id = int(ids[-1])
+        vectors.last_created_at = latest
+        self.indexed += len(rows)
+
+    def _evict(self) -> None:
+        total = sum(v.nbytes for v in self._users.values())
+        while total > self.max_bytes and len(self._users) > 1:
+            user_id, evicted = self._users.popitem(last=False)
+            total -= evicted.nbytes
+            lock = self._locks.get(user_id)
+            if lock is not None and not lock.locked():
+                del self._locks[user_id]
+            self.evictions += 1
+
+    # ------------------------------------------------------------------ #
+    # Fichiers
+    # ------------------------------------------------------------------ #
+    def _user_dir(self, user_id: str) -> str:
+        key = hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key)
+
+    def _load(self, user_id: str) -> _UserVectors:
+        vectors = _UserVectors(self.dim)
+        folder = self._user_dir(user_id)
+        meta_path = os.path.join(folder, "meta.json")
+        if not os.path.exists(meta_path):
+            return vectors
+
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != _FORMAT_VERSION or meta.get("dim") != self.dim:
+                raise ValueError("format ou dimension différents")
+            arrays = {}
+            for name, dtype, size in _FILES:
+                expected = int(meta[size])
+                arrays[name] = np.fromfile(
+                    os.path.join(folder, name + ".bin"), dtype=dtype, count=expected
+                )
+                if len(arrays[name]) != expected:
+                    raise ValueError(f"{name}.bin tronqué")
+            if int(arrays["lengths"].sum()) != int(meta["nnz"]):
+                raise ValueError("lengths.bin incohérent")
+        except Exception as e:
+            print(
+                "[AGENT_MEMORY] index vectoriel illisible pour", user_id,
+                ": reconstruction depuis la base (", repr(e), ")",
+                flush=True,
+            )
+            self.rebuilds += 1
+            os.remove(meta_path)
+            return vectors
+
+        vectors.append(arrays["ids"], arrays["indices"], arrays["values"], arrays["lengths"])
+        vectors.last_id = int(meta["last_id"])
+        if meta.get("last_created_at"):
+            vectors.last_created_at = datetime.fromisoformat(meta["last_created_at"])
+        self.disk_loads += 1
+        return vectors
+
+    def _persist(
+        self,
+        user_id: str,
+        vectors: _UserVectors,
+        ids: np.ndarray,
+        indices: np.ndarray,
+        values: np.ndarray,
+        lengths: np.ndarray,
+        last_id: int,
+        last_created_at: datetime,
+    ) -> None:
+        """
+        Ajoute les nouveaux vecteurs aux fichiers de l'utilisateur, puis
+        remplace meta.json (qui fait foi pour la relecture).
+        """
+        folder = self._user_dir(user_id)
+        os.makedirs(folder, exist_ok=True)
+        new = {"ids": ids, "lengths": lengths, "indices": indices, "values": values}
+        before = {"count": vectors.count, "nnz": vectors.nnz}
+        for name, dtype, size in _FILES:
+            path = os.path.join(folder, name + ".bin")
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                # Reste éventuel d'un ajout interrompu : au-delà de meta.json
+                f.truncate(before[size] * np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(new[name], dtype=dtype).tobytes())
+
+        meta = {
+            "version": _FORMAT_VERSION,
+            "user_id": user_id,
+            "dim": self.dim,
+            "count": vectors.count + len(ids),
+            "nnz": vectors.nnz + len(indices),
+            "last_id": last_id,
+            "last_created_at": last_created_at.isoformat(),
+        }
+        tmp_path = os.path.join(folder, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(folder, "meta.json"))
+
+    # ------------------------------------------------------------------ #
+    # Statistiques
+    # ------------------------------------------------------------------ #
+    def clear(self) -> None:
+        """
+        Vide la mémoire (les fichiers restent) : utile aux tests et benchmarks.
+        """
+        self._users.clear()
+        self._locks.clear()
+
+    def forget_user(self, user_id: str) -> None:
+        """
+        Supprime l'index d'un utilisateur (mémoire et fichiers) : ses ids
+        ont changé (déplacement vers un autre shard, cf. app/db/rebalance.py)
+        ou un import a ajouté des lignes anciennes, hors de la fenêtre de
+        rattrapage. Il sera reconstruit depuis la base à la prochaine recherche.
+        """
+        self._users.pop(user_id, None)
+        self._latest_written.pop(user_id, None)
+        shutil.rmtree(self._user_dir(user_id), ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "dim": self.dim,
+            "directory": self.directory,
+            "users_in_memory": len(self._users),
+            "vectors_in_memory": sum(v.count for v in self._users.values()),
+            "nnz_in_memory": sum(v.nnz for v in self._users.values()),
+            "bytes": sum(v.nbytes for v in self._users.values()),
+            "max_bytes": self.max_bytes,
+            "searches": self.searches,
+            "indexed": self.indexed,
+            "disk_loads": self.disk_loads,
+            "rebuilds": self.rebuilds,
+            "catchup_queries": self.catchup_queries,
+            "catchups_skipped": self.catchups_skipped,
+            "evictions": self.evictions,
+        }
+
+
+vector_index = VectorIndex()
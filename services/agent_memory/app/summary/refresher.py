@@ -0,0 +1,126 @@
+# services/agent_memory/app/summary/refresher.py
+
+"""
+Rafraîchissement des résumés en tâche de fond : à partir de
+SUMMARY_REFRESH_EVERY interactions non résumées, une mise à jour
+incrémentale est lancée (une à la fois par utilisateur) sans retarder
+la réponse MCP.
+"""
+
+import asyncio
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Set
+
+from app.changes.feed import change_feed
+from app.db.shards import shard_router
+from app.repositories.summaries import (
+    count_unsummarized,
+    get_summary,
+    get_unsummarized,
+    upsert_summary,
+)
+from app.summary.summarizer import render_summary, update_state
+
+SUMMARY_REFRESH_EVERY = int(os.getenv("SUMMARY_REFRESH_EVERY", "6"))
+
+
+def _refresh_user_summary(db: Any, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Intègre au résumé toutes les interactions postérieures au dernier
+    rafraîchissement. Synchrone : exécuté via AsyncSession.run_sync().
+    """
+    row = get_summary(db, user_id)
+    last_id = row.last_interaction_id if row else 0
+    new_items = get_unsummarized(db, user_id, last_id)
+    if not new_items:
+        return None
+
+    state = update_state(
+        row.state_json if row else None,
+        (
+            {"role": it.role, "text": it.text, "metadata": it.metadata_json or {}}
+            for it in new_items
+        ),
+    )
+    row = upsert_summary(
+        db,
+        user_id=user_id,
+        summary=render_summary(state),
+        state=state,
+        last_interaction_id=new_items[-1].id,
+        interactions_covered=state["covered"],
+    )
+    return {"user_id": user_id, "covered": row.interactions_covered}
+
+
+async def refresh_user_summary(user_id: str) -> Optional[Dict[str, Any]]:
+    async with shard_router.session(user_id) as db:
+        return await db.run_sync(_refresh_user_summary, user_id)
+
+
+class SummaryRefresher:
+    def __init__(self, every: int = SUMMARY_REFRESH_EVERY) -> None:
+        self.every = max(1, every)
+        self._in_flight: Set[str] = set()
+        # Estimation en mémoire du nombre d'interactions non résumées par
+        # utilisateur : évite une requête COUNT à chaque écriture.
+        self._unsummarized: Dict[str, int] = {}
+        self.db_checks = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    async def maybe_schedule(self, user_ids: Iterable[str]) -> None:
+        """
+        Programme un rafraîchissement pour chaque utilisateur ayant au moins
+        `every` interactions non résumées.
+        """
+        for user_id, added in Counter(u for u in user_ids if u).items():
+            known = self._unsummarized.get(user_id)
+            if known is not None:
+                self._unsummarized[user_id] = known + added
+            if user_id in self._in_flight:
+                continue
+            if known is not None and known + added < self.every:
+                continue
+            # Réservé AVANT l'await : une requête concurrente ne doit pas
+            # programmer un second rafraîchissement pour le même utilisateur.
+            self._in_flight.add(user_id)
+            self.db_checks += 1
+            try:
+                async with shard_router.session(user_id) as db:
+                    pending = await db.run_sync(count_unsummarized, user_id)
+            except Exception:
+                self._in_flight.discard(user_id)
+                raise
+            self._unsummarized[user_id] = pending
+            if pending < self.every:
+                self._in_flight.discard(user_id)
+                continue
+            asyncio.get_running_loop().create_task(self._refresh(user_id))
+
+    async def _refresh(self, user_id: str) -> None:
+        try:
+            refreshed = await refresh_user_summary(user_id)
+            self.refreshes += 1
+            if refreshed is not None:
+                change_feed.publish("summary", user_id, covered=refreshed["covered"])
+        except Exception as e:
+            self.errors += 1
+            print("[AGENT_MEMORY] échec du résumé pour", user_id, ":", repr(e), flush=True)
+        finally:
+            # Recompté depuis la base à la prochaine écriture.
+            self._unsummarized.pop(user_id, None)
+            self._in_flight.discard(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "refresh_every": self.every,
+            "in_flight": len(self._in_flight),
+            "db_checks": self.db_checks,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+        }
+
+
+summary_refresher = SummaryRefresher()
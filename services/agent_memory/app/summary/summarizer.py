@@ -0,0 +1,182 @@
+# services/agent_memory/app/summary/summarizer.py
+
+"""
+Résumé glissant de l'historique d'un utilisateur : état structuré
+(profil, objectifs, sujets, humeurs, dernier plan) mis à jour avec les
+seules nouvelles interactions, sans appel LLM, puis rendu en texte.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+MAX_TOPICS = 30
+MAX_MOODS = 5
+MAX_REQUESTS = 3
+MAX_PLAN_ITEMS = 6
+MAX_REQUEST_CHARS = 160
+
+_GOALS = [
+    (re.compile(r"perdre du poids|maigrir|perte de poids|mincir"), "perte de poids"),
+    (re.compile(r"prise de masse|prendre du muscle|muscler|musculation"), "prise de muscle"),
+    (re.compile(r"courir|course|courant|footing|jogging|marathon|trail"), "course à pied"),
+    (re.compile(r"reprendre|reprise|recommencer le sport"), "reprise du sport"),
+    (re.compile(r"dormir|sommeil|insomnie"), "sommeil"),
+    (re.compile(r"stress|anxi"), "gestion du stress"),
+    (re.compile(r"manger mieux|alimentation|nutrition|regime"), "alimentation"),
+]
+
+_PROFILE = {
+    "âge": re.compile(r"\b(\d{1,2})\s*ans\b"),
+    "poids": re.compile(r"\b(\d{2,3}(?:[.,]\d)?)\s*(?:kg|kilos?)\b"),
+    "taille": re.compile(r"\b(1[.,]\d{2}\s*m|1\d{2}\s*cm)\b"),
+}
+
+_STOPWORDS = {
+    "alors", "aussi", "autre", "avant", "avec", "avoir", "bien", "c'est",
+    "cette", "comme", "comment", "dans", "depuis", "encore", "entre", "est-ce",
+    "faire", "faut", "leurs", "mais", "merci", "moins", "notre", "parce",
+    "peux", "plus", "pour", "pourquoi", "quand", "quelle", "quelles", "quels",
+    "sans", "semaine", "sont", "suis", "tout", "toute", "tous", "tres", "trop",
+    "veux", "voudrais", "votre", "bonjour", "salut", "coach", "jours",
+    "quelque", "chose", "plutot", "avoir", "etre", "fais", "fait",
+}
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFD", text.lower())
+    return "".join(c for c in text if unicodedata.category(c) != "Mn")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimation grossière du nombre de tokens (mots + ponctuation, un mot
+    long compte pour plusieurs tokens). Même heuristique que agent_cerveau.
+    """
+    if not text:
+        return 0
+    return sum(1 + len(p) // 6 for p in re.findall(r"\w+|[^\w\s]", text))
+
+
+def format_history_lines(history: Iterable[Dict[str, Any]]) -> str:
+    """
+    Historique au format du prompt du coach ("- role: text").
+    """
+    return "\n".join(f"- {h.get('role', 'inconnu')}: {h.get('text', '')}" for h in history)
+
+
+def empty_state() -> Dict[str, Any]:
+    return {
+        "profile": {},
+        "goals": [],
+        "topics": {},
+        "moods": [],
+        "last_plan": [],
+        "last_requests": [],
+        "covered": 0,
+    }
+
+
+def _extract_plan(text: str) -> List[str]:
+    marker = "petit plan simple"
+    idx = text.lower().find(marker)
+    block = text[idx:] if idx != -1 else text
+    items = [
+        re.sub(r"^[-*]\s*", "", line.strip())
+        for line in block.splitlines()
+        if line.strip().startswith(("* ", "- "))
+    ]
+    return items[:MAX_PLAN_ITEMS]
+
+
+def update_state(
+    state: Optional[Dict[str, Any]],
+    interactions: Iterable[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Intègre de nouvelles interactions (dicts role, text, metadata) à l'état.
+    """
+    state = {**empty_state(), **(state or {})}
+    topics = Counter(state["topics"])
+    goals: List[str] = list(state["goals"])
+    moods: List[str] = list(state["moods"])
+    requests: List[str] = list(state["last_requests"])
+    profile: Dict[str, str] = dict(state["profile"])
+    last_plan: List[str] = list(state["last_plan"])
+
+    for it in interactions:
+        role = it.get("role") or ""
+        text = it.get("text") or ""
+        metadata = it.get("metadata") or {}
+        norm = _normalize(text)
+        state["covered"] += 1
+
+        if role == "user":
+            for key, pattern in _PROFILE.items():
+                m = pattern.search(norm)
+                if m:
+                    profile[key] = m.group(1).replace(" ", "")
+            for pattern, goal in _GOALS:
+                if pattern.search(norm) and goal not in goals:
+                    goals.append(goal)
+            topics.update(
+                w for w in re.findall(r"[a-z']{5,}", norm) if w not in _STOPWORDS
+            )
+            short = text.strip().replace("\n", " ")
+            if len(short) > MAX_REQUEST_CHARS:
+                short = short[: MAX_REQUEST_CHARS - 1] + "…"
+            requests = (requests + [short])[-MAX_REQUESTS:]
+
+            mood_raw = metadata.get("mood_raw")
+            if mood_raw and mood_raw != "None":
+                moods = (moods + [str(mood_raw)])[-MAX_MOODS:]
+
+        elif role == "coach":
+            plan = _extract_plan(text)
+            if plan:
+                last_plan = plan
+
+        elif role == "mood":
+            phys = metadata.get("physical_state")
+            mental = metadata.get("mental_state")
+            if phys or mental:
+                moods = (moods + [f"physique {phys}, mental {mental}"])[-MAX_MOODS:]
+
+    state["profile"] = profile
+    state["goals"] = goals
+    state["topics"] = dict(topics.most_common(MAX_TOPICS))
+    state["moods"] = moods
+    state["last_plan"] = last_plan
+    state["last_requests"] = requests
+    return state
+
+
+def render_summary(state: Dict[str, Any]) -> str:
+    """
+    Rend l'état sous forme de quelques lignes lisibles par le coach.
+    """
+    lines = [f"Résumé des échanges précédents ({state.get('covered', 0)} messages) :"]
+
+    profile = state.get("profile") or {}
+    if profile:
+        lines.append(
+            "- Profil mentionné : " + ", ".join(f"{k} {v}" for k, v in profile.items())
+        )
+    if state.get("goals"):
+        lines.append("- Objectifs exprimés : " + ", ".join(state["goals"]))
+    topics = list((state.get("topics") or {}).items())[:8]
+    if topics:
+        lines.append(
+            "- Sujets fréquents : " + ", ".join(f"{w} ({n})" for w, n in topics)
+        )
+    if state.get("moods"):
+        lines.append("- Humeurs récentes : " + " → ".join(state["moods"]))
+    if state.get("last_plan"):
+        lines.append("- Dernier plan proposé : " + " ; ".join(state["last_plan"]))
+    if state.get("last_requests"):
+        lines.append(
+            "- Dernières demandes : " + " | ".join(f'"{r}"' for r in state["last_requests"])
+        )
+
+    return "\n".join(lines)
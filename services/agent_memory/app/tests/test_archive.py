@@ -0,0 +1,123 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.mcp.handler as handler
+import app.summary.refresher as refresher
+from app.archive.archiver import Archiver, archive_cutoff
+from app.archive.cold_store import ColdStore
+from app.db.session import create_memory_engine, init_db_async
+from app.db.shards import ShardRouter
+from app.repositories.interactions import create_interactions
+from app.repositories.partitions import list_partitions
+from app.retrieval.vector_index import VectorIndex
+
+NOW = datetime(2025, 9, 15, 12, 0, 0)
+
+
+def _message(payload):
+    return {"message_id": "m", "from_agent": "test", "payload": payload}
+
+
+def _setup(tmp_path, monkeypatch):
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{tmp_path / 'memory.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    router = ShardRouter([sessions])
+    monkeypatch.setattr(handler, "shard_router", router)
+    monkeypatch.setattr(refresher, "shard_router", router)
+    store = ColdStore(directory=str(tmp_path / "archive"), cache_files=1)
+    monkeypatch.setattr(handler, "cold_store", store)
+    index = VectorIndex(directory=str(tmp_path / "vectors"), enabled=True)
+    monkeypatch.setattr(handler, "vector_index", index)
+    archiver = Archiver(sessions, store=store, index=index, hot_months=6, interval_s=0, batch=7)
+    return engine, sessions, store, archiver
+
+
+def _rows(user_id, start, count, label):
+    return [
+        {
+            "user_id": user_id,
+            "role": "user",
+            "text": f"{label} {i}",
+            "metadata": {"i": i},
+            "created_at": start + timedelta(hours=i),
+        }
+        for i in range(count)
+    ]
+
+
+async def _history(user_id, **extra):
+    response = await handler.process_mcp_message(
+        _message({"task": "get_history", "user_id": user_id, **extra})
+    )
+    return response.payload
+
+
+def test_cutoff_keeps_current_and_previous_months():
+    assert archive_cutoff(NOW, 6) == datetime(2025, 4, 1)
+    assert archive_cutoff(datetime(2025, 2, 3), 3) == datetime(2024, 12, 1)
+
+
+def test_old_months_move_to_cold_files_and_stay_readable(tmp_path, monkeypatch):
+    engine, sessions, store, archiver = _setup(tmp_path, monkeypatch)
+
+    async def scenario():
+        await init_db_async(engine)
+        async with sessions() as db:
+            await db.run_sync(
+                create_interactions,
+                items=_rows("arch_u1", datetime(2024, 1, 10), 10, "janvier")
+                + _rows("arch_u2", datetime(2024, 1, 12), 3, "autre")
+                + _rows("arch_u1", datetime(2024, 2, 10), 10, "février")
+                + _rows("arch_u1", datetime(2025, 9, 1), 5, "récent"),
+            )
+        first = await archiver.run_once(now=NOW)
+        again = await archiver.run_once(now=NOW)
+
+        async with sessions() as db:
+            partitions = await db.run_sync(list_partitions)
+
+        hot_only = await _history("arch_u1", limit=10)
+        pages, cursor = [], None
+        while True:
+            page = await _history(
+                "arch_u1", limit=4, include_archived=True, fields=["text"], before=cursor
+            )
+            pages.append(page)
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        retrieved = await handler.process_mcp_message(
+            _message({"task": "retrieve_relevant", "user_id": "arch_u1", "query": "janvier 3", "k": 1})
+        )
+        await engine.dispose()
+        return first, again, partitions, hot_only, pages, retrieved.payload
+
+    first, again, partitions, hot_only, pages, retrieved = asyncio.run(scenario())
+
+    assert first["rows_copied"] == first["rows_deleted"] == 23
+    # Rejouer le job ne recopie rien
+    assert again["rows_copied"] == again["rows_deleted"] == 0
+
+    assert [p.month for p in partitions] == ["2024-02", "2024-01"]
+    assert [p.rows for p in partitions] == [10, 13]
+    assert all(os.path.exists(p.path) and p.bytes_compressed > 0 for p in partitions)
+
+    # Sans include_archived, seule la table chaude est lue
+    assert [h["text"] for h in hot_only["history"]] == [f"récent {i}" for i in range(4, -1, -1)]
+    assert hot_only["next_cursor"] is None
+
+    texts = [h["text"] for page in pages for h in page["history"]]
+    assert texts == (
+        [f"récent {i}" for i in range(4, -1, -1)]
+        + [f"février {i}" for i in range(9, -1, -1)]
+        + [f"janvier {i}" for i in range(9, -1, -1)]
+    )
+    assert all(set(h) == {"text"} for page in pages for h in page["history"])
+    assert all(len(page["history"]) == 4 for page in pages[:-1])
+
+    # Les souvenirs archivés restent retrouvables par id
+    assert [r["text"] for r in retrieved["results"]] == ["janvier 3"]
+    assert retrieved["results"][0]["metadata"] == {"i": 3}
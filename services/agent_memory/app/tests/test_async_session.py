@@ -0,0 +1,62 @@
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.mcp.handler as handler
+import app.summary.refresher as refresher
+from app.db.session import create_memory_engine, init_db_async
+from app.db.shards import ShardRouter
+
+
+def _message(payload):
+    return {"message_id": "m", "from_agent": "test", "payload": payload}
+
+
+def test_concurrent_reads_and_writes_on_wal_database(tmp_path, monkeypatch):
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{tmp_path / 'memory.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    router = ShardRouter([sessions])
+    monkeypatch.setattr(handler, "shard_router", router)
+    monkeypatch.setattr(refresher, "shard_router", router)
+
+    async def scenario():
+        await init_db_async(engine)
+        async with engine.connect() as conn:
+            mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+
+        writes = [
+            handler.process_mcp_message(
+                _message(
+                    {
+                        "task": "save_interaction",
+                        "user_id": f"u{i % 3}",
+                        "role": "user",
+                        "text": f"message {i}",
+                    }
+                )
+            )
+            for i in range(30)
+        ]
+        reads = [
+            handler.process_mcp_message(
+                _message({"task": "get_history", "user_id": "u0", "limit": 5})
+            )
+            for _ in range(30)
+        ]
+        responses = await asyncio.gather(*writes, *reads)
+        # Laisse se terminer les rafraîchissements de résumé programmés
+        while refresher.summary_refresher._in_flight:
+            await asyncio.sleep(0.01)
+        final = await handler.process_mcp_message(
+            _message({"task": "get_history", "user_id": "u0", "limit": 50})
+        )
+        await engine.dispose()
+        return mode, responses, final
+
+    mode, responses, final = asyncio.run(scenario())
+
+    assert mode == "wal"
+    assert all(r.payload["status"] == "ok" for r in responses)
+    assert len(final.payload["history"]) == 10
+    assert refresher.summary_refresher.errors == 0
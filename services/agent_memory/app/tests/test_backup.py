@@ -0,0 +1,157 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.mcp.handler as handler
+import app.summary.refresher as refresher
+from app.backup.snapshots import (
+    BackupManager,
+    archive_dir,
+    backup_database,
+    database_files,
+    list_snapshots,
+)
+from app.db.session import create_memory_engine, init_db_async
+from app.db.shards import ShardRouter
+
+
+def _count(path, user_id):
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        return conn.execute(
+            "SELECT count(*) FROM interactions WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_snapshots_during_writes_and_retention(tmp_path, monkeypatch):
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{tmp_path / 'memory.db'}")
+    router = ShardRouter([async_sessionmaker(engine, expire_on_commit=False)], [engine])
+    monkeypatch.setattr(handler, "shard_router", router)
+    monkeypatch.setattr(refresher, "shard_router", router)
+    monkeypatch.setattr(handler, "group_commits", {})
+    backups_dir = str(tmp_path / "backups")
+    manager = BackupManager(database_files(router), directory=backups_dir, keep=2, pages=4, pause_ms=1)
+
+    async def scenario():
+        await init_db_async(engine)
+        for n in range(200):
+            await handler.process_mcp_message(
+                {"payload": {"task": "save_interaction", "user_id": "backup_u1", "text": f"séance {n} " * 20}}
+            )
+
+        # Écritures continues pendant les sauvegardes (pas de 4 pages)
+        stop = asyncio.Event()
+
+        async def writer():
+            n = 0
+            while not stop.is_set():
+                await handler.process_mcp_message(
+                    {"payload": {"task": "save_interaction", "user_id": "backup_u1", "text": f"pendant {n}"}}
+                )
+                n += 1
+            return n
+
+        writes = asyncio.ensure_future(writer())
+        start = datetime(2026, 1, 1)
+        reports = [await manager.run_once(now=start + timedelta(days=i)) for i in range(3)]
+        stop.set()
+        during = await writes
+        await engine.dispose()
+        return reports, during
+
+    reports, during = asyncio.run(scenario())
+
+    assert list(manager.sources) == ["memory"]
+    first, last = (r["snapshots"]["memory"] for r in (reports[0], reports[2]))
+    assert first["steps"] > 1 and first["restarts"] == 0
+    assert during > 0
+    # L'instantané est une base cohérente, sans fichier WAL à côté
+    assert 200 <= _count(last["path"], "backup_u1") <= 200 + during
+    assert not os.path.exists(last["path"] + "-wal")
+
+    # Rétention : les 2 plus récents
+    assert reports[2]["pruned"] == [first["path"]]
+    assert [os.path.basename(p) for p in list_snapshots(backups_dir, "memory")] == [
+        "memory-20260102T000000000000Z.db",
+        "memory-20260103T000000000000Z.db",
+    ]
+    assert manager.stats()["runs"] == 3
+
+
+def test_snapshot_keeps_the_cold_partitions_of_its_catalog(tmp_path):
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{tmp_path / 'memory.db'}")
+    asyncio.run(init_db_async(engine))
+    asyncio.run(engine.dispose())
+    partition = tmp_path / "archive" / "interactions_2024_01.sqlite.gz"
+    partition.parent.mkdir()
+    partition.write_bytes(b"partition 2024-01")
+    conn = sqlite3.connect(tmp_path / "memory.db")
+    conn.execute(
+        "INSERT INTO archive_partitions (month, path, rows, min_id, max_id, min_created_at,"
+        " max_created_at, bytes_raw, bytes_compressed, archived_at)"
+        " VALUES ('2024-01', ?, 1, 1, 1, '2024-01-01', '2024-01-01', 1, 1, '2024-03-01')",
+        (str(partition),),
+    )
+    conn.commit()
+    conn.close()
+
+    manager = BackupManager(
+        {"memory": str(tmp_path / "memory.db")}, directory=str(tmp_path / "backups"), keep=1
+    )
+    first = asyncio.run(manager.run_once(now=datetime(2026, 1, 1)))["snapshots"]["memory"]
+    [copy] = first["archives"]
+    assert first["missing"] == []
+    # L'archiveur réécrit la partition après l'instantané
+    partition.unlink()
+    partition.write_bytes(b"partition 2024-01, completee")
+    assert open(copy, "rb").read() == b"partition 2024-01"
+    second = asyncio.run(manager.run_once(now=datetime(2026, 1, 2)))
+
+    # Rétention : l'instantané supprimé part avec ses partitions
+    assert second["pruned"] == [first["path"]]
+    assert not os.path.exists(archive_dir(first["path"]))
+    [latest] = second["snapshots"]["memory"]["archives"]
+    assert open(latest, "rb").read() == b"partition 2024-01, completee"
+
+
+def test_rollback_journal_source_falls_back_to_a_locked_copy(tmp_path):
+    source = str(tmp_path / "moods.db")
+    conn = sqlite3.connect(source)
+    conn.execute("CREATE TABLE moods (id INTEGER PRIMARY KEY, mood_json TEXT)")
+    conn.executemany("INSERT INTO moods (mood_json) VALUES (?)", [("x" * 500,)] * 2000)
+    conn.commit()
+    conn.close()
+
+    # Un écrivain modifie la base entre chaque pas : la copie par pas recommence
+    stop = threading.Event()
+
+    def writer():
+        c = sqlite3.connect(source, timeout=5)
+        while not stop.is_set():
+            c.execute("INSERT INTO moods (mood_json) VALUES ('y')")
+            c.commit()
+            # Sans pause, l'écrivain affame les lecteurs (journal classique)
+            time.sleep(0.0005)
+        c.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        report = backup_database(source, str(tmp_path / "copy.db"), pages=1, pause_ms=2, max_restarts=2)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert report["restarts"] == 2
+    copy = sqlite3.connect(report["path"])
+    assert copy.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert copy.execute("SELECT count(*) FROM moods").fetchone()[0] >= 2000
+    copy.close()
@@ -0,0 +1,153 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.bulk.ndjson as ndjson
+from app.bulk.ndjson import export_interactions, import_interactions
+from app.db.session import create_memory_engine, init_db_async
+from app.db.shards import ShardRouter
+from app.repositories.interactions import create_interactions, get_history_page
+from app.retrieval.vector_index import VectorIndex
+
+
+def _sessions(path):
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{path}")
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def _collect(stream):
+    return b"".join([chunk async for chunk in stream])
+
+
+async def _body(data: bytes, size: int):
+    # Découpage arbitraire du corps, comme les morceaux d'une requête HTTP
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+def _rows(count):
+    start = datetime(2025, 3, 1, 8, 0, 0)
+    return [
+        {
+            "user_id": f"bulk_u{i % 3}",
+            "role": "user" if i % 2 == 0 else "coach",
+            "text": f"Séance n°{i} : 5 km, « facile »",
+            "metadata": {"i": i},
+            "created_at": start + timedelta(minutes=(i * 7) % 50),
+        }
+        for i in range(count)
+    ]
+
+
+def test_export_then_import_round_trip_is_chunked_and_idempotent(tmp_path):
+    source_engine, source = _sessions(tmp_path / "source.db")
+    target_engine, target = _sessions(tmp_path / "target.db")
+    source_shards, target_shards = ShardRouter([source]), ShardRouter([target])
+
+    async def scenario():
+        await init_db_async(source_engine)
+        await init_db_async(target_engine)
+        async with source() as db:
+            await db.run_sync(create_interactions, items=_rows(53))
+
+        chunks = [chunk async for chunk in export_interactions(source_shards, chunk=10)]
+        one_user = await _collect(export_interactions(source_shards, user_id="bulk_u1", chunk=4))
+        dump = b"".join(chunks)
+
+        first = await import_interactions(target_shards, _body(dump, 37), keep_ids=True, batch=8)
+        again = await import_interactions(target_shards, _body(dump, 1000), keep_ids=True, batch=8)
+        copy = await _collect(export_interactions(target_shards, chunk=1000))
+
+        async with target() as db:
+            page = await db.run_sync(get_history_page, user_id="bulk_u0", limit=100)
+        await source_engine.dispose()
+        await target_engine.dispose()
+        return chunks, one_user, dump, first, again, copy, page
+
+    chunks, one_user, dump, first, again, copy, page = asyncio.run(scenario())
+
+    assert len(chunks) == 6
+    lines = [json.loads(line) for line in dump.decode("utf-8").splitlines()]
+    assert [line["id"] for line in lines] == list(range(1, 54))
+    assert lines[4]["text"] == "Séance n°4 : 5 km, « facile »"
+    assert lines[4]["metadata"] == {"i": 4}
+
+    user_lines = [json.loads(line) for line in one_user.decode("utf-8").splitlines()]
+    assert {line["user_id"] for line in user_lines} == {"bulk_u1"}
+    assert len(user_lines) == 18
+    keys = [(line["created_at"], line["id"]) for line in user_lines]
+    assert keys == sorted(keys)
+
+    assert (first["imported"], first["skipped"], first["rejected"]) == (53, 0, 0)
+    # Réimport du même fichier avec les ids d'origine : rien n'est dupliqué
+    assert (again["imported"], again["skipped"]) == (0, 53)
+    assert copy == dump
+    assert len(page["items"]) == 18
+
+
+def test_invalid_lines_are_reported_without_stopping_the_import(tmp_path):
+    engine, sessions = _sessions(tmp_path / "memory.db")
+    body = "\n".join(
+        [
+            json.dumps({"user_id": "bulk_x", "text": "ok 1", "created_at": "2025-01-01T10:00:00+02:00"}),
+            "{pas du json",
+            json.dumps({"user_id": "bulk_x"}),
+            "",
+            json.dumps({"user_id": "bulk_x", "text": "ok 2", "metadata": [1]}),
+            json.dumps({"user_id": "bulk_x", "text": "ok 3", "role": "coach"}),
+        ]
+    ).encode("utf-8")
+
+    async def scenario():
+        await init_db_async(engine)
+        report = await import_interactions(ShardRouter([sessions]), _body(body, 5))
+        async with sessions() as db:
+            page = await db.run_sync(get_history_page, user_id="bulk_x", limit=10)
+        await engine.dispose()
+        return report, page
+
+    report, page = asyncio.run(scenario())
+
+    assert (report["lines"], report["imported"], report["rejected"]) == (6, 2, 3)
+    assert [e["line"] for e in report["errors"]] == [2, 3, 5]
+    texts = {item["text"]: item for item in page["items"]}
+    assert set(texts) == {"ok 1", "ok 3"}
+    # Date avec fuseau ramenée en UTC
+    assert texts["ok 1"]["created_at"] == "2025-01-01T08:00:00"
+    assert texts["ok 3"]["role"] == "coach"
+
+
+def test_old_rows_imported_for_an_indexed_user_are_retrieved(tmp_path, monkeypatch):
+    engine, sessions = _sessions(tmp_path / "memory.db")
+    shards = ShardRouter([sessions])
+    index = VectorIndex(directory=str(tmp_path / "vectors"), enabled=True)
+    monkeypatch.setattr(ndjson, "vector_index", index)
+    old = {
+        "user_id": "u1",
+        "role": "user",
+        "text": "J'ai une tendinite au genou droit.",
+        "metadata": {},
+        "created_at": "2024-01-01T09:00:00",
+    }
+
+    async def scenario():
+        await init_db_async(engine)
+        async with sessions() as db:
+            await db.run_sync(
+                create_interactions,
+                items=[{"user_id": "u1", "role": "user", "text": "Séance de 5 km ce matin."}],
+            )
+            await index.search(db, "u1", "séance", k=1)  # index à jour
+        report = await import_interactions(shards, _body(json.dumps(old).encode("utf-8"), 64))
+        async with sessions() as db:
+            hits = await index.search(db, "u1", "tendinite genou droit", k=1)
+        await engine.dispose()
+        return report, hits
+
+    report, hits = asyncio.run(scenario())
+
+    assert report["imported"] == 1
+    # l'interaction importée (id 2), datée d'avant la dernière indexée
+    assert [interaction_id for interaction_id, _ in hits] == [2]
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.mcp.handler as handler
+import app.summary.refresher as refresher
+from app.changes.feed import ChangeFeed, sse_events
+from app.db.session import create_memory_engine, init_db_async
+from app.db.shards import ShardRouter
+
+
+def _message(payload):
+    return {"message_id": "m", "from_agent": "test", "payload": payload}
+
+
+def test_read_filters_pages_and_resets_stale_cursors():
+    feed = ChangeFeed(capacity=4, start=100)
+    feed.publish("interactions", "feed_u1", ["coaching_sport"], interaction_ids=[1])
+    feed.publish("interactions", "feed_u2", ["mood_tracker"], interaction_ids=[2])
+    feed.publish("summary", "feed_u1")
+
+    # Sans curseur : abonnement à partir de maintenant
+    assert feed.read() == {"events": [], "next": 103, "reset": False}
+
+    page = feed.read(100, user_id="feed_u1")
+    assert [(e["seq"], e["kind"]) for e in page["events"]] == [(101, "interactions"), (103, "summary")]
+    assert page["next"] == 103
+    assert [e["user_id"] for e in feed.read(100, service="mood_tracker")["events"]] == ["feed_u2"]
+
+    first = feed.read(100, limit=1)
+    assert [e["seq"] for e in first["events"]] == [101]
+    assert [e["seq"] for e in feed.read(first["next"], limit=1)["events"]] == [102]
+
+    # Le tampon (4 événements) a perdu 101 et 102 : un curseur à 100 est périmé
+    feed.publish("interactions", "feed_u3", interaction_ids=[3])
+    feed.publish("interactions", "feed_u3", interaction_ids=[4])
+    assert feed.read(100) == {"events": [], "next": 105, "reset": True}
+    assert [e["seq"] for e in feed.read(102)["events"]] == [103, 104, 105]
+
+
+def test_long_poll_and_sse_are_woken_by_writes(tmp_path, monkeypatch):
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{tmp_path / 'memory.db'}")
+    router = ShardRouter([async_sessionmaker(engine, expire_on_commit=False)])
+    feed = ChangeFeed()
+    monkeypatch.setattr(handler, "shard_router", router)
+    monkeypatch.setattr(refresher, "shard_router", router)
+    monkeypatch.setattr(handler, "change_feed", feed)
+
+    async def scenario():
+        await init_db_async(engine)
+        loop = asyncio.get_running_loop()
+        since = feed.read()["next"]
+        waiting = asyncio.ensure_future(feed.wait(since, user_id="feed_u1", timeout=5))
+        other_user = asyncio.ensure_future(feed.wait(since, user_id="feed_u9", timeout=0.2))
+        stream = sse_events(feed, since, service="mood_tracker", heartbeat_s=5)
+        first_sse = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+
+        started = loop.time()
+        await handler.process_mcp_message(
+            _message({"task": "save_interaction", "user_id": "feed_u1", "text": "Séance de fractionné"})
+        )
+        page = await waiting
+        latency = loop.time() - started
+        await handler.process_mcp_message(
+            _message({"task": "save_mood", "user_id": "feed_u1", "physical_state": "high"})
+        )
+        sse = await first_sse
+        await stream.aclose()
+        await engine.dispose()
+        return page, latency, await other_user, sse
+
+    page, latency, other_user, sse = asyncio.run(scenario())
+
+    (event,) = page["events"]
+    assert (event["kind"], event["user_id"], event["interaction_ids"]) == ("interactions", "feed_u1", [1])
+    assert latency < 1.0
+    assert other_user["events"] == [] and other_user["reset"] is False
+
+    # Le flux SSE filtré sur le service ne reçoit que le mood
+    lines = sse.strip().split("\n")
+    assert lines[1] == "event: interactions"
+    data = json.loads(lines[2][len("data: "):])
+    assert data["services"] == ["mood_tracker"] and lines[0] == f"id: {data['seq']}"
@@ -0,0 +1,52 @@
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.group_commit import GroupCommitWriter
+from app.db.session import create_memory_engine, init_db_async
+
+
+def _item(i):
+    return {"user_id": f"u{i % 4}", "role": "user", "text": f"message {i}"}
+
+
+def test_concurrent_writes_share_commits_and_get_their_ids(tmp_path):
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{tmp_path / 'memory.db'}")
+    writer = GroupCommitWriter(async_sessionmaker(engine, expire_on_commit=False), window_ms=5)
+
+    async def scenario():
+        await init_db_async(engine)
+        results = await asyncio.gather(
+            *(writer.write([_item(2 * i), _item(2 * i + 1)]) for i in range(50))
+        )
+        async with engine.connect() as conn:
+            rows = dict(
+                (await conn.execute(text("SELECT id, text FROM interactions"))).all()
+            )
+        await engine.dispose()
+        return results, rows
+
+    results, rows = asyncio.run(scenario())
+
+    assert writer.stats()["commits"] < 10
+    assert len(rows) == 100
+    for i, ids in enumerate(results):
+        assert [rows[x] for x in ids] == [f"message {2 * i}", f"message {2 * i + 1}"]
+
+
+def test_failed_commit_is_reported_to_every_writer(tmp_path):
+    # Base sans tables : la transaction échoue
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{tmp_path / 'empty.db'}")
+    writer = GroupCommitWriter(async_sessionmaker(engine), window_ms=1)
+
+    async def scenario():
+        outcomes = await asyncio.gather(
+            writer.write([_item(0)]), writer.write([_item(1)]), return_exceptions=True
+        )
+        await engine.dispose()
+        return outcomes
+
+    outcomes = asyncio.run(scenario())
+    assert all(isinstance(o, Exception) for o in outcomes)
+    assert writer.stats()["failed_commits"] >= 1
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Interaction
+from app.db.session import init_db
+from app.repositories.interactions import get_history_page, get_user_history
+
+
+def _session(n=7):
+    engine = create_engine("sqlite://")
+    init_db(engine)
+    db = sessionmaker(bind=engine)()
+    start = datetime(2024, 1, 1)
+    for i in range(n):
+        db.add(
+            Interaction(
+                user_id="u1",
+                role="user" if i % 2 == 0 else "coach",
+                text=f"message {i}",
+                metadata_json={"i": i},
+                # deux messages au même instant pour tester le départage par id
+                created_at=start + timedelta(minutes=i // 2),
+            )
+        )
+    db.add(Interaction(user_id="u2", role="user", text="autre", created_at=start))
+    db.commit()
+    return engine, db
+
+
+def test_keyset_pages_cover_history_without_gaps():
+    _, db = _session()
+    seen = []
+    cursor = None
+    while True:
+        page = get_history_page(db, "u1", limit=3, before=cursor, fields=["text"])
+        seen += [item["text"] for item in page["items"]]
+        assert all(set(item) == {"text"} for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(seen) == sorted(f"message {i}" for i in range(7))
+    assert len(seen) == 7
+    assert seen[0] == "message 6"
+
+
+def test_same_timestamp_rows_come_newest_first():
+    _, db = _session(n=6)
+    ids = []
+    cursor = None
+    while True:
+        page = get_history_page(db, "u1", limit=3, before=cursor, fields=["id"])
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # réponse du coach (id plus grand) avant le message au même instant
+    assert ids == sorted(ids, reverse=True)
+    assert [i.id for i in get_user_history(db, "u1", limit=6)] == ids
+
+
+def test_after_cursor_and_role_filter():
+    _, db = _session()
+    first = get_history_page(db, "u1", limit=2)
+    older = get_history_page(db, "u1", limit=10, before=first["next_cursor"])
+    newer = get_history_page(db, "u1", limit=10, after=older["prev_cursor"])
+    assert [i["id"] for i in newer["items"]] == [i["id"] for i in first["items"]]
+
+    coach = get_history_page(db, "u1", limit=10, roles=["coach"])
+    assert {i["role"] for i in coach["items"]} == {"coach"}
+
+    with pytest.raises(ValueError):
+        get_history_page(db, "u1", before="pas-un-curseur")
+
+
+def test_history_query_uses_composite_index_without_sort():
+    engine, _ = _session()
+    with engine.connect() as conn:
+        plan = conn.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT id, text FROM interactions "
+                "WHERE user_id = 'u1' ORDER BY created_at DESC, id DESC LIMIT 10"
+            )
+        ).fetchall()
+    details = " ".join(str(row[-1]) for row in plan)
+    assert "ix_interactions_user_created_id" in details
+    assert "TEMP B-TREE" not in details
+
+
+def test_init_db_rebuilds_index_with_old_sort_order():
+    engine, _ = _session()
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_interactions_user_created_id"))
+        conn.execute(
+            text(
+                "CREATE INDEX ix_interactions_user_created_id "
+                "ON interactions (user_id, created_at DESC, id)"
+            )
+        )
+    init_db(engine)
+    with engine.connect() as conn:
+        keys = conn.execute(text("PRAGMA index_xinfo(ix_interactions_user_created_id)")).all()
+    assert [(row[2], row[3]) for row in keys if row[5]] == [
+        ("user_id", 0),
+        ("created_at", 1),
+        ("id", 1),
+    ]
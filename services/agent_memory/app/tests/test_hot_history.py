@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from app.cache.hot_history import HotHistoryCache
+
+T0 = datetime(2024, 1, 1)
+
+
+def _row(i, user_id="u1", role="user"):
+    return {
+        "id": i,
+        "user_id": user_id,
+        "role": role,
+        "text": f"message {i}",
+        "metadata": {},
+        "created_at": T0 + timedelta(minutes=i),
+    }
+
+
+def _fill(cache, user_id, rows, requested):
+    token = cache.begin_load(user_id)
+    cache.fill(user_id, rows, requested, token)
+
+
+def test_write_through_keeps_latest_entries_and_counts_hits():
+    cache = HotHistoryCache(depth=3, max_bytes=10**6, enabled=True)
+    assert cache.get_page("u1", 2) is None
+
+    _fill(cache, "u1", [_row(2), _row(1)], requested=3)  # utilisateur complet
+    cache.record_writes([_row(3), _row(4, role="coach")], [3, 4])
+
+    page = cache.get_page("u1", 3, fields=["id", "role"])
+    assert page["items"] == [
+        {"id": 4, "role": "coach"},
+        {"id": 3, "role": "user"},
+        {"id": 2, "role": "user"},
+    ]
+    assert page["next_cursor"] is not None  # l'interaction 1 est plus ancienne
+    assert cache.get_page("u1", 1, roles=["coach"])["items"][0]["id"] == 4
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_same_timestamp_entries_follow_index_order():
+    cache = HotHistoryCache(depth=3, max_bytes=10**6, enabled=True)
+    _fill(cache, "u1", [_row(1)], requested=3)
+    user, coach = _row(2), _row(3, role="coach")
+    coach["created_at"] = user["created_at"]  # même échange, même instant
+    cache.record_writes([user, coach], [2, 3])
+
+    assert [i["id"] for i in cache.get_page("u1", 3, fields=["id"])["items"]] == [3, 2, 1]
+
+
+def test_concurrent_write_makes_a_pending_load_stale():
+    cache = HotHistoryCache(depth=5, max_bytes=10**6, enabled=True)
+    token = cache.begin_load("u1")
+    cache.record_writes([_row(2)], [2])  # écrit pendant la lecture en base
+    cache.fill("u1", [_row(1)], 5, token)
+    assert cache.get_page("u1", 1) is None
+
+
+def test_memory_ceiling_evicts_least_recently_used_users():
+    cache = HotHistoryCache(depth=5, max_bytes=3300, enabled=True)
+    for user in ("a", "b", "c"):
+        _fill(cache, user, [_row(i, user) for i in range(5, 0, -1)], 5)
+    cache.get_page("a", 1)
+    _fill(cache, "d", [_row(i, "d") for i in range(5, 0, -1)], 5)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 3300
+    assert stats["evictions"] >= 1
+    assert cache.is_cached("d") and cache.is_cached("a")
+    assert not cache.is_cached("b")
@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+import app.mcp.handler as handler
+import app.summary.refresher as refresher
+from app.db.models import Interaction
+from app.db.session import create_memory_engine, init_db, init_db_async
+from app.db.shards import ShardRouter
+from app.repositories.interactions import create_interactions
+
+
+def _message(payload):
+    return {"message_id": "m", "from_agent": "test", "payload": payload}
+
+
+def _mood(user_id, created_at, physical, mental):
+    return {
+        "user_id": user_id,
+        "role": "mood",
+        "text": f"Mood du jour - physique: {physical}, mental: {mental}",
+        "metadata": {"service": "mood_tracker", "physical_state": physical, "mental_state": mental},
+        "created_at": created_at,
+    }
+
+
+def test_get_mood_timeline_aggregates_per_day(tmp_path, monkeypatch):
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{tmp_path / 'memory.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    router = ShardRouter([sessions])
+    monkeypatch.setattr(handler, "shard_router", router)
+    monkeypatch.setattr(refresher, "shard_router", router)
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    day_1 = today - timedelta(days=2)
+
+    async def scenario():
+        await init_db_async(engine)
+        async with sessions() as db:
+            await db.run_sync(
+                create_interactions,
+                items=[
+                    _mood("mood_u1", day_1, "low", "medium"),
+                    _mood("mood_u1", day_1 + timedelta(hours=3), "high", None),
+                    _mood("mood_u2", day_1, "high", "high"),
+                    {"user_id": "mood_u1", "role": "user", "text": "Séance faite", "metadata": {"service": "coaching"}, "created_at": day_1},
+                    _mood("mood_u1", today - timedelta(days=40), "low", "low"),
+                ],
+            )
+        await handler.process_mcp_message(
+            _message({"task": "save_mood", "user_id": "mood_u1", "physical_state": "medium", "mental_state": "high"})
+        )
+        timeline = await handler.process_mcp_message(
+            _message({"task": "get_mood_timeline", "user_id": "mood_u1", "days": 7})
+        )
+        invalid = await handler.process_mcp_message(
+            _message({"task": "get_mood_timeline", "user_id": "mood_u1", "start": "2025-02-10", "end": "2025-02-01"})
+        )
+        await engine.dispose()
+        return timeline.payload, invalid.payload
+
+    timeline, invalid = asyncio.run(scenario())
+
+    assert timeline["status"] == "ok"
+    assert [d["date"] for d in timeline["days"]] == [
+        day_1.date().isoformat(),
+        datetime.utcnow().date().isoformat(),
+    ]
+    first, last = timeline["days"]
+    assert first["entries"] == 2
+    assert first["physical"] == {"low": 1, "medium": 0, "high": 1}
+    assert first["mental"] == {"low": 0, "medium": 1, "high": 0}
+    assert first["physical_score"] == 0.5
+    # L'état mental inconnu ne compte pas dans la moyenne
+    assert first["mental_score"] == 0.5
+    assert (last["entries"], last["physical_score"], last["mental_score"]) == (1, 0.5, 1.0)
+
+    assert invalid["status"] == "error"
+
+
+def test_generated_columns_are_added_to_an_existing_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # Schéma d'avant les colonnes générées
+        conn.exec_driver_sql(
+            "CREATE TABLE interactions (id INTEGER PRIMARY KEY, user_id VARCHAR NOT NULL, "
+            "role VARCHAR NOT NULL, text TEXT NOT NULL, metadata JSON, created_at DATETIME NOT NULL)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO interactions (user_id, role, text, metadata, created_at) VALUES "
+            "('old', 'mood', 'm', '{\"service\": \"mood_tracker\", \"physical_state\": \"low\"}', "
+            "'2024-05-01 08:00:00.000000')"
+        )
+
+    init_db(engine)
+    init_db(engine)  # idempotent
+
+    with Session(engine) as db:
+        row = db.execute(
+            select(Interaction.meta_service, Interaction.physical_state, Interaction.mental_state)
+        ).one()
+        indexes = {
+            name
+            for (name,) in db.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index'")
+            )
+        }
+    engine.dispose()
+
+    assert tuple(row) == ("mood_tracker", "low", None)
+    assert {
+        "ix_interactions_service_created",
+        "ix_interactions_mood_timeline",
+        "ux_interactions_exchange_role",
+    } <= indexes
@@ -0,0 +1,163 @@
+import asyncio
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.mcp.handler as handler
+import app.summary.refresher as refresher
+from app.db.models import Interaction
+from app.db.session import create_memory_engine, init_db_async
+from app.db.shards import ShardRouter
+
+
+def _message(payload):
+    return {"message_id": "m", "from_agent": "test", "payload": payload}
+
+
+def _setup(tmp_path, monkeypatch):
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{tmp_path / 'memory.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    router = ShardRouter([sessions])
+    monkeypatch.setattr(handler, "shard_router", router)
+    monkeypatch.setattr(refresher, "shard_router", router)
+    monkeypatch.setattr(handler, "group_commits", {})
+    return engine, sessions
+
+
+async def _rows(sessions, user_id):
+    async with sessions() as db:
+        result = await db.execute(
+            select(Interaction.role, Interaction.text, Interaction.exchange_id)
+            .where(Interaction.user_id == user_id)
+            .order_by(Interaction.id)
+        )
+        return [tuple(row) for row in result]
+
+
+# mood_state tel que renvoyé par agent_mood (analyze_mood)
+MOOD = {
+    "status": "ok",
+    "task": "analyze_mood",
+    "user_id": "exch_u1",
+    "mood": "fatigue",
+    "score": 0.7,
+    "valence": "negative",
+    "energy": "low",
+    "matched_keywords": {"fatigue": ["creve"]},
+    "debug": {"explanation": "Détection de mots-clés liés à la fatigue."},
+}
+MEAL = {"title": "Pâtes carbonara", "description": "Pâtes, lardons, crème", "kcal": 750}
+
+
+def test_exchange_is_recorded_once_across_writers(tmp_path, monkeypatch):
+    engine, sessions = _setup(tmp_path, monkeypatch)
+
+    async def scenario():
+        await init_db_async(engine)
+        # cerveau : message + réponse
+        from_cerveau = await handler.process_mcp_message(
+            _message(
+                {
+                    "task": "record_exchanges",
+                    "exchanges": [
+                        {
+                            "exchange_id": "ex-1",
+                            "user_id": "exch_u1",
+                            "user_text": "Je suis crevé après ma séance",
+                            "user_metadata": {"mood_raw": "fatigue"},
+                            "coach_text": "Repos ce soir, on reprend demain.",
+                        }
+                    ],
+                }
+            )
+        )
+        # interface : l'échange complet, avec mood et repas
+        full = {
+            "task": "record_exchange",
+            "exchange_id": "ex-1",
+            "user_id": "exch_u1",
+            "user_text": "Je suis crevé après ma séance",
+            "coach_text": "Repos ce soir, on reprend demain.",
+            "mood": MOOD,
+            "meal": MEAL,
+        }
+        from_interface = await handler.process_mcp_message(_message(full))
+        replay = await handler.process_mcp_message(_message(full))
+        timeline = await handler.process_mcp_message(
+            _message({"task": "get_mood_timeline", "user_id": "exch_u1", "days": 1})
+        )
+        history = await handler.process_mcp_message(
+            _message({"task": "get_history", "user_id": "exch_u1", "limit": 10})
+        )
+        rows = await _rows(sessions, "exch_u1")
+        await engine.dispose()
+        return from_cerveau.payload, from_interface.payload, replay.payload, timeline.payload, history.payload, rows
+
+    from_cerveau, from_interface, replay, timeline, history, rows = asyncio.run(scenario())
+
+    assert sorted(from_cerveau["results"][0]["interaction_ids"]) == ["coach", "user"]
+    assert from_interface["skipped"] == ["user", "coach"]
+    assert sorted(from_interface["interaction_ids"]) == ["meal", "mood"]
+    assert replay["interaction_ids"] == {}
+    assert replay["skipped"] == ["user", "coach", "mood", "meal"]
+
+    assert [(role, exchange_id) for role, _, exchange_id in rows] == [
+        ("user", "ex-1"),
+        ("coach", "ex-1"),
+        ("mood", "ex-1"),
+        ("meal", "ex-1"),
+    ]
+    assert "750 kcal" in rows[3][1]
+    assert rows[2][1] == "Mood du jour - physique: low, mental: low"
+    # Le mood de l'échange alimente la frise du mood tracker
+    day = timeline["days"][0]
+    assert day["physical"]["low"] == 1 and day["mental"]["low"] == 1
+    # Le cache d'historique n'a reçu que les lignes réellement insérées
+    assert len(history["history"]) == 4
+    user_row = next(h for h in history["history"] if h["role"] == "user")
+    assert user_row["metadata"] == {"service": "coaching_sport", "mood_raw": "fatigue"}
+
+
+def test_concurrent_writers_and_invalid_exchanges(tmp_path, monkeypatch):
+    engine, sessions = _setup(tmp_path, monkeypatch)
+    exchange = {
+        "task": "record_exchange",
+        "exchange_id": "ex-2",
+        "user_id": "exch_u2",
+        "user_text": "Combien de protéines après le sport ?",
+        "coach_text": "Environ 20 à 30 g.",
+    }
+
+    async def scenario():
+        await init_db_async(engine)
+        # Même échange envoyé 5 fois en même temps : un seul commit groupé
+        results = await asyncio.gather(
+            *(handler.process_mcp_message(_message(exchange)) for _ in range(5))
+        )
+        missing_id = await handler.process_mcp_message(
+            _message({"task": "record_exchange", "user_id": "exch_u2", "user_text": "?"})
+        )
+        empty = await handler.process_mcp_message(
+            _message({"task": "record_exchanges", "exchanges": [{"exchange_id": "ex-3", "user_id": "exch_u2"}]})
+        )
+        # Mood sans état exploitable : pas de ligne mood
+        no_state = await handler.process_mcp_message(
+            _message({"task": "record_exchange", "exchange_id": "ex-4", "user_id": "exch_u2", "mood": {"score": 0.4}})
+        )
+        async with sessions() as db:
+            count = (
+                await db.execute(
+                    select(func.count(Interaction.id)).where(Interaction.user_id == "exch_u2")
+                )
+            ).scalar()
+        await engine.dispose()
+        return [r.payload for r in results], missing_id.payload, empty.payload, no_state.payload, count
+
+    results, missing_id, empty, no_state, count = asyncio.run(scenario())
+
+    assert count == 2
+    assert sum(len(r["interaction_ids"]) for r in results) == 2
+    assert all(r["status"] == "ok" for r in results)
+    assert missing_id["status"] == "error" and "exchange_id" in missing_id["message"]
+    assert empty["status"] == "error"
+    assert no_state["status"] == "error"
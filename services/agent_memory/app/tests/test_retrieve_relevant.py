@@ -0,0 +1,163 @@
+import asyncio
+import os
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import app.mcp.handler as handler
+import app.summary.refresher as refresher
+from app.db.session import create_memory_engine, init_db_async
+from app.db.shards import ShardRouter
+from app.retrieval.vector_index import VectorIndex
+
+FILLER = [
+    "Séance de fractionné terminée, 8 x 400 m.",
+    "Pense à bien t'hydrater pendant l'effort.",
+    "J'ai mangé des pâtes ce midi.",
+    "Objectif : courir un 10 km en moins de 50 minutes.",
+    "Bien dormi cette nuit, 8 heures.",
+    "Fais 10 minutes d'étirements après la séance.",
+]
+
+
+def _message(payload):
+    return {"message_id": "m", "from_agent": "test", "payload": payload}
+
+
+def _setup(tmp_path, monkeypatch):
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{tmp_path / 'memory.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    router = ShardRouter([sessions])
+    monkeypatch.setattr(handler, "shard_router", router)
+    monkeypatch.setattr(refresher, "shard_router", router)
+    index = VectorIndex(directory=str(tmp_path / "vectors"), enabled=True)
+    monkeypatch.setattr(handler, "vector_index", index)
+    return engine, index
+
+
+async def _save(items):
+    response = await handler.process_mcp_message(
+        _message({"task": "save_interactions", "interactions": items})
+    )
+    return response.payload["interaction_ids"]
+
+
+async def _retrieve(user_id, query, **extra):
+    response = await handler.process_mcp_message(
+        _message({"task": "retrieve_relevant", "user_id": user_id, "query": query, **extra})
+    )
+    return response.payload
+
+
+def test_old_relevant_interaction_is_found_and_index_stays_incremental(tmp_path, monkeypatch):
+    engine, index = _setup(tmp_path, monkeypatch)
+
+    async def scenario():
+        await init_db_async(engine)
+        [injury] = await _save(
+            [{"user_id": "u1", "role": "user", "text": "J'ai une tendinite au genou droit depuis dimanche."}]
+        )
+        await _save([{"user_id": "u1", "role": "user", "text": t} for t in FILLER * 5])
+        await _save([{"user_id": "u2", "role": "user", "text": "Mon genou droit me fait mal."}])
+
+        first = await _retrieve("u1", "Mon genou me fait encore mal, que faire ?", k=3)
+        again = await _retrieve("u1", "douleur au genou", k=3)
+        excluded = await _retrieve("u1", "douleur au genou", k=3, exclude_ids=[injury])
+
+        [later] = await _save(
+            [{"user_id": "u1", "role": "user", "text": "Le kiné dit que ma tendinite du genou guérit."}]
+        )
+        after_write = await _retrieve("u1", "tendinite genou", k=2)
+        await engine.dispose()
+        return injury, later, first, again, excluded, after_write
+
+    injury, later, first, again, excluded, after_write = asyncio.run(scenario())
+
+    assert first["status"] == "ok"
+    assert first["results"][0]["id"] == injury
+    assert all(r["user_id"] == "u1" for r in first["results"])
+    assert again["results"][0]["id"] == injury
+    assert injury not in [r["id"] for r in excluded["results"]]
+    assert {r["id"] for r in after_write["results"]} == {injury, later}
+
+    stats = index.stats()
+    assert stats["indexed"] == 32
+    # 1 rattrapage initial + 1 après la nouvelle écriture ; les autres recherches
+    # n'ont pas touché la base.
+    assert (stats["catchup_queries"], stats["catchups_skipped"]) == (2, 2)
+
+
+def test_query_without_common_feature_returns_no_result(tmp_path, monkeypatch):
+    engine, _ = _setup(tmp_path, monkeypatch)
+
+    async def scenario():
+        await init_db_async(engine)
+        await _save([{"user_id": "u1", "role": "user", "text": "J'aime courir le matin"}])
+        response = await _retrieve("u1", "xyz", k=3)
+        await engine.dispose()
+        return response
+
+    response = asyncio.run(scenario())
+    assert response["status"] == "ok"
+    assert response["results"] == []
+
+
+def test_index_is_reloaded_from_disk_and_rebuilt_if_corrupt(tmp_path, monkeypatch):
+    engine, index = _setup(tmp_path, monkeypatch)
+
+    async def scenario():
+        await init_db_async(engine)
+        await _save([{"user_id": "u1", "role": "user", "text": t} for t in FILLER])
+        before = await _retrieve("u1", "étirements après la séance", k=2)
+
+        reloaded = VectorIndex(directory=index.directory, enabled=True)
+        monkeypatch.setattr(handler, "vector_index", reloaded)
+        from_disk = await _retrieve("u1", "étirements après la séance", k=2)
+
+        folder = reloaded._user_dir("u1")
+        with open(os.path.join(folder, "values.bin"), "r+b") as f:
+            f.truncate(100)
+        rebuilt = VectorIndex(directory=index.directory, enabled=True)
+        monkeypatch.setattr(handler, "vector_index", rebuilt)
+        after_rebuild = await _retrieve("u1", "étirements après la séance", k=2)
+        await engine.dispose()
+        return before, from_disk, reloaded, after_rebuild, rebuilt
+
+    before, from_disk, reloaded, after_rebuild, rebuilt = asyncio.run(scenario())
+
+    assert from_disk["results"] == before["results"]
+    assert after_rebuild["results"] == before["results"]
+    assert reloaded.stats()["disk_loads"] == 1 and reloaded.stats()["indexed"] == 0
+    assert rebuilt.stats()["rebuilds"] == 1 and rebuilt.stats()["indexed"] == len(FILLER)
+
+
+def test_posting_lists_and_unindexed_tail_score_like_dense_cosine():
+    import numpy as np
+
+    from app.retrieval.embedding import embed_text, embed_texts
+    from app.retrieval.vector_index import _UserVectors
+
+    dim = 2**12
+    texts = [f"{FILLER[i % len(FILLER)]} semaine {i % 7}" for i in range(300)]
+    vectors = _UserVectors(dim)
+    vectors.append(np.arange(300), *embed_texts(texts, dim))
+    query = embed_text("étirements après la séance de fractionné", dim)
+    vectors.search(*query, k=1)  # construit les listes inversées
+    extra = ["Étirements du soir après le fractionné."] * 5
+    vectors.append(np.arange(300, 305), *embed_texts(extra, dim))
+    assert vectors._posting_count == 300
+
+    dense = np.zeros((305, dim))
+    for row, text in enumerate(texts + extra):
+        indices, values = embed_text(text, dim)
+        dense[row, indices] = values
+    idf = np.log(306 / (1.0 + np.count_nonzero(dense, axis=0))) + 1.0
+    q = np.zeros(dim)
+    q[query[0]] = query[1]
+    expected = (dense * idf) @ (q * idf)
+    expected /= np.linalg.norm(dense * idf, axis=1) * np.linalg.norm(q * idf)
+
+    hits = vectors.search(*query, k=10)
+    # Les normes des 300 premiers vecteurs datent de l'IDF d'avant l'ajout
+    # (recalcul à +10 %) : écart toléré de 2 %.
+    assert np.allclose([score for _, score in hits], np.sort(expected)[::-1][:10], rtol=0.02)
+    assert np.allclose([expected[i] for i, _ in hits], [score for _, score in hits], rtol=0.02)
@@ -0,0 +1,52 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Interaction
+from app.db.session import init_db
+from app.repositories.search import build_match_query, search_history
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    init_db(engine)
+    db = sessionmaker(bind=engine)()
+    texts = [
+        ("u1", "user", "J'ai mal au genou après la course"),
+        ("u1", "coach", "Pour ton genou : repos, glace, et reprise progressive."),
+        ("u1", "coach", "Bois de l'eau pendant l'effort."),
+        ("u2", "user", "Mon genou va mieux"),
+    ]
+    for user_id, role, t in texts:
+        db.add(Interaction(user_id=user_id, role=role, text=t))
+    db.commit()
+    return db
+
+
+def test_search_is_scoped_ranked_and_accent_insensitive():
+    db = _session()
+    found = search_history(db, "u1", "Qu'a dit le coach sur mon GENOU ?")
+    assert len(found["results"]) == 2
+    assert all("genou" in r["text"].lower() for r in found["results"])
+    assert "[genou]" in found["results"][0]["snippet"].lower()
+
+    assert len(search_history(db, "u1", "apres")["results"]) == 1
+    assert search_history(db, "u1", "genou", roles=["coach"])["results"][0]["role"] == "coach"
+
+    page = search_history(db, "u1", "genou", limit=1)
+    assert page["has_more"] is True
+
+
+def test_triggers_keep_index_in_sync_and_queries_are_escaped():
+    db = _session()
+    row = db.query(Interaction).filter_by(text="Bois de l'eau pendant l'effort.").one()
+    row.text = "Hydratation : bois souvent."
+    db.delete(db.query(Interaction).filter_by(user_id="u2").one())
+    db.commit()
+
+    assert search_history(db, "u1", "hydratation")["results"][0]["id"] == row.id
+    assert search_history(db, "u1", "effort")["results"] == []
+    assert db.execute(text("SELECT count(*) FROM interactions_fts")).scalar() == 3
+
+    # Syntaxe FTS dans la saisie : neutralisée
+    assert build_match_query('genou" OR owner:*') == '"genou" AND "OR" AND "owner"*'
+    assert search_history(db, "u1", 'genou" OR owner:*')["results"] == []
@@ -0,0 +1,186 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+import app.mcp.handler as handler
+import app.summary.refresher as refresher
+from app.db.models import Interaction
+from app.db.rebalance import rebalance
+from app.db.session import init_db
+from app.db.shards import ShardRouter, shard_of
+from app.repositories.interactions import create_interactions
+from app.repositories.partitions import upsert_partition
+from app.repositories.search import search_history
+from app.repositories.summaries import count_unsummarized, get_summary, upsert_summary
+from app.retrieval.vector_index import VectorIndex
+
+
+def _message(payload):
+    return {"message_id": "m", "from_agent": "test", "payload": payload}
+
+
+def _users_by_shard(count, per_shard):
+    found = {shard: [] for shard in range(count)}
+    i = 0
+    while any(len(users) < per_shard for users in found.values()):
+        user_id = f"shard_u{i}"
+        if len(found[shard_of(user_id, count)]) < per_shard:
+            found[shard_of(user_id, count)].append(user_id)
+        i += 1
+    return found
+
+
+def _count_rows(path, user_id=None):
+    engine = create_engine(f"sqlite:///{path}")
+    with Session(engine) as db:
+        query = select(func.count(Interaction.id))
+        if user_id is not None:
+            query = query.where(Interaction.user_id == user_id)
+        count = db.execute(query).scalar()
+    engine.dispose()
+    return count
+
+
+def test_routing_is_stable_and_balanced():
+    counts = Counter(shard_of(f"user-{i}", 4) for i in range(4000))
+    assert set(counts) == {0, 1, 2, 3}
+    assert all(800 <= n <= 1200 for n in counts.values())
+    assert shard_of("user-1", 1) == 0 and shard_of(None, 4) == 0
+    # Même shard d'un appel à l'autre
+    assert [shard_of(f"user-{i}", 4) for i in range(50)] == [shard_of(f"user-{i}", 4) for i in range(50)]
+
+
+def test_writes_and_reads_go_to_the_user_shard(tmp_path, monkeypatch):
+    paths = [tmp_path / "shard0.db", tmp_path / "shard1.db"]
+    router = ShardRouter.from_urls([f"sqlite+aiosqlite:///{p}" for p in paths])
+    monkeypatch.setattr(handler, "shard_router", router)
+    monkeypatch.setattr(refresher, "shard_router", router)
+    users = _users_by_shard(2, 1)
+    u0, u1 = users[0][0], users[1][0]
+
+    async def scenario():
+        await router.init_all()
+        saved = await handler.process_mcp_message(
+            _message(
+                {
+                    "task": "save_interactions",
+                    "interactions": [
+                        {"user_id": u0, "text": "Footing 5 km"},
+                        {"user_id": u1, "text": "Natation 1 km"},
+                        {"user_id": u0, "text": "Étirements"},
+                    ],
+                }
+            )
+        )
+        history = await handler.process_mcp_message(
+            _message({"task": "get_history", "user_id": u1, "limit": 10})
+        )
+        await router.dispose_all()
+        return saved.payload, history.payload
+
+    saved, history = asyncio.run(scenario())
+
+    # Ids propres à chaque shard, renvoyés dans l'ordre du lot
+    assert saved["interaction_ids"] == [1, 1, 2]
+    assert [h["text"] for h in history["history"]] == ["Natation 1 km"]
+    assert (_count_rows(paths[0], u0), _count_rows(paths[0], u1)) == (2, 0)
+    assert (_count_rows(paths[1], u0), _count_rows(paths[1], u1)) == (0, 1)
+
+
+def test_rebalance_moves_users_with_their_summary(tmp_path):
+    paths = [tmp_path / "shard0.db", tmp_path / "shard1.db"]
+    users = _users_by_shard(2, 2)
+    engine = create_engine(f"sqlite:///{paths[0]}")
+    init_db(engine)
+    with Session(engine) as db:
+        for round_ in range(3):
+            create_interactions(
+                db,
+                [
+                    {"user_id": u, "role": "user", "text": f"séance {round_} de {u} : fractionné"}
+                    for u in users[0] + users[1]
+                ],
+            )
+        for u in users[0] + users[1]:
+            # Résumé des deux premières séances de chaque utilisateur
+            covered = (
+                db.execute(
+                    select(Interaction.id)
+                    .where(Interaction.user_id == u)
+                    .order_by(Interaction.id)
+                    .limit(2)
+                )
+                .scalars()
+                .all()
+            )
+            upsert_summary(
+                db,
+                u,
+                summary=f"résumé {u}",
+                state={},
+                last_interaction_id=covered[-1],
+                interactions_covered=2,
+            )
+    engine.dispose()
+
+    urls = [f"sqlite:///{p}" for p in paths]
+    index = VectorIndex(directory=str(tmp_path / "vectors"), enabled=True)
+    report = rebalance(urls, 1, 2, batch=2, index=index)
+    again = rebalance(urls, 1, 2, index=index)
+
+    assert (report["users_moved"], report["interactions_moved"]) == (2, 6)
+    assert again["users_moved"] == 0
+    for u in users[0]:
+        assert (_count_rows(paths[0], u), _count_rows(paths[1], u)) == (3, 0)
+    for u in users[1]:
+        assert (_count_rows(paths[0], u), _count_rows(paths[1], u)) == (0, 3)
+
+    target = create_engine(urls[1])
+    with Session(target) as db:
+        moved = users[1][0]
+        summary = get_summary(db, moved)
+        assert summary.summary == f"résumé {moved}"
+        # Seule la troisième séance reste à résumer dans le nouveau shard
+        assert count_unsummarized(db, moved) == 1
+        found = search_history(db, user_id=moved, query="fractionné")
+        assert len(found["results"]) == 3
+    target.dispose()
+
+
+def test_rebalance_refuses_shards_with_archived_partitions_unless_forced(tmp_path):
+    paths = [tmp_path / "shard0.db", tmp_path / "shard1.db"]
+    users = _users_by_shard(2, 1)
+    engine = create_engine(f"sqlite:///{paths[0]}")
+    init_db(engine)
+    with Session(engine) as db:
+        create_interactions(
+            db, [{"user_id": u, "role": "user", "text": "séance"} for u in users[0] + users[1]]
+        )
+        upsert_partition(
+            db,
+            month="2024-01",
+            path=str(tmp_path / "interactions_2024_01.sqlite.gz"),
+            rows=1,
+            min_id=1,
+            max_id=1,
+            min_created_at=datetime(2024, 1, 1),
+            max_created_at=datetime(2024, 1, 1),
+        )
+    engine.dispose()
+
+    urls = [f"sqlite:///{p}" for p in paths]
+    index = VectorIndex(directory=str(tmp_path / "vectors"), enabled=True)
+    with pytest.raises(ValueError):
+        rebalance(urls, 1, 2, index=index)
+    assert _count_rows(paths[0], users[1][0]) == 1
+
+    dry = rebalance(urls, 1, 2, index=index, dry_run=True)
+    forced = rebalance(urls, 1, 2, index=index, force=True)
+
+    assert dry["archived_shards"] == [0] and dry["interactions_moved"] == 0
+    assert forced["archived_shards"] == [0] and forced["users_moved"] == 1
+    assert _count_rows(paths[1], users[1][0]) == 1
@@ -0,0 +1,36 @@
+from app.summary.summarizer import estimate_tokens, render_summary, update_state
+
+
+def _turns(n):
+    for i in range(n):
+        yield {
+            "role": "user",
+            "text": f"J'ai 34 ans, je pèse 92 kg et je veux perdre du poids en courant ({i})",
+            "metadata": {"mood_raw": "motivé"},
+        }
+        yield {
+            "role": "coach",
+            "text": "**Petit plan simple à mettre en place**\n* 10 min de marche\n* 3 × 1 min de footing",
+        }
+
+
+def test_summary_is_incremental_and_bounded():
+    state = update_state(None, _turns(3))
+    state = update_state(state, _turns(50))
+    summary = render_summary(state)
+
+    assert state["covered"] == 106
+    assert state["profile"] == {"âge": "34", "poids": "92"}
+    assert "perte de poids" in state["goals"] and "course à pied" in state["goals"]
+    assert state["last_plan"] == ["10 min de marche", "3 × 1 min de footing"]
+    assert len(state["last_requests"]) == 3
+    # La taille du résumé ne dépend pas du nombre d'échanges
+    assert estimate_tokens(summary) < estimate_tokens(render_summary(update_state(None, _turns(3)))) * 1.5
+
+
+def test_mood_interactions_feed_recent_moods():
+    state = update_state(
+        None,
+        [{"role": "mood", "text": "", "metadata": {"physical_state": "low", "mental_state": "high"}}],
+    )
+    assert state["moods"] == ["physique low, mental high"]
@@ -0,0 +1,155 @@
+# services/agent_memory/benchmarks/bench_archive.py
+
+"""
+Benchmark de l'archivage des mois anciens : taille de la base chaude,
+lecture d'historique et écriture avant / après, durée du job,
+compression et lecture dans les archives.
+
+    python -m benchmarks.bench_archive --rows 300000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.archive.archiver import Archiver
+from app.archive.cold_store import ColdStore
+from app.db.session import create_memory_engine, init_db_async
+from app.repositories.interactions import create_interactions, get_history_page
+from app.repositories.partitions import list_partitions
+from app.retrieval.vector_index import VectorIndex
+
+
+def _report(label: str, timings: List[float]) -> None:
+    print(
+        f"{label:<46} médiane {statistics.median(timings):8.3f} ms   "
+        f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:8.3f} ms"
+    )
+
+
+def _db_size(path: str) -> float:
+    return sum(
+        os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix)
+    ) / 2**20
+
+
+async def _measure(sessions, label: str, repeat: int) -> None:
+    timings = []
+    async with sessions() as db:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            await db.run_sync(get_history_page, user_id="heavy", limit=20)
+            timings.append((time.perf_counter() - t0) * 1000.0)
+    _report(f"[{label}] première page d'historique", timings)
+
+    timings = []
+    for i in range(repeat):
+        async with sessions() as db:
+            t0 = time.perf_counter()
+            await db.run_sync(
+                create_interactions,
+                items=[{"user_id": f"user-{i % 50}", "role": "user", "text": f"Séance du jour {i}"}],
+            )
+            timings.append((time.perf_counter() - t0) * 1000.0)
+    _report(f"[{label}] écriture d'une interaction", timings)
+
+
+async def _run(args, tmp: str) -> None:
+    db_path = os.path.join(tmp, "bench.db")
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{db_path}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    await init_db_async(engine)
+
+    rng = random.Random(3)
+    now = datetime.utcnow()
+    span = timedelta(days=30 * args.months)
+    rows = sorted(
+        (now - span + timedelta(seconds=rng.randrange(int(span.total_seconds()))) for _ in range(args.rows))
+    )
+    batch = []
+    async with engine.begin() as conn:
+        for i, created_at in enumerate(rows):
+            batch.append(
+                {
+                    "user_id": "heavy" if i % 10 == 0 else f"user-{rng.randrange(args.users)}",
+                    "role": "user" if i % 2 == 0 else "coach",
+                    "text": f"Séance {i} : " + "footing tranquille, hydratation ok. " * rng.randrange(1, 6),
+                    "created_at": created_at,
+                }
+            )
+            if len(batch) == 20_000 or i == len(rows) - 1:
+                await conn.execute(
+                    text(
+                        "INSERT INTO interactions (user_id, role, text, metadata, created_at) "
+                        "VALUES (:user_id, :role, :text, '{\"service\": \"coaching_sport\"}', :created_at)"
+                    ),
+                    batch,
+                )
+                batch = []
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    print(f"{args.rows} interactions sur {args.months} mois, base chaude {_db_size(db_path):.1f} Mo")
+    await _measure(sessions, "avant", args.repeat)
+
+    store = ColdStore(directory=os.path.join(tmp, "archive"), cache_files=2)
+    archiver = Archiver(
+        sessions, store=store, index=VectorIndex(enabled=False), hot_months=6, interval_s=0
+    )
+    report = await archiver.run_once()
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        await conn.exec_driver_sql("VACUUM")
+    async with sessions() as db:
+        partitions = await db.run_sync(list_partitions)
+    raw = sum(p.bytes_raw for p in partitions) / 2**20
+    compressed = sum(p.bytes_compressed for p in partitions) / 2**20
+    print(
+        f"archivage : {report['rows_deleted']} interactions en {report['duration_ms'] / 1000:.1f} s, "
+        f"{len(partitions)} partitions, {raw:.1f} Mo -> {compressed:.1f} Mo "
+        f"(x{raw / compressed:.1f}), base chaude {_db_size(db_path):.1f} Mo"
+    )
+    await _measure(sessions, "après", args.repeat)
+
+    # Lecture dans les archives : page juste avant la partie chaude
+    oldest = partitions[-1]
+    cursor_partitions = partitions[len(partitions) // 2 :]
+    timings_cold, timings_warm = [], []
+    for partition in cursor_partitions[: args.repeat]:
+        store.forget(partition.path)
+        t0 = time.perf_counter()
+        await asyncio.to_thread(store.history_page, [partition], "heavy", 20)
+        timings_cold.append((time.perf_counter() - t0) * 1000.0)
+        t0 = time.perf_counter()
+        await asyncio.to_thread(store.history_page, [partition], "heavy", 20)
+        timings_warm.append((time.perf_counter() - t0) * 1000.0)
+    _report("[archives] page, avec décompression", timings_cold)
+    _report("[archives] page, fichier déjà décompressé", timings_warm)
+    print(f"(partition la plus ancienne : {oldest.month}, {oldest.rows} interactions)")
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run(args, tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# services/agent_memory/benchmarks/bench_backup.py
+
+"""
+Benchmark de la latence d'écriture pendant une sauvegarde à chaud :
+sans sauvegarde, copie de fichier, sauvegarde en un pas et par pas, sur
+une base WAL puis en journal classique.
+
+    python -m benchmarks.bench_backup --rows 300000 --clients 8 --seconds 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import List
+
+
+def _prefill(path: str, rows: int) -> None:
+    conn = sqlite3.connect(path)
+    metadata = json.dumps({"service": "coaching_sport"})
+    batch = 10000
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO interactions (user_id, role, text, metadata, created_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (f"user-{n % 500}", "user", f"message {n} " + "bla " * 40, metadata, "2026-01-01 00:00:00.000000")
+                for n in range(start, min(rows, start + batch))
+            ],
+        )
+        conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+async def _run(label: str, args, path: str, backup_dir: str, quiet: bool = False) -> None:
+    import shutil
+
+    import app.mcp.handler as handler
+    from app.backup.snapshots import backup_database
+
+    handler.group_commits.clear()
+    latencies: List[float] = []
+    durations: List[float] = []
+    stop = asyncio.Event()
+    counter = {"sent": 0}
+
+    async def client() -> None:
+        while not stop.is_set():
+            n = counter["sent"]
+            counter["sent"] += 1
+            t0 = time.perf_counter()
+            await handler.process_mcp_message(
+                {
+                    "payload": {
+                        "task": "save_interaction",
+                        "user_id": f"user-{n % 500}",
+                        "text": f"pendant {n} " + "bla " * 20,
+                    }
+                }
+            )
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            await asyncio.sleep(args.interval_ms / 1000.0)
+
+    def one_backup() -> None:
+        target = os.path.join(backup_dir, f"{label.replace(' ', '_')}.db")
+        t0 = time.perf_counter()
+        if label == "copie":
+            shutil.copyfile(path, target)
+        elif label == "un pas":
+            backup_database(path, target, pages=-1, pause_ms=0)
+        else:
+            backup_database(path, target, pages=args.pages, pause_ms=args.pause_ms)
+        durations.append((time.perf_counter() - t0) * 1000.0)
+
+    async def backups() -> None:
+        if label == "sans":
+            return
+        while not stop.is_set():
+            await asyncio.to_thread(one_backup)
+
+    clients = [asyncio.ensure_future(client()) for _ in range(args.clients)]
+    runner = asyncio.ensure_future(backups())
+    await asyncio.sleep(1.0 if quiet else args.seconds)
+    stop.set()
+    await asyncio.gather(runner, *clients)
+    if quiet:
+        return
+
+    latencies.sort()
+    extra = ""
+    if durations:
+        extra = f"   {len(durations)} sauvegardes de {statistics.median(durations):6.0f} ms"
+    print(
+        f"{label:<8} {len(latencies):6d} écritures   "
+        f"p50 {statistics.median(latencies):6.2f} ms   "
+        f"p99 {latencies[int(0.99 * (len(latencies) - 1))]:7.2f} ms   "
+        f"max {latencies[-1]:7.2f} ms{extra}"
+    )
+
+
+async def _main(args, tmp: str) -> None:
+    import app.mcp.handler as handler
+    import app.summary.refresher as refresher
+    from app.db.shards import ShardRouter
+
+    path = os.path.join(tmp, "memory.db")
+    router = ShardRouter.from_urls([f"sqlite+aiosqlite:///{path}"])
+    handler.shard_router = refresher.shard_router = router
+    await router.init_all()
+    await asyncio.to_thread(_prefill, path, args.rows)
+    print(f"base : {os.path.getsize(path) / 1e6:.0f} Mo")
+
+    backup_dir = os.path.join(tmp, "backups")
+    os.makedirs(backup_dir)
+    # Mise en route (caches, pool de connexions), non mesurée
+    await _run("sans", args, path, backup_dir, quiet=True)
+    for label in ("sans", "copie", "un pas", "par pas"):
+        await _run(label, args, path, backup_dir)
+    await router.dispose_all()
+
+
+def _run_journal(label: str, args, path: str, backup_dir: str) -> None:
+    import threading
+
+    from app.backup.snapshots import backup_database
+
+    latencies: List[float] = []
+    durations: List[float] = []
+    stop = threading.Event()
+
+    def writer() -> None:
+        conn = sqlite3.connect(path, timeout=30)
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            conn.execute("INSERT INTO moods (mood_json) VALUES (?)", ("{}",))
+            conn.commit()
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            time.sleep(args.interval_ms / 1000.0)
+        conn.close()
+
+    def backups() -> None:
+        target = os.path.join(backup_dir, "moods.db")
+        while label != "sans" and not stop.is_set():
+            t0 = time.perf_counter()
+            if label == "un pas":
+                report = backup_database(path, target, pages=-1, pause_ms=0)
+            else:
+                report = backup_database(path, target, pages=args.pages, pause_ms=args.pause_ms)
+            durations.append((time.perf_counter() - t0) * 1000.0)
+            restarts.append(report["restarts"])
+
+    restarts: List[int] = []
+    threads = [threading.Thread(target=writer), threading.Thread(target=backups)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    extra = ""
+    if durations:
+        extra = (
+            f"   {len(durations)} sauvegardes de {statistics.median(durations):6.0f} ms"
+            f" ({sum(restarts)} redémarrages)"
+        )
+    print(
+        f"{label:<8} {len(latencies):6d} écritures   "
+        f"p50 {statistics.median(latencies):6.2f} ms   "
+        f"p99 {latencies[int(0.99 * (len(latencies) - 1))]:7.2f} ms   "
+        f"max {latencies[-1]:7.2f} ms{extra}"
+    )
+
+
+def _journal(args, tmp: str) -> None:
+    path = os.path.join(tmp, "moods.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE moods (id INTEGER PRIMARY KEY AUTOINCREMENT, mood_json TEXT NOT NULL)")
+    conn.executemany(
+        "INSERT INTO moods (mood_json) VALUES (?)",
+        [(json.dumps({"label": "fatigue", "n": n, "notes": "bla " * 40}),) for n in range(args.journal_rows)],
+    )
+    conn.commit()
+    conn.close()
+    print(f"journal classique : {os.path.getsize(path) / 1e6:.0f} Mo")
+    backup_dir = os.path.join(tmp, "backups_journal")
+    os.makedirs(backup_dir)
+    for label in ("sans", "un pas", "par pas"):
+        _run_journal(label, args, path, backup_dir)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--journal-rows", type=int, default=100000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--interval-ms", type=float, default=2.0)
+    parser.add_argument("--pages", type=int, default=256)
+    parser.add_argument("--pause-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUMMARY_REFRESH_EVERY", str(10**9))
+    os.environ.setdefault("MEMORY_VECTOR_ENABLED", "0")
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_main(args, tmp))
+        _journal(args, tmp)
+
+
+if __name__ == "__main__":
+    main()
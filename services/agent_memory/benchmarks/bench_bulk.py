@@ -0,0 +1,143 @@
+# services/agent_memory/benchmarks/bench_bulk.py
+
+"""
+Benchmark de l'export / import NDJSON en flux (débit et pic de mémoire),
+comparé au chargement de toute la table en une seule réponse.
+
+    python -m benchmarks.bench_bulk --rows 200000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.bulk.ndjson import export_interactions, import_interactions
+from app.db.models import Interaction
+from app.db.session import create_memory_engine, init_db_async
+from app.db.shards import ShardRouter
+
+
+def _mb(value: int) -> str:
+    return f"{value / 2**20:7.1f} Mo"
+
+
+async def _populate(engine, rows: int) -> None:
+    rng = random.Random(5)
+    start = datetime(2024, 1, 1)
+    batch = []
+    async with engine.begin() as conn:
+        for i in range(rows):
+            batch.append(
+                {
+                    "user_id": f"user-{rng.randrange(500)}",
+                    "role": "user" if i % 2 == 0 else "coach",
+                    "text": f"Séance {i} : " + "footing tranquille, hydratation ok. " * rng.randrange(1, 6),
+                    "created_at": start + timedelta(seconds=30 * i),
+                }
+            )
+            if len(batch) == 20_000 or i == rows - 1:
+                await conn.execute(
+                    text(
+                        "INSERT INTO interactions (user_id, role, text, metadata, created_at) "
+                        "VALUES (:user_id, :role, :text, '{\"service\": \"coaching_sport\"}', :created_at)"
+                    ),
+                    batch,
+                )
+                batch = []
+
+
+async def _file_chunks(path: str):
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(64 * 1024)
+            if not data:
+                return
+            yield data
+
+
+async def _run(args, tmp: str) -> None:
+    source_engine = create_memory_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'source.db')}")
+    source = async_sessionmaker(source_engine, expire_on_commit=False)
+    await init_db_async(source_engine)
+    await _populate(source_engine, args.rows)
+    dump = os.path.join(tmp, "export.ndjson")
+
+    async def full_list() -> None:
+        # Référence : toute la table en une liste, une seule réponse JSON
+        async with source() as db:
+            items = (await db.execute(select(Interaction))).scalars().all()
+            json.dumps(
+                [
+                    {
+                        "id": it.id,
+                        "user_id": it.user_id,
+                        "role": it.role,
+                        "text": it.text,
+                        "metadata": it.metadata_json,
+                        "created_at": it.created_at.isoformat(),
+                    }
+                    for it in items
+                ],
+                ensure_ascii=False,
+            )
+
+    async def export() -> None:
+        with open(dump, "wb") as f:
+            async for chunk in export_interactions(ShardRouter([source]), chunk=args.chunk):
+                f.write(chunk)
+
+    imports = []
+
+    async def import_() -> None:
+        path = os.path.join(tmp, f"target-{len(imports)}.db")
+        engine = create_memory_engine(f"sqlite+aiosqlite:///{path}")
+        await init_db_async(engine)
+        target = async_sessionmaker(engine, expire_on_commit=False)
+        imports.append(
+            await import_interactions(
+                ShardRouter([target]), _file_chunks(dump), keep_ids=True, batch=args.chunk
+            )
+        )
+        await engine.dispose()
+
+    # Débit mesuré sans tracemalloc (qui ralentit l'interpréteur), puis
+    # seconde passe pour le pic de mémoire.
+    for label, step in (("liste complète", full_list), ("export NDJSON", export), ("import NDJSON", import_)):
+        t0 = time.perf_counter()
+        await step()
+        elapsed = time.perf_counter() - t0
+        tracemalloc.start()
+        await step()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<15}: {args.rows / elapsed:9.0f} lignes/s   pic mémoire {_mb(peak)}")
+
+    print(
+        f"fichier NDJSON {os.path.getsize(dump) / 2**20:.1f} Mo, "
+        f"import : {imports[0]['imported']} lignes, {imports[0]['rejected']} rejetées"
+    )
+
+    await source_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunk", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run(args, tmp))
+
+
+if __name__ == "__main__":
+    main()
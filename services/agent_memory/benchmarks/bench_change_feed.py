@@ -0,0 +1,120 @@
+# services/agent_memory/benchmarks/bench_change_feed.py
+
+"""
+Benchmark de l'invalidation des caches clients : long-poll sur le flux
+de changements contre relecture périodique de get_history (délai de
+détection p50 / p99 et nombre de lectures).
+
+    python -m benchmarks.bench_change_feed --consumers 200 --writes 2000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+
+async def _run(mode: str, args, tmp: str) -> None:
+    import app.mcp.handler as handler
+    import app.summary.refresher as refresher
+    from app.changes.feed import ChangeFeed
+    from app.db.shards import ShardRouter
+
+    router = ShardRouter.from_urls([f"sqlite+aiosqlite:///{os.path.join(tmp, mode + '.db')}"])
+    handler.shard_router = refresher.shard_router = router
+    handler.group_commits.clear()
+    feed = handler.change_feed = ChangeFeed()
+    await router.init_all()
+
+    users = [f"user-{i}" for i in range(args.consumers)]
+    written_at: Dict[str, List[float]] = {u: [] for u in users}
+    delays: List[float] = []
+    reads = {"count": 0}
+    done = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    async def consumer(user_id: str) -> None:
+        seen = 0
+        if mode == "flux":
+            cursor = feed.read()["next"]
+            while not done.is_set():
+                page = await feed.wait(cursor, user_id=user_id, timeout=1.0)
+                reads["count"] += 1
+                cursor = page["next"]
+                now = loop.time()
+                for _ in page["events"]:
+                    if seen < len(written_at[user_id]):
+                        delays.append(now - written_at[user_id][seen])
+                        seen += 1
+        else:
+            last_id = 0
+            while not done.is_set():
+                await asyncio.sleep(args.poll_ms / 1000.0)
+                response = await handler.process_mcp_message(
+                    {"payload": {"task": "get_history", "user_id": user_id, "limit": 1}}
+                )
+                reads["count"] += 1
+                history = response.payload["history"]
+                now = loop.time()
+                if history and history[0]["id"] != last_id:
+                    last_id = history[0]["id"]
+                    while seen < len(written_at[user_id]):
+                        delays.append(now - written_at[user_id][seen])
+                        seen += 1
+
+    async def writer() -> None:
+        for n in range(args.writes):
+            user_id = users[n % len(users)]
+            # Instant de la demande d'écriture (le flux peut réveiller le
+            # consommateur avant le retour de process_mcp_message)
+            written_at[user_id].append(loop.time())
+            await handler.process_mcp_message(
+                {
+                    "payload": {
+                        "task": "save_interaction",
+                        "user_id": user_id,
+                        "text": f"message {n}",
+                    }
+                }
+            )
+            await asyncio.sleep(args.interval_ms / 1000.0)
+
+    consumers = [asyncio.ensure_future(consumer(u)) for u in users]
+    await asyncio.sleep(0.1)
+    t0 = time.perf_counter()
+    await writer()
+    await asyncio.sleep(max(args.poll_ms / 1000.0, 0.05) * 2)
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await asyncio.gather(*consumers)
+    await router.dispose_all()
+
+    delays.sort()
+    ms = [d * 1000.0 for d in delays]
+    print(
+        f"{mode:<8} détectées {len(ms):5d}/{args.writes}   "
+        f"p50 {statistics.median(ms):7.2f} ms   p99 {ms[int(0.99 * (len(ms) - 1))]:7.2f} ms   "
+        f"lectures {reads['count']:7d} ({reads['count'] / elapsed:7.0f}/s)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--consumers", type=int, default=200)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--interval-ms", type=float, default=2.0)
+    parser.add_argument("--poll-ms", type=float, default=500.0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUMMARY_REFRESH_EVERY", str(10**9))
+    os.environ.setdefault("MEMORY_VECTOR_ENABLED", "0")
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run("polling", args, tmp))
+        asyncio.run(_run("flux", args, tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# services/agent_memory/benchmarks/bench_concurrency.py
+
+"""
+Benchmark de charge mixte lectures / écritures sur process_mcp_message :
+débit, latence p50 / p99 et retard maximal de la boucle d'événements.
+
+    python -m benchmarks.bench_concurrency --clients 32 --requests 3000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _run(args) -> None:
+    from app.db.session import engine, init_db_async
+    from app.mcp.handler import process_mcp_message
+
+    await init_db_async()
+
+    latencies: List[float] = []
+    counter = {"sent": 0}
+    lag = {"max_ms": 0.0}
+    stop = asyncio.Event()
+
+    async def ticker() -> None:
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            t0 = loop.time()
+            await asyncio.sleep(0.001)
+            lag["max_ms"] = max(lag["max_ms"], (loop.time() - t0 - 0.001) * 1000.0)
+
+    async def client(index: int) -> None:
+        while counter["sent"] < args.requests:
+            n = counter["sent"]
+            counter["sent"] += 1
+            user_id = f"user-{(index + n) % args.users}"
+            if (n % 100) < args.write_ratio * 100:
+                payload = {
+                    "task": "save_interaction",
+                    "user_id": user_id,
+                    "role": "user",
+                    "text": f"message {n} " + "bla " * 20,
+                }
+            else:
+                payload = {"task": "get_history", "user_id": user_id, "limit": 10}
+            t0 = time.perf_counter()
+            response = await process_mcp_message({"message_id": str(n), "payload": payload})
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            assert response.payload["status"] == "ok", response.payload
+
+    tick = asyncio.create_task(ticker())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(args.clients)))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await tick
+    await engine.dispose()
+
+    print(f"{len(latencies)} requêtes MCP, {args.clients} clients, écritures {args.write_ratio:.0%}")
+    print(f"débit        : {len(latencies) / elapsed:8.0f} req/s")
+    print(f"latence p50  : {statistics.median(latencies):8.2f} ms")
+    print(f"latence p99  : {_percentile(latencies, 0.99):8.2f} ms")
+    print(f"retard boucle: {lag['max_ms']:8.2f} ms (max)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["MEMORY_DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        # Pas de rafraîchissement de résumé pendant la mesure
+        os.environ.setdefault("SUMMARY_REFRESH_EVERY", str(10**9))
+        asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# services/agent_memory/benchmarks/bench_history.py
+
+"""
+Benchmark de la lecture d'historique d'un utilisateur "lourd" sur une
+grosse table : index simple sur user_id avec tri, contre l'index
+(user_id, created_at DESC, id DESC) et la pagination par curseur.
+
+    python -m benchmarks.bench_history --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import init_db
+from app.repositories.interactions import get_history_page, get_user_history
+
+
+def _populate(engine, rows: int, users: int, heavy_share: float) -> None:
+    rng = random.Random(42)
+    start = datetime(2023, 1, 1)
+    heavy_rows = int(rows * heavy_share)
+    batch = []
+
+    with engine.begin() as conn:
+        for i in range(rows):
+            user = "heavy" if i < heavy_rows else f"user-{rng.randrange(users)}"
+            batch.append(
+                {
+                    "user_id": user,
+                    "role": "user" if i % 2 == 0 else "coach",
+                    "text": f"message {i} " + "bla " * rng.randrange(5, 40),
+                    "metadata": '{"service": "coaching_sport"}',
+                    # ordre d'insertion ≠ ordre chronologique
+                    "created_at": start + timedelta(seconds=rng.randrange(0, 3 * 10**7)),
+                }
+            )
+            if len(batch) == 20_000:
+                conn.execute(
+                    text(
+                        "INSERT INTO interactions (user_id, role, text, metadata, created_at) "
+                        "VALUES (:user_id, :role, :text, :metadata, :created_at)"
+                    ),
+                    batch,
+                )
+                batch = []
+        if batch:
+            conn.execute(
+                text(
+                    "INSERT INTO interactions (user_id, role, text, metadata, created_at) "
+                    "VALUES (:user_id, :role, :text, :metadata, :created_at)"
+                ),
+                batch,
+            )
+
+
+def _timeit(fn: Callable[[], object], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000.0)
+    return timings
+
+
+def _report(label: str, timings: List[float]) -> None:
+    print(
+        f"{label:<38} médiane {statistics.median(timings):8.3f} ms   "
+        f"max {max(timings):8.3f} ms"
+    )
+
+
+def _plan(engine, sql: str) -> str:
+    with engine.connect() as conn:
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql)).fetchall()
+    return " | ".join(str(r[-1]) for r in rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--heavy-share", type=float, default=0.1)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        Session = sessionmaker(bind=engine)
+
+        t0 = time.perf_counter()
+        _populate(engine, args.rows, args.users, args.heavy_share)
+        print(f"{args.rows} lignes insérées en {time.perf_counter() - t0:.1f} s")
+
+        query = (
+            "SELECT id, text FROM interactions WHERE user_id = 'heavy' "
+            f"ORDER BY created_at DESC LIMIT {args.limit}"
+        )
+
+        # --- Index simple (schéma d'origine) ---
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_interactions_user_created_id"))
+            conn.execute(text("CREATE INDEX ix_interactions_user_id ON interactions (user_id)"))
+            conn.execute(text("ANALYZE"))
+        print("plan legacy    :", _plan(engine, query))
+        with Session() as db:
+            _report(
+                f"legacy   get_user_history({args.limit})",
+                _timeit(
+                    lambda: db.execute(text(query)).all(),
+                    args.repeat,
+                ),
+            )
+
+        # --- Index composite ---
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_interactions_user_id"))
+        init_db(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        print("plan composite :", _plan(engine, query.replace("DESC", "DESC, id")))
+
+        with Session() as db:
+            _report(
+                f"composite get_user_history({args.limit})",
+                _timeit(lambda: get_user_history(db, "heavy", args.limit), args.repeat),
+            )
+            _report(
+                "composite page 1 (text seul)",
+                _timeit(
+                    lambda: get_history_page(db, "heavy", args.limit, fields=["text"]),
+                    args.repeat,
+                ),
+            )
+
+            # Pages profondes : le coût ne dépend pas de la profondeur
+            cursor = None
+            for _ in range(1_000):
+                page = get_history_page(db, "heavy", args.limit, before=cursor, fields=["text"])
+                cursor = page["next_cursor"]
+            _report(
+                "composite page ~1000 (curseur)",
+                _timeit(
+                    lambda: get_history_page(
+                        db, "heavy", args.limit, before=cursor, fields=["text"]
+                    ),
+                    args.repeat,
+                ),
+            )
+
+
+if __name__ == "__main__":
+    main()
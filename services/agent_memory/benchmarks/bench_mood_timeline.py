@@ -0,0 +1,155 @@
+# services/agent_memory/benchmarks/bench_mood_timeline.py
+
+"""
+Benchmark de la frise des moods (get_mood_timeline) sur 90 jours d'un
+utilisateur "lourd" : agrégat en Python, json_extract() en SQL, puis
+colonnes générées + index partiel.
+
+    python -m benchmarks.bench_mood_timeline --days 730
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Callable, List
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+from app.db.models import Interaction
+from app.db.session import init_db
+from app.repositories.moods import get_mood_timeline
+
+_LEVELS = ("low", "medium", "high")
+
+
+def _populate(engine, args) -> None:
+    rng = random.Random(11)
+    start = datetime(2024, 1, 1)
+    batch = []
+    with engine.begin() as conn:
+        for d in range(args.days):
+            for j in range(args.per_day):
+                # Même format de date que SQLAlchemy (comparaisons de chaînes)
+                at = (start + timedelta(days=d, minutes=10 * j)).strftime("%Y-%m-%d %H:%M:%S.%f")
+                if j == 0:
+                    physical, mental = rng.choice(_LEVELS), rng.choice(_LEVELS)
+                    batch.append(
+                        {
+                            "user_id": "heavy",
+                            "role": "mood",
+                            "text": f"Mood du jour - physique: {physical}, mental: {mental}",
+                            "metadata": (
+                                '{"service": "mood_tracker", '
+                                f'"physical_state": "{physical}", "mental_state": "{mental}"}}'
+                            ),
+                            "created_at": at,
+                        }
+                    )
+                else:
+                    batch.append(
+                        {
+                            "user_id": "heavy" if j % 3 else f"user-{rng.randrange(500)}",
+                            "role": "user" if j % 2 else "coach",
+                            "text": "Séance du jour : footing tranquille, hydratation ok.",
+                            "metadata": '{"service": "coaching_sport", "nb_tokens": 42}',
+                            "created_at": at,
+                        }
+                    )
+            if len(batch) >= 20_000 or d == args.days - 1:
+                conn.execute(
+                    text(
+                        "INSERT INTO interactions (user_id, role, text, metadata, created_at) "
+                        "VALUES (:user_id, :role, :text, :metadata, :created_at)"
+                    ),
+                    batch,
+                )
+                batch = []
+
+
+def _timeline_python(db: Session, start: date, end: date):
+    rows = db.execute(
+        select(Interaction.created_at, Interaction.metadata_json).where(
+            Interaction.user_id == "heavy",
+            Interaction.created_at >= datetime.combine(start, datetime.min.time()),
+            Interaction.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        )
+    ).all()
+    days = defaultdict(lambda: defaultdict(int))
+    for created_at, metadata in rows:
+        if (metadata or {}).get("service") != "mood_tracker":
+            continue
+        day = days[created_at.date()]
+        day["entries"] += 1
+        day["physical_" + str(metadata.get("physical_state"))] += 1
+        day["mental_" + str(metadata.get("mental_state"))] += 1
+    return sorted(days.items())
+
+
+def _timeline_json_extract(db: Session, start: date, end: date):
+    return db.execute(
+        text(
+            "SELECT date(created_at) AS day, count(*), "
+            "sum(json_extract(metadata, '$.physical_state') = 'low'), "
+            "sum(json_extract(metadata, '$.mental_state') = 'low') "
+            "FROM interactions WHERE user_id = :u AND created_at >= :s AND created_at < :e "
+            "AND json_extract(metadata, '$.service') = 'mood_tracker' GROUP BY day ORDER BY day"
+        ),
+        {
+            "u": "heavy",
+            "s": datetime.combine(start, datetime.min.time()),
+            "e": datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        },
+    ).all()
+
+
+def _timeit(fn: Callable[[], object], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000.0)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--per-day", type=int, default=60)
+    parser.add_argument("--window", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        _populate(engine, args)
+        end = date(2024, 1, 1) + timedelta(days=args.days - 1)
+        start = end - timedelta(days=args.window - 1)
+        print(
+            f"{args.days * args.per_day} interactions, fenêtre de {args.window} jours "
+            f"({args.window} moods parmi ~{args.window * (args.per_day * 2 // 3)} lignes de l'utilisateur)"
+        )
+
+        with Session(engine) as db:
+            assert len(get_mood_timeline(db, "heavy", start, end)) == args.window
+            for label, fn in (
+                ("python (parsing JSON)", lambda: _timeline_python(db, start, end)),
+                ("SQL json_extract", lambda: _timeline_json_extract(db, start, end)),
+                ("colonnes générées + index", lambda: get_mood_timeline(db, "heavy", start, end)),
+            ):
+                timings = _timeit(fn, args.repeat)
+                print(
+                    f"{label:<28} médiane {statistics.median(timings):8.3f} ms   "
+                    f"max {max(timings):8.3f} ms"
+                )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# services/agent_memory/benchmarks/bench_retrieve.py
+
+"""
+Benchmark de retrieve_relevant sur un utilisateur de --rows
+interactions : indexation, recherche à chaud, après un nouvel échange,
+après rechargement depuis le disque, et rang de la bonne réponse.
+
+    python -m benchmarks.bench_retrieve --rows 20000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.session import create_memory_engine, init_db_async
+from app.retrieval.vector_index import VectorIndex
+
+_TOPICS = [
+    "Séance de fractionné terminée, {n} x 400 m.",
+    "Pense à bien t'hydrater pendant l'effort, surtout par {n} degrés.",
+    "J'ai mangé des pâtes et {n} g de poulet ce midi.",
+    "Objectif : courir un 10 km en moins de {n} minutes.",
+    "Bien dormi cette nuit, {n} heures.",
+    "Fais {n} minutes d'étirements après la séance.",
+    "Aujourd'hui repos, petite marche de {n} minutes.",
+    "Je me sens fatigué après {n} jours d'entraînement.",
+    "Séance de musculation : squats et gainage, {n} séries.",
+    "Pour progresser, augmente ton volume de {n} % par semaine.",
+]
+_NEEDLE = "J'ai une tendinite au genou droit depuis la sortie longue de dimanche."
+
+
+def _timeit(fn, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000.0)
+    return timings
+
+
+def _report(label: str, timings: List[float]) -> None:
+    print(
+        f"{label:<42} médiane {statistics.median(timings):8.3f} ms   "
+        f"max {max(timings):8.3f} ms"
+    )
+
+
+async def _run(args, tmp: str) -> None:
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    await init_db_async(engine)
+
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1)
+    needle_at = args.rows // 3
+    rows = [
+        {
+            "user_id": "heavy",
+            "role": "user" if i % 2 == 0 else "coach",
+            "text": _NEEDLE if i == needle_at else rng.choice(_TOPICS).format(n=rng.randrange(2, 90)),
+            "created_at": start + timedelta(minutes=i),
+        }
+        for i in range(args.rows)
+    ]
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO interactions (user_id, role, text, metadata, created_at) "
+                "VALUES (:user_id, :role, :text, '{}', :created_at)"
+            ),
+            rows,
+        )
+    needle_id = needle_at + 1
+    queries = ["Mon genou me fait encore mal, je cours demain ?", "douleur genou droit"]
+    vectors_dir = os.path.join(tmp, "vectors")
+
+    async with sessions() as db:
+        index = VectorIndex(directory=vectors_dir, enabled=True)
+
+        t0 = time.perf_counter()
+        await index.search(db, "heavy", queries[0], k=5)
+        elapsed = time.perf_counter() - t0
+        print(
+            f"indexation initiale : {args.rows} interactions en {elapsed:.2f} s "
+            f"({args.rows / elapsed:.0f} /s), {index.stats()['bytes'] / 2**20:.1f} Mo en mémoire"
+        )
+
+        for query in queries:
+            hits = await index.search(db, "heavy", query, k=5)
+            ranks = [i for i, _ in hits]
+            rank = ranks.index(needle_id) + 1 if needle_id in ranks else None
+            print(f"  {query!r} -> rang de l'interaction attendue : {rank}")
+
+        loop = asyncio.get_running_loop()
+
+        async def timed_searches(label: str, before=None) -> None:
+            timings = []
+            for _ in range(args.repeat):
+                if before is not None:
+                    await before()
+                t0 = time.perf_counter()
+                await index.search(db, "heavy", queries[0], k=5)
+                timings.append((time.perf_counter() - t0) * 1000.0)
+            _report(label, timings)
+
+        await timed_searches("recherche (index à jour)")
+
+        counter = {"n": args.rows}
+
+        async def new_exchange() -> None:
+            n = counter["n"]
+            counter["n"] += 2
+            items = [
+                {"user_id": "heavy", "text": f"Nouveau message {n}", "created_at": start + timedelta(minutes=n)},
+                {"user_id": "heavy", "text": f"Réponse du coach {n}", "created_at": start + timedelta(minutes=n + 1)},
+            ]
+            async with sessions() as write_db:
+                result = await write_db.execute(
+                    text(
+                        "INSERT INTO interactions (user_id, role, text, metadata, created_at) "
+                        "VALUES (:user_id, 'user', :text, '{}', :created_at) RETURNING id"
+                    ),
+                    items,
+                )
+                ids = [row[0] for row in result] if result.returns_rows else []
+                await write_db.commit()
+            if not ids:
+                ids = [n + 1, n + 2]
+            index.note_writes(items, ids)
+
+        await timed_searches("recherche après un échange (+2 lignes)", new_exchange)
+
+        # Redémarrage : index relu depuis le disque
+        timings = []
+        for _ in range(min(args.repeat, 10)):
+            reloaded = VectorIndex(directory=vectors_dir, enabled=True)
+            t0 = time.perf_counter()
+            await reloaded.search(db, "heavy", queries[0], k=5)
+            timings.append((time.perf_counter() - t0) * 1000.0)
+        _report("rechargement disque + recherche", timings)
+        del loop
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run(args, tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# services/agent_memory/benchmarks/bench_search.py
+
+"""
+Benchmark de search_history (FTS5, BM25) contre un filtre LIKE, sur
+l'historique d'un utilisateur "lourd", pour des termes fréquents et rares.
+
+    python -m benchmarks.bench_search --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import init_db
+from app.repositories.search import search_history
+
+# Mots "métier" (rares) noyés dans un vocabulaire de remplissage à
+# distribution de Zipf, pour imiter des messages réels.
+_TOPICS = (
+    "genou cheville tendinite rotule périostite fractionné sommeil "
+    "hydratation protéines squat étirements courbatures gainage natation"
+).split()
+_FILLER = [f"mot{k}" for k in range(5_000)]
+_FILLER_WEIGHTS = [1.0 / (k + 1) for k in range(len(_FILLER))]
+
+
+def _populate(engine, rows: int, users: int, heavy_share: float) -> None:
+    rng = random.Random(42)
+    heavy_rows = int(rows * heavy_share)
+    sql = text(
+        "INSERT INTO interactions (user_id, role, text, metadata, created_at) "
+        "VALUES (:user_id, :role, :text, '{}', CURRENT_TIMESTAMP)"
+    )
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            batch.append(
+                {
+                    "user_id": "heavy" if i < heavy_rows else f"user-{rng.randrange(users)}",
+                    "role": "user" if i % 2 == 0 else "coach",
+                    "text": " ".join(
+                        rng.choices(_FILLER, _FILLER_WEIGHTS, k=rng.randrange(6, 30))
+                        + rng.sample(_TOPICS, k=rng.randrange(0, 3))
+                        + (["ménisque"] if rng.random() < 0.0005 else [])
+                    ),
+                }
+            )
+            if len(batch) == 20_000:
+                conn.execute(sql, batch)
+                batch = []
+        if batch:
+            conn.execute(sql, batch)
+
+
+def _timeit(fn: Callable[[], object], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000.0)
+    return timings
+
+
+def _report(label: str, timings: List[float]) -> None:
+    print(
+        f"{label:<38} médiane {statistics.median(timings):8.3f} ms   "
+        f"max {max(timings):8.3f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--heavy-share", type=float, default=0.1)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        Session = sessionmaker(bind=engine)
+
+        t0 = time.perf_counter()
+        _populate(engine, args.rows, args.users, args.heavy_share)
+        print(f"{args.rows} lignes insérées (index FTS compris) en {time.perf_counter() - t0:.1f} s")
+
+        queries = [
+            ("genou tendinite", ["%genou%", "%tendinite%"]),
+            ("ménisque", ["%ménisque%"]),
+        ]
+        with Session() as db:
+            for label, user in (("utilisateur lourd", "heavy"), ("utilisateur moyen", "user-7")):
+                print(f"--- {label} ---")
+                for query, patterns in queries:
+                    like = text(
+                        "SELECT id, text FROM interactions WHERE user_id = :u AND "
+                        + " AND ".join(f"text LIKE :p{i}" for i in range(len(patterns)))
+                        + " ORDER BY created_at DESC, id DESC LIMIT :n"
+                    )
+                    params = {"u": user, "n": args.limit}
+                    params.update({f"p{i}": p for i, p in enumerate(patterns)})
+                    _report(
+                        f"like  {query!r}",
+                        _timeit(lambda: db.execute(like, params).all(), args.repeat),
+                    )
+                    _report(
+                        f"fts5  {query!r}",
+                        _timeit(
+                            lambda: search_history(db, user, query, limit=args.limit),
+                            args.repeat,
+                        ),
+                    )
+
+if __name__ == "__main__":
+    main()
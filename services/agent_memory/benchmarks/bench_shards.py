@@ -0,0 +1,97 @@
+# services/agent_memory/benchmarks/bench_shards.py
+
+"""
+Benchmark du débit d'écriture (save_interaction) selon le nombre de
+shards, avec et sans group commit : débit et latence p50 / p99.
+
+    python -m benchmarks.bench_shards --clients 64 --writes 8000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+
+async def _run(shards: int, group_commit: bool, args, tmp: str) -> None:
+    import app.mcp.handler as handler
+    import app.summary.refresher as refresher
+    from app.db.shards import ShardRouter
+    from sqlalchemy.exc import OperationalError
+
+    label = f"{shards}-{'gc' if group_commit else 'tx'}"
+    router = ShardRouter.from_urls(
+        [f"sqlite+aiosqlite:///{os.path.join(tmp, f'{label}-{i}.db')}" for i in range(shards)]
+    )
+    handler.shard_router = refresher.shard_router = router
+    handler.MEMORY_GROUP_COMMIT_ENABLED = group_commit
+    handler.group_commits.clear()
+    await router.init_all()
+
+    latencies: List[float] = []
+    counter = {"sent": 0, "failed": 0}
+
+    async def client() -> None:
+        while counter["sent"] < args.writes:
+            n = counter["sent"]
+            counter["sent"] += 1
+            t0 = time.perf_counter()
+            try:
+                await handler.process_mcp_message(
+                    {
+                        "message_id": str(n),
+                        "payload": {
+                            "task": "save_interaction",
+                            "user_id": f"user-{n % args.users}",
+                            "role": "user",
+                            "text": f"message {n} " + "bla " * 20,
+                        },
+                    }
+                )
+            except OperationalError:
+                # "database is locked" : busy_timeout dépassé en attendant le verrou
+                counter["failed"] += 1
+                continue
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    elapsed = time.perf_counter() - t0
+    await router.dispose_all()
+
+    latencies.sort()
+    print(
+        f"{shards} shard(s) {'group commit' if group_commit else 'par ligne':<13}"
+        f"{len(latencies) / elapsed:8.0f} écritures/s   "
+        f"p50 {statistics.median(latencies):7.2f} ms   "
+        f"p99 {latencies[int(0.99 * (len(latencies) - 1))]:7.2f} ms   "
+        f"échecs (verrou) {counter['failed']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--writes", type=int, default=8000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--synchronous", default="FULL")
+    args = parser.parse_args()
+
+    # Pas de rafraîchissement de résumé pendant la mesure ; synchronous=FULL
+    # par défaut : un fsync par commit, comme sur un disque où le verrou
+    # d'écriture est tenu pendant la synchronisation.
+    os.environ.setdefault("SUMMARY_REFRESH_EVERY", str(10**9))
+    os.environ.setdefault("MEMORY_DB_SYNCHRONOUS", args.synchronous)
+    os.environ.setdefault("MEMORY_VECTOR_ENABLED", "0")
+    with tempfile.TemporaryDirectory() as tmp:
+        for group_commit in (False, True):
+            for shards in args.shards:
+                asyncio.run(_run(shards, group_commit, args, tmp))
+
+
+if __name__ == "__main__":
+    main()
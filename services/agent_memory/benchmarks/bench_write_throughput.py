@@ -0,0 +1,89 @@
+# services/agent_memory/benchmarks/bench_write_throughput.py
+
+"""
+Benchmark du débit d'écriture de save_interaction avec --clients
+écrivains concurrents : une transaction par ligne contre le group commit.
+
+    python -m benchmarks.bench_write_throughput --clients 32 --writes 4000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+
+async def _run_mode(label: str, group_commit: bool, args) -> None:
+    import app.mcp.handler as handler
+    import app.summary.refresher as refresher
+    from app.db.session import create_memory_engine, init_db_async
+    from app.db.shards import ShardRouter
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    tmp = os.environ["BENCH_TMP_DIR"]
+    engine = create_memory_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, label + '.db')}")
+    handler.shard_router = ShardRouter([async_sessionmaker(engine, expire_on_commit=False)])
+    refresher.shard_router = handler.shard_router
+    handler.MEMORY_GROUP_COMMIT_ENABLED = group_commit
+    handler.group_commits.clear()
+    await init_db_async(engine)
+
+    latencies: List[float] = []
+    counter = {"sent": 0}
+
+    async def client(index: int) -> None:
+        while counter["sent"] < args.writes:
+            n = counter["sent"]
+            counter["sent"] += 1
+            t0 = time.perf_counter()
+            response = await handler.process_mcp_message(
+                {
+                    "message_id": str(n),
+                    "payload": {
+                        "task": "save_interaction",
+                        "user_id": f"user-{n % args.users}",
+                        "role": "user",
+                        "text": f"message {n} " + "bla " * 20,
+                    },
+                }
+            )
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            assert response.payload["status"] == "ok", response.payload
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(args.clients)))
+    elapsed = time.perf_counter() - t0
+    await engine.dispose()
+
+    latencies.sort()
+    extra = ""
+    if group_commit:
+        stats = handler.group_commits[0].stats()
+        extra = f"   {stats['avg_rows_per_commit']:.1f} lignes/commit"
+    print(
+        f"{label:<13} {len(latencies) / elapsed:8.0f} écritures/s   "
+        f"p50 {statistics.median(latencies):7.2f} ms   "
+        f"p99 {latencies[int(0.99 * (len(latencies) - 1))]:7.2f} ms{extra}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--writes", type=int, default=4000)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    # Pas de rafraîchissement de résumé pendant la mesure
+    os.environ.setdefault("SUMMARY_REFRESH_EVERY", str(10**9))
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["BENCH_TMP_DIR"] = tmp
+        asyncio.run(_run_mode("par ligne", False, args))
+        asyncio.run(_run_mode("group commit", True, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
+import json
+
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 
-from app.mcp.handler import process_mcp_message
+from app.mcp.handler import process_mcp_message, stream_user_input
 from app.mcp.schemas import MCPMessage, MCPResponse
 
 app = FastAPI(title="Orchestrator")
@@ -12,3 +15,17 @@ async def mcp_endpoint(msg: MCPMessage) -> MCPResponse:
     Endpoint MCP de l'orchestrateur.
     """
     return await process_mcp_message(msg.dict())
+
+
+@app.post("/mcp/stream")
+async def mcp_stream_endpoint(msg: MCPMessage) -> StreamingResponse:
+    """
+    Endpoint MCP en streaming : la réponse du coach est relayée token par
+    token (NDJSON), suivie d'un événement "done" avec le payload complet.
+    """
+
+    async def ndjson_events():
+        async for event in stream_user_input(msg.dict()):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson_events(), media_type="application/x-ndjson")
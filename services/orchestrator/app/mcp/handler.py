@@ -1,7 +1,8 @@
 # services/orchestrator/app/mcp/handler.py
 
 import uuid
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from app.mcp.schemas import MCPResponse
 from app.services_registry import (
@@ -64,61 +65,32 @@ async def _route_with_manager(
     return services
 
 
-async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
+@dataclass
+class _PipelineState:
     """
-    Orchestrateur principal.
-
-    Tâche gérée :
-      - "process_user_input" : reçoit un texte utilisateur (et éventuellement
-        un chemin audio et/ou un chemin image), orchestre les appels aux autres
-        agents.
-
-    Entrée attendue dans payload :
-      - task: "process_user_input"
-      - user_input: str (facultatif, texte brut fourni par l'interface)
-      - audio_path: str (facultatif, chemin/identifiant du fichier audio)
-      - image_path: str (facultatif, chemin/identifiant de l'image à analyser)
-
-    La réponse contient :
-      - status: "ok" ou "error"
-      - task: "process_user_input"
-      - user_id: str ou None
-      - mood_state: dict ou None
-      - coach_answer: str ou None
-      - speech_transcription: dict ou None
-      - nutrition_result: dict ou None
-      - vision_result: dict ou None
-      - called_services: liste brute des services reçus de l'agent_manager
-
-    Comportement vocal :
-      - si un service "speech"/"transcribe_audio" est exécuté et renvoie un
-        "output_text", ce texte est utilisé comme entrée pour les services
-        suivants (mood, nutrition, coaching, etc.).
+    État accumulé pendant la première passe (tout sauf le coaching).
     """
 
-    payload: Dict[str, Any] = msg.get("payload", {}) or {}
-    context: Dict[str, Any] = msg.get("context", {}) or {}
-    task: Optional[str] = payload.get("task")
-    user_id: Optional[str] = context.get("user_id")
+    services: List[Dict[str, Any]] = field(default_factory=list)
+    mood_state: Optional[Dict[str, Any]] = None
+    transcription_result: Optional[Dict[str, Any]] = None
+    transcribed_text: Optional[str] = None
+    nutrition_result: Optional[Dict[str, Any]] = None
+    vision_result: Optional[Dict[str, Any]] = None
+    coaching_commands: List[ServiceCommand] = field(default_factory=list)
 
-    # -------------------------------------------------------------------------
-    # Vérification de la tâche demandée
-    # -------------------------------------------------------------------------
-    if task != "process_user_input":
-        response_payload = {
-            "status": "error",
-            "message": f"Tâche inconnue pour orchestrateur: {task!r}",
-        }
-        return MCPResponse(
-            message_id=msg.get("message_id", str(uuid.uuid4())),
-            to_agent=msg.get("from_agent", "unknown"),
-            payload=response_payload,
-            context=context,
-        )
 
-    user_input: str = payload.get("user_input", "") or ""
-    audio_path: Optional[str] = payload.get("audio_path")
-    image_path: Optional[str] = payload.get("image_path")
+async def _run_first_pass(
+    user_input: str,
+    user_id: Optional[str],
+    audio_path: Optional[str],
+    image_path: Optional[str],
+) -> _PipelineState:
+    """
+    Routage via l'agent_manager puis exécution de tous les services sauf
+    le coaching (speech, vision, mood, nutrition). Les commandes de coaching
+    sont renvoyées pour la deuxième passe (classique ou streaming).
+    """
 
     # -------------------------------------------------------------------------
     # 1) Appeler l'agent_manager pour savoir quels services exécuter
@@ -189,7 +161,6 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
     # 2) Exécution des services en DEUX PASSES
     # -------------------------------------------------------------------------
     mood_state: Optional[Dict[str, Any]] = None
-    coach_answer: Optional[str] = None
 
     transcription_result: Optional[Dict[str, Any]] = None
     transcribed_text: Optional[str] = None
@@ -285,17 +256,114 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
                 )
             )
 
+    return _PipelineState(
+        services=services,
+        mood_state=mood_state,
+        transcription_result=transcription_result,
+        transcribed_text=transcribed_text,
+        nutrition_result=nutrition_result,
+        vision_result=vision_result,
+        coaching_commands=coaching_commands,
+    )
+
+
+def _build_response_payload(
+    state: _PipelineState,
+    user_id: Optional[str],
+    coach_answer: Optional[str],
+    exchange_id: str,
+) -> Dict[str, Any]:
+    return {
+        "status": "ok",
+        "task": "process_user_input",
+        "user_id": user_id,
+        "exchange_id": exchange_id,
+        "mood_state": state.mood_state,
+        "coach_answer": coach_answer,
+        "speech_transcription": state.transcription_result,
+        "nutrition_result": state.nutrition_result,
+        "vision_result": state.vision_result,
+        "called_services": state.services,
+    }
+
+
+async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
+    """
+    Orchestrateur principal.
+
+    Tâche gérée :
+      - "process_user_input" : reçoit un texte utilisateur (et éventuellement
+        un chemin audio et/ou un chemin image), orchestre les appels aux autres
+        agents.
+
+    Entrée attendue dans payload :
+      - task: "process_user_input"
+      - user_input: str (facultatif, texte brut fourni par l'interface)
+      - audio_path: str (facultatif, chemin/identifiant du fichier audio)
+      - image_path: str (facultatif, chemin/identifiant de l'image à analyser)
+
+    La réponse contient :
+      - status: "ok" ou "error"
+      - task: "process_user_input"
+      - user_id: str ou None
+      - exchange_id: message_id de la requête, clé de l'échange dans
+        agent_memory (record_exchange, cf. agent_cerveau et l'interface)
+      - mood_state: dict ou None
+      - coach_answer: str ou None
+      - speech_transcription: dict ou None
+      - nutrition_result: dict ou None
+      - vision_result: dict ou None
+      - called_services: liste brute des services reçus de l'agent_manager
+
+    Comportement vocal :
+      - si un service "speech"/"transcribe_audio" est exécuté et renvoie un
+        "output_text", ce texte est utilisé comme entrée pour les services
+        suivants (mood, nutrition, coaching, etc.).
+    """
+
+    payload: Dict[str, Any] = msg.get("payload", {}) or {}
+    context: Dict[str, Any] = msg.get("context", {}) or {}
+    task: Optional[str] = payload.get("task")
+    user_id: Optional[str] = context.get("user_id")
+
+    # -------------------------------------------------------------------------
+    # Vérification de la tâche demandée
+    # -------------------------------------------------------------------------
+    if task != "process_user_input":
+        response_payload = {
+            "status": "error",
+            "message": f"Tâche inconnue pour orchestrateur: {task!r}",
+        }
+        return MCPResponse(
+            message_id=msg.get("message_id", str(uuid.uuid4())),
+            to_agent=msg.get("from_agent", "unknown"),
+            payload=response_payload,
+            context=context,
+        )
+
+    exchange_id: str = msg.get("message_id") or str(uuid.uuid4())
+    user_input: str = payload.get("user_input", "") or ""
+    audio_path: Optional[str] = payload.get("audio_path")
+    image_path: Optional[str] = payload.get("image_path")
+
+    # -------------------------------------------------------------------------
+    # 1) + 2.1) Routage et première passe
+    # -------------------------------------------------------------------------
+    state = await _run_first_pass(user_input, user_id, audio_path, image_path)
+    coach_answer: Optional[str] = None
+
     # ------------------------- 2.2 Deuxième passe ----------------------------
-    for cmd in coaching_commands:
-        if transcribed_text:
-            cmd.text = transcribed_text
+    for cmd in state.coaching_commands:
+        if state.transcribed_text:
+            cmd.text = state.transcribed_text
+        cmd.exchange_id = exchange_id
 
         result = await service_registry.execute(
             cmd,
             user_id=user_id,
-            mood_state=mood_state,
-            nutrition_result=nutrition_result,
-            vision_result=vision_result,
+            mood_state=state.mood_state,
+            nutrition_result=state.nutrition_result,
+            vision_result=state.vision_result,
         )
 
         if isinstance(result, str):
@@ -304,21 +372,68 @@ async def process_mcp_message(msg: Dict[str, Any]) -> MCPResponse:
     # -------------------------------------------------------------------------
     # 3) Construire la réponse globale
     # -------------------------------------------------------------------------
-    response_payload: Dict[str, Any] = {
-        "status": "ok",
-        "task": "process_user_input",
-        "user_id": user_id,
-        "mood_state": mood_state,
-        "coach_answer": coach_answer,
-        "speech_transcription": transcription_result,
-        "nutrition_result": nutrition_result,
-        "vision_result": vision_result,
-        "called_services": services,
-    }
+    response_payload = _build_response_payload(state, user_id, coach_answer, exchange_id)
 
     return MCPResponse(
-        message_id=msg.get("message_id", str(uuid.uuid4())),
+        message_id=exchange_id,
         to_agent=msg.get("from_agent", "unknown"),
         payload=response_payload,
         context=context,
     )
+
+
+async def stream_user_input(msg: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Variante streaming de "process_user_input".
+
+    Événements produits (sérialisés en NDJSON par main.py) :
+      - {"type": "meta", "payload": {...}}   après la première passe
+        (mood_state, nutrition_result, vision_result, speech_transcription...)
+      - {"type": "token", "content": "..."}  relayés depuis l'agent_cerveau
+      - {"type": "done", "payload": {...}}   payload identique à /mcp
+      - {"type": "error", "message": "..."}  si la tâche est inconnue
+    """
+    payload: Dict[str, Any] = msg.get("payload", {}) or {}
+    context: Dict[str, Any] = msg.get("context", {}) or {}
+    task: Optional[str] = payload.get("task")
+    user_id: Optional[str] = context.get("user_id")
+
+    if task != "process_user_input":
+        yield {
+            "type": "error",
+            "message": f"Tâche inconnue pour orchestrateur: {task!r}",
+        }
+        return
+
+    exchange_id: str = msg.get("message_id") or str(uuid.uuid4())
+    state = await _run_first_pass(
+        payload.get("user_input", "") or "",
+        user_id,
+        payload.get("audio_path"),
+        payload.get("image_path"),
+    )
+    yield {"type": "meta", "payload": _build_response_payload(state, user_id, None, exchange_id)}
+
+    coach_answer: Optional[str] = None
+    for cmd in state.coaching_commands:
+        if state.transcribed_text:
+            cmd.text = state.transcribed_text
+        cmd.exchange_id = exchange_id
+
+        async for event in service_registry.stream_coach_response(
+            cmd,
+            user_id=user_id,
+            mood_state=state.mood_state,
+            nutrition_result=state.nutrition_result,
+            vision_result=state.vision_result,
+        ):
+            if event.get("type") == "token":
+                yield event
+            elif event.get("type") == "done":
+                answer = (event.get("payload") or {}).get("answer")
+                if isinstance(answer, str):
+                    coach_answer = answer
+            elif event.get("type") == "error":
+                print("[ORCH] streaming coaching en erreur :", event, flush=True)
+
+    yield {"type": "done", "payload": _build_response_payload(state, user_id, coach_answer, exchange_id)}
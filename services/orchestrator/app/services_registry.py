@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import json
 import os
 import uuid
 from dataclasses import dataclass
-from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
 
 import httpx
 
@@ -14,6 +15,9 @@ import httpx
 AGENT_MANAGER_URL = os.getenv("AGENT_MANAGER_URL", "http://agent_manager:8004/mcp")
 AGENT_MOOD_URL = os.getenv("AGENT_MOOD_URL", "http://agent_mood:8001/mcp")
 AGENT_CERVEAU_URL = os.getenv("AGENT_CERVEAU_URL", "http://agent_cerveau:8002/mcp")
+AGENT_CERVEAU_STREAM_URL = os.getenv(
+    "AGENT_CERVEAU_STREAM_URL", AGENT_CERVEAU_URL.rstrip("/") + "/stream"
+)
 AGENT_SPEECH_URL = os.getenv("AGENT_SPEECH_URL", "http://agent_speech:8006/mcp")
 AGENT_KNOWLEDGE_URL = os.getenv(
     "AGENT_KNOWLEDGE_URL", "http://agent_knowledge:8007/mcp"
@@ -33,6 +37,21 @@ async def call_agent(url: str, message: Dict[str, Any]) -> Dict[str, Any]:
         return resp.json()
 
 
+async def stream_agent(url: str, message: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Appelle un endpoint MCP en streaming (NDJSON) et renvoie les événements
+    JSON au fur et à mesure de leur réception.
+    """
+    async with httpx.AsyncClient() as client:
+        async with client.stream("POST", url, json=message, timeout=30.0) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                line = line.strip()
+                if not line:
+                    continue
+                yield json.loads(line)
+
+
 @dataclass
 class ServiceCommand:
     """
@@ -47,6 +66,9 @@ class ServiceCommand:
     service: str
     command: str
     text: str
+    # message_id de la requête utilisateur : clé de l'échange pour
+    # agent_memory (record_exchange), transmise à l'agent_cerveau
+    exchange_id: Optional[str] = None
 
 
 # Type d'un handler pour un service.
@@ -259,16 +281,17 @@ class ServiceRegistry:
             # Si l'agent mood plante, on ne bloque pas tout.
             return None
 
-    async def _handle_coach_response(
-        self,
+    @staticmethod
+    def build_coach_message(
         command: ServiceCommand,
         user_id: Optional[str],
         mood_state: Optional[Dict[str, Any]],
         nutrition_result: Optional[Dict[str, Any]] = None,
         vision_result: Optional[Dict[str, Any]] = None,
-    ) -> Optional[str]:
+    ) -> Dict[str, Any]:
         """
-        Appelle l'agent_cerveau pour générer la réponse de coaching.
+        Construit le message MCP "coach_response" destiné à l'agent_cerveau
+        (mode classique et mode streaming).
         """
 
         payload: Dict[str, Any] = {
@@ -305,16 +328,58 @@ class ServiceRegistry:
 
         payload["expert_knowledge"] = expert_knowledge
 
+        context: Dict[str, Any] = {"user_id": user_id} if user_id else {}
+        if command.exchange_id:
+            context["exchange_id"] = command.exchange_id
+
         # MCP message final
-        msg: Dict[str, Any] = {
+        return {
             "message_id": str(uuid.uuid4()),
             "type": "request",
             "from_agent": "orchestrator",
             "to_agent": "agent_cerveau",
             "payload": payload,
-            "context": {"user_id": user_id} if user_id else {},
+            "context": context,
         }
 
+    async def stream_coach_response(
+        self,
+        command: ServiceCommand,
+        *,
+        user_id: Optional[str],
+        mood_state: Optional[Dict[str, Any]],
+        nutrition_result: Optional[Dict[str, Any]],
+        vision_result: Optional[Dict[str, Any]],
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Variante streaming de coaching/coach_response : relaie les événements
+        NDJSON de l'agent_cerveau ("token", puis "done" ou "error").
+        """
+        msg = self.build_coach_message(
+            command, user_id, mood_state, nutrition_result, vision_result
+        )
+        try:
+            async for event in stream_agent(AGENT_CERVEAU_STREAM_URL, msg):
+                yield event
+        except Exception as e:
+            print("[ORCH] ERREUR streaming agent_cerveau :", repr(e), flush=True)
+            yield {"type": "error", "message": f"agent_cerveau indisponible: {e!r}"}
+
+    async def _handle_coach_response(
+        self,
+        command: ServiceCommand,
+        user_id: Optional[str],
+        mood_state: Optional[Dict[str, Any]],
+        nutrition_result: Optional[Dict[str, Any]] = None,
+        vision_result: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """
+        Appelle l'agent_cerveau pour générer la réponse de coaching.
+        """
+        msg = self.build_coach_message(
+            command, user_id, mood_state, nutrition_result, vision_result
+        )
+
         try:
             resp = await call_agent(AGENT_CERVEAU_URL, msg)
             payload_resp = resp.get("payload", {}) or {}
@@ -0,0 +1,137 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+import app.mcp.handler as handler
+import app.services_registry as registry
+from app.main import app
+from app.services_registry import ServiceCommand
+
+
+class _Chunks(httpx.AsyncByteStream):
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    async def __aiter__(self):
+        for n, chunk in enumerate(self.chunks):
+            if n == self.fail_after:
+                raise httpx.ReadError("connexion coupée")
+            yield chunk.encode("utf-8")
+
+
+def _cerveau(monkeypatch, chunks, status=200, fail_after=None):
+    """
+    Remplace l'agent_cerveau par un flux NDJSON découpé en `chunks`.
+    """
+    requests = []
+
+    def respond(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(status, stream=_Chunks(chunks, fail_after))
+
+    class _Client(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            super().__init__(transport=httpx.MockTransport(respond), **kwargs)
+
+    monkeypatch.setattr(registry.httpx, "AsyncClient", _Client)
+    return requests
+
+
+def _first_pass(monkeypatch, commands=1):
+    async def run(user_input, user_id, audio_path, image_path):
+        return handler._PipelineState(
+            mood_state={"mood": "fatigue", "energy": "low"},
+            coaching_commands=[
+                ServiceCommand("coaching", "coach_response", user_input) for _ in range(commands)
+            ],
+        )
+
+    monkeypatch.setattr(handler, "_run_first_pass", run)
+
+
+def _collect(msg):
+    async def run():
+        return [event async for event in handler.stream_user_input(msg)]
+
+    return asyncio.run(run())
+
+
+MSG = {
+    "message_id": "m-1",
+    "payload": {"task": "process_user_input", "user_input": "Je suis crevé"},
+    "context": {"user_id": "u1"},
+}
+
+
+def test_ndjson_lines_split_across_chunks_are_reassembled(monkeypatch):
+    _cerveau(
+        monkeypatch,
+        [
+            '{"type": "token", "con',
+            'tent": "Bon"}\n\n{"type": "token", "content": "jour"}\n{"ty',
+            'pe": "done", "payload": {"answer": "Bonjour"}}\n',
+        ],
+    )
+
+    async def run():
+        return [e async for e in registry.stream_agent("http://cerveau/mcp/stream", {"payload": {}})]
+
+    assert asyncio.run(run()) == [
+        {"type": "token", "content": "Bon"},
+        {"type": "token", "content": "jour"},
+        {"type": "done", "payload": {"answer": "Bonjour"}},
+    ]
+
+
+def test_tokens_are_relayed_then_a_single_done(monkeypatch):
+    _first_pass(monkeypatch, commands=2)
+    requests = _cerveau(
+        monkeypatch,
+        ['{"type": "token", "content": "Repos"}\n', '{"type": "done", "payload": {"answer": "Repos"}}\n'],
+    )
+
+    events = _collect(MSG)
+
+    assert [e["type"] for e in events] == ["meta", "token", "token", "done"]
+    done = events[-1]["payload"]
+    assert done["coach_answer"] == "Repos" and done["exchange_id"] == "m-1"
+    # L'exchange_id est transmis à l'agent_cerveau (clé de l'échange en mémoire)
+    assert {r["context"]["exchange_id"] for r in requests} == {"m-1"}
+
+
+def test_cerveau_failure_mid_stream_still_ends_with_done(monkeypatch):
+    _first_pass(monkeypatch)
+    _cerveau(
+        monkeypatch,
+        ['{"type": "token", "content": "Re"}\n', '{"type": "token", "content": "pos"}\n'],
+        fail_after=1,
+    )
+
+    events = _collect(MSG)
+
+    assert [e["type"] for e in events] == ["meta", "token", "done"]
+    assert events[-1]["payload"]["coach_answer"] is None
+
+
+def test_stream_endpoint_writes_one_json_object_per_line(monkeypatch):
+    _first_pass(monkeypatch)
+    _cerveau(
+        monkeypatch,
+        ['{"type": "token", "content": "Ça va\\nmieux"}\n', '{"type": "done", "payload": {"answer": "Ça va\\nmieux"}}\n'],
+    )
+
+    envelope = {**MSG, "type": "request", "from_agent": "agent_interface", "to_agent": "orchestrator"}
+    client = TestClient(app)
+    resp = client.post("/mcp/stream", json=envelope)
+    lines = resp.text.splitlines()
+
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in lines]
+    assert [e["type"] for e in events] == ["meta", "token", "done"]
+    assert events[1]["content"] == "Ça va\nmieux"
+
+    unknown = client.post("/mcp/stream", json={**envelope, "payload": {"task": "autre"}})
+    assert [json.loads(line)["type"] for line in unknown.text.splitlines()] == ["error"]